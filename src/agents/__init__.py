@@ -26,6 +26,7 @@ from .guardrail import (
     output_guardrail,
 )
 from .handoffs import Handoff, HandoffInputData, HandoffInputFilter, handoff
+from .history import HistoryManager, TokenBudgetHistoryManager
 from .items import (
     HandoffCallItem,
     HandoffOutputItem,
@@ -40,7 +41,7 @@ from .items import (
 )
 from .lifecycle import AgentHooks, RunHooks
 from .model_settings import ModelSettings
-from .models.interface import Model, ModelProvider, ModelTracing
+from .models.interface import Model, ModelProvider, ModelTracing, WarmupReport
 from .models.openai_chatcompletions import OpenAIChatCompletionsModel
 from .models.openai_provider import OpenAIProvider
 from .models.openai_responses import OpenAIResponsesModel
@@ -85,6 +86,7 @@ from .tracing import (
     guardrail_span,
     handoff_span,
     set_trace_processors,
+    set_trace_sampler,
     set_tracing_disabled,
     set_tracing_export_api_key,
     trace,
@@ -140,6 +142,7 @@ __all__ = [
     "Model",
     "ModelProvider",
     "ModelTracing",
+    "WarmupReport",
     "ModelSettings",
     "OpenAIChatCompletionsModel",
     "OpenAIProvider",
@@ -166,6 +169,8 @@ __all__ = [
     "Handoff",
     "HandoffInputData",
     "HandoffInputFilter",
+    "HistoryManager",
+    "TokenBudgetHistoryManager",
     "TResponseInputItem",
     "MessageOutputItem",
     "ModelResponse",
@@ -205,6 +210,7 @@ __all__ = [
     "guardrail_span",
     "handoff_span",
     "set_trace_processors",
+    "set_trace_sampler",
     "set_tracing_disabled",
     "trace",
     "Trace",
@@ -43,9 +43,11 @@ from .items import (
     ToolCallItem,
     ToolCallOutputItem,
     TResponseInputItem,
+    TResponseOutputItem,
 )
 from .lifecycle import RunHooks
 from .logger import logger
+from .models.fake_id import FAKE_RESPONSES_ID
 from .models.interface import ModelTracing
 from .run_context import RunContextWrapper, TContext
 from .stream_events import RunItemStreamEvent, StreamEvent
@@ -647,6 +649,61 @@ class RunImpl:
                 queue.put_nowait(event)
 
 
+class ResponseChain:
+    """Tracks the conversation state that the Responses API stores for a run, so that each turn can
+    continue from the previous response with `previous_response_id` and only send the items that
+    were added since, instead of the full history.
+    """
+
+    def __init__(self) -> None:
+        self.response_id: str | None = None
+        self._original_input: str | list[TResponseInputItem] | None = None
+        self._sent_items: list[RunItem] = []
+        self._response_output: list[TResponseOutputItem] = []
+
+    def record(
+        self,
+        original_input: str | list[TResponseInputItem],
+        generated_items: list[RunItem],
+        response: ModelResponse,
+    ) -> None:
+        """Records a response, along with the run state whose history produced it."""
+        response_id = response.referenceable_id
+        self.response_id = response_id if response_id != FAKE_RESPONSES_ID else None
+        self._original_input = original_input
+        self._sent_items = list(generated_items)
+        self._response_output = list(response.output)
+
+    def continuation(
+        self,
+        original_input: str | list[TResponseInputItem],
+        generated_items: list[RunItem],
+    ) -> tuple[str, list[TResponseInputItem]] | None:
+        """Returns the ID of the previous response and the input items added since then, or None if
+        the next request has to send the full history.
+        """
+        if self.response_id is None or original_input is not self._original_input:
+            return None
+
+        # The server already has everything we sent last time plus the response output. If a handoff
+        # input filter rewrote any of that, the stored state no longer matches the history.
+        sent = len(self._sent_items)
+        if len(generated_items) < sent or any(
+            item is not sent_item for item, sent_item in zip(generated_items, self._sent_items)
+        ):
+            return None
+
+        new_items = generated_items[sent:]
+        output_ids = {id(output) for output in self._response_output}
+        if not output_ids <= {id(item.raw_item) for item in new_items}:
+            return None
+
+        new_input = [
+            item.to_input_item() for item in new_items if id(item.raw_item) not in output_ids
+        ]
+        return (self.response_id, new_input) if new_input else None
+
+
 class TraceCtxManager:
     """Creates a trace only if there is no current trace, and manages the trace lifecycle."""
 
@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import time
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+
+def _gen_run_id() -> str:
+    return f"run_{uuid.uuid4().hex}"
+
+
+@dataclass
+class RunScope:
+    """Identifies the agent run in progress, so that code running on its behalf (e.g. models and
+    providers) can tell runs apart without threading state through every call."""
+
+    run_id: str = field(default_factory=_gen_run_id)
+    """A unique ID for the run."""
+
+    priority: int = 0
+    """The priority of the run's model calls. Higher values are served first when calls have to
+    wait, e.g. for a concurrency limit."""
+
+    deadline: float | None = None
+    """When the run should be done by, as a `time.monotonic()` timestamp. Calls of runs with
+    earlier deadlines are served first among calls with the same priority."""
+
+
+_current_run_scope: contextvars.ContextVar[RunScope | None] = contextvars.ContextVar(
+    "current_run_scope", default=None
+)
+
+
+def get_current_run_scope() -> RunScope | None:
+    """Returns the scope of the run in progress, or None outside of a run."""
+    return _current_run_scope.get()
+
+
+@contextlib.contextmanager
+def run_scope(priority: int = 0, deadline: float | None = None) -> Iterator[RunScope]:
+    """Starts a new run scope for the duration of the block. Tasks created inside the block keep
+    the scope after it exits.
+
+    Args:
+        priority: The priority of the run's model calls.
+        deadline: The time (in seconds) from now that the run should be done by, if any.
+    """
+    scope = RunScope(
+        priority=priority,
+        deadline=time.monotonic() + deadline if deadline is not None else None,
+    )
+    token = _current_run_scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _current_run_scope.reset(token)
@@ -61,3 +61,36 @@ class OutputGuardrailTripwireTriggered(AgentsException):
         super().__init__(
             f"Guardrail {guardrail_result.guardrail.__class__.__name__} triggered tripwire"
         )
+
+
+class CassetteMismatchError(AgentsException):
+    """Exception raised when a replayed model receives a request that was not recorded in its
+    cassette.
+    """
+
+    message: str
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(message)
+
+
+class BatchRequestError(AgentsException):
+    """Exception raised when a request submitted through the Batch API fails or gets no result."""
+
+    message: str
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(message)
+
+
+class CircuitOpenError(AgentsException):
+    """Exception raised when a model call is rejected because the circuit breaker of its endpoint
+    is open."""
+
+    message: str
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(message)
@@ -0,0 +1,463 @@
+from __future__ import annotations
+
+import abc
+import hashlib
+import json
+import math
+from collections import OrderedDict
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, cast
+
+from .handoffs import Handoff
+from .items import TResponseInputItem
+from .logger import logger
+from .tool import Tool
+
+if TYPE_CHECKING:
+    from .agent import Agent
+    from .run import RunConfig
+    from .run_context import RunContextWrapper
+
+TokenCounter = Callable[[Sequence[TResponseInputItem]], int]
+"""A function that returns the number of tokens a list of input items takes up. Strategies assume
+counts are roughly additive, i.e. that a list takes up the sum of what its items take up."""
+
+_CHARS_PER_TOKEN = 4
+_TOKENS_PER_ITEM = 4
+_TOOL_CALL_TYPES = ("function_call", "computer_call")
+_TOOL_OUTPUT_TYPES = ("function_call_output", "computer_call_output")
+
+
+def estimate_tokens(items: Sequence[TResponseInputItem]) -> int:
+    """Estimates the number of tokens input items take up, without calling a tokenizer: about
+    four characters of JSON per token, plus a few tokens of overhead per item. The estimate is
+    rough but cheap, and errs on the high side for typical English text."""
+    total = 0
+    for item in items:
+        text = json.dumps(item, separators=(",", ":"), ensure_ascii=False, default=str)
+        total += math.ceil(len(text) / _CHARS_PER_TOKEN) + _TOKENS_PER_ITEM
+    return total
+
+
+def _estimate_text_tokens(text: str | None) -> int:
+    return math.ceil(len(text) / _CHARS_PER_TOKEN) if text else 0
+
+
+@dataclass
+class HistoryContext:
+    """What a history manager knows about the model request it prepares the input for."""
+
+    agent: Agent[Any]
+    """The agent about to be called."""
+
+    system_instructions: str | None
+    """The system prompt of the request."""
+
+    tools: list[Tool]
+    """The tools of the request."""
+
+    handoffs: list[Handoff]
+    """The handoffs of the request."""
+
+    context_wrapper: RunContextWrapper[Any]
+    """The context of the run."""
+
+    run_config: RunConfig
+    """The config of the run."""
+
+
+class HistoryManager(abc.ABC):
+    """Prepares the history sent to the model before each model request of a run, e.g. to keep it
+    within the model's context window. Set it with `RunConfig.history_manager`.
+
+    The history is managed per request: the run still keeps every item, so handoffs and
+    `RunResult.to_input_list()` see the full history.
+    """
+
+    @abc.abstractmethod
+    async def manage(
+        self, input: list[TResponseInputItem], context: HistoryContext
+    ) -> list[TResponseInputItem]:
+        """Returns the input to send to the model. Must not modify `input` in place.
+
+        Args:
+            input: The full history of the run: the original input, followed by every item
+                generated so far.
+            context: The model request the input is for.
+        """
+        pass
+
+
+@dataclass
+class HistoryBudget:
+    """The token budget that history strategies compact the input to."""
+
+    max_tokens: int
+    """The number of tokens the input items may take up."""
+
+    count_tokens: TokenCounter
+    """Counts the tokens input items take up."""
+
+    context: HistoryContext
+    """The model request the input is for."""
+
+    def fits(self, items: Sequence[TResponseInputItem]) -> bool:
+        return self.count_tokens(items) <= self.max_tokens
+
+
+class HistoryStrategy(abc.ABC):
+    """One way of making the history smaller. Strategies should stop as soon as the input fits
+    the budget, and must keep every tool call together with its output."""
+
+    @abc.abstractmethod
+    async def compact(
+        self, items: list[TResponseInputItem], budget: HistoryBudget
+    ) -> list[TResponseInputItem]:
+        """Returns a smaller version of `items`. Must not modify `items` in place."""
+        pass
+
+
+def _item_type(item: TResponseInputItem) -> str | None:
+    item_type = item.get("type")
+    if item_type is None and "role" in item:
+        return "message"
+    return str(item_type) if item_type is not None else None
+
+
+def _segments(items: Sequence[TResponseInputItem]) -> list[list[int]]:
+    """Groups the indices of items that must be kept or dropped together: a tool call with its
+    output, and reasoning items with the item that follows them. Segments are returned in the
+    order of their first item."""
+    parent = list(range(len(items)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(i: int, j: int) -> None:
+        parent[find(j)] = find(i)
+
+    calls: dict[str, int] = {}
+    for i, item in enumerate(items):
+        item_type = _item_type(item)
+        if item_type == "reasoning" and i + 1 < len(items):
+            union(i, i + 1)
+        call_id = item.get("call_id")
+        if isinstance(call_id, str) and item_type in _TOOL_CALL_TYPES + _TOOL_OUTPUT_TYPES:
+            if call_id in calls:
+                union(calls[call_id], i)
+            else:
+                calls[call_id] = i
+
+    segments: dict[int, list[int]] = {}
+    for i in range(len(items)):
+        segments.setdefault(find(i), []).append(i)
+    return sorted(segments.values(), key=lambda segment: segment[0])
+
+
+def _protected_start(items: Sequence[TResponseInputItem], keep_last: int) -> int:
+    """Returns the index from which items are protected, moved back so that no segment starts
+    before it and ends after it."""
+    start = max(0, len(items) - keep_last)
+    for segment in _segments(items):
+        if segment[0] < start <= segment[-1]:
+            start = segment[0]
+    return start
+
+
+class DropReasoningItems(HistoryStrategy):
+    """Drops reasoning items, oldest first. Reasoning items are only useful to the model for the
+    turn they were generated in."""
+
+    def __init__(self, keep_last: int = 10) -> None:
+        """
+        Args:
+            keep_last: The number of most recent items to leave alone.
+        """
+        self.keep_last = keep_last
+
+    async def compact(
+        self, items: list[TResponseInputItem], budget: HistoryBudget
+    ) -> list[TResponseInputItem]:
+        tokens = budget.count_tokens(items)
+        kept: list[TResponseInputItem] = []
+        end = max(0, len(items) - self.keep_last)
+        for i, item in enumerate(items):
+            if i < end and tokens > budget.max_tokens and _item_type(item) == "reasoning":
+                tokens -= budget.count_tokens([item])
+            else:
+                kept.append(item)
+        return kept
+
+
+class ClearToolOutputs(HistoryStrategy):
+    """Replaces the outputs of old function calls with a short placeholder, oldest first. The
+    calls and their outputs stay paired, so the model can still see which tools it called."""
+
+    def __init__(
+        self,
+        keep_last: int = 10,
+        placeholder: str = "[Tool output removed to save space]",
+    ) -> None:
+        """
+        Args:
+            keep_last: The number of most recent items to leave alone.
+            placeholder: The text that replaces each cleared output.
+        """
+        self.keep_last = keep_last
+        self.placeholder = placeholder
+
+    async def compact(
+        self, items: list[TResponseInputItem], budget: HistoryBudget
+    ) -> list[TResponseInputItem]:
+        items = list(items)
+        tokens = budget.count_tokens(items)
+        for i in range(max(0, len(items) - self.keep_last)):
+            if tokens <= budget.max_tokens:
+                break
+            item = items[i]
+            if _item_type(item) != "function_call_output" or item.get("output") == self.placeholder:
+                continue
+            cleared = cast(TResponseInputItem, {**item, "output": self.placeholder})
+            tokens += budget.count_tokens([cleared]) - budget.count_tokens([item])
+            items[i] = cleared
+        return items
+
+
+class DropOldestItems(HistoryStrategy):
+    """Drops the oldest items until the input fits. Tool calls are dropped together with their
+    outputs, and reasoning items together with the item that follows them."""
+
+    def __init__(self, keep_last: int = 10, keep_first_message: bool = True) -> None:
+        """
+        Args:
+            keep_last: The number of most recent items to leave alone. The input may still not fit
+                after everything else has been dropped.
+            keep_first_message: Whether to keep the first item if it's a message, which is
+                usually the task the run was started with.
+        """
+        self.keep_last = keep_last
+        self.keep_first_message = keep_first_message
+
+    async def compact(
+        self, items: list[TResponseInputItem], budget: HistoryBudget
+    ) -> list[TResponseInputItem]:
+        protected = _protected_start(items, self.keep_last)
+        tokens = budget.count_tokens(items)
+        dropped: set[int] = set()
+        for segment in _segments(items):
+            if tokens <= budget.max_tokens or segment[-1] >= protected:
+                break
+            if segment == [0] and self.keep_first_message and _item_type(items[0]) == "message":
+                continue
+            dropped.update(segment)
+            tokens -= budget.count_tokens([items[i] for i in segment])
+        return [item for i, item in enumerate(items) if i not in dropped]
+
+
+_SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+_DEFAULT_SUMMARY_INSTRUCTIONS = (
+    "You summarize the earlier part of a conversation between a user and an AI assistant that "
+    "uses tools, so that the assistant can continue the conversation from the summary. Keep the "
+    "user's goals, decisions, facts learned from tool outputs and open questions. Be concise."
+)
+
+
+def _summary_message(summary: str) -> TResponseInputItem:
+    return {"role": "user", "content": _SUMMARY_PREFIX + summary}
+
+
+def _transcript(items: Sequence[TResponseInputItem]) -> str:
+    lines = []
+    for item in items:
+        item_type = _item_type(item)
+        if item_type == "message":
+            content = item.get("content")
+            if isinstance(content, list):
+                content = " ".join(
+                    str(part.get("text") or part.get("refusal") or "")
+                    for part in content
+                    if isinstance(part, dict)
+                )
+            lines.append(f"{item.get('role')}: {content}")
+        elif item_type == "function_call":
+            lines.append(f"tool call: {item.get('name')}({item.get('arguments')})")
+        elif item_type == "function_call_output":
+            lines.append(f"tool output: {item.get('output')}")
+        elif item_type != "reasoning":
+            lines.append(f"{item_type}: {json.dumps(item, default=str)}")
+    return "\n".join(lines)
+
+
+class SummarizeOlderItems(HistoryStrategy):
+    """Replaces the older part of the history with a summary written by a (typically small and
+    cheap) summarizer agent.
+
+    Summaries are cached by the history they summarize, so that later requests of the run reuse
+    them and only summarize what was added since.
+    """
+
+    def __init__(
+        self,
+        summarizer: Agent[Any] | None = None,
+        keep_last: int = 10,
+        max_cached_summaries: int = 256,
+    ) -> None:
+        """
+        Args:
+            summarizer: The agent that writes summaries. It gets a transcript of the items to
+                summarize as input, and its final output is the summary. Defaults to an agent
+                using `gpt-4o-mini`.
+            keep_last: The number of most recent items to keep as they are.
+            max_cached_summaries: The number of summaries to keep in the cache.
+        """
+        if summarizer is None:
+            # Imported lazily to avoid an import cycle with the agent module.
+            from .agent import Agent
+
+            summarizer = Agent(
+                name="History summarizer",
+                instructions=_DEFAULT_SUMMARY_INSTRUCTIONS,
+                model="gpt-4o-mini",
+            )
+        self.summarizer = summarizer
+        self.keep_last = keep_last
+        self.max_cached_summaries = max_cached_summaries
+        self._summaries: OrderedDict[str, tuple[int, str]] = OrderedDict()
+
+    def _prefix_fingerprints(self, items: Sequence[TResponseInputItem]) -> dict[int, str]:
+        """Fingerprints the prefixes of `items` that have a cached summary, and `items` itself.
+
+        The fingerprint is a running hash, so each item is serialized and hashed once however many
+        prefixes are checked.
+        """
+        lengths = {length for length, _ in self._summaries.values() if length <= len(items)}
+        lengths.add(len(items))
+        hasher = hashlib.sha256()
+        fingerprints = {0: hasher.hexdigest()} if 0 in lengths else {}
+        for index, item in enumerate(items[: max(lengths)], start=1):
+            # Compact JSON never contains a raw newline, so it separates items unambiguously.
+            payload = json.dumps(item, sort_keys=True, separators=(",", ":"), default=str)
+            hasher.update(payload.encode("utf-8") + b"\n")
+            if index in lengths:
+                fingerprints[index] = hasher.copy().hexdigest()
+        return fingerprints
+
+    def _cached_summary(self, fingerprints: dict[int, str]) -> tuple[int, str] | None:
+        """Returns the longest cached summary of a prefix, with the prefix length."""
+        best: tuple[int, str] | None = None
+        for length, fingerprint in fingerprints.items():
+            cached = self._summaries.get(fingerprint)
+            if cached is not None and cached[0] == length and (best is None or length > best[0]):
+                best = cached
+        return best
+
+    async def _summarize(self, items: Sequence[TResponseInputItem], budget: HistoryBudget) -> str:
+        # Imported lazily to avoid an import cycle with the runner, which uses history managers.
+        from .run import RunConfig, Runner
+
+        run_config = budget.context.run_config
+        result = await Runner.run(
+            self.summarizer,
+            _transcript(items),
+            run_config=RunConfig(
+                model_provider=run_config.model_provider,
+                tracing_disabled=run_config.tracing_disabled,
+                trace_include_sensitive_data=run_config.trace_include_sensitive_data,
+            ),
+        )
+        return str(result.final_output)
+
+    async def compact(
+        self, items: list[TResponseInputItem], budget: HistoryBudget
+    ) -> list[TResponseInputItem]:
+        split = _protected_start(items, self.keep_last)
+        if split == 0:
+            return list(items)
+
+        summarized: list[TResponseInputItem] = []
+        fingerprints = self._prefix_fingerprints(items[:split])
+        cached = self._cached_summary(fingerprints)
+        start = 0
+        if cached is not None:
+            start, summary = cached
+            summarized = [_summary_message(summary)]
+            compacted = summarized + items[start:]
+            if budget.fits(compacted) or start == split:
+                return compacted
+
+        logger.debug(f"Summarizing {split - start} history items")
+        summary = await self._summarize(summarized + items[start:split], budget)
+        self._summaries[fingerprints[split]] = (split, summary)
+        while len(self._summaries) > self.max_cached_summaries:
+            self._summaries.popitem(last=False)
+        return [_summary_message(summary)] + items[split:]
+
+
+class TokenBudgetHistoryManager(HistoryManager):
+    """Keeps the input of each model request within a token budget.
+
+    The tokens taken up by the system prompt and tool definitions are subtracted from the budget.
+    If the history doesn't fit in what's left, the strategies are applied in order, each one
+    stopping as soon as the history fits.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        strategies: list[HistoryStrategy] | None = None,
+        token_counter: TokenCounter | None = None,
+    ) -> None:
+        """
+        Args:
+            max_tokens: The number of input tokens each request may take up, e.g. the model's
+                context window minus the room needed for the output.
+            strategies: How to make the history fit, in order. Defaults to dropping reasoning
+                items, then clearing old tool outputs, then dropping the oldest items.
+            token_counter: Counts the tokens input items take up. Defaults to `estimate_tokens`.
+                Plug in a real tokenizer for exact counts.
+        """
+        self.max_tokens = max_tokens
+        self.strategies = (
+            strategies
+            if strategies is not None
+            else [DropReasoningItems(), ClearToolOutputs(), DropOldestItems()]
+        )
+        self.count_tokens = token_counter or estimate_tokens
+
+    def _fixed_tokens(self, context: HistoryContext) -> int:
+        # Imported lazily to avoid an import cycle with the model implementations.
+        from .models.openai_responses import Converter
+
+        converted = Converter.convert_tools(context.tools, context.handoffs)
+        return _estimate_text_tokens(context.system_instructions) + _estimate_text_tokens(
+            json.dumps(converted.tools, default=str)
+        )
+
+    async def manage(
+        self, input: list[TResponseInputItem], context: HistoryContext
+    ) -> list[TResponseInputItem]:
+        budget = HistoryBudget(
+            max_tokens=self.max_tokens - self._fixed_tokens(context),
+            count_tokens=self.count_tokens,
+            context=context,
+        )
+        if budget.fits(input):
+            return input
+
+        items = input
+        for strategy in self.strategies:
+            items = await strategy.compact(items, budget)
+            if budget.fits(items):
+                break
+        else:
+            logger.warning(
+                f"History of {self.count_tokens(items)} tokens still exceeds the budget of "
+                f"{budget.max_tokens} tokens after compaction"
+            )
+        logger.debug(f"Compacted history from {len(input)} to {len(items)} items")
+        return items
@@ -39,6 +39,13 @@ class ModelSettings:
     max_tokens: int | None = None
     """The maximum number of output tokens to generate."""
 
+    cache_breakpoints: bool | None = None
+    """Whether to mark prompt cache breakpoints (`cache_control` hints) on the instructions and on
+    the end of the conversation history. This is for providers that only cache prompts at explicit
+    breakpoints, such as Anthropic models behind an OpenAI-compatible Chat Completions API. OpenAI
+    models cache prompts automatically, so this is ignored by the Responses API.
+    """
+
     def resolve(self, override: ModelSettings | None) -> ModelSettings:
         """Produce a new ModelSettings by overlaying any non-None values from the
         override on top of this instance."""
@@ -53,4 +60,5 @@ class ModelSettings:
             parallel_tool_calls=override.parallel_tool_calls or self.parallel_tool_calls,
             truncation=override.truncation or self.truncation,
             max_tokens=override.max_tokens or self.max_tokens,
+            cache_breakpoints=override.cache_breakpoints or self.cache_breakpoints,
         )
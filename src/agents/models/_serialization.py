@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import json
+from typing import TYPE_CHECKING, Any
+
+from pydantic import TypeAdapter
+
+from ..agent_output import AgentOutputSchema
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseOutputItem
+from ..tool import Tool
+from ..usage import Usage
+from .interface import Model
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+_output_items_adapter: TypeAdapter[list[TResponseOutputItem]] = TypeAdapter(
+    list[TResponseOutputItem]
+)
+
+
+def describe_model(model: Model) -> str:
+    """Returns a stable, human-readable description of a model, looking through wrapper models
+    (which expose the model they wrap as `wrapped_model`)."""
+    wrapped = getattr(model, "wrapped_model", None)
+    if isinstance(wrapped, Model):
+        return f"{type(model).__name__}({describe_model(wrapped)})"
+
+    name = getattr(model, "model", None)
+    return f"{type(model).__name__}:{name}" if isinstance(name, str) else type(model).__name__
+
+
+def canonical_json(value: Any) -> str:
+    """Serializes a value to JSON with sorted keys and no whitespace, so that equal values always
+    produce byte-identical output."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def request_fingerprint(
+    model_name: str,
+    system_instructions: str | None,
+    input: str | list[TResponseInputItem],
+    model_settings: ModelSettings,
+    tools: list[Tool],
+    output_schema: AgentOutputSchema | None,
+    handoffs: list[Handoff],
+    previous_response_id: str | None = None,
+) -> str:
+    """Returns a stable hash of everything that influences a model request. Two calls with the
+    same fingerprint would send the same request to the model.
+    """
+    # Imported lazily to avoid an import cycle with the model implementations.
+    from .openai_responses import Converter
+
+    converted_tools = Converter.convert_tools(tools, handoffs)
+    payload = {
+        "model": model_name,
+        "instructions": system_instructions,
+        "input": input,
+        "tools": converted_tools.tools,
+        "includes": converted_tools.includes,
+        "output_schema": Converter.get_response_format(output_schema),
+        "model_settings": dataclasses.asdict(model_settings),
+    }
+    if previous_response_id is not None:
+        # Only included when set, so that the fingerprints of unchained requests don't change.
+        payload["previous_response_id"] = previous_response_id
+    return hashlib.sha256(canonical_json(payload).encode("utf-8")).hexdigest()
+
+
+def model_response_to_dict(response: ModelResponse) -> dict[str, Any]:
+    """Converts a model response into a JSON-serializable dict."""
+    return {
+        "output": [item.model_dump(mode="json", exclude_unset=True) for item in response.output],
+        "usage": dataclasses.asdict(response.usage),
+        "referenceable_id": response.referenceable_id,
+    }
+
+
+def model_response_from_dict(data: dict[str, Any]) -> ModelResponse:
+    """Converts a dict produced by `model_response_to_dict` back into a model response."""
+    usage_fields = {f.name for f in dataclasses.fields(Usage)}
+    return ModelResponse(
+        output=_output_items_adapter.validate_python(data["output"]),
+        usage=Usage(**{k: v for k, v in data.get("usage", {}).items() if k in usage_fields}),
+        referenceable_id=data.get("referenceable_id"),
+    )
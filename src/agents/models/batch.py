@@ -0,0 +1,471 @@
+from __future__ import annotations
+
+import abc
+import asyncio
+import contextvars
+import dataclasses
+import functools
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Union, cast
+
+import httpx
+from openai import APIStatusError, AsyncOpenAI, NotGiven
+from openai.types.chat import ChatCompletion
+from openai.types.responses import Response
+
+from ..agent_output import AgentOutputSchema
+from ..exceptions import BatchRequestError, UserError
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..logger import logger
+from ..tool import Tool
+from ..tracing import SpanError, generation_span, response_span
+from ..tracing.setup import GLOBAL_TRACE_PROVIDER
+from ..usage import Usage
+from . import _openai_shared
+from .interface import Model, ModelTracing
+from .openai_chatcompletions import OpenAIChatCompletionsModel, _Converter
+from .openai_responses import OpenAIResponsesModel
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+
+RESPONSES_ENDPOINT = "/v1/responses"
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+
+BatchableModel = Union[OpenAIResponsesModel, OpenAIChatCompletionsModel]
+
+
+def _get_client(openai_client: AsyncOpenAI | None) -> AsyncOpenAI:
+    return (
+        openai_client
+        or _openai_shared.get_default_openai_client()
+        or AsyncOpenAI(api_key=_openai_shared.get_default_openai_key())
+    )
+
+
+class BatchTransport(abc.ABC):
+    """Runs batches of requests. Batches are exchanged in the JSONL format of the OpenAI Batch API:
+    one `{"custom_id", "method", "url", "body"}` request per input line, and one
+    `{"custom_id", "response": {"status_code", "body"}, "error"}` result per output line.
+    """
+
+    @abc.abstractmethod
+    async def submit(self, endpoint: str, requests: bytes) -> bytes:
+        """Runs a batch and waits for it to finish.
+
+        Args:
+            endpoint: The endpoint all the requests in the batch are sent to, e.g.
+                `/v1/responses`.
+            requests: The batch input file, in JSONL format.
+
+        Returns:
+            The batch output file, in JSONL format. Results may be in any order, and requests
+            without a result are failed with a `BatchRequestError`.
+        """
+        pass
+
+
+class OpenAIBatchTransport(BatchTransport):
+    """Runs batches with the OpenAI Batch API: uploads the input file, creates a batch, polls it
+    until it's done and downloads the output and error files.
+    """
+
+    def __init__(
+        self,
+        openai_client: AsyncOpenAI | None = None,
+        completion_window: str = "24h",
+        poll_interval: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            openai_client: The client to use. Defaults to the default OpenAI client.
+            completion_window: The time frame within which each batch should be processed.
+            poll_interval: How often (in seconds) to check whether a batch has finished.
+        """
+        self._client = openai_client
+        self.completion_window = completion_window
+        self.poll_interval = poll_interval
+
+    async def submit(self, endpoint: str, requests: bytes) -> bytes:
+        client = _get_client(self._client)
+        input_file = await client.files.create(file=("batch.jsonl", requests), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            # The installed `openai` package may not list every endpoint the Batch API accepts.
+            endpoint=cast(Any, endpoint),
+            completion_window=cast(Any, self.completion_window),
+        )
+        logger.debug(f"Created batch {batch.id} for {endpoint}")
+
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(self.poll_interval)
+            batch = await client.batches.retrieve(batch.id)
+
+        if batch.status == "failed":
+            errors = [error.message for error in batch.errors.data or []] if batch.errors else []
+            raise BatchRequestError(f"Batch {batch.id} failed: {'; '.join(map(str, errors))}")
+
+        output: list[bytes] = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await client.files.content(file_id)
+                output.append(content.content)
+        return b"\n".join(output)
+
+
+class LocalBatchTransport(BatchTransport):
+    """Runs each request of a batch as a regular API request. Useful in tests, and with
+    OpenAI-compatible servers that don't implement the Batch API.
+    """
+
+    def __init__(self, openai_client: AsyncOpenAI | None = None, max_concurrency: int = 8) -> None:
+        """
+        Args:
+            openai_client: The client to send the requests with. Defaults to the default OpenAI
+                client.
+            max_concurrency: The maximum number of requests to send at the same time.
+        """
+        self._client = openai_client
+        self.max_concurrency = max_concurrency
+
+    async def submit(self, endpoint: str, requests: bytes) -> bytes:
+        client = _get_client(self._client)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def send(request: dict[str, Any]) -> dict[str, Any]:
+            path = request["url"].removeprefix("/v1")
+            async with semaphore:
+                try:
+                    response = await client.post(path, body=request["body"], cast_to=httpx.Response)
+                except APIStatusError as e:
+                    result = {"status_code": e.status_code, "body": {"error": e.body}}
+                else:
+                    result = {"status_code": response.status_code, "body": response.json()}
+            return {"custom_id": request["custom_id"], "response": result, "error": None}
+
+        results = await asyncio.gather(
+            *(send(json.loads(line)) for line in requests.splitlines() if line.strip())
+        )
+        return "".join(json.dumps(result) + "\n" for result in results).encode("utf-8")
+
+
+@dataclass
+class _BatchRequest:
+    custom_id: str
+    endpoint: str
+    body: dict[str, Any]
+    future: asyncio.Future[dict[str, Any]]
+
+
+def _error_message(result: dict[str, Any]) -> str:
+    error = result.get("error") or (result.get("response") or {}).get("body", {}).get("error")
+    if isinstance(error, dict):
+        return str(error.get("message") or error)
+    return str(error)
+
+
+class BatchCollector:
+    """Collects the model requests of many concurrent runs into batches.
+
+    A batch is submitted as soon as every unfinished run is waiting on a model response (or when
+    `max_batch_size` requests are waiting), and each run resumes when its result arrives. Requests
+    are grouped into one batch per endpoint and model.
+    """
+
+    def __init__(self, transport: BatchTransport, max_batch_size: int = 50_000) -> None:
+        self.transport = transport
+        self.max_batch_size = max_batch_size
+        self.batches_submitted = 0
+        """The number of batches submitted so far."""
+
+        self._active_runs = 0
+        self._pending: list[_BatchRequest] = []
+        self._next_id = 0
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    def wrap(self, model: Model) -> Model:
+        """Returns a model that sends its requests through this collector. Only OpenAI models can
+        be batched; other models are returned unchanged and keep making real-time requests."""
+        if isinstance(model, (OpenAIResponsesModel, OpenAIChatCompletionsModel)):
+            return BatchedModel(model, self)
+        logger.debug(f"{type(model).__name__} can't be batched, making real-time requests")
+        return model
+
+    def runs_started(self, count: int) -> None:
+        """Registers runs whose requests go through this collector."""
+        self._active_runs += count
+
+    def run_finished(self) -> None:
+        """Unregisters a run, which may complete a batch the other runs are waiting on."""
+        self._active_runs -= 1
+        self._maybe_flush()
+
+    async def submit(self, endpoint: str, body: dict[str, Any]) -> dict[str, Any]:
+        """Adds a request to the next batch and waits for its response body."""
+        request = _BatchRequest(
+            custom_id=f"request-{self._next_id}",
+            endpoint=endpoint,
+            body=body,
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._next_id += 1
+        self._pending.append(request)
+        self._maybe_flush()
+        return await request.future
+
+    def _maybe_flush(self) -> None:
+        if not self._pending:
+            return
+        if len(self._pending) < self._active_runs and len(self._pending) < self.max_batch_size:
+            return
+
+        groups: dict[tuple[str, str], list[_BatchRequest]] = {}
+        for request in self._pending:
+            groups.setdefault((request.endpoint, str(request.body["model"])), []).append(request)
+        self._pending = []
+
+        for (endpoint, _), requests in groups.items():
+            task = asyncio.create_task(self._run_batch(endpoint, requests))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            # If the batch is cancelled, e.g. when the event loop shuts down, the runs waiting on
+            # it would otherwise wait forever.
+            task.add_done_callback(functools.partial(_fail_stopped_batch, requests))
+
+    async def _run_batch(self, endpoint: str, requests: list[_BatchRequest]) -> None:
+        self.batches_submitted += 1
+        try:
+            input_file = "".join(
+                json.dumps(
+                    {
+                        "custom_id": request.custom_id,
+                        "method": "POST",
+                        "url": endpoint,
+                        "body": request.body,
+                    }
+                )
+                + "\n"
+                for request in requests
+            )
+            output_file = await self.transport.submit(endpoint, input_file.encode("utf-8"))
+            results = {}
+            for line in output_file.splitlines():
+                if line.strip():
+                    result = json.loads(line)
+                    results[result["custom_id"]] = result
+        except Exception as e:
+            _fail_unresolved(requests, e)
+            return
+
+        for request in requests:
+            if request.future.done():
+                continue
+            result = results.get(request.custom_id)
+            response = (result or {}).get("response") or {}
+            if result is None:
+                request.future.set_exception(
+                    BatchRequestError(f"The batch returned no result for {request.custom_id}")
+                )
+            elif result.get("error") or response.get("status_code", 200) >= 400:
+                request.future.set_exception(
+                    BatchRequestError(
+                        f"Batch request {request.custom_id} failed: {_error_message(result)}"
+                    )
+                )
+            else:
+                request.future.set_result(response["body"])
+
+
+def _fail_unresolved(requests: list[_BatchRequest], error: BaseException) -> None:
+    for request in requests:
+        if not request.future.done():
+            request.future.set_exception(error)
+
+
+def _fail_stopped_batch(requests: list[_BatchRequest], task: asyncio.Task[None]) -> None:
+    # Only has an effect if the batch stopped before resolving its requests.
+    _fail_unresolved(requests, BatchRequestError("The batch was cancelled before it completed"))
+
+
+_current_collector: contextvars.ContextVar[BatchCollector | None] = contextvars.ContextVar(
+    "current_batch_collector", default=None
+)
+
+
+def get_current_batch_collector() -> BatchCollector | None:
+    """Returns the collector of the batch run in progress, if any."""
+    return _current_collector.get()
+
+
+def set_current_batch_collector(
+    collector: BatchCollector | None,
+) -> contextvars.Token[BatchCollector | None]:
+    return _current_collector.set(collector)
+
+
+def reset_current_batch_collector(token: contextvars.Token[BatchCollector | None]) -> None:
+    _current_collector.reset(token)
+
+
+def _request_body(request: dict[str, Any]) -> dict[str, Any]:
+    body = {
+        k: v
+        for k, v in request.items()
+        if not isinstance(v, NotGiven)
+        and not k.startswith("extra_")
+        and k not in ("stream", "stream_options")
+    }
+    body["model"] = str(body["model"])
+    return body
+
+
+class BatchedModel(Model):
+    """A `Model` that sends the requests of an OpenAI model through a `BatchCollector` instead of
+    making real-time requests. Created by `Runner.run_batch`; streaming isn't supported."""
+
+    def __init__(self, wrapped_model: BatchableModel, collector: BatchCollector) -> None:
+        self.wrapped_model = wrapped_model
+        self.collector = collector
+
+    @property
+    def supports_previous_response_id(self) -> bool:
+        return self.wrapped_model.supports_previous_response_id
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        if isinstance(self.wrapped_model, OpenAIResponsesModel):
+            return await self._get_responses_response(
+                self.wrapped_model,
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                previous_response_id=previous_response_id,
+            )
+        return await self._get_chat_completions_response(
+            self.wrapped_model,
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+        )
+
+    async def _get_responses_response(
+        self,
+        model: OpenAIResponsesModel,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        with response_span(disabled=tracing.is_disabled()) as span_response:
+            try:
+                request = model._build_request(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    previous_response_id=previous_response_id,
+                )
+                body = await self.collector.submit(RESPONSES_ENDPOINT, _request_body(request))
+                response = Response.model_validate(body)
+                if tracing.include_data():
+                    span_response.span_data.response = response
+                    span_response.span_data.input = input
+            except Exception as e:
+                span_response.set_error(
+                    SpanError(
+                        message="Error getting batch response",
+                        data={"error": str(e) if tracing.include_data() else e.__class__.__name__},
+                    )
+                )
+                raise
+
+        return ModelResponse(
+            output=response.output,
+            usage=Usage.from_response_usage(response.usage),
+            referenceable_id=response.id,
+        )
+
+    async def _get_chat_completions_response(
+        self,
+        model: OpenAIChatCompletionsModel,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        with generation_span(
+            model=str(model.model),
+            model_config=(
+                None
+                if tracing.is_disabled() or GLOBAL_TRACE_PROVIDER.spans_disabled()
+                else dataclasses.asdict(model_settings)
+            ),
+            disabled=tracing.is_disabled(),
+        ) as span_generation:
+            request = model._build_request(
+                system_instructions, input, model_settings, tools, output_schema, handoffs
+            )
+            if tracing.include_data():
+                span_generation.span_data.input = request["messages"]
+
+            body = await self.collector.submit(CHAT_COMPLETIONS_ENDPOINT, _request_body(request))
+            completion = ChatCompletion.model_validate(body)
+            message = completion.choices[0].message
+            usage = Usage.from_completion_usage(completion.usage)
+
+            if tracing.include_data():
+                span_generation.span_data.output = [message.model_dump()]
+            span_generation.span_data.usage = {
+                "input_tokens": usage.input_tokens,
+                "output_tokens": usage.output_tokens,
+            }
+
+        return ModelResponse(
+            output=_Converter.message_to_output_items(message),
+            usage=usage,
+            referenceable_id=None,
+        )
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        raise UserError("Batch runs don't support streaming")
+        yield  # Makes this an async generator, like the other models.
@@ -0,0 +1,439 @@
+from __future__ import annotations
+
+import abc
+import copy
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+
+from openai.types.responses import (
+    Response,
+    ResponseCompletedEvent,
+    ResponseContentPartAddedEvent,
+    ResponseContentPartDoneEvent,
+    ResponseCreatedEvent,
+    ResponseFunctionCallArgumentsDeltaEvent,
+    ResponseFunctionToolCall,
+    ResponseOutputItemAddedEvent,
+    ResponseOutputItemDoneEvent,
+    ResponseOutputMessage,
+    ResponseOutputRefusal,
+    ResponseOutputText,
+    ResponseRefusalDeltaEvent,
+    ResponseTextDeltaEvent,
+)
+
+from ..agent_output import AgentOutputSchema
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..logger import logger
+from ..tool import Tool
+from ..usage import Usage
+from ._serialization import (
+    describe_model,
+    model_response_from_dict,
+    model_response_to_dict,
+    request_fingerprint,
+)
+from .fake_id import FAKE_RESPONSES_ID
+from .interface import Model, ModelTracing, previous_response_kwargs
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+
+class ModelResponseCache(abc.ABC):
+    """A storage backend for cached model responses, keyed by request fingerprint."""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> ModelResponse | None:
+        """Returns the cached response for the key, or None if missing or expired."""
+        pass
+
+    @abc.abstractmethod
+    def set(self, key: str, response: ModelResponse) -> None:
+        """Stores a response under the key."""
+        pass
+
+    @abc.abstractmethod
+    def clear(self) -> None:
+        """Removes all cached responses."""
+        pass
+
+
+class InMemoryModelResponseCache(ModelResponseCache):
+    """An in-memory LRU cache. Entries are evicted when the cache grows beyond `max_entries`, or
+    when they are older than `ttl` seconds.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None):
+        """
+        Args:
+            max_entries: The maximum number of responses to keep. The least recently used response
+                is evicted first.
+            ttl: How long (in seconds) a response stays valid. If None, responses never expire.
+        """
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, ModelResponse]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> ModelResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            stored_at, response = entry
+            if self._ttl is not None and time.time() - stored_at > self._ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return copy.deepcopy(response)
+
+    def set(self, key: str, response: ModelResponse) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), copy.deepcopy(response))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+class DiskModelResponseCache(ModelResponseCache):
+    """A cache that stores each response as a JSON file in a directory, so that cached responses
+    survive across processes.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str], ttl: float | None = None):
+        """
+        Args:
+            directory: The directory to store responses in. Created if it doesn't exist.
+            ttl: How long (in seconds) a response stays valid. If None, responses never expire.
+        """
+        self._directory = os.fspath(directory)
+        self._ttl = ttl
+        os.makedirs(self._directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, f"{key}.json")
+
+    def get(self, key: str) -> ModelResponse | None:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+            stored_at = entry["stored_at"]
+            expired = self._ttl is not None and time.time() - stored_at > self._ttl
+            response = None if expired else model_response_from_dict(entry["response"])
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, TypeError, ValueError) as e:
+            # Includes entries that are valid JSON but malformed, or from an older format.
+            logger.warning(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+        if response is None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return response
+
+    def set(self, key: str, response: ModelResponse) -> None:
+        entry = {"stored_at": time.time(), "response": model_response_to_dict(response)}
+        # Write to a temp file and rename, so concurrent readers never see a partial entry.
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def clear(self) -> None:
+        for name in os.listdir(self._directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(self._directory, name))
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    """The number of requests served from the cache."""
+
+    misses: int = 0
+    """The number of requests forwarded to the underlying model."""
+
+    saved_input_tokens: int = 0
+    """Input tokens that would have been sent to the model, if not for the cache."""
+
+    saved_output_tokens: int = 0
+    """Output tokens that would have been generated by the model, if not for the cache."""
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of requests served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    @property
+    def saved_tokens(self) -> int:
+        """The total number of tokens saved by the cache."""
+        return self.saved_input_tokens + self.saved_output_tokens
+
+
+class CachingModel(Model):
+    """A `Model` that caches responses from an underlying model, keyed by a canonical fingerprint
+    of the request (instructions, input, tools, output schema and model settings).
+
+    Only use this for deterministic requests (e.g. `temperature=0`); otherwise, a cached response
+    hides the sampling diversity of the model. Responses served from the cache report empty usage,
+    since no request was made; the tokens saved are recorded in `stats` instead.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        cache: ModelResponseCache | None = None,
+        namespace: str | None = None,
+    ) -> None:
+        """
+        Args:
+            model: The model to forward cache misses to.
+            cache: The cache backend. Defaults to an `InMemoryModelResponseCache`.
+            namespace: Included in every cache key, so that different models sharing one cache
+                don't collide. Defaults to the class and model name of the underlying model.
+        """
+        self.wrapped_model = model
+        self.cache = cache if cache is not None else InMemoryModelResponseCache()
+        self.namespace = namespace or describe_model(model)
+        self.stats = CacheStats()
+
+    def _key(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        previous_response_id: str | None = None,
+    ) -> str:
+        return request_fingerprint(
+            self.namespace,
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+        )
+
+    def _lookup(self, key: str) -> ModelResponse | None:
+        cached = self.cache.get(key)
+        if cached is None:
+            self.stats.misses += 1
+            logger.debug(f"Model cache miss for {key}")
+            return None
+
+        self.stats.hits += 1
+        self.stats.saved_input_tokens += cached.usage.input_tokens
+        self.stats.saved_output_tokens += cached.usage.output_tokens
+        logger.debug(f"Model cache hit for {key}")
+        return ModelResponse(
+            output=cached.output,
+            usage=Usage(),
+            referenceable_id=cached.referenceable_id,
+        )
+
+    @property
+    def supports_previous_response_id(self) -> bool:
+        return self.wrapped_model.supports_previous_response_id
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        key = self._key(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+        )
+        if cached := self._lookup(key):
+            return cached
+
+        response = await self.wrapped_model.get_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **previous_response_kwargs(previous_response_id),
+        )
+        self.cache.set(key, response)
+        return response
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        key = self._key(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+        )
+        if cached := self._lookup(key):
+            for event in stream_events_from_response(cached):
+                yield event
+            return
+
+        async for event in self.wrapped_model.stream_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **previous_response_kwargs(previous_response_id),
+        ):
+            if isinstance(event, ResponseCompletedEvent):
+                self.cache.set(
+                    key,
+                    ModelResponse(
+                        output=event.response.output,
+                        usage=Usage.from_response_usage(event.response.usage),
+                        referenceable_id=event.response.id,
+                    ),
+                )
+            yield event
+
+
+def stream_events_from_response(response: ModelResponse) -> list[TResponseStreamEvent]:
+    """Synthesizes the stream events that a model would have emitted while generating the given
+    response, ending with a `ResponseCompletedEvent`.
+    """
+    response_id = response.referenceable_id or FAKE_RESPONSES_ID
+    base_response = Response(
+        id=response_id,
+        created_at=time.time(),
+        model="",
+        object="response",
+        output=[],
+        tool_choice="auto",
+        top_p=None,
+        tools=[],
+        parallel_tool_calls=False,
+    )
+
+    events: list[TResponseStreamEvent] = [
+        ResponseCreatedEvent(response=base_response, type="response.created")
+    ]
+    for output_index, item in enumerate(response.output):
+        events.append(
+            ResponseOutputItemAddedEvent(
+                item=item, output_index=output_index, type="response.output_item.added"
+            )
+        )
+        if isinstance(item, ResponseOutputMessage):
+            for content_index, part in enumerate(item.content):
+                events.append(
+                    ResponseContentPartAddedEvent(
+                        content_index=content_index,
+                        item_id=item.id,
+                        output_index=output_index,
+                        part=part,
+                        type="response.content_part.added",
+                    )
+                )
+                if isinstance(part, ResponseOutputText):
+                    events.append(
+                        ResponseTextDeltaEvent(
+                            content_index=content_index,
+                            delta=part.text,
+                            item_id=item.id,
+                            output_index=output_index,
+                            type="response.output_text.delta",
+                        )
+                    )
+                elif isinstance(part, ResponseOutputRefusal):
+                    events.append(
+                        ResponseRefusalDeltaEvent(
+                            content_index=content_index,
+                            delta=part.refusal,
+                            item_id=item.id,
+                            output_index=output_index,
+                            type="response.refusal.delta",
+                        )
+                    )
+                events.append(
+                    ResponseContentPartDoneEvent(
+                        content_index=content_index,
+                        item_id=item.id,
+                        output_index=output_index,
+                        part=part,
+                        type="response.content_part.done",
+                    )
+                )
+        elif isinstance(item, ResponseFunctionToolCall):
+            events.append(
+                ResponseFunctionCallArgumentsDeltaEvent(
+                    delta=item.arguments,
+                    item_id=item.id or FAKE_RESPONSES_ID,
+                    output_index=output_index,
+                    type="response.function_call_arguments.delta",
+                )
+            )
+        events.append(
+            ResponseOutputItemDoneEvent(
+                item=item, output_index=output_index, type="response.output_item.done"
+            )
+        )
+
+    final_response = base_response.model_copy()
+    final_response.output = list(response.output)
+    events.append(ResponseCompletedEvent(response=final_response, type="response.completed"))
+    return events
@@ -0,0 +1,299 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import os
+import time
+from collections.abc import AsyncIterator
+from typing import IO, TYPE_CHECKING, Any, cast
+
+from pydantic import TypeAdapter
+
+from ..agent_output import AgentOutputSchema
+from ..exceptions import CassetteMismatchError
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..tool import Tool
+from ..tracing import generation_span
+from ._serialization import model_response_from_dict, model_response_to_dict, request_fingerprint
+from .interface import Model, ModelTracing, previous_response_kwargs
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+CASSETTE_VERSION = 1
+
+# Cassettes are model-agnostic: a recording made with one model can be replayed without it, so the
+# model identity is deliberately left out of the request fingerprint.
+_CASSETTE_NAMESPACE = "cassette"
+
+_stream_event_adapter: TypeAdapter[TResponseStreamEvent] = TypeAdapter(TResponseStreamEvent)
+
+
+def _open_cassette(path: str, mode: str) -> IO[str]:
+    if path.endswith(".gz"):
+        return cast(IO[str], gzip.open(path, mode + "t", encoding="utf-8"))
+    return open(path, mode, encoding="utf-8")
+
+
+def _fingerprint(
+    system_instructions: str | None,
+    input: str | list[TResponseInputItem],
+    model_settings: ModelSettings,
+    tools: list[Tool],
+    output_schema: AgentOutputSchema | None,
+    handoffs: list[Handoff],
+    previous_response_id: str | None,
+) -> str:
+    return request_fingerprint(
+        _CASSETTE_NAMESPACE,
+        system_instructions,
+        input,
+        model_settings,
+        tools,
+        output_schema,
+        handoffs,
+        previous_response_id,
+    )
+
+
+class RecordingModel(Model):
+    """A `Model` that forwards requests to another model and records every exchange to a cassette
+    file, so it can later be served by a `ReplayModel` without network access.
+
+    The cassette is a JSONL file (gzip-compressed if the path ends in `.gz`). Each line holds the
+    request fingerprint, the response (or the stream events, with their timing) and the observed
+    latency. Requests that fail are not recorded.
+    """
+
+    def __init__(self, model: Model, path: str | os.PathLike[str]) -> None:
+        """
+        Args:
+            model: The model to record.
+            path: The cassette file to write. Any existing file is overwritten.
+        """
+        self.wrapped_model = model
+        self.path = os.fspath(path)
+        with _open_cassette(self.path, "w") as f:
+            f.write(json.dumps({"version": CASSETTE_VERSION}) + "\n")
+
+    def _append(self, interaction: dict[str, Any]) -> None:
+        with _open_cassette(self.path, "a") as f:
+            f.write(json.dumps(interaction, separators=(",", ":")) + "\n")
+
+    @property
+    def supports_previous_response_id(self) -> bool:
+        return self.wrapped_model.supports_previous_response_id
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        fingerprint = _fingerprint(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+        )
+        start = time.perf_counter()
+        response = await self.wrapped_model.get_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **previous_response_kwargs(previous_response_id),
+        )
+        self._append(
+            {
+                "kind": "response",
+                "fingerprint": fingerprint,
+                "latency": round(time.perf_counter() - start, 6),
+                "response": model_response_to_dict(response),
+            }
+        )
+        return response
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        fingerprint = _fingerprint(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+        )
+        start = time.perf_counter()
+        events: list[tuple[float, dict[str, Any]]] = []
+        async for event in self.wrapped_model.stream_response(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            tracing,
+            **previous_response_kwargs(previous_response_id),
+        ):
+            events.append(
+                (
+                    round(time.perf_counter() - start, 6),
+                    event.model_dump(mode="json", exclude_unset=True),
+                )
+            )
+            yield event
+
+        self._append(
+            {
+                "kind": "stream",
+                "fingerprint": fingerprint,
+                "latency": round(time.perf_counter() - start, 6),
+                "events": events,
+            }
+        )
+
+
+class ReplayModel(Model):
+    """A `Model` that serves the exchanges recorded by a `RecordingModel`, without making any
+    network requests.
+
+    Each request is matched by fingerprint against the recorded exchanges that haven't been
+    replayed yet, in recording order, so concurrent runs replay correctly as long as they send the
+    same requests. A request with no matching exchange raises a `CassetteMismatchError`.
+    """
+
+    def __init__(
+        self,
+        path: str | os.PathLike[str],
+        latency_scale: float | None = None,
+    ) -> None:
+        """
+        Args:
+            path: The cassette file to replay.
+            latency_scale: If None, responses are served immediately. Otherwise, the recorded
+                latency (and the recorded timing of stream events) is multiplied by this factor and
+                simulated, e.g. 1.0 replays with the original latency.
+        """
+        self.path = os.fspath(path)
+        self.latency_scale = latency_scale
+        with _open_cassette(self.path, "r") as f:
+            lines = [json.loads(line) for line in f if line.strip()]
+
+        if not lines or lines[0].get("version") != CASSETTE_VERSION:
+            raise CassetteMismatchError(f"{self.path} is not a version {CASSETTE_VERSION} cassette")
+
+        self._interactions: list[dict[str, Any]] = lines[1:]
+        self._replayed: list[bool] = [False] * len(self._interactions)
+
+    @property
+    def remaining(self) -> int:
+        """The number of recorded exchanges that haven't been replayed yet."""
+        return self._replayed.count(False)
+
+    def _next_interaction(self, kind: str, fingerprint: str) -> dict[str, Any]:
+        for index, interaction in enumerate(self._interactions):
+            if (
+                not self._replayed[index]
+                and interaction["kind"] == kind
+                and interaction["fingerprint"] == fingerprint
+            ):
+                self._replayed[index] = True
+                return interaction
+
+        raise CassetteMismatchError(
+            f"No recorded {kind} exchange in {self.path} matches request {fingerprint} "
+            f"({self.remaining} unreplayed exchanges remain)"
+        )
+
+    async def _sleep(self, seconds: float) -> None:
+        if self.latency_scale is not None and seconds > 0:
+            await asyncio.sleep(seconds * self.latency_scale)
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        with generation_span(model="replay", disabled=tracing.is_disabled()) as span_generation:
+            interaction = self._next_interaction(
+                "response",
+                _fingerprint(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    previous_response_id,
+                ),
+            )
+            await self._sleep(interaction["latency"])
+            response = model_response_from_dict(interaction["response"])
+
+            if tracing.include_data():
+                span_generation.span_data.output = interaction["response"]["output"]
+            span_generation.span_data.usage = {
+                "input_tokens": response.usage.input_tokens,
+                "output_tokens": response.usage.output_tokens,
+            }
+            return response
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        with generation_span(model="replay", disabled=tracing.is_disabled()):
+            interaction = self._next_interaction(
+                "stream",
+                _fingerprint(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    previous_response_id,
+                ),
+            )
+            previous_offset = 0.0
+            for offset, event in interaction["events"]:
+                await self._sleep(offset - previous_offset)
+                previous_offset = offset
+                yield _stream_event_adapter.validate_python(event)
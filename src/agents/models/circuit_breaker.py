@@ -0,0 +1,349 @@
+from __future__ import annotations
+
+import contextlib
+import time
+from collections.abc import AsyncIterator, Iterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Callable, Literal
+
+from ..agent_output import AgentOutputSchema
+from ..exceptions import CircuitOpenError
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..logger import logger
+from ..tool import Tool
+from ..tracing import custom_span, get_current_trace
+from .interface import Model, ModelProvider, ModelTracing, previous_response_kwargs
+from .retry import classify_error
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+
+CircuitState = Literal["closed", "open", "half_open"]
+
+
+@dataclass(frozen=True)
+class CircuitKey:
+    """Identifies the circuit a model's calls go through."""
+
+    provider: str
+    """The name of the model provider."""
+
+    base_url: str | None
+    """The base URL the model sends requests to, if known."""
+
+    model: str
+    """The model name."""
+
+
+@dataclass(frozen=True)
+class CircuitBreakerPolicy:
+    failure_threshold: int = 5
+    """The number of consecutive failures that opens the circuit."""
+
+    recovery_time: float = 30.0
+    """How long (in seconds) the circuit stays open before letting probe calls through."""
+
+    half_open_max_calls: int = 1
+    """The number of probe calls allowed at the same time while the circuit is half-open."""
+
+    success_threshold: int = 1
+    """The number of successful probe calls that closes the circuit again."""
+
+
+@dataclass(frozen=True)
+class CircuitStateChange:
+    key: CircuitKey
+    """The circuit whose state changed."""
+
+    previous_state: CircuitState
+    """The state before the change."""
+
+    state: CircuitState
+    """The state after the change."""
+
+    consecutive_failures: int
+    """The number of consecutive failures at the time of the change."""
+
+
+class CircuitBreaker:
+    """Tracks the failures of calls through one circuit.
+
+    The circuit starts closed. After `failure_threshold` consecutive failures (connection errors,
+    timeouts and server errors) it opens, and calls fail fast for `recovery_time` seconds. It then
+    becomes half-open and lets a few probe calls through: if `success_threshold` of them succeed
+    it closes again, and if one fails it opens again.
+    """
+
+    def __init__(
+        self,
+        key: CircuitKey,
+        policy: CircuitBreakerPolicy,
+        on_state_change: Callable[[CircuitStateChange], None] | None = None,
+    ) -> None:
+        self.key = key
+        self.policy = policy
+        self.on_state_change = on_state_change
+        self.consecutive_failures = 0
+        self._state: CircuitState = "closed"
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+
+    @property
+    def state(self) -> CircuitState:
+        """The current state of the circuit. An open circuit whose recovery time is up reads as
+        half-open; it becomes half-open, and reports the change, on the next `try_acquire()`."""
+        return "half_open" if self._recovered() else self._state
+
+    def _recovered(self) -> bool:
+        return (
+            self._state == "open"
+            and time.monotonic() - self._opened_at >= self.policy.recovery_time
+        )
+
+    def _transition(self, state: CircuitState) -> None:
+        previous, self._state = self._state, state
+        if state == "open":
+            self._opened_at = time.monotonic()
+        self._probes = 0
+        self._probe_successes = 0
+
+        change = CircuitStateChange(
+            key=self.key,
+            previous_state=previous,
+            state=state,
+            consecutive_failures=self.consecutive_failures,
+        )
+        log = logger.warning if state == "open" else logger.info
+        log(f"Circuit for {self.key.model} at {self.key.base_url} is now {state}")
+        if get_current_trace() is not None:
+            with custom_span(
+                "circuit_breaker_state_change",
+                data={
+                    "provider": self.key.provider,
+                    "base_url": self.key.base_url,
+                    "model": self.key.model,
+                    "previous_state": previous,
+                    "state": state,
+                    "consecutive_failures": self.consecutive_failures,
+                },
+            ):
+                pass
+        if self.on_state_change is not None:
+            try:
+                self.on_state_change(change)
+            except Exception as e:
+                logger.error(f"Error in circuit breaker state change callback: {e}")
+
+    def try_acquire(self) -> bool:
+        """Returns whether a call may go through the circuit. A call that is let through must be
+        followed by `record_success()` or `record_failure()`."""
+        if self._recovered():
+            self._transition("half_open")
+        if self._state == "closed":
+            return True
+        if self._state == "half_open" and self._probes < self.policy.half_open_max_calls:
+            self._probes += 1
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        if self._state == "half_open":
+            self._probes -= 1
+            self._probe_successes += 1
+            if self._probe_successes >= self.policy.success_threshold:
+                self._transition("closed")
+
+    def record_failure(self, error: BaseException) -> None:
+        if classify_error(error) not in ("server_error", "timeout"):
+            # The call was rejected or cancelled, which says nothing about the endpoint's health.
+            self.record_release()
+            return
+        self.consecutive_failures += 1
+        if self._state == "half_open" or (
+            self._state == "closed" and self.consecutive_failures >= self.policy.failure_threshold
+        ):
+            self._transition("open")
+
+    def record_release(self) -> None:
+        """Releases a call that neither succeeded nor failed because of the endpoint."""
+        if self._state == "half_open":
+            self._probes -= 1
+
+    @contextlib.contextmanager
+    def call(self) -> Iterator[None]:
+        """Records the outcome of a call that was let through."""
+        try:
+            yield
+        except BaseException as e:
+            self.record_failure(e)
+            raise
+        else:
+            self.record_success()
+
+
+def circuit_key(model: Model, provider: str = "") -> CircuitKey:
+    """Returns the circuit key of a model, from its `base_url` and `model` name if it has them."""
+    base_url = getattr(model, "base_url", None)
+    return CircuitKey(
+        provider=provider or type(model).__name__,
+        base_url=str(base_url) if base_url is not None else None,
+        model=str(getattr(model, "model", type(model).__name__)),
+    )
+
+
+class CircuitBreakerModel(Model):
+    """A `Model` whose calls go through a circuit breaker. While the circuit is open, calls fail
+    fast with a `CircuitOpenError`, or go to the fallback model if there is one."""
+
+    def __init__(
+        self,
+        wrapped_model: Model,
+        breaker: CircuitBreaker | None = None,
+        fallback: Model | None = None,
+    ) -> None:
+        """
+        Args:
+            wrapped_model: The model to protect.
+            breaker: The circuit breaker to use. Defaults to a new breaker with the default policy.
+            fallback: A model to send calls to while the circuit is open.
+        """
+        self.wrapped_model = wrapped_model
+        self.breaker = breaker or CircuitBreaker(circuit_key(wrapped_model), CircuitBreakerPolicy())
+        self.fallback = fallback
+
+    def _open_circuit_model(self) -> Model:
+        if self.fallback is None:
+            raise CircuitOpenError(
+                f"The circuit for {self.breaker.key.model} at {self.breaker.key.base_url} is open"
+            )
+        logger.debug(f"Circuit for {self.breaker.key.model} is open, using the fallback model")
+        return self.fallback
+
+    @property
+    def supports_previous_response_id(self) -> bool:
+        return self.wrapped_model.supports_previous_response_id and (
+            self.fallback is None or self.fallback.supports_previous_response_id
+        )
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        if not self.breaker.try_acquire():
+            return await self._open_circuit_model().get_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                **previous_response_kwargs(previous_response_id),
+            )
+
+        with self.breaker.call():
+            return await self.wrapped_model.get_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                **previous_response_kwargs(previous_response_id),
+            )
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        if not self.breaker.try_acquire():
+            async for event in self._open_circuit_model().stream_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                **previous_response_kwargs(previous_response_id),
+            ):
+                yield event
+            return
+
+        with self.breaker.call():
+            async for event in self.wrapped_model.stream_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                **previous_response_kwargs(previous_response_id),
+            ):
+                yield event
+
+
+class CircuitBreakerProvider(ModelProvider):
+    """A `ModelProvider` that puts the models of another provider behind circuit breakers, one
+    per provider, base URL and model. Breakers are shared by all the runs using the provider."""
+
+    def __init__(
+        self,
+        provider: ModelProvider,
+        policy: CircuitBreakerPolicy | None = None,
+        fallback: ModelProvider | None = None,
+        fallback_model_name: str | None = None,
+        on_state_change: Callable[[CircuitStateChange], None] | None = None,
+    ) -> None:
+        """
+        Args:
+            provider: The provider whose models to protect.
+            policy: The circuit breaker policy. Defaults to `CircuitBreakerPolicy()`.
+            fallback: A provider for fallback models, used while a circuit is open. If not set,
+                calls fail fast with a `CircuitOpenError` instead.
+            fallback_model_name: The model to get from the fallback provider. Defaults to the same
+                name as the protected model.
+            on_state_change: Called whenever a circuit changes state, e.g. to report metrics.
+        """
+        self.provider = provider
+        self.policy = policy or CircuitBreakerPolicy()
+        self.fallback = fallback
+        self.fallback_model_name = fallback_model_name
+        self.on_state_change = on_state_change
+        self.breakers: dict[CircuitKey, CircuitBreaker] = {}
+        self._models: dict[str | None, CircuitBreakerModel] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        if model_name not in self._models:
+            model = self.provider.get_model(model_name)
+            key = circuit_key(model, provider=type(self.provider).__name__)
+            if key not in self.breakers:
+                self.breakers[key] = CircuitBreaker(key, self.policy, self.on_state_change)
+            self._models[model_name] = CircuitBreakerModel(
+                model,
+                breaker=self.breakers[key],
+                fallback=self.fallback.get_model(self.fallback_model_name or model_name)
+                if self.fallback
+                else None,
+            )
+        return self._models[model_name]
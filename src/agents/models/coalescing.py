@@ -0,0 +1,271 @@
+from __future__ import annotations
+
+import asyncio
+import copy
+from collections.abc import AsyncIterator, Awaitable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
+
+from openai.types.responses import ResponseCompletedEvent
+
+from ..agent_output import AgentOutputSchema
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..logger import logger
+from ..tool import Tool
+from ..usage import Usage
+from ._serialization import describe_model, request_fingerprint
+from .interface import Model, ModelTracing, previous_response_kwargs
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+T = TypeVar("T")
+
+
+@dataclass
+class CoalescingStats:
+    requests: int = 0
+    """The number of requests sent to the underlying model."""
+
+    coalesced: int = 0
+    """The number of calls that were attached to an identical request already in flight."""
+
+    saved_input_tokens: int = 0
+    """Input tokens that would have been sent to the model, if not for coalescing."""
+
+    saved_output_tokens: int = 0
+    """Output tokens that would have been generated by the model, if not for coalescing."""
+
+
+class _Flight(Generic[T]):
+    """A request in flight, run as a task of its own so that it survives any one of its callers
+    being cancelled. It is only cancelled once all of its callers are gone."""
+
+    def __init__(self, coro: Awaitable[T]) -> None:
+        self.task: asyncio.Task[T] = asyncio.ensure_future(coro)
+        self.callers = 0
+
+    async def wait(self) -> T:
+        self.callers += 1
+        try:
+            return await asyncio.shield(self.task)
+        except asyncio.CancelledError:
+            if not self.task.done() and self.callers == 1:
+                self.task.cancel()
+            raise
+        finally:
+            self.callers -= 1
+
+
+class _SharedStream:
+    """A stream in flight. Its events are buffered, so that callers attached after it started
+    still get every event from the beginning."""
+
+    def __init__(self, events: AsyncIterator[TResponseStreamEvent]) -> None:
+        self.events: list[TResponseStreamEvent] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.subscribers = 0
+        self._new_events = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(events))
+
+    def _notify(self) -> None:
+        self._new_events.set()
+        self._new_events = asyncio.Event()
+
+    async def _pump(self, events: AsyncIterator[TResponseStreamEvent]) -> None:
+        try:
+            async for event in events:
+                self.events.append(event)
+                self._notify()
+        except BaseException as e:
+            self.error = e
+            if isinstance(e, asyncio.CancelledError):
+                raise
+        finally:
+            self.done = True
+            self._notify()
+
+    async def subscribe(self) -> AsyncIterator[TResponseStreamEvent]:
+        self.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(self.events):
+                    index += 1
+                    yield self.events[index - 1]
+                if self.done:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._new_events.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.task.done():
+                # Nobody is listening anymore.
+                self.task.cancel()
+
+
+class CoalescingModel(Model):
+    """A `Model` that sends identical concurrent requests only once.
+
+    When a call comes in while an identical request (same instructions, input, tools, output
+    schema and model settings) is already in flight, the call is attached to that request instead
+    of sending a new one, and gets its response, or its event stream from the beginning. Only
+    calls that overlap are coalesced: nothing is kept once a request completes.
+
+    Attached calls get the same output as the request they were attached to, so only use this for
+    agents where sampling diversity between concurrent identical requests doesn't matter. The
+    usage of a request is reported to the call that sent it; attached calls report empty usage,
+    and the tokens saved are recorded in `stats` instead.
+    """
+
+    def __init__(self, model: Model, namespace: str | None = None) -> None:
+        """
+        Args:
+            model: The model to send requests to.
+            namespace: Included in every request key. Defaults to the class and model name of the
+                underlying model.
+        """
+        self.wrapped_model = model
+        self.namespace = namespace or describe_model(model)
+        self.stats = CoalescingStats()
+        self._responses: dict[str, _Flight[ModelResponse]] = {}
+        self._streams: dict[str, _SharedStream] = {}
+
+    def _key(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        previous_response_id: str | None = None,
+    ) -> str:
+        return request_fingerprint(
+            self.namespace,
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+        )
+
+    @property
+    def supports_previous_response_id(self) -> bool:
+        return self.wrapped_model.supports_previous_response_id
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        key = self._key(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+        )
+        flight = self._responses.get(key)
+        if flight is not None:
+            self.stats.coalesced += 1
+            logger.debug(f"Coalescing model request {key}")
+            response = await flight.wait()
+            self.stats.saved_input_tokens += response.usage.input_tokens
+            self.stats.saved_output_tokens += response.usage.output_tokens
+            return ModelResponse(
+                output=copy.deepcopy(response.output),
+                usage=Usage(),
+                referenceable_id=response.referenceable_id,
+            )
+
+        self.stats.requests += 1
+        flight = _Flight(
+            self.wrapped_model.get_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                **previous_response_kwargs(previous_response_id),
+            )
+        )
+        self._responses[key] = flight
+        flight.task.add_done_callback(lambda _: self._forget(self._responses, key, flight))
+        return await flight.wait()
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        key = self._key(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+        )
+        stream = self._streams.get(key)
+        attached = stream is not None
+        if stream is None:
+            self.stats.requests += 1
+            stream = _SharedStream(
+                self.wrapped_model.stream_response(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    tracing,
+                    **previous_response_kwargs(previous_response_id),
+                )
+            )
+            self._streams[key] = stream
+            stream.task.add_done_callback(lambda _: self._forget(self._streams, key, stream))
+        else:
+            self.stats.coalesced += 1
+            logger.debug(f"Coalescing model stream {key}")
+
+        async for event in stream.subscribe():
+            if attached and isinstance(event, ResponseCompletedEvent):
+                event = self._without_usage(event)
+            yield event
+
+    @staticmethod
+    def _forget(in_flight: dict[str, Any], key: str, value: Any) -> None:
+        if in_flight.get(key) is value:
+            del in_flight[key]
+
+    def _without_usage(self, event: ResponseCompletedEvent) -> ResponseCompletedEvent:
+        usage = event.response.usage
+        if usage is None:
+            return event
+        self.stats.saved_input_tokens += usage.input_tokens
+        self.stats.saved_output_tokens += usage.output_tokens
+        response = event.response.model_copy(update={"usage": None})
+        return event.model_copy(update={"response": response})
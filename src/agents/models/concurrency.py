@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass, replace
+
+from ..exceptions import UserError
+from ..logger import logger
+from .interface import ModelProvider
+from .scheduler import ConcurrencyStats, RequestScheduler, SchedulingProvider
+
+_MIN_BASELINE_SAMPLES = 10
+"""The number of latency samples needed before latency spikes are detected."""
+
+
+@dataclass(frozen=True)
+class AdaptiveConcurrencyPolicy:
+    """How an `AdaptiveConcurrencyLimiter` adjusts its limit: additive increase on success,
+    multiplicative decrease on overload (AIMD)."""
+
+    initial_limit: int = 10
+    """The number of model calls allowed in flight at first."""
+
+    min_limit: int = 1
+    """The lowest the limit can go."""
+
+    max_limit: int = 200
+    """The highest the limit can go."""
+
+    increase: float = 1.0
+    """How much the limit grows per limit's worth of successful calls, i.e. about once per round
+    trip when the limit is saturated."""
+
+    decrease_factor: float = 0.5
+    """The factor the limit is multiplied by on overload."""
+
+    latency_spike_ratio: float | None = 3.0
+    """A call counts as overload if its latency exceeds the baseline (a moving average of recent
+    latencies) by this factor. For streamed calls, the latency is the time to the first event.
+    None disables latency-based decreases, so that only rate limit errors decrease the limit."""
+
+    latency_ewma_decay: float = 0.9
+    """The weight of the previous baseline when a new latency sample is added."""
+
+    decrease_cooldown: float = 1.0
+    """The minimum time (in seconds) between two decreases, so that a burst of errors from
+    requests sent at the same time only counts once."""
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.min_limit <= self.initial_limit <= self.max_limit:
+            raise UserError("Concurrency limits must satisfy 1 <= min <= initial <= max")
+        if not 0 < self.decrease_factor < 1:
+            raise UserError("decrease_factor must be between 0 and 1")
+
+
+class AdaptiveConcurrencyLimiter(RequestScheduler):
+    """A `RequestScheduler` whose limit adapts to what the backend can take.
+
+    Each successful call grows the limit a little (additive increase), and each rate limit error
+    or latency spike cuts it (multiplicative decrease). Calls over the limit wait, and are
+    dispatched like with any `RequestScheduler`: by priority, then deadline, then in turns.
+    """
+
+    def __init__(
+        self,
+        policy: AdaptiveConcurrencyPolicy | None = None,
+        aging_interval: float | None = 10.0,
+    ) -> None:
+        """
+        Args:
+            policy: How to adapt the limit. Defaults to `AdaptiveConcurrencyPolicy()`.
+            aging_interval: The time (in seconds) after which a waiting call's priority goes up
+                by one. None disables aging.
+        """
+        self.policy = policy or AdaptiveConcurrencyPolicy()
+        super().__init__(self.policy.max_limit, aging_interval)
+        self._limit = float(self.policy.initial_limit)
+        self._baseline: float | None = None
+        self._samples = 0
+        self._last_decrease = float("-inf")
+        self._decreases = 0
+
+    @property
+    def limit(self) -> int:
+        """The current number of model calls allowed in flight."""
+        return int(self._limit)
+
+    def stats(self) -> ConcurrencyStats:
+        return replace(
+            super().stats(),
+            decreases=self._decreases,
+            latency_baseline=self._baseline if self._samples >= _MIN_BASELINE_SAMPLES else None,
+        )
+
+    def _on_release(self, latency: float | None, overloaded: bool) -> None:
+        if overloaded:
+            self._decrease("rate limited")
+        elif latency is not None:
+            self._record_latency(latency)
+
+    def _record_latency(self, latency: float) -> None:
+        ratio = self.policy.latency_spike_ratio
+        if (
+            ratio is not None
+            and self._baseline is not None
+            and self._samples >= _MIN_BASELINE_SAMPLES
+            and latency > self._baseline * ratio
+        ):
+            # Spikes are kept out of the baseline, so that it doesn't drift up under overload.
+            self._decrease(f"latency spike ({latency:.2f}s)")
+            return
+
+        decay = self.policy.latency_ewma_decay
+        self._baseline = (
+            latency if self._baseline is None else decay * self._baseline + (1 - decay) * latency
+        )
+        self._samples += 1
+        self._limit = min(
+            float(self.policy.max_limit), self._limit + self.policy.increase / self._limit
+        )
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.policy.decrease_cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.policy.min_limit), self._limit * self.policy.decrease_factor)
+        self._decreases += 1
+        logger.debug(f"Concurrency limit decreased to {self.limit}: {reason}")
+
+
+class AdaptiveConcurrencyProvider(SchedulingProvider):
+    """A `ModelProvider` that limits the model calls of another provider with a single
+    `AdaptiveConcurrencyLimiter`, shared by all its models and all the runs using it."""
+
+    def __init__(
+        self,
+        provider: ModelProvider,
+        policy: AdaptiveConcurrencyPolicy | None = None,
+        aging_interval: float | None = 10.0,
+    ) -> None:
+        """
+        Args:
+            provider: The provider whose model calls to limit.
+            policy: How to adapt the limit. Defaults to `AdaptiveConcurrencyPolicy()`.
+            aging_interval: The time (in seconds) after which a waiting call's priority goes up
+                by one. None disables aging.
+        """
+        self.limiter = AdaptiveConcurrencyLimiter(policy, aging_interval)
+        super().__init__(provider, self.limiter)
@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Literal, Union, cast
+
+from ..agent_output import AgentOutputSchema
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..logger import logger
+from ..tool import Tool
+from ..tracing import custom_span
+from ..usage import Usage
+from .interface import Model, ModelProvider, ModelTracing, previous_response_kwargs
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+
+HedgeWinner = Literal["primary", "secondary"]
+
+
+@dataclass
+class HedgeStats:
+    requests: int = 0
+    """The total number of requests made through the hedged model."""
+
+    hedged_requests: int = 0
+    """The number of requests for which a hedge request was sent to the secondary model."""
+
+    secondary_wins: int = 0
+    """The number of requests that were answered by the secondary model."""
+
+    cancelled_requests: int = 0
+    """The number of requests that were cancelled because the other model answered first."""
+
+    failed_requests: int = 0
+    """The number of requests that failed, while the other model answered."""
+
+    wasted_usage: Usage = field(default_factory=Usage)
+    """The usage of requests whose response was discarded. Requests cancelled before they completed
+    only count towards `requests`, since their token usage is never reported."""
+
+
+class _Done:
+    pass
+
+
+_DONE = _Done()
+
+_QueueItem = Union[TResponseStreamEvent, BaseException, _Done]
+
+
+class HedgedModel(Model):
+    """A `Model` that sends each request to a primary model and, if no response (or, when
+    streaming, no first delta of output) arrives within a delay, also sends it to a secondary
+    model. The first model to answer wins, and the other request is cancelled.
+
+    The delay adapts to the primary model: once `min_samples` latencies have been observed, it is
+    the `percentile` of the most recent `window_size` latencies. Until then, `hedge_delay` is
+    used. When the primary request loses the race, the time it had taken so far is recorded as
+    its latency: the actual latency is at least that long, and leaving it out would bias the
+    window towards the requests fast enough not to be hedged. If the primary request fails before
+    the delay, the secondary request is sent right away.
+
+    Each request is wrapped in a `hedged_request` custom span, which records the delay and the
+    winner; the spans of the underlying models are nested inside it.
+    """
+
+    def __init__(
+        self,
+        primary: Model,
+        secondary: Model,
+        hedge_delay: float = 2.0,
+        percentile: float | None = 0.95,
+        min_samples: int = 20,
+        window_size: int = 200,
+    ) -> None:
+        """
+        Args:
+            primary: The model that receives every request.
+            secondary: The model that receives hedge requests.
+            hedge_delay: The delay (in seconds) before hedging, until enough latencies have been
+                observed. If `percentile` is None, this delay is always used.
+            percentile: The percentile (between 0 and 1) of the primary model's recent latencies to
+                use as the hedge delay.
+            min_samples: The number of latencies to observe before using the percentile.
+            window_size: The number of recent latencies to keep.
+        """
+        self.primary = primary
+        self.secondary = secondary
+        self.hedge_delay = hedge_delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.stats = HedgeStats()
+        # Full responses and first deltas arrive after very different delays, so we keep separate
+        # latency windows for each.
+        self._response_latencies: deque[float] = deque(maxlen=window_size)
+        self._first_delta_latencies: deque[float] = deque(maxlen=window_size)
+
+    def current_delay(self, streaming: bool = False) -> float:
+        """Returns the delay (in seconds) after which a request is hedged."""
+        latencies = self._first_delta_latencies if streaming else self._response_latencies
+        if self.percentile is None or len(latencies) < self.min_samples:
+            return self.hedge_delay
+
+        ordered = sorted(latencies)
+        index = max(0, math.ceil(self.percentile * len(ordered)) - 1)
+        return ordered[index]
+
+    def _record_winner(self, span_data: dict[str, Any], winner: HedgeWinner, hedged: bool) -> None:
+        span_data["winner"] = winner
+        span_data["hedged"] = hedged
+        if hedged:
+            self.stats.hedged_requests += 1
+        if winner == "secondary":
+            self.stats.secondary_wins += 1
+
+    @property
+    def supports_previous_response_id(self) -> bool:
+        # Either model can end up answering, so both have to be able to continue the chain.
+        return (
+            self.primary.supports_previous_response_id
+            and self.secondary.supports_previous_response_id
+        )
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        def call(model: Model) -> asyncio.Task[ModelResponse]:
+            return asyncio.create_task(
+                model.get_response(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    tracing,
+                    **previous_response_kwargs(previous_response_id),
+                )
+            )
+
+        self.stats.requests += 1
+        delay = self.current_delay()
+        with custom_span(
+            "hedged_request", data={"hedge_delay": delay}, disabled=tracing.is_disabled()
+        ) as span:
+            start = time.perf_counter()
+            primary_task = call(self.primary)
+            secondary_task: asyncio.Task[ModelResponse] | None = None
+            try:
+                await asyncio.wait({primary_task}, timeout=delay)
+                if primary_task.done() and primary_task.exception() is None:
+                    self._response_latencies.append(time.perf_counter() - start)
+                    self._record_winner(span.span_data.data, "primary", hedged=False)
+                    return primary_task.result()
+
+                logger.debug(f"Hedging request after {time.perf_counter() - start:.3f}s")
+                secondary_task = call(self.secondary)
+                tasks: dict[asyncio.Task[ModelResponse], HedgeWinner] = {
+                    primary_task: "primary",
+                    secondary_task: "secondary",
+                }
+                pending = set(tasks)
+                while True:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    winners = [t for t in done if t.exception() is None]
+                    if winners or not pending:
+                        break
+
+                if not winners:
+                    # Both requests failed; surface the primary model's error.
+                    raise primary_task.exception()  # type: ignore[misc]
+
+                winner = winners[0]
+                loser = secondary_task if winner is primary_task else primary_task
+                if winner is primary_task or not primary_task.done():
+                    # When the primary request lost, this is a lower bound of its latency.
+                    self._response_latencies.append(time.perf_counter() - start)
+                self._record_winner(span.span_data.data, tasks[winner], hedged=True)
+
+                response = winner.result()
+                usage = Usage()
+                usage.add(response.usage)
+                if not loser.done():
+                    self.stats.cancelled_requests += 1
+                    self.stats.wasted_usage.add(Usage(requests=1))
+                    usage.add(Usage(requests=1))
+                elif loser.exception() is not None:
+                    self.stats.failed_requests += 1
+                else:
+                    # Both answered; the losing response was paid for but is discarded.
+                    self.stats.wasted_usage.add(loser.result().usage)
+                    usage.add(loser.result().usage)
+
+                return ModelResponse(
+                    output=response.output,
+                    usage=usage,
+                    referenceable_id=response.referenceable_id,
+                )
+            finally:
+                for task in (primary_task, secondary_task):
+                    if task is not None and not task.done():
+                        task.cancel()
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        # Each stream is consumed in its own task and pushed through a queue. This keeps each
+        # underlying model's generator (and the spans it opens) inside a single task context, and
+        # lets us cancel the losing stream cleanly.
+        async def pump(model: Model, queue: asyncio.Queue[_QueueItem]) -> None:
+            try:
+                async for event in model.stream_response(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    tracing,
+                    **previous_response_kwargs(previous_response_id),
+                ):
+                    queue.put_nowait(event)
+                queue.put_nowait(_DONE)
+            except asyncio.CancelledError:
+                raise
+            except BaseException as e:
+                queue.put_nowait(e)
+
+        self.stats.requests += 1
+        delay = self.current_delay(streaming=True)
+        with custom_span(
+            "hedged_request", data={"hedge_delay": delay}, disabled=tracing.is_disabled()
+        ) as span:
+            start = time.perf_counter()
+            queues: dict[HedgeWinner, asyncio.Queue[_QueueItem]] = {"primary": asyncio.Queue()}
+            # The events each stream sent before its first delta.
+            buffers: dict[HedgeWinner, list[TResponseStreamEvent]] = {"primary": []}
+            pumps: dict[HedgeWinner, asyncio.Task[None]] = {
+                "primary": asyncio.create_task(pump(self.primary, queues["primary"]))
+            }
+            first_deltas: dict[HedgeWinner, asyncio.Task[_QueueItem]] = {
+                "primary": asyncio.create_task(_first_delta(queues["primary"], buffers["primary"]))
+            }
+            try:
+                winner: HedgeWinner | None = None
+                await asyncio.wait({first_deltas["primary"]}, timeout=delay)
+                primary_done = first_deltas["primary"].done()
+                if primary_done and not isinstance(first_deltas["primary"].result(), BaseException):
+                    winner = "primary"
+                    self._first_delta_latencies.append(time.perf_counter() - start)
+                    self._record_winner(span.span_data.data, "primary", hedged=False)
+                else:
+                    logger.debug(f"Hedging stream after {time.perf_counter() - start:.3f}s")
+                    queues["secondary"] = asyncio.Queue()
+                    buffers["secondary"] = []
+                    pumps["secondary"] = asyncio.create_task(
+                        pump(self.secondary, queues["secondary"])
+                    )
+                    first_deltas["secondary"] = asyncio.create_task(
+                        _first_delta(queues["secondary"], buffers["secondary"])
+                    )
+
+                    pending = {task for task in first_deltas.values() if not task.done()}
+                    while winner is None and pending:
+                        _, pending = await asyncio.wait(
+                            pending, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        for name, first_delta in first_deltas.items():
+                            done = first_delta.done()
+                            if done and not isinstance(first_delta.result(), BaseException):
+                                winner = name
+                                break
+
+                    if winner is None:
+                        # Both streams failed; surface the primary model's error.
+                        raise cast(BaseException, first_deltas["primary"].result())
+
+                    primary_lost = winner == "secondary" and not first_deltas["primary"].done()
+                    if winner == "primary" or primary_lost:
+                        # When the primary stream lost, this is a lower bound of its latency.
+                        self._first_delta_latencies.append(time.perf_counter() - start)
+                    self._record_winner(span.span_data.data, winner, hedged=True)
+
+                    loser: HedgeWinner = "secondary" if winner == "primary" else "primary"
+                    loser_first_delta = first_deltas[loser]
+                    if loser_first_delta.done() and isinstance(
+                        loser_first_delta.result(), BaseException
+                    ):
+                        self.stats.failed_requests += 1
+                    elif not pumps[loser].done():
+                        self.stats.cancelled_requests += 1
+                        self.stats.wasted_usage.add(Usage(requests=1))
+                        pumps[loser].cancel()
+
+                for event in buffers[winner]:
+                    yield event
+                item = first_deltas[winner].result()
+                while not isinstance(item, _Done):
+                    if isinstance(item, BaseException):
+                        raise item
+                    yield item
+                    item = await queues[winner].get()
+            finally:
+                for task in [*first_deltas.values(), *pumps.values()]:
+                    if not task.done():
+                        task.cancel()
+
+
+def _is_output_delta(event: TResponseStreamEvent) -> bool:
+    # Streams open with bookkeeping events, such as `response.created`, that are sent before the
+    # model produced anything. Deltas of text, refusals or tool call arguments are actual output.
+    return event.type.endswith(".delta") or event.type == "response.completed"
+
+
+async def _first_delta(
+    queue: asyncio.Queue[_QueueItem], buffer: list[TResponseStreamEvent]
+) -> _QueueItem:
+    """Returns the first delta of output from a stream, or its error or end, collecting the
+    events that came before it in `buffer`."""
+    while True:
+        item = await queue.get()
+        if isinstance(item, (BaseException, _Done)) or _is_output_delta(item):
+            return item
+        buffer.append(item)
+
+
+class HedgedModelProvider(ModelProvider):
+    """A `ModelProvider` that returns `HedgedModel`s, sending hedge requests to a model from a
+    secondary provider. Models are cached by name, so latency observations accumulate across runs.
+    """
+
+    def __init__(
+        self,
+        primary: ModelProvider,
+        secondary: ModelProvider,
+        secondary_model_name: str | None = None,
+        **hedge_options: Any,
+    ) -> None:
+        """
+        Args:
+            primary: The provider for primary models.
+            secondary: The provider for secondary models.
+            secondary_model_name: The model to request from the secondary provider. Defaults to the
+                same name as the primary model.
+            **hedge_options: Passed to each `HedgedModel`, e.g. `hedge_delay` or `percentile`.
+        """
+        self.primary = primary
+        self.secondary = secondary
+        self.secondary_model_name = secondary_model_name
+        self.hedge_options = hedge_options
+        self._models: dict[str | None, HedgedModel] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        if model_name not in self._models:
+            self._models[model_name] = HedgedModel(
+                primary=self.primary.get_model(model_name),
+                secondary=self.secondary.get_model(self.secondary_model_name or model_name),
+                **self.hedge_options,
+            )
+        return self._models[model_name]
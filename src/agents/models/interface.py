@@ -2,9 +2,13 @@ from __future__ import annotations
 
 import abc
 import enum
-from collections.abc import AsyncIterator
+import time
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING
 
+from typing_extensions import TypedDict
+
 from ..agent_output import AgentOutputSchema
 from ..handoffs import Handoff
 from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
@@ -31,9 +35,30 @@ class ModelTracing(enum.Enum):
         return self == ModelTracing.ENABLED
 
 
+class PreviousResponseKwargs(TypedDict, total=False):
+    previous_response_id: str
+
+
+def previous_response_kwargs(previous_response_id: str | None) -> PreviousResponseKwargs:
+    """The keyword arguments that pass `previous_response_id` on to a wrapped model. They're empty
+    when there is no previous response, so that models implementing the `get_response` and
+    `stream_response` signatures without `previous_response_id` can still be wrapped."""
+    if previous_response_id is None:
+        return {}
+    return {"previous_response_id": previous_response_id}
+
+
 class Model(abc.ABC):
     """The base interface for calling an LLM."""
 
+    @property
+    def supports_previous_response_id(self) -> bool:
+        """Whether the model can continue from a previous response it returned, given its
+        `referenceable_id` as `previous_response_id`. The runner only chains the turns of a run
+        for models that can. Models that wrap another model should forward this, and pass
+        `previous_response_id` on with `previous_response_kwargs`."""
+        return False
+
     @abc.abstractmethod
     async def get_response(
         self,
@@ -44,6 +69,7 @@ class Model(abc.ABC):
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
         tracing: ModelTracing,
+        previous_response_id: str | None = None,
     ) -> ModelResponse:
         """Get a response from the model.
 
@@ -55,6 +81,9 @@ class Model(abc.ABC):
             output_schema: The output schema to use.
             handoffs: The handoffs available to the model.
             tracing: Tracing configuration.
+            previous_response_id: The ID of the response to continue from, in which case `input`
+                only holds the items that came after it. Only passed to models whose
+                `supports_previous_response_id` is True.
 
         Returns:
             The full model response.
@@ -71,6 +100,7 @@ class Model(abc.ABC):
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
         tracing: ModelTracing,
+        previous_response_id: str | None = None,
     ) -> AsyncIterator[TResponseStreamEvent]:
         """Stream a response from the model.
 
@@ -82,6 +112,9 @@ class Model(abc.ABC):
             output_schema: The output schema to use.
             handoffs: The handoffs available to the model.
             tracing: Tracing configuration.
+            previous_response_id: The ID of the response to continue from, in which case `input`
+                only holds the items that came after it. Only passed to models whose
+                `supports_previous_response_id` is True.
 
         Returns:
             An iterator of response stream events, in OpenAI Responses format.
@@ -89,6 +122,31 @@ class Model(abc.ABC):
         pass
 
 
+@dataclass
+class WarmupReport:
+    """The outcome of warming up a model provider."""
+
+    models: list[str] = field(default_factory=list)
+    """The names of the models that were resolved."""
+
+    model_resolution_time: float = 0.0
+    """The time (in seconds) it took to resolve the models."""
+
+    connections_opened: int = 0
+    """The number of pooled connections that were opened."""
+
+    connection_errors: int = 0
+    """The number of connections that could not be opened."""
+
+    connection_time: float = 0.0
+    """The time (in seconds) it took to open the connections."""
+
+    @property
+    def total_time(self) -> float:
+        """The total time (in seconds) the warmup took."""
+        return self.model_resolution_time + self.connection_time
+
+
 class ModelProvider(abc.ABC):
     """The base interface for a model provider.
 
@@ -105,3 +163,24 @@ class ModelProvider(abc.ABC):
         Returns:
             The model.
         """
+
+    async def warmup(
+        self, model_names: Sequence[str | None] = (), connections: int = 1
+    ) -> WarmupReport:
+        """Prepare the provider to serve requests, so that the first requests after startup don't
+        pay any setup costs. By default, this resolves the given models; providers that hold
+        network connections may also open them ahead of time.
+
+        Args:
+            model_names: The names of the models to resolve.
+            connections: The number of connections to open, for providers that pool them.
+
+        Returns:
+            A report of what was warmed up and how long it took.
+        """
+        start = time.perf_counter()
+        models = []
+        for model_name in dict.fromkeys(model_names):
+            self.get_model(model_name)
+            models.append(model_name if model_name is not None else "default")
+        return WarmupReport(models=models, model_resolution_time=time.perf_counter() - start)
@@ -0,0 +1,426 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Literal
+
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    AsyncOpenAI,
+    DefaultAsyncHttpxClient,
+    InternalServerError,
+)
+
+from .._run_scope import get_current_run_scope
+from ..agent_output import AgentOutputSchema
+from ..exceptions import UserError
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..logger import logger
+from ..tool import Tool
+from .interface import Model, ModelProvider, ModelTracing, previous_response_kwargs
+from .openai_chatcompletions import OpenAIChatCompletionsModel
+from .openai_responses import OpenAIResponsesModel
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+
+RoutingStrategy = Literal["least_outstanding", "ewma_latency"]
+
+
+@dataclass
+class Endpoint:
+    """An OpenAI-compatible endpoint in a load-balanced pool."""
+
+    base_url: str
+    """The base URL of the endpoint, e.g. `http://replica-1:8000/v1`."""
+
+    api_key: str | None = None
+    """The API key for the endpoint. Self-hosted servers often don't check it."""
+
+    openai_client: AsyncOpenAI | None = None
+    """A client to use for this endpoint instead of creating one from `base_url`."""
+
+
+@dataclass
+class EndpointStats:
+    base_url: str
+    """The base URL of the endpoint."""
+
+    healthy: bool = True
+    """Whether the endpoint receives traffic. Unhealthy endpoints are ejected from the pool until
+    their ejection time is over or a health check succeeds."""
+
+    outstanding_requests: int = 0
+    """The number of requests to the endpoint that are in progress."""
+
+    requests: int = 0
+    """The total number of requests sent to the endpoint."""
+
+    failures: int = 0
+    """The total number of requests that failed because of the endpoint, i.e. connection errors,
+    timeouts and 5xx responses."""
+
+    consecutive_failures: int = 0
+    """The number of failures since the last successful request."""
+
+    ewma_latency: float | None = None
+    """The exponentially weighted moving average of the latency (in seconds) of the endpoint. For
+    streamed requests, the latency is the time to the first event."""
+
+
+class _EndpointState:
+    def __init__(self, client: AsyncOpenAI) -> None:
+        self.client = client
+        self.stats = EndpointStats(base_url=str(client.base_url))
+        self.ejected_until = 0.0
+        self.models: dict[tuple[str, bool], Model] = {}
+
+    def is_available(self, now: float) -> bool:
+        return self.stats.healthy or now >= self.ejected_until
+
+
+def _is_endpoint_failure(error: BaseException) -> bool:
+    # Client errors (4xx) say something about the request, not the endpoint.
+    return isinstance(error, (APIConnectionError, InternalServerError)) or (
+        isinstance(error, APIStatusError) and error.status_code >= 500
+    )
+
+
+class LoadBalancer:
+    """Routes requests across a pool of endpoints, tracking their health and latency."""
+
+    def __init__(
+        self,
+        endpoints: Sequence[Endpoint],
+        strategy: RoutingStrategy,
+        sticky_runs: bool,
+        max_failures: int,
+        ejection_time: float,
+        ewma_decay: float,
+        max_connections: int | None,
+    ) -> None:
+        if not endpoints:
+            raise UserError("A load balancer needs at least one endpoint")
+
+        self.strategy = strategy
+        self.sticky_runs = sticky_runs
+        self.max_failures = max_failures
+        self.ejection_time = ejection_time
+        self.ewma_decay = ewma_decay
+        self.endpoints = [
+            _EndpointState(self._create_client(endpoint, max_connections)) for endpoint in endpoints
+        ]
+        self._next = 0
+        self._sticky: OrderedDict[str, _EndpointState] = OrderedDict()
+        self._max_sticky_runs = 10_000
+
+    @staticmethod
+    def _create_client(endpoint: Endpoint, max_connections: int | None) -> AsyncOpenAI:
+        if endpoint.openai_client is not None:
+            return endpoint.openai_client
+        # Each endpoint gets its own connection pool, so a slow replica can't exhaust the
+        # connections of the others.
+        limits = (
+            httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+            if max_connections
+            else None
+        )
+        return AsyncOpenAI(
+            api_key=endpoint.api_key or "unused",
+            base_url=endpoint.base_url,
+            http_client=DefaultAsyncHttpxClient(limits=limits)
+            if limits
+            else DefaultAsyncHttpxClient(),
+        )
+
+    def _score(self, state: _EndpointState) -> float:
+        if self.strategy == "ewma_latency":
+            # Unmeasured endpoints score 0, so they are tried first.
+            return (state.stats.ewma_latency or 0.0) * (state.stats.outstanding_requests + 1)
+        return state.stats.outstanding_requests
+
+    def pick(self) -> _EndpointState:
+        """Picks the endpoint for the next request."""
+        now = time.monotonic()
+        scope = get_current_run_scope() if self.sticky_runs else None
+        if scope is not None:
+            sticky = self._sticky.get(scope.run_id)
+            if sticky is not None and sticky.is_available(now):
+                self._sticky.move_to_end(scope.run_id)
+                return sticky
+
+        candidates = [state for state in self.endpoints if state.is_available(now)]
+        if not candidates:
+            # Every endpoint is ejected. Rather than failing outright, try the one that comes back
+            # first.
+            candidates = [min(self.endpoints, key=lambda state: state.ejected_until)]
+
+        # Rotate the starting point so that ties are spread across endpoints.
+        offset = self._next % len(candidates)
+        self._next += 1
+        rotated = candidates[offset:] + candidates[:offset]
+        chosen = min(rotated, key=self._score)
+
+        if scope is not None:
+            self._sticky[scope.run_id] = chosen
+            self._sticky.move_to_end(scope.run_id)
+            if len(self._sticky) > self._max_sticky_runs:
+                self._sticky.popitem(last=False)
+        return chosen
+
+    @contextlib.contextmanager
+    def track(self, state: _EndpointState) -> Iterator[None]:
+        """Tracks a request to an endpoint, recording whether it succeeded."""
+        state.stats.outstanding_requests += 1
+        state.stats.requests += 1
+        try:
+            yield
+        except BaseException as e:
+            if _is_endpoint_failure(e):
+                self.record_failure(state)
+            raise
+        else:
+            self.record_success(state)
+        finally:
+            state.stats.outstanding_requests -= 1
+
+    def record_latency(self, state: _EndpointState, latency: float) -> None:
+        previous = state.stats.ewma_latency
+        state.stats.ewma_latency = (
+            latency
+            if previous is None
+            else self.ewma_decay * previous + (1 - self.ewma_decay) * latency
+        )
+
+    def record_success(self, state: _EndpointState) -> None:
+        state.stats.consecutive_failures = 0
+        state.stats.healthy = True
+
+    def record_failure(self, state: _EndpointState) -> None:
+        state.stats.failures += 1
+        state.stats.consecutive_failures += 1
+        if state.stats.consecutive_failures >= self.max_failures:
+            self.eject(state)
+
+    def eject(self, state: _EndpointState) -> None:
+        """Takes an endpoint out of the pool for `ejection_time` seconds."""
+        if state.stats.healthy:
+            logger.warning(f"Ejecting endpoint {state.stats.base_url} from the pool")
+        state.stats.healthy = False
+        state.ejected_until = time.monotonic() + self.ejection_time
+
+
+class LoadBalancedModel(Model):
+    """A `Model` that sends each request to an endpoint picked by a `LoadBalancer`."""
+
+    def __init__(self, model: str, balancer: LoadBalancer, use_responses: bool) -> None:
+        self.model = model
+        self.balancer = balancer
+        self.use_responses = use_responses
+
+    def _model_for(self, state: _EndpointState) -> Model:
+        key = (self.model, self.use_responses)
+        if key not in state.models:
+            state.models[key] = (
+                OpenAIResponsesModel(model=self.model, openai_client=state.client)
+                if self.use_responses
+                else OpenAIChatCompletionsModel(model=self.model, openai_client=state.client)
+            )
+        return state.models[key]
+
+    @property
+    def supports_previous_response_id(self) -> bool:
+        return self.use_responses
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        state = self.balancer.pick()
+        with self.balancer.track(state):
+            start = time.perf_counter()
+            response = await self._model_for(state).get_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                **previous_response_kwargs(previous_response_id),
+            )
+            self.balancer.record_latency(state, time.perf_counter() - start)
+        return response
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        state = self.balancer.pick()
+        with self.balancer.track(state):
+            start = time.perf_counter()
+            first_event = True
+            async for event in self._model_for(state).stream_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                **previous_response_kwargs(previous_response_id),
+            ):
+                if first_event:
+                    first_event = False
+                    self.balancer.record_latency(state, time.perf_counter() - start)
+                yield event
+
+
+class LoadBalancingProvider(ModelProvider):
+    """A model provider that spreads requests over a pool of OpenAI-compatible endpoints, such as
+    self-hosted inference replicas.
+
+    Requests go to the endpoint with the fewest outstanding requests, or to the one with the lowest
+    latency-weighted load. Endpoints that fail `max_failures` times in a row are ejected from the
+    pool for `ejection_time` seconds, after which they get traffic again. `check_health()` probes
+    every endpoint, and can be run periodically with `start_health_checks()`.
+
+    By default, all the requests of a run go to the same endpoint, to keep its KV/prefix cache warm.
+    A run moves to another endpoint only if its endpoint is ejected.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[str | Endpoint],
+        *,
+        strategy: RoutingStrategy = "least_outstanding",
+        use_responses: bool = False,
+        sticky_runs: bool = True,
+        max_failures: int = 3,
+        ejection_time: float = 30.0,
+        ewma_decay: float = 0.7,
+        max_connections: int | None = None,
+        api_key: str | None = None,
+    ) -> None:
+        """
+        Args:
+            endpoints: The endpoints of the pool, as base URLs or `Endpoint` objects.
+            strategy: How to route requests: `least_outstanding` sends each request to the endpoint
+                with the fewest requests in progress, and `ewma_latency` to the endpoint with the
+                lowest average latency multiplied by its requests in progress.
+            use_responses: Whether to use the Responses API instead of Chat Completions. Most
+                self-hosted servers only implement Chat Completions.
+            sticky_runs: Whether to send all the requests of a run to the same endpoint.
+            max_failures: The number of consecutive failures after which an endpoint is ejected.
+            ejection_time: How long (in seconds) an ejected endpoint gets no traffic.
+            ewma_decay: The weight of the previous average when updating an endpoint's latency
+                average, between 0 and 1.
+            max_connections: The maximum number of connections in each endpoint's pool. Defaults
+                to the `httpx` default.
+            api_key: The API key for endpoints given as base URLs.
+        """
+        self.balancer = LoadBalancer(
+            [
+                Endpoint(base_url=endpoint, api_key=api_key)
+                if isinstance(endpoint, str)
+                else endpoint
+                for endpoint in endpoints
+            ],
+            strategy=strategy,
+            sticky_runs=sticky_runs,
+            max_failures=max_failures,
+            ejection_time=ejection_time,
+            ewma_decay=ewma_decay,
+            max_connections=max_connections,
+        )
+        self.use_responses = use_responses
+        self._models: dict[str, Model] = {}
+        self._health_check_task: asyncio.Task[None] | None = None
+
+    def get_model(self, model_name: str | None) -> Model:
+        if model_name is None:
+            raise UserError(
+                "LoadBalancingProvider has no default model; set a model on the agent or run config"
+            )
+        if model_name not in self._models:
+            self._models[model_name] = LoadBalancedModel(
+                model_name, self.balancer, self.use_responses
+            )
+        return self._models[model_name]
+
+    def endpoint_stats(self) -> list[EndpointStats]:
+        """Returns the stats of each endpoint in the pool."""
+        return [state.stats for state in self.balancer.endpoints]
+
+    async def check_health(self, timeout: float = 5.0) -> list[EndpointStats]:
+        """Probes every endpoint by listing its models. Endpoints that don't answer, or answer with
+        a server error, are ejected; endpoints that answer are returned to the pool.
+
+        Returns:
+            The stats of each endpoint in the pool.
+        """
+
+        async def probe(state: _EndpointState) -> None:
+            client = state.client.with_options(max_retries=0, timeout=timeout)
+            try:
+                await client.models.list()
+            except APIStatusError as e:
+                # The endpoint answered; it's only unhealthy if it's failing.
+                if e.status_code >= 500:
+                    self.balancer.eject(state)
+                else:
+                    self.balancer.record_success(state)
+            except APIConnectionError:
+                self.balancer.eject(state)
+            else:
+                self.balancer.record_success(state)
+
+        await asyncio.gather(*(probe(state) for state in self.balancer.endpoints))
+        return self.endpoint_stats()
+
+    def start_health_checks(self, interval: float = 10.0, timeout: float = 5.0) -> None:
+        """Runs `check_health()` every `interval` seconds in the background, until
+        `stop_health_checks()` is called. Must be called from a running event loop."""
+        if self._health_check_task is not None:
+            return
+
+        async def loop() -> None:
+            while True:
+                try:
+                    await self.check_health(timeout=timeout)
+                except Exception as e:
+                    logger.error(f"Error checking endpoint health: {e}")
+                await asyncio.sleep(interval)
+
+        self._health_check_task = asyncio.create_task(loop())
+
+    async def stop_health_checks(self) -> None:
+        """Stops the background health checks."""
+        if self._health_check_task is None:
+            return
+        self._health_check_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._health_check_task
+        self._health_check_task = None
@@ -64,12 +64,15 @@ from ..items import ModelResponse, TResponseInputItem, TResponseOutputItem, TRes
 from ..logger import logger
 from ..tool import FunctionTool, Tool
 from ..tracing import generation_span
+from ..tracing.setup import GLOBAL_TRACE_PROVIDER
 from ..tracing.span_data import GenerationSpanData
 from ..tracing.spans import Span
 from ..usage import Usage
 from ..version import __version__
 from .fake_id import FAKE_RESPONSES_ID
 from .interface import Model, ModelTracing
+from .rate_limit import RateLimiter, estimate_tokens, with_rate_limit
+from .retry import Retrier, call_with_retries, open_stream_with_retries
 
 if TYPE_CHECKING:
     from ..model_settings import ModelSettings
@@ -92,13 +95,23 @@ class OpenAIChatCompletionsModel(Model):
         self,
         model: str | ChatModel,
         openai_client: AsyncOpenAI,
+        rate_limiter: RateLimiter | None = None,
+        retrier: Retrier | None = None,
     ) -> None:
         self.model = model
-        self._client = openai_client
+        # The retrier replaces the client's own retries, which don't follow its policies.
+        self._client = openai_client.with_options(max_retries=0) if retrier else openai_client
+        self._rate_limiter = rate_limiter
+        self._retrier = retrier
 
     def _non_null_or_not_given(self, value: Any) -> Any:
         return value if value is not None else NOT_GIVEN
 
+    @property
+    def base_url(self) -> str:
+        """The base URL of the API the model sends requests to."""
+        return str(self._client.base_url)
+
     async def get_response(
         self,
         system_instructions: str | None,
@@ -108,23 +121,29 @@ class OpenAIChatCompletionsModel(Model):
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
         tracing: ModelTracing,
+        previous_response_id: str | None = None,
     ) -> ModelResponse:
         with generation_span(
             model=str(self.model),
-            model_config=dataclasses.asdict(model_settings)
-            | {"base_url": str(self._client.base_url)},
+            model_config=self._span_model_config(model_settings, tracing),
             disabled=tracing.is_disabled(),
         ) as span_generation:
-            response = await self._fetch_response(
-                system_instructions,
-                input,
-                model_settings,
-                tools,
-                output_schema,
-                handoffs,
-                span_generation,
-                tracing,
-                stream=False,
+
+            async def fetch() -> ChatCompletion:
+                return await self._fetch_response(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    span_generation,
+                    tracing,
+                    stream=False,
+                )
+
+            response = await call_with_retries(
+                self._retrier, fetch, span_generation.span_data.retries
             )
 
             if _debug.DONT_LOG_MODEL_DATA:
@@ -134,16 +153,7 @@ class OpenAIChatCompletionsModel(Model):
                     f"LLM resp:\n{json.dumps(response.choices[0].message.model_dump(), indent=2)}\n"
                 )
 
-            usage = (
-                Usage(
-                    requests=1,
-                    input_tokens=response.usage.prompt_tokens,
-                    output_tokens=response.usage.completion_tokens,
-                    total_tokens=response.usage.total_tokens,
-                )
-                if response.usage
-                else Usage()
-            )
+            usage = Usage.from_completion_usage(response.usage)
             if tracing.include_data():
                 span_generation.span_data.output = [response.choices[0].message.model_dump()]
             span_generation.span_data.usage = {
@@ -168,30 +178,43 @@ class OpenAIChatCompletionsModel(Model):
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
         tracing: ModelTracing,
+        previous_response_id: str | None = None,
     ) -> AsyncIterator[TResponseStreamEvent]:
         """
         Yields a partial message as it is generated, as well as the usage information.
         """
         with generation_span(
             model=str(self.model),
-            model_config=dataclasses.asdict(model_settings)
-            | {"base_url": str(self._client.base_url)},
+            model_config=self._span_model_config(model_settings, tracing),
             disabled=tracing.is_disabled(),
         ) as span_generation:
-            response, stream = await self._fetch_response(
-                system_instructions,
-                input,
-                model_settings,
-                tools,
-                output_schema,
-                handoffs,
-                span_generation,
-                tracing,
-                stream=True,
+            started_ns = time.perf_counter_ns()
+            responses: list[Response] = []
+
+            async def open_stream() -> AsyncIterator[ChatCompletionChunk]:
+                response, stream = await self._fetch_response(
+                    system_instructions,
+                    input,
+                    model_settings,
+                    tools,
+                    output_schema,
+                    handoffs,
+                    span_generation,
+                    tracing,
+                    stream=True,
+                )
+                responses.append(response)
+                return stream
+
+            # Streams are only retried until their first chunk, so no event is yielded twice.
+            stream = await open_stream_with_retries(
+                self._retrier, open_stream, span_generation.span_data.retries
             )
+            response = responses[-1]
 
             usage: CompletionUsage | None = None
             state = _StreamingState()
+            first_token_seen = False
 
             async for chunk in stream:
                 if not state.started:
@@ -208,6 +231,11 @@ class OpenAIChatCompletionsModel(Model):
                     continue
 
                 delta = chunk.choices[0].delta
+                if not first_token_seen and (delta.content or delta.refusal or delta.tool_calls):
+                    first_token_seen = True
+                    span_generation.span_data.time_to_first_token_ns = (
+                        time.perf_counter_ns() - started_ns
+                    )
 
                 # Handle text
                 if delta.content:
@@ -420,6 +448,13 @@ class OpenAIChatCompletionsModel(Model):
                         and usage.completion_tokens_details.reasoning_tokens
                         else 0
                     ),
+                    # Not a typed field of `ResponseUsage` yet, but carried along so that the
+                    # cached token count survives the conversion.
+                    input_tokens_details={  # type: ignore[call-arg]
+                        "cached_tokens": usage.prompt_tokens_details.cached_tokens or 0
+                        if usage.prompt_tokens_details
+                        else 0
+                    },
                 )
                 if usage
                 else None
@@ -438,6 +473,13 @@ class OpenAIChatCompletionsModel(Model):
                     "output_tokens": usage.completion_tokens,
                 }
 
+    def _span_model_config(
+        self, model_settings: ModelSettings, tracing: ModelTracing
+    ) -> dict[str, Any] | None:
+        if tracing.is_disabled() or GLOBAL_TRACE_PROVIDER.spans_disabled():
+            return None
+        return dataclasses.asdict(model_settings) | {"base_url": str(self._client.base_url)}
+
     @overload
     async def _fetch_response(
         self,
@@ -478,6 +520,87 @@ class OpenAIChatCompletionsModel(Model):
         tracing: ModelTracing,
         stream: bool = False,
     ) -> ChatCompletion | tuple[Response, AsyncStream[ChatCompletionChunk]]:
+        request = self._convert_request(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, stream
+        )
+        if tracing.include_data():
+            span.span_data.input = request.messages
+
+        if self._rate_limiter is not None:
+            create = with_rate_limit(
+                self._rate_limiter,
+                str(self.model),
+                estimate_tokens(
+                    request.messages,
+                    tools=request.tools,
+                    max_output_tokens=model_settings.max_tokens,
+                ),
+            )(self._get_client().chat.completions.with_raw_response.create)
+        else:
+            create = self._get_client().chat.completions.create
+
+        ret = await create(
+            model=request.model,
+            messages=request.messages,
+            tools=request.tools,
+            temperature=request.temperature,
+            top_p=request.top_p,
+            frequency_penalty=request.frequency_penalty,
+            presence_penalty=request.presence_penalty,
+            max_tokens=request.max_tokens,
+            tool_choice=request.tool_choice,
+            response_format=request.response_format,
+            parallel_tool_calls=request.parallel_tool_calls,
+            stream=stream,
+            stream_options={"include_usage": True} if stream else NOT_GIVEN,
+            extra_headers=_HEADERS,
+        )
+
+        if isinstance(ret, ChatCompletion):
+            return ret
+
+        response = Response(
+            id=FAKE_RESPONSES_ID,
+            created_at=time.time(),
+            model=self.model,
+            object="response",
+            output=[],
+            tool_choice=cast(Literal["auto", "required", "none"], request.tool_choice)
+            if request.tool_choice != NOT_GIVEN
+            else "auto",
+            top_p=model_settings.top_p,
+            temperature=model_settings.temperature,
+            tools=[],
+            parallel_tool_calls=request.parallel_tool_calls or False,
+        )
+        return response, ret
+
+    def _build_request(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+    ) -> dict[str, Any]:
+        """Converts the inputs of a model call into the body of a `chat.completions.create`
+        request, for the Batch API."""
+        request = self._convert_request(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, stream=False
+        )
+        return request.body()
+
+    def _convert_request(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        stream: bool,
+    ) -> _ConvertedRequest:
         converted_messages = _Converter.items_to_messages(input)
 
         if system_instructions:
@@ -488,8 +611,8 @@ class OpenAIChatCompletionsModel(Model):
                     "role": "system",
                 },
             )
-        if tracing.include_data():
-            span.span_data.input = converted_messages
+        if model_settings.cache_breakpoints:
+            _Converter.add_cache_breakpoints(converted_messages)
 
         parallel_tool_calls = (
             True if model_settings.parallel_tool_calls and tools and len(tools) > 0 else NOT_GIVEN
@@ -513,7 +636,7 @@ class OpenAIChatCompletionsModel(Model):
                 f"Response format: {response_format}\n"
             )
 
-        ret = await self._get_client().chat.completions.create(
+        return _ConvertedRequest(
             model=self.model,
             messages=converted_messages,
             tools=converted_tools or NOT_GIVEN,
@@ -525,29 +648,7 @@ class OpenAIChatCompletionsModel(Model):
             tool_choice=tool_choice,
             response_format=response_format,
             parallel_tool_calls=parallel_tool_calls,
-            stream=stream,
-            stream_options={"include_usage": True} if stream else NOT_GIVEN,
-            extra_headers=_HEADERS,
-        )
-
-        if isinstance(ret, ChatCompletion):
-            return ret
-
-        response = Response(
-            id=FAKE_RESPONSES_ID,
-            created_at=time.time(),
-            model=self.model,
-            object="response",
-            output=[],
-            tool_choice=cast(Literal["auto", "required", "none"], tool_choice)
-            if tool_choice != NOT_GIVEN
-            else "auto",
-            top_p=model_settings.top_p,
-            temperature=model_settings.temperature,
-            tools=[],
-            parallel_tool_calls=parallel_tool_calls or False,
         )
-        return response, ret
 
     def _get_client(self) -> AsyncOpenAI:
         if self._client is None:
@@ -555,6 +656,27 @@ class OpenAIChatCompletionsModel(Model):
         return self._client
 
 
+@dataclass
+class _ConvertedRequest:
+    """The parameters of a `chat.completions.create` request, other than streaming and headers.
+    Both real-time requests and Batch API request bodies are built from this."""
+
+    model: str | ChatModel
+    messages: list[ChatCompletionMessageParam]
+    tools: list[ChatCompletionToolParam] | NotGiven
+    temperature: float | NotGiven
+    top_p: float | NotGiven
+    frequency_penalty: float | NotGiven
+    presence_penalty: float | NotGiven
+    max_tokens: int | NotGiven
+    tool_choice: ChatCompletionToolChoiceOptionParam | NotGiven
+    response_format: ResponseFormat | NotGiven
+    parallel_tool_calls: bool | NotGiven
+
+    def body(self) -> dict[str, Any]:
+        return {param.name: getattr(self, param.name) for param in dataclasses.fields(self)}
+
+
 class _Converter:
     @classmethod
     def convert_tool_choice(
@@ -947,6 +1069,30 @@ class _Converter:
         flush_assistant_message()
         return result
 
+    @classmethod
+    def add_cache_breakpoints(cls, messages: list[ChatCompletionMessageParam]) -> None:
+        """Marks prompt cache breakpoints on the system message and on the last message with
+        content, for providers that only cache prompts up to explicit `cache_control` hints. The
+        first breakpoint covers the tools and instructions, which rarely change; the second covers
+        the conversation so far, which the next turn extends.
+        """
+        marked: list[ChatCompletionMessageParam] = []
+        if messages and messages[0]["role"] == "system":
+            marked.append(messages[0])
+        last = next((message for message in reversed(messages) if message.get("content")), None)
+        if last is not None and all(last is not message for message in marked):
+            marked.append(last)
+
+        for message in marked:
+            content = message.get("content")
+            parts: list[dict[str, Any]] = (
+                [{"type": "text", "text": content}]
+                if isinstance(content, str)
+                else [dict(part) for part in cast(Iterable[dict[str, Any]], content)]
+            )
+            parts[-1]["cache_control"] = {"type": "ephemeral"}
+            cast(dict[str, Any], message)["content"] = parts
+
 
 class ToolConverter:
     @classmethod
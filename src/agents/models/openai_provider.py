@@ -1,12 +1,19 @@
 from __future__ import annotations
 
+import asyncio
+import time
+from collections.abc import Sequence
+
 import httpx
-from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from openai import APIConnectionError, APIStatusError, AsyncOpenAI, DefaultAsyncHttpxClient
 
+from ..logger import logger
 from . import _openai_shared
-from .interface import Model, ModelProvider
+from .interface import Model, ModelProvider, WarmupReport
 from .openai_chatcompletions import OpenAIChatCompletionsModel
 from .openai_responses import OpenAIResponsesModel
+from .rate_limit import RateLimiter, RateLimitPolicy
+from .retry import Retrier, RetryConfig
 
 DEFAULT_MODEL: str = "gpt-4o"
 
@@ -33,6 +40,8 @@ class OpenAIProvider(ModelProvider):
         organization: str | None = None,
         project: str | None = None,
         use_responses: bool | None = None,
+        rate_limit_policy: RateLimitPolicy | None = None,
+        retry_config: RetryConfig | None = None,
     ) -> None:
         if openai_client is not None:
             assert api_key is None and base_url is None, (
@@ -51,6 +60,13 @@ class OpenAIProvider(ModelProvider):
         else:
             self._use_responses = _openai_shared.get_use_responses_by_default()
 
+        # A single limiter is shared by every model from this provider, so that concurrent runs
+        # queue locally instead of all hitting the API's rate limits.
+        self.rate_limiter = RateLimiter(rate_limit_policy) if rate_limit_policy else None
+        # Likewise, a single retrier enforces the retry budget of a run across all its models.
+        self.retrier = Retrier(retry_config) if retry_config else None
+        self._models: dict[str, Model] = {}
+
     # We lazy load the client in case you never actually use OpenAIProvider(). Otherwise
     # AsyncOpenAI() raises an error if you don't have an API key set.
     def _get_client(self) -> AsyncOpenAI:
@@ -69,10 +85,56 @@ class OpenAIProvider(ModelProvider):
         if model_name is None:
             model_name = DEFAULT_MODEL
 
-        client = self._get_client()
+        # Models are stateless wrappers around the client, so one instance per name is enough.
+        if model_name not in self._models:
+            client = self._get_client()
+            self._models[model_name] = (
+                OpenAIResponsesModel(
+                    model=model_name,
+                    openai_client=client,
+                    rate_limiter=self.rate_limiter,
+                    retrier=self.retrier,
+                )
+                if self._use_responses
+                else OpenAIChatCompletionsModel(
+                    model=model_name,
+                    openai_client=client,
+                    rate_limiter=self.rate_limiter,
+                    retrier=self.retrier,
+                )
+            )
+
+        return self._models[model_name]
 
-        return (
-            OpenAIResponsesModel(model=model_name, openai_client=client)
-            if self._use_responses
-            else OpenAIChatCompletionsModel(model=model_name, openai_client=client)
+    async def warmup(
+        self, model_names: Sequence[str | None] = (), connections: int = 1
+    ) -> WarmupReport:
+        """Resolve the given models and open `connections` keep-alive connections to the API, so
+        that the first requests after startup don't pay for connection and TLS setup. Each
+        connection is opened with a lightweight request to list models.
+        """
+        report = await super().warmup(
+            [name if name is not None else DEFAULT_MODEL for name in model_names], connections
         )
+        if connections <= 0:
+            return report
+
+        client = self._get_client().with_options(max_retries=0)
+
+        async def open_connection() -> bool:
+            try:
+                await client.models.list()
+            except APIConnectionError as e:
+                logger.debug(f"Failed to open connection during warmup: {e}")
+                return False
+            except APIStatusError:
+                # The request was rejected, but the connection was established.
+                pass
+            return True
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*(open_connection() for _ in range(connections)))
+        report.connection_time = time.perf_counter() - start
+        report.connections_opened = sum(results)
+        report.connection_errors = len(results) - report.connections_opened
+        return report
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import dataclasses
 import json
+import time
 from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any, Literal, overload
@@ -28,6 +30,8 @@ from ..tracing import SpanError, response_span
 from ..usage import Usage
 from ..version import __version__
 from .interface import Model, ModelTracing
+from .rate_limit import RateLimiter, estimate_tokens, with_rate_limit
+from .retry import Retrier, call_with_retries, open_stream_with_retries
 
 if TYPE_CHECKING:
     from ..model_settings import ModelSettings
@@ -53,13 +57,27 @@ class OpenAIResponsesModel(Model):
         self,
         model: str | ChatModel,
         openai_client: AsyncOpenAI,
+        rate_limiter: RateLimiter | None = None,
+        retrier: Retrier | None = None,
     ) -> None:
         self.model = model
-        self._client = openai_client
+        # The retrier replaces the client's own retries, which don't follow its policies.
+        self._client = openai_client.with_options(max_retries=0) if retrier else openai_client
+        self._rate_limiter = rate_limiter
+        self._retrier = retrier
 
     def _non_null_or_not_given(self, value: Any) -> Any:
         return value if value is not None else NOT_GIVEN
 
+    @property
+    def base_url(self) -> str:
+        """The base URL of the API the model sends requests to."""
+        return str(self._client.base_url)
+
+    @property
+    def supports_previous_response_id(self) -> bool:
+        return True
+
     async def get_response(
         self,
         system_instructions: str | None,
@@ -69,17 +87,24 @@ class OpenAIResponsesModel(Model):
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
         tracing: ModelTracing,
+        previous_response_id: str | None = None,
     ) -> ModelResponse:
+        async def fetch() -> Response:
+            return await self._fetch_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                previous_response_id=previous_response_id,
+                stream=False,
+            )
+
         with response_span(disabled=tracing.is_disabled()) as span_response:
             try:
-                response = await self._fetch_response(
-                    system_instructions,
-                    input,
-                    model_settings,
-                    tools,
-                    output_schema,
-                    handoffs,
-                    stream=False,
+                response = await call_with_retries(
+                    self._retrier, fetch, span_response.span_data.retries
                 )
 
                 if _debug.DONT_LOG_MODEL_DATA:
@@ -90,16 +115,7 @@ class OpenAIResponsesModel(Model):
                         f"{json.dumps([x.model_dump() for x in response.output], indent=2)}\n"
                     )
 
-                usage = (
-                    Usage(
-                        requests=1,
-                        input_tokens=response.usage.input_tokens,
-                        output_tokens=response.usage.output_tokens,
-                        total_tokens=response.usage.total_tokens,
-                    )
-                    if response.usage
-                    else Usage()
-                )
+                usage = Usage.from_response_usage(response.usage)
 
                 if tracing.include_data():
                     span_response.span_data.response = response
@@ -132,25 +148,41 @@ class OpenAIResponsesModel(Model):
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
         tracing: ModelTracing,
+        previous_response_id: str | None = None,
     ) -> AsyncIterator[ResponseStreamEvent]:
         """
         Yields a partial message as it is generated, as well as the usage information.
         """
+
+        async def open_stream() -> AsyncIterator[ResponseStreamEvent]:
+            return await self._fetch_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                previous_response_id=previous_response_id,
+                stream=True,
+            )
+
         with response_span(disabled=tracing.is_disabled()) as span_response:
+            started_ns = time.perf_counter_ns()
             try:
-                stream = await self._fetch_response(
-                    system_instructions,
-                    input,
-                    model_settings,
-                    tools,
-                    output_schema,
-                    handoffs,
-                    stream=True,
+                # Streams are only retried until their first event, so no event is yielded twice.
+                stream = await open_stream_with_retries(
+                    self._retrier, open_stream, span_response.span_data.retries
                 )
 
                 final_response: Response | None = None
 
+                first_token_seen = False
                 async for chunk in stream:
+                    if not first_token_seen and chunk.type.endswith(".delta"):
+                        first_token_seen = True
+                        span_response.span_data.time_to_first_token_ns = (
+                            time.perf_counter_ns() - started_ns
+                        )
                     if isinstance(chunk, ResponseCompletedEvent):
                         final_response = chunk.response
                     yield chunk
@@ -180,6 +212,7 @@ class OpenAIResponsesModel(Model):
         tools: list[Tool],
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
+        previous_response_id: str | None,
         stream: Literal[True],
     ) -> AsyncStream[ResponseStreamEvent]: ...
 
@@ -192,6 +225,7 @@ class OpenAIResponsesModel(Model):
         tools: list[Tool],
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
+        previous_response_id: str | None,
         stream: Literal[False],
     ) -> Response: ...
 
@@ -203,8 +237,87 @@ class OpenAIResponsesModel(Model):
         tools: list[Tool],
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
+        previous_response_id: str | None = None,
         stream: Literal[True] | Literal[False] = False,
     ) -> Response | AsyncStream[ResponseStreamEvent]:
+        request = self._convert_request(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+            stream,
+        )
+
+        if self._rate_limiter is not None:
+            create = with_rate_limit(
+                self._rate_limiter,
+                str(self.model),
+                estimate_tokens(
+                    request.input,
+                    instructions=system_instructions,
+                    tools=request.tools,
+                    max_output_tokens=model_settings.max_tokens,
+                ),
+            )(self._client.responses.with_raw_response.create)
+        else:
+            create = self._client.responses.create
+
+        return await create(
+            instructions=request.instructions,
+            model=request.model,
+            input=request.input,
+            previous_response_id=request.previous_response_id,
+            include=request.include,
+            tools=request.tools,
+            temperature=request.temperature,
+            top_p=request.top_p,
+            truncation=request.truncation,
+            max_output_tokens=request.max_output_tokens,
+            tool_choice=request.tool_choice,
+            parallel_tool_calls=request.parallel_tool_calls,
+            stream=stream,
+            extra_headers=_HEADERS,
+            text=request.text,
+        )
+
+    def _build_request(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        previous_response_id: str | None = None,
+    ) -> dict[str, Any]:
+        """Converts the inputs of a model call into the body of a `responses.create` request, for
+        the Batch API."""
+        request = self._convert_request(
+            system_instructions,
+            input,
+            model_settings,
+            tools,
+            output_schema,
+            handoffs,
+            previous_response_id,
+            stream=False,
+        )
+        return request.body()
+
+    def _convert_request(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        previous_response_id: str | None,
+        stream: bool,
+    ) -> _ConvertedRequest:
         list_input = ItemHelpers.input_to_new_input_list(input)
 
         parallel_tool_calls = (
@@ -227,10 +340,11 @@ class OpenAIResponsesModel(Model):
                 f"Response format: {response_format}\n"
             )
 
-        return await self._client.responses.create(
+        return _ConvertedRequest(
             instructions=self._non_null_or_not_given(system_instructions),
             model=self.model,
             input=list_input,
+            previous_response_id=self._non_null_or_not_given(previous_response_id),
             include=converted_tools.includes,
             tools=converted_tools.tools,
             temperature=self._non_null_or_not_given(model_settings.temperature),
@@ -239,8 +353,6 @@ class OpenAIResponsesModel(Model):
             max_output_tokens=self._non_null_or_not_given(model_settings.max_tokens),
             tool_choice=tool_choice,
             parallel_tool_calls=parallel_tool_calls,
-            stream=stream,
-            extra_headers=_HEADERS,
             text=response_format,
         )
 
@@ -256,6 +368,29 @@ class ConvertedTools:
     includes: list[IncludeLiteral]
 
 
+@dataclass
+class _ConvertedRequest:
+    """The parameters of a `responses.create` request, other than streaming and headers. Both
+    real-time requests and Batch API request bodies are built from this."""
+
+    instructions: str | NotGiven
+    model: str | ChatModel
+    input: list[TResponseInputItem]
+    previous_response_id: str | NotGiven
+    include: list[IncludeLiteral]
+    tools: list[ToolParam]
+    temperature: float | NotGiven
+    top_p: float | NotGiven
+    truncation: Literal["auto", "disabled"] | NotGiven
+    max_output_tokens: int | NotGiven
+    tool_choice: response_create_params.ToolChoice | NotGiven
+    parallel_tool_calls: bool | NotGiven
+    text: ResponseTextConfigParam | NotGiven
+
+    def body(self) -> dict[str, Any]:
+        return {param.name: getattr(self, param.name) for param in dataclasses.fields(self)}
+
+
 class Converter:
     @classmethod
     def convert_tool_choice(
@@ -319,7 +454,7 @@ class Converter:
         for tool in tools:
             converted_tool, include = cls._convert_tool(tool)
             converted_tools.append(converted_tool)
-            if include:
+            if include and include not in includes:
                 includes.append(include)
 
         for handoff in handoffs:
@@ -0,0 +1,264 @@
+from __future__ import annotations
+
+import asyncio
+import re
+import threading
+import time
+from collections.abc import Awaitable, Mapping
+from dataclasses import dataclass, field
+from typing import Callable, Protocol, TypeVar
+
+import httpx
+from openai import APIStatusError
+from typing_extensions import ParamSpec
+
+from ..logger import logger
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """Requests-per-minute and tokens-per-minute limits. A limit of None is not enforced."""
+
+    requests_per_minute: int | None = None
+    tokens_per_minute: int | None = None
+
+
+@dataclass
+class RateLimitPolicy:
+    """Client-side rate limits for the models of a provider. Limits apply to each model
+    separately, like the API's own limits."""
+
+    requests_per_minute: int | None = None
+    """The default requests-per-minute limit for each model."""
+
+    tokens_per_minute: int | None = None
+    """The default tokens-per-minute limit for each model."""
+
+    per_model: dict[str, RateLimit] = field(default_factory=dict)
+    """Limits for specific models, overriding the defaults."""
+
+    def limit_for(self, model: str) -> RateLimit:
+        """Returns the limits that apply to a model."""
+        return self.per_model.get(
+            model,
+            RateLimit(
+                requests_per_minute=self.requests_per_minute,
+                tokens_per_minute=self.tokens_per_minute,
+            ),
+        )
+
+
+@dataclass
+class RateLimitStats:
+    requests: int = 0
+    """The number of requests that went through the limiter."""
+
+    queued_requests: int = 0
+    """The number of requests that had to wait before being sent."""
+
+    total_wait: float = 0.0
+    """The total time (in seconds) requests spent waiting."""
+
+    max_wait: float = 0.0
+    """The longest time (in seconds) a single request spent waiting."""
+
+    @property
+    def average_wait(self) -> float:
+        """The average time (in seconds) a request spent waiting."""
+        return self.total_wait / self.requests if self.requests else 0.0
+
+
+class _TokenBucket:
+    """A token bucket that refills continuously to `capacity` over a minute.
+
+    Acquiring always succeeds immediately but may drive the level negative; the caller then waits
+    for the returned time. This reserves capacity in arrival order, so waiting requests are served
+    first come, first served without holding a lock while they sleep.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity = float(capacity)
+        self.rate = capacity / 60.0
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + max(0.0, now - self.updated) * self.rate)
+        self.updated = max(self.updated, now)
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Reserves `amount` and returns how long (in seconds) to wait before using it."""
+        self._refill(now)
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def observe_remaining(self, remaining: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+    def block_for(self, seconds: float, now: float) -> None:
+        self._refill(now)
+        self.level = min(self.level, -seconds * self.rate)
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def _parse_duration(value: str) -> float | None:
+    """Parses durations in the format of the `x-ratelimit-reset-*` headers, e.g. "6m0s"."""
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _float_header(headers: Mapping[str, str], name: str) -> float | None:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def _text_length(value: object) -> int:
+    """Counts the characters of the strings in a JSON-like value, without serializing it."""
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, Mapping):
+        return sum(len(str(key)) + _text_length(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(_text_length(item) for item in value)
+    return 0
+
+
+def estimate_tokens(
+    input: object,
+    instructions: str | None = None,
+    tools: object = None,
+    max_output_tokens: int | None = None,
+) -> int:
+    """Estimates the number of tokens a request counts against the tokens-per-minute limit: about
+    four characters of input, instructions and tool definitions per input token, plus the maximum
+    number of output tokens."""
+    characters = _text_length(input) + len(instructions or "") + _text_length(tools)
+    return characters // 4 + (max_output_tokens or 0)
+
+
+class RateLimiter:
+    """Queues requests locally so that they stay within the limits of a `RateLimitPolicy`.
+
+    A single limiter is shared by all the models of a provider (and therefore by all the runs
+    using them), with one requests bucket and one tokens bucket per model. The buckets are
+    corrected from the `x-ratelimit-remaining-*` headers of each response, and a 429 response with
+    a `retry-after` header pauses all requests to that model.
+    """
+
+    def __init__(self, policy: RateLimitPolicy) -> None:
+        self.policy = policy
+        self.stats = RateLimitStats()
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[_TokenBucket | None, _TokenBucket | None]] = {}
+
+    def _buckets_for(self, model: str) -> tuple[_TokenBucket | None, _TokenBucket | None]:
+        if model not in self._buckets:
+            limit = self.policy.limit_for(model)
+            self._buckets[model] = (
+                _TokenBucket(limit.requests_per_minute) if limit.requests_per_minute else None,
+                _TokenBucket(limit.tokens_per_minute) if limit.tokens_per_minute else None,
+            )
+        return self._buckets[model]
+
+    async def acquire(self, model: str, tokens: int) -> float:
+        """Waits until a request to `model` using about `tokens` tokens may be sent.
+
+        Returns:
+            The time (in seconds) the request waited.
+        """
+        with self._lock:
+            now = time.monotonic()
+            requests_bucket, tokens_bucket = self._buckets_for(model)
+            wait = max(
+                requests_bucket.reserve(1, now) if requests_bucket else 0.0,
+                tokens_bucket.reserve(tokens, now) if tokens_bucket else 0.0,
+            )
+            self.stats.requests += 1
+            if wait > 0:
+                self.stats.queued_requests += 1
+                self.stats.total_wait += wait
+                self.stats.max_wait = max(self.stats.max_wait, wait)
+
+        if wait > 0:
+            logger.debug(f"Rate limiting request to {model} for {wait:.3f}s")
+            await asyncio.sleep(wait)
+        return wait
+
+    def update_from_headers(self, model: str, headers: Mapping[str, str]) -> None:
+        """Corrects the buckets of a model from the rate limit headers of an API response."""
+        retry_after = _float_header(headers, "retry-after")
+        retry_after_ms = _float_header(headers, "retry-after-ms")
+        if retry_after_ms is not None:
+            retry_after = retry_after_ms / 1000
+
+        with self._lock:
+            now = time.monotonic()
+            for bucket, kind in zip(self._buckets_for(model), ("requests", "tokens")):
+                if bucket is None:
+                    continue
+                remaining = _float_header(headers, f"x-ratelimit-remaining-{kind}")
+                if remaining is not None:
+                    bucket.observe_remaining(remaining, now)
+                    reset = _parse_duration(headers.get(f"x-ratelimit-reset-{kind}", ""))
+                    if remaining < 1 and reset is not None:
+                        # The server's window is exhausted; nothing gets through until it resets.
+                        bucket.block_for(reset, now)
+                if retry_after is not None:
+                    bucket.block_for(retry_after, now)
+
+
+P = ParamSpec("P")
+T = TypeVar("T")
+T_co = TypeVar("T_co", covariant=True)
+
+
+class _RawResponse(Protocol[T_co]):
+    """What `with_raw_response` methods of the OpenAI client return."""
+
+    @property
+    def headers(self) -> httpx.Headers: ...
+
+    def parse(self) -> T_co: ...
+
+
+def with_rate_limit(
+    limiter: RateLimiter, model: str, tokens: int
+) -> Callable[[Callable[P, Awaitable[_RawResponse[T]]]], Callable[P, Awaitable[T]]]:
+    """Returns a decorator for the `with_raw_response` create methods of the OpenAI client. The
+    decorated method sends the request once the limiter allows it, updates the limiter from the
+    response headers, and returns the parsed response.
+
+    Args:
+        limiter: The rate limiter.
+        model: The model the request is sent to.
+        tokens: The estimated number of tokens of the request, from `estimate_tokens`.
+    """
+
+    def decorator(
+        raw_create: Callable[P, Awaitable[_RawResponse[T]]],
+    ) -> Callable[P, Awaitable[T]]:
+        async def create(*args: P.args, **kwargs: P.kwargs) -> T:
+            await limiter.acquire(model, tokens)
+            try:
+                raw_response = await raw_create(*args, **kwargs)
+            except APIStatusError as e:
+                limiter.update_from_headers(model, e.response.headers)
+                raise
+
+            limiter.update_from_headers(model, raw_response.headers)
+            return raw_response.parse()
+
+        return create
+
+    return decorator
@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Awaitable
+from dataclasses import dataclass, field
+from typing import Any, Callable, Literal, TypeVar
+
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    InternalServerError,
+    RateLimitError,
+)
+
+from .._run_scope import get_current_run_scope
+from ..logger import logger
+from .rate_limit import _float_header
+
+T = TypeVar("T")
+
+ErrorClass = Literal["rate_limit", "server_error", "timeout"]
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """How to retry one class of errors: exponential backoff with jitter, or the delay the server
+    asks for in its `Retry-After` header."""
+
+    max_retries: int = 3
+    """The maximum number of retries of a single model call."""
+
+    initial_delay: float = 0.5
+    """The delay (in seconds) before the first retry."""
+
+    multiplier: float = 2.0
+    """The factor the delay grows by with each retry."""
+
+    max_delay: float = 30.0
+    """The maximum delay (in seconds) between retries. If the server asks to wait longer than this,
+    the error is not retried."""
+
+    jitter: float = 0.5
+    """The fraction of each delay that is randomized, between 0 (no jitter) and 1 (a uniformly
+    random delay between 0 and the backoff delay). Jitter keeps concurrent runs from retrying in
+    lockstep."""
+
+    respect_retry_after: bool = True
+    """Whether to wait for the delay in the `Retry-After` header instead of the backoff delay."""
+
+    def backoff(self, retries: int) -> float:
+        """Returns the backoff delay (in seconds) after `retries` previous retries."""
+        delay = min(self.max_delay, self.initial_delay * self.multiplier**retries)
+        return delay * (1 - self.jitter * random.random())
+
+
+@dataclass
+class RetryConfig:
+    """Retry policies for model calls, by class of error. A policy of None disables retries for
+    that class. Client errors other than rate limits (e.g. invalid requests) are never retried."""
+
+    rate_limit: RetryPolicy | None = field(
+        default_factory=lambda: RetryPolicy(max_retries=5, initial_delay=1.0, max_delay=60.0)
+    )
+    """The policy for rate limit (429) errors."""
+
+    server_error: RetryPolicy | None = field(default_factory=RetryPolicy)
+    """The policy for server (5xx) errors."""
+
+    timeout: RetryPolicy | None = field(default_factory=lambda: RetryPolicy(max_retries=2))
+    """The policy for timeouts and connection errors, such as connection resets."""
+
+    max_retries_per_run: int | None = 10
+    """The maximum number of retries across all the model calls of a run, so that a struggling
+    backend can't stretch a run indefinitely. None means no limit."""
+
+    def policy_for(self, error_class: ErrorClass) -> RetryPolicy | None:
+        if error_class == "rate_limit":
+            return self.rate_limit
+        if error_class == "server_error":
+            return self.server_error
+        return self.timeout
+
+
+@dataclass
+class RetryAttempt:
+    """A failed model call that was retried."""
+
+    retry: int
+    """The number of the retry, starting at 1."""
+
+    error_class: ErrorClass
+    """The class of error that was retried."""
+
+    error_type: str
+    """The type of the exception that was retried."""
+
+    status_code: int | None
+    """The HTTP status code of the error, if any."""
+
+    delay: float
+    """The time (in seconds) waited before the retry."""
+
+    def export(self) -> dict[str, Any]:
+        return {
+            "retry": self.retry,
+            "error_class": self.error_class,
+            "error_type": self.error_type,
+            "status_code": self.status_code,
+            "delay": self.delay,
+        }
+
+
+def classify_error(error: BaseException) -> ErrorClass | None:
+    """Returns the class of a retryable error, or None if the error shouldn't be retried."""
+    if isinstance(error, RateLimitError):
+        return "rate_limit"
+    if isinstance(error, (APITimeoutError, APIConnectionError)):
+        return "timeout"
+    if isinstance(error, APIStatusError):
+        if error.status_code == 408:
+            return "timeout"
+        if isinstance(error, InternalServerError) or error.status_code >= 500:
+            return "server_error"
+    return None
+
+
+def _retry_after(error: BaseException) -> float | None:
+    if not isinstance(error, APIStatusError):
+        return None
+    headers = error.response.headers
+    retry_after_ms = _float_header(headers, "retry-after-ms")
+    if retry_after_ms is not None:
+        return retry_after_ms / 1000
+    return _float_header(headers, "retry-after")
+
+
+class Retrier:
+    """Decides whether and when to retry failed model calls, following a `RetryConfig`.
+
+    A single retrier is shared by all the models of a provider, so that the retry budget of a run
+    covers every model call it makes.
+    """
+
+    def __init__(self, config: RetryConfig | None = None) -> None:
+        self.config = config or RetryConfig()
+        self._lock = threading.Lock()
+        self._retries_by_run: OrderedDict[str, int] = OrderedDict()
+        self._max_tracked_runs = 10_000
+
+    def _take_from_budget(self) -> bool:
+        limit = self.config.max_retries_per_run
+        scope = get_current_run_scope()
+        if limit is None or scope is None:
+            return True
+        with self._lock:
+            used = self._retries_by_run.get(scope.run_id, 0)
+            if used >= limit:
+                return False
+            self._retries_by_run[scope.run_id] = used + 1
+            self._retries_by_run.move_to_end(scope.run_id)
+            if len(self._retries_by_run) > self._max_tracked_runs:
+                self._retries_by_run.popitem(last=False)
+        return True
+
+    def next_attempt(self, error: BaseException, retries: int) -> RetryAttempt | None:
+        """Decides whether to retry a call that failed with `error` after `retries` previous
+        retries. If so, one retry is taken from the run's budget.
+
+        Returns:
+            The retry to make, or None if the error should be raised.
+        """
+        error_class = classify_error(error)
+        if error_class is None:
+            return None
+        policy = self.config.policy_for(error_class)
+        if policy is None or retries >= policy.max_retries:
+            return None
+
+        delay = policy.backoff(retries)
+        retry_after = _retry_after(error) if policy.respect_retry_after else None
+        if retry_after is not None:
+            if retry_after > policy.max_delay:
+                return None
+            delay = retry_after
+
+        if not self._take_from_budget():
+            logger.debug("Not retrying model call: the run's retry budget is exhausted")
+            return None
+
+        return RetryAttempt(
+            retry=retries + 1,
+            error_class=error_class,
+            error_type=type(error).__name__,
+            status_code=error.status_code if isinstance(error, APIStatusError) else None,
+            delay=delay,
+        )
+
+    async def call(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        attempts: list[dict[str, Any]] | None = None,
+    ) -> T:
+        """Calls `fn`, retrying it according to the config. Each retry is recorded in `attempts`,
+        e.g. the `retries` of a span, if given."""
+        retries = 0
+        while True:
+            try:
+                return await fn()
+            except Exception as e:
+                attempt = self.next_attempt(e, retries)
+                if attempt is None:
+                    raise
+                await self._wait(attempt, attempts)
+                retries += 1
+
+    async def open_stream(
+        self,
+        open_stream: Callable[[], Awaitable[AsyncIterator[T]]],
+        attempts: list[dict[str, Any]] | None = None,
+    ) -> AsyncIterator[T]:
+        """Opens a stream with `open_stream` and waits for its first event, retrying failures
+        according to the config. Once the first event has arrived, the stream is never retried, so
+        that no event is delivered twice. Each retry is recorded in `attempts`, if given.
+
+        Returns:
+            An iterator over all the events of the stream.
+        """
+        retries = 0
+        while True:
+            try:
+                iterator = (await open_stream()).__aiter__()
+                first = await iterator.__anext__()
+            except StopAsyncIteration:
+                return _chain([], iterator)
+            except Exception as e:
+                attempt = self.next_attempt(e, retries)
+                if attempt is None:
+                    raise
+                await self._wait(attempt, attempts)
+                retries += 1
+            else:
+                return _chain([first], iterator)
+
+    async def _wait(
+        self,
+        attempt: RetryAttempt,
+        attempts: list[dict[str, Any]] | None,
+    ) -> None:
+        logger.debug(f"Retrying model call in {attempt.delay:.2f}s after {attempt.error_type}")
+        if attempts is not None:
+            attempts.append(attempt.export())
+        await asyncio.sleep(attempt.delay)
+
+
+async def call_with_retries(
+    retrier: Retrier | None,
+    fn: Callable[[], Awaitable[T]],
+    attempts: list[dict[str, Any]] | None = None,
+) -> T:
+    """Calls `fn` through `retrier`, or just once if there's no retrier."""
+    if retrier is None:
+        return await fn()
+    return await retrier.call(fn, attempts)
+
+
+async def open_stream_with_retries(
+    retrier: Retrier | None,
+    open_stream: Callable[[], Awaitable[AsyncIterator[T]]],
+    attempts: list[dict[str, Any]] | None = None,
+) -> AsyncIterator[T]:
+    """Opens a stream through `retrier`, or just once if there's no retrier."""
+    if retrier is None:
+        return await open_stream()
+    return await retrier.open_stream(open_stream, attempts)
+
+
+async def _chain(first: list[T], rest: AsyncIterator[T]) -> AsyncIterator[T]:
+    for event in first:
+        yield event
+    async for event in rest:
+        yield event
@@ -0,0 +1,350 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import math
+import time
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from .._run_scope import get_current_run_scope
+from ..agent_output import AgentOutputSchema
+from ..exceptions import UserError
+from ..handoffs import Handoff
+from ..items import ModelResponse, TResponseInputItem, TResponseStreamEvent
+from ..tool import Tool
+from .interface import Model, ModelProvider, ModelTracing, previous_response_kwargs
+from .retry import classify_error
+
+if TYPE_CHECKING:
+    from ..model_settings import ModelSettings
+
+_MAX_WAIT_SAMPLES = 1000
+"""The number of recent wait times kept per priority to compute percentiles."""
+
+
+@dataclass
+class ConcurrencyStats:
+    """A snapshot of a `RequestScheduler`."""
+
+    limit: int
+    """The current number of model calls allowed in flight."""
+
+    in_flight: int
+    """The number of model calls in flight."""
+
+    queue_length: int
+    """The number of model calls waiting for a slot."""
+
+    calls: int = 0
+    """The total number of calls that got a slot."""
+
+    queued_calls: int = 0
+    """The number of calls that had to wait for a slot."""
+
+    total_wait: float = 0.0
+    """The total time (in seconds) calls spent waiting for a slot."""
+
+    max_wait: float = 0.0
+    """The longest time (in seconds) a call waited for a slot."""
+
+    p95_wait_by_priority: dict[int, float] = field(default_factory=dict)
+    """The 95th percentile of recent wait times (in seconds), by run priority."""
+
+    decreases: int = 0
+    """The number of times the limit was decreased, for adaptive limiters."""
+
+    latency_baseline: float | None = None
+    """The moving average of call latencies (in seconds), for adaptive limiters that have seen
+    enough calls."""
+
+    @property
+    def average_wait(self) -> float:
+        """The average time (in seconds) calls waited for a slot."""
+        return self.total_wait / self.calls if self.calls else 0.0
+
+
+@dataclass
+class ConcurrencySlot:
+    """A slot held by a model call. Set `latency` to override the latency the scheduler records,
+    e.g. to the time to the first event of a stream."""
+
+    start: float
+    latency: float | None = None
+
+
+@dataclass
+class _Waiter:
+    priority: int
+    deadline: float | None
+    turn: int
+    seq: int
+    enqueued_at: float
+    future: asyncio.Future[None]
+
+
+def _percentile(values: deque[float], percentile: float) -> float:
+    ordered = sorted(values)
+    index = max(0, math.ceil(len(ordered) * percentile / 100) - 1)
+    return ordered[index]
+
+
+class RequestScheduler:
+    """Limits the number of model calls in flight, and decides which waiting call goes next.
+
+    Waiting calls are dispatched in this order:
+
+    1. Calls of runs with a higher `RunConfig.priority` go first. To keep low-priority runs from
+       starving, a waiting call's priority goes up by one every `aging_interval` seconds.
+    2. Among calls with the same priority, calls of runs with the earliest deadline (see
+       `RunConfig.deadline`) go first. Calls without a deadline go last.
+    3. Then runs take turns, so that a run making many calls can't hold up the others.
+    4. Then calls go in the order they arrived.
+    """
+
+    def __init__(self, max_concurrency: int = 10, aging_interval: float | None = 10.0) -> None:
+        """
+        Args:
+            max_concurrency: The number of model calls allowed in flight.
+            aging_interval: The time (in seconds) after which a waiting call's priority goes up
+                by one. None disables aging, so that lower-priority calls only go when no
+                higher-priority call is waiting.
+        """
+        if max_concurrency < 1:
+            raise UserError("max_concurrency must be at least 1")
+        self.max_concurrency = max_concurrency
+        self.aging_interval = aging_interval
+        self._in_flight = 0
+        self._waiters: list[_Waiter] = []
+        self._seq = 0
+        self._turns_by_run: OrderedDict[str, int] = OrderedDict()
+        self._max_tracked_runs = 10_000
+        self._waits_by_priority: dict[int, deque[float]] = {}
+        self._stats = ConcurrencyStats(limit=max_concurrency, in_flight=0, queue_length=0)
+
+    @property
+    def limit(self) -> int:
+        """The current number of model calls allowed in flight."""
+        return self.max_concurrency
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def queue_length(self) -> int:
+        return len(self._waiters)
+
+    def stats(self) -> ConcurrencyStats:
+        """Returns a snapshot of the scheduler's state and counters."""
+        stats = self._stats
+        return ConcurrencyStats(
+            limit=self.limit,
+            in_flight=self._in_flight,
+            queue_length=self.queue_length,
+            calls=stats.calls,
+            queued_calls=stats.queued_calls,
+            total_wait=stats.total_wait,
+            max_wait=stats.max_wait,
+            p95_wait_by_priority={
+                priority: _percentile(waits, 95)
+                for priority, waits in sorted(self._waits_by_priority.items())
+            },
+        )
+
+    def _next_turn(self, run_id: str | None) -> int:
+        # Each call takes the next turn of its run, so that runs with the same priority are
+        # served in round-robin order however many calls they queue.
+        if run_id is None:
+            return 0
+        turn = self._turns_by_run.get(run_id, 0)
+        self._turns_by_run[run_id] = turn + 1
+        self._turns_by_run.move_to_end(run_id)
+        if len(self._turns_by_run) > self._max_tracked_runs:
+            self._turns_by_run.popitem(last=False)
+        return turn
+
+    def _record_admission(self, priority: int, wait: float) -> None:
+        self._stats.calls += 1
+        self._stats.total_wait += wait
+        self._stats.max_wait = max(self._stats.max_wait, wait)
+        waits = self._waits_by_priority.get(priority)
+        if waits is None:
+            waits = self._waits_by_priority[priority] = deque(maxlen=_MAX_WAIT_SAMPLES)
+        waits.append(wait)
+
+    async def acquire(self) -> None:
+        """Waits for a slot. Every acquired slot must be given back with `release()`."""
+        scope = get_current_run_scope()
+        priority = scope.priority if scope else 0
+        turn = self._next_turn(scope.run_id if scope else None)
+        if self._in_flight < self.limit and not self._waiters:
+            self._in_flight += 1
+            self._record_admission(priority, 0.0)
+            return
+
+        self._seq += 1
+        waiter = _Waiter(
+            priority=priority,
+            deadline=scope.deadline if scope else None,
+            turn=turn,
+            seq=self._seq,
+            enqueued_at=time.monotonic(),
+            future=asyncio.get_running_loop().create_future(),
+        )
+        self._waiters.append(waiter)
+        self._stats.queued_calls += 1
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.cancelled():
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            else:
+                # The slot was handed over just as the call was cancelled, so pass it on.
+                self._in_flight -= 1
+                self._wake()
+            raise
+        self._record_admission(priority, time.monotonic() - waiter.enqueued_at)
+
+    def release(self, latency: float | None = None, overloaded: bool = False) -> None:
+        """Gives back a slot.
+
+        Args:
+            latency: The latency (in seconds) of the call, or None if it failed.
+            overloaded: Whether the call failed because the backend is overloaded, e.g. with a
+                rate limit error.
+        """
+        self._in_flight -= 1
+        self._on_release(latency, overloaded)
+        self._wake()
+
+    def _on_release(self, latency: float | None, overloaded: bool) -> None:
+        """Called when a slot is given back, before waiting calls are woken up."""
+
+    def _dispatch_key(self, waiter: _Waiter, now: float) -> tuple[int, float, int, int]:
+        priority = waiter.priority
+        if self.aging_interval:
+            priority += int((now - waiter.enqueued_at) / self.aging_interval)
+        deadline = waiter.deadline if waiter.deadline is not None else math.inf
+        return (-priority, deadline, waiter.turn, waiter.seq)
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            # Aging changes the order over time, so the next call is picked with a scan rather
+            # than kept in a heap. Waiting rooms are small enough for this not to matter.
+            now = time.monotonic()
+            waiter = min(self._waiters, key=lambda w: self._dispatch_key(w, now))
+            self._waiters.remove(waiter)
+            if waiter.future.done():
+                # Cancelled while waiting.
+                continue
+            # The slot is taken on the waiter's behalf, so that no other call can take it before
+            # the waiter resumes.
+            self._in_flight += 1
+            waiter.future.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def slot(self) -> AsyncIterator[ConcurrencySlot]:
+        """Holds a slot for the duration of the block, and releases it with the outcome of the
+        block: its latency if it succeeds, or whether the backend is overloaded if it raises."""
+        await self.acquire()
+        slot = ConcurrencySlot(start=time.monotonic())
+        try:
+            yield slot
+        except BaseException as e:
+            self.release(overloaded=classify_error(e) == "rate_limit")
+            raise
+        else:
+            latency = slot.latency if slot.latency is not None else time.monotonic() - slot.start
+            self.release(latency)
+
+
+class ScheduledModel(Model):
+    """A `Model` whose calls go through a `RequestScheduler`. Streamed calls hold their slot until
+    the stream ends, and the latency they record is the time to the first event."""
+
+    def __init__(self, wrapped_model: Model, scheduler: RequestScheduler) -> None:
+        self.wrapped_model = wrapped_model
+        self.scheduler = scheduler
+
+    @property
+    def supports_previous_response_id(self) -> bool:
+        return self.wrapped_model.supports_previous_response_id
+
+    async def get_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> ModelResponse:
+        async with self.scheduler.slot():
+            return await self.wrapped_model.get_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                **previous_response_kwargs(previous_response_id),
+            )
+
+    async def stream_response(
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+        previous_response_id: str | None = None,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        async with self.scheduler.slot() as slot:
+            async for event in self.wrapped_model.stream_response(
+                system_instructions,
+                input,
+                model_settings,
+                tools,
+                output_schema,
+                handoffs,
+                tracing,
+                **previous_response_kwargs(previous_response_id),
+            ):
+                if slot.latency is None:
+                    slot.latency = time.monotonic() - slot.start
+                yield event
+
+
+class SchedulingProvider(ModelProvider):
+    """A `ModelProvider` that sends the model calls of another provider through a single
+    `RequestScheduler`, shared by all its models and all the runs using it."""
+
+    def __init__(self, provider: ModelProvider, scheduler: RequestScheduler | None = None) -> None:
+        """
+        Args:
+            provider: The provider whose model calls to schedule.
+            scheduler: The scheduler to use. Defaults to `RequestScheduler()`.
+        """
+        self.provider = provider
+        self.scheduler = scheduler or RequestScheduler()
+        self._models: dict[str | None, ScheduledModel] = {}
+
+    def get_model(self, model_name: str | None) -> Model:
+        if model_name not in self._models:
+            self._models[model_name] = ScheduledModel(
+                self.provider.get_model(model_name), self.scheduler
+            )
+        return self._models[model_name]
+
+    def stats(self) -> ConcurrencyStats:
+        """Returns the current limit, queue length and wait times of the shared scheduler."""
+        return self.scheduler.stats()
@@ -2,9 +2,12 @@ from __future__ import annotations
 
 import asyncio
 import copy
+import json
+from collections.abc import AsyncIterator, Sequence
 from dataclasses import dataclass, field
 from typing import Any, cast
 
+from openai import BadRequestError, NotFoundError
 from openai.types.responses import ResponseCompletedEvent
 
 from . import Model, _utils
@@ -13,11 +16,13 @@ from ._run_impl import (
     NextStepHandoff,
     NextStepRunAgain,
     QueueCompleteSentinel,
+    ResponseChain,
     RunImpl,
     SingleStepResult,
     TraceCtxManager,
     get_model_tracing_impl,
 )
+from ._run_scope import run_scope
 from .agent import Agent
 from .agent_output import AgentOutputSchema
 from .exceptions import (
@@ -29,22 +34,47 @@ from .exceptions import (
 )
 from .guardrail import InputGuardrail, InputGuardrailResult, OutputGuardrail, OutputGuardrailResult
 from .handoffs import Handoff, HandoffInputFilter, handoff
-from .items import ItemHelpers, ModelResponse, RunItem, TResponseInputItem
+from .history import HistoryContext, HistoryManager
+from .items import ItemHelpers, ModelResponse, RunItem, TResponseInputItem, TResponseStreamEvent
 from .lifecycle import RunHooks
 from .logger import logger
 from .model_settings import ModelSettings
-from .models.interface import ModelProvider
+from .models.batch import (
+    BatchCollector,
+    BatchTransport,
+    OpenAIBatchTransport,
+    get_current_batch_collector,
+    reset_current_batch_collector,
+    set_current_batch_collector,
+)
+from .models.interface import ModelProvider, WarmupReport
 from .models.openai_provider import OpenAIProvider
 from .result import RunResult, RunResultStreaming
 from .run_context import RunContextWrapper, TContext
 from .stream_events import AgentUpdatedStreamEvent, RawResponsesStreamEvent
 from .tracing import Span, SpanError, agent_span, get_current_trace, trace
+from .tracing.setup import GLOBAL_TRACE_PROVIDER
 from .tracing.span_data import AgentSpanData
 from .usage import Usage
 
 DEFAULT_MAX_TURNS = 10
 
 
+def _input_bytes(input: list[TResponseInputItem]) -> int:
+    return len(json.dumps(input, default=str).encode("utf-8"))
+
+
+def _previous_response_missing(error: BadRequestError | NotFoundError) -> bool:
+    """Whether the API rejected a request because the previous response it continues from
+    doesn't exist or has expired. Other errors aren't fixed by sending the full history."""
+    return error.code == "previous_response_not_found" or error.param == "previous_response_id"
+
+
+def _add_usage(context_wrapper: RunContextWrapper[Any], agent: Agent[Any], usage: Usage) -> None:
+    context_wrapper.usage.add(usage)
+    context_wrapper.usage_by_agent.setdefault(agent.name, Usage()).add(usage)
+
+
 @dataclass
 class RunConfig:
     """Configures settings for the entire agent run."""
@@ -103,6 +133,33 @@ class RunConfig:
     An optional dictionary of additional metadata to include with the trace.
     """
 
+    use_previous_response_id: bool = False
+    """Whether to chain the turns of the run with `previous_response_id`, so that each turn only
+    sends the items added since the previous response instead of the full history. Only applies to
+    models whose `supports_previous_response_id` is True, such as those that use the OpenAI
+    Responses API. The full history is sent whenever the chain can't be continued, e.g. after a
+    handoff input filter rewrites the history, or when the previous response has expired.
+    """
+
+    history_manager: HistoryManager | None = None
+    """Prepares the history sent to the model before each model request, e.g. a
+    `TokenBudgetHistoryManager` to keep it within the model's context window. The run still keeps
+    the full history. Turns whose history was changed by the manager aren't chained with
+    `previous_response_id`.
+    """
+
+    priority: int = 0
+    """The priority of the run's model calls. When calls have to wait, e.g. for a
+    `SchedulingProvider` to free up capacity, calls of higher-priority runs go first. For example,
+    give interactive runs a higher priority than background batch runs.
+    """
+
+    deadline: float | None = None
+    """The time (in seconds) from the start of the run that it should be done by. Among waiting
+    calls with the same priority, calls of the runs with the earliest deadlines go first. The run
+    isn't cancelled when its deadline passes.
+    """
+
 
 class Runner:
     @classmethod
@@ -149,12 +206,15 @@ class Runner:
         if run_config is None:
             run_config = RunConfig()
 
-        with TraceCtxManager(
-            workflow_name=run_config.workflow_name,
-            trace_id=run_config.trace_id,
-            group_id=run_config.group_id,
-            metadata=run_config.trace_metadata,
-            disabled=run_config.tracing_disabled,
+        with (
+            run_scope(priority=run_config.priority, deadline=run_config.deadline),
+            TraceCtxManager(
+                workflow_name=run_config.workflow_name,
+                trace_id=run_config.trace_id,
+                group_id=run_config.group_id,
+                metadata=run_config.trace_metadata,
+                disabled=run_config.tracing_disabled,
+            ),
         ):
             current_turn = 0
             original_input: str | list[TResponseInputItem] = copy.deepcopy(input)
@@ -170,25 +230,14 @@ class Runner:
             current_span: Span[AgentSpanData] | None = None
             current_agent = starting_agent
             should_run_agent_start_hooks = True
+            response_chain = ResponseChain() if run_config.use_previous_response_id else None
 
             try:
                 while True:
                     # Start an agent span if we don't have one. This span is ended if the current
                     # agent changes, or if the agent loop ends.
                     if current_span is None:
-                        handoff_names = [h.agent_name for h in cls._get_handoffs(current_agent)]
-                        tool_names = [t.name for t in current_agent.tools]
-                        if output_schema := cls._get_output_schema(current_agent):
-                            output_type_name = output_schema.output_type_name()
-                        else:
-                            output_type_name = "str"
-
-                        current_span = agent_span(
-                            name=current_agent.name,
-                            handoffs=handoff_names,
-                            tools=tool_names,
-                            output_type=output_type_name,
-                        )
+                        current_span = cls._agent_span(current_agent)
                         current_span.start(mark_as_current=True)
 
                     current_turn += 1
@@ -223,6 +272,7 @@ class Runner:
                                 context_wrapper=context_wrapper,
                                 run_config=run_config,
                                 should_run_agent_start_hooks=should_run_agent_start_hooks,
+                                response_chain=response_chain,
                             ),
                         )
                     else:
@@ -234,6 +284,7 @@ class Runner:
                             context_wrapper=context_wrapper,
                             run_config=run_config,
                             should_run_agent_start_hooks=should_run_agent_start_hooks,
+                            response_chain=response_chain,
                         )
                     should_run_agent_start_hooks = False
 
@@ -410,19 +461,122 @@ class Runner:
         )
 
         # Kick off the actual agent loop in the background and return the streamed result object.
-        streamed_result._run_impl_task = asyncio.create_task(
-            cls._run_streamed_impl(
-                starting_input=input,
-                streamed_result=streamed_result,
-                starting_agent=starting_agent,
-                max_turns=max_turns,
-                hooks=hooks,
-                context_wrapper=context_wrapper,
-                run_config=run_config,
+        # The task keeps the run scope it was created in.
+        with run_scope(priority=run_config.priority, deadline=run_config.deadline):
+            streamed_result._run_impl_task = asyncio.create_task(
+                cls._run_streamed_impl(
+                    starting_input=input,
+                    streamed_result=streamed_result,
+                    starting_agent=starting_agent,
+                    max_turns=max_turns,
+                    hooks=hooks,
+                    context_wrapper=context_wrapper,
+                    run_config=run_config,
+                )
             )
-        )
         return streamed_result
 
+    @classmethod
+    async def run_batch(
+        cls,
+        starting_agent: Agent[TContext],
+        inputs: Sequence[str | list[TResponseInputItem]],
+        *,
+        transport: BatchTransport | None = None,
+        context: TContext | None = None,
+        max_turns: int = DEFAULT_MAX_TURNS,
+        hooks: RunHooks[TContext] | None = None,
+        run_config: RunConfig | None = None,
+        max_batch_size: int = 50_000,
+    ) -> list[RunResult | BaseException]:
+        """Run many workflows through the Batch API, for large non-interactive workloads that can
+        trade latency for throughput.
+
+        Each input gets its own run, like `Runner.run`. Runs are suspended whenever they need a
+        model response; once every unfinished run is waiting (or `max_batch_size` requests are
+        waiting), the requests are submitted as a single batch, and each run resumes its agent loop
+        when its result arrives. Tools, handoffs and guardrails work as usual. Only OpenAI models
+        are batched; other models make real-time requests.
+
+        Args:
+            starting_agent: The starting agent of each run.
+            inputs: The initial input of each run.
+            transport: How batches are run. Defaults to an `OpenAIBatchTransport`.
+            context: The context to run the agents with. It is shared by all the runs.
+            max_turns: The maximum number of turns of each run.
+            hooks: An object that receives callbacks on various lifecycle events.
+            run_config: Global settings for each run.
+            max_batch_size: The maximum number of requests in a single batch.
+
+        Returns:
+            The result of each run, in the order of `inputs`. A run that raises doesn't stop the
+            others; its exception is returned in place of its result.
+        """
+        collector = BatchCollector(transport or OpenAIBatchTransport(), max_batch_size)
+
+        async def run_one(input: str | list[TResponseInputItem]) -> RunResult:
+            try:
+                return await cls.run(
+                    starting_agent,
+                    input,
+                    context=context,
+                    max_turns=max_turns,
+                    hooks=hooks,
+                    run_config=run_config,
+                )
+            finally:
+                collector.run_finished()
+
+        # Register every run up front, so that the first requests wait for the other runs.
+        collector.runs_started(len(inputs))
+        token = set_current_batch_collector(collector)
+        try:
+            return await asyncio.gather(
+                *(run_one(input) for input in inputs), return_exceptions=True
+            )
+        finally:
+            reset_current_batch_collector(token)
+
+    @classmethod
+    async def warmup(
+        cls,
+        agents: Sequence[Agent[Any]] = (),
+        *,
+        connections: int = 1,
+        run_config: RunConfig | None = None,
+    ) -> WarmupReport:
+        """Warm up the model provider before serving runs, e.g. right after a process starts, so
+        that the first runs don't pay for model setup and connection establishment.
+
+        Args:
+            agents: The agents that will be run. The models of these agents, and of the agents they
+                can hand off to, are resolved ahead of time.
+            connections: The number of pooled connections the provider should open.
+            run_config: The run config that the runs will use. Its model provider is warmed up.
+
+        Returns:
+            A report of what was warmed up and how long it took.
+        """
+        if run_config is None:
+            run_config = RunConfig()
+
+        model_names: list[str | None] = []
+        if isinstance(run_config.model, str):
+            model_names.append(run_config.model)
+        elif run_config.model is None:
+            seen: set[int] = set()
+            pending = list(agents)
+            while pending:
+                agent = pending.pop()
+                if id(agent) in seen:
+                    continue
+                seen.add(id(agent))
+                if not isinstance(agent.model, Model):
+                    model_names.append(agent.model)
+                pending.extend(h for h in agent.handoffs if isinstance(h, Agent))
+
+        return await run_config.model_provider.warmup(model_names, connections=connections)
+
     @classmethod
     async def _run_input_guardrails_with_queue(
         cls,
@@ -481,6 +635,7 @@ class Runner:
         current_agent = starting_agent
         current_turn = 0
         should_run_agent_start_hooks = True
+        response_chain = ResponseChain() if run_config.use_previous_response_id else None
 
         streamed_result._event_queue.put_nowait(AgentUpdatedStreamEvent(new_agent=current_agent))
 
@@ -492,19 +647,7 @@ class Runner:
                 # Start an agent span if we don't have one. This span is ended if the current
                 # agent changes, or if the agent loop ends.
                 if current_span is None:
-                    handoff_names = [h.agent_name for h in cls._get_handoffs(current_agent)]
-                    tool_names = [t.name for t in current_agent.tools]
-                    if output_schema := cls._get_output_schema(current_agent):
-                        output_type_name = output_schema.output_type_name()
-                    else:
-                        output_type_name = "str"
-
-                    current_span = agent_span(
-                        name=current_agent.name,
-                        handoffs=handoff_names,
-                        tools=tool_names,
-                        output_type=output_type_name,
-                    )
+                    current_span = cls._agent_span(current_agent)
                     current_span.start(mark_as_current=True)
 
                 current_turn += 1
@@ -541,6 +684,7 @@ class Runner:
                         context_wrapper,
                         run_config,
                         should_run_agent_start_hooks,
+                        response_chain,
                     )
                     should_run_agent_start_hooks = False
 
@@ -608,6 +752,7 @@ class Runner:
         context_wrapper: RunContextWrapper[TContext],
         run_config: RunConfig,
         should_run_agent_start_hooks: bool,
+        response_chain: ResponseChain | None = None,
     ) -> SingleStepResult:
         if should_run_agent_start_hooks:
             await asyncio.gather(
@@ -632,35 +777,69 @@ class Runner:
         model_settings = agent.model_settings.resolve(run_config.model_settings)
         final_response: ModelResponse | None = None
 
-        input = ItemHelpers.input_to_new_input_list(streamed_result.input)
-        input.extend([item.to_input_item() for item in streamed_result.new_items])
+        full_input = ItemHelpers.input_to_new_input_list(streamed_result.input)
+        full_input.extend([item.to_input_item() for item in streamed_result.new_items])
+        input = await cls._manage_history(
+            agent, system_prompt, full_input, handoffs, context_wrapper, run_config
+        )
+
+        original_input = streamed_result.input
+        pre_step_items = streamed_result.new_items
+        tracing = get_model_tracing_impl(
+            run_config.tracing_disabled, run_config.trace_include_sensitive_data
+        )
+        continuation = (
+            response_chain.continuation(original_input, pre_step_items)
+            if response_chain and input is full_input
+            else None
+        )
+        sent_input = input
+
+        async def stream_events() -> AsyncIterator[TResponseStreamEvent]:
+            nonlocal sent_input
+            if continuation is not None and model.supports_previous_response_id:
+                previous_response_id, sent_input = continuation
+                started = False
+                try:
+                    async for event in model.stream_response(
+                        system_prompt,
+                        sent_input,
+                        model_settings,
+                        agent.tools,
+                        output_schema,
+                        handoffs,
+                        tracing,
+                        previous_response_id=previous_response_id,
+                    ):
+                        started = True
+                        yield event
+                    return
+                except (BadRequestError, NotFoundError) as e:
+                    if started or not _previous_response_missing(e):
+                        raise
+                    logger.warning(
+                        f"Couldn't continue from response {previous_response_id}, "
+                        f"sending the full history instead: {e}"
+                    )
+                    sent_input = input
+
+            async for event in model.stream_response(
+                system_prompt,
+                input,
+                model_settings,
+                agent.tools,
+                output_schema,
+                handoffs,
+                tracing,
+            ):
+                yield event
 
         # 1. Stream the output events
-        async for event in model.stream_response(
-            system_prompt,
-            input,
-            model_settings,
-            agent.tools,
-            output_schema,
-            handoffs,
-            get_model_tracing_impl(
-                run_config.tracing_disabled, run_config.trace_include_sensitive_data
-            ),
-        ):
+        async for event in stream_events():
             if isinstance(event, ResponseCompletedEvent):
-                usage = (
-                    Usage(
-                        requests=1,
-                        input_tokens=event.response.usage.input_tokens,
-                        output_tokens=event.response.usage.output_tokens,
-                        total_tokens=event.response.usage.total_tokens,
-                    )
-                    if event.response.usage
-                    else Usage()
-                )
                 final_response = ModelResponse(
                     output=event.response.output,
-                    usage=usage,
+                    usage=Usage.from_response_usage(event.response.usage),
                     referenceable_id=event.response.id,
                 )
 
@@ -670,11 +849,17 @@ class Runner:
         if not final_response:
             raise ModelBehaviorError("Model did not produce a final response!")
 
+        if run_config.use_previous_response_id:
+            final_response.usage.input_bytes = _input_bytes(sent_input)
+        _add_usage(context_wrapper, agent, final_response.usage)
+        if response_chain:
+            response_chain.record(original_input, pre_step_items, final_response)
+
         # 3. Now, we can process the turn as we do in the non-streaming case
         single_step_result = await cls._get_single_step_result_from_response(
             agent=agent,
-            original_input=streamed_result.input,
-            pre_step_items=streamed_result.new_items,
+            original_input=original_input,
+            pre_step_items=pre_step_items,
             new_response=final_response,
             output_schema=output_schema,
             handoffs=handoffs,
@@ -697,6 +882,7 @@ class Runner:
         context_wrapper: RunContextWrapper[TContext],
         run_config: RunConfig,
         should_run_agent_start_hooks: bool,
+        response_chain: ResponseChain | None = None,
     ) -> SingleStepResult:
         # Ensure we run the hooks before anything else
         if should_run_agent_start_hooks:
@@ -713,8 +899,11 @@ class Runner:
 
         output_schema = cls._get_output_schema(agent)
         handoffs = cls._get_handoffs(agent)
-        input = ItemHelpers.input_to_new_input_list(original_input)
-        input.extend([generated_item.to_input_item() for generated_item in generated_items])
+        full_input = ItemHelpers.input_to_new_input_list(original_input)
+        full_input.extend([generated_item.to_input_item() for generated_item in generated_items])
+        input = await cls._manage_history(
+            agent, system_prompt, full_input, handoffs, context_wrapper, run_config
+        )
 
         new_response = await cls._get_new_response(
             agent,
@@ -724,7 +913,14 @@ class Runner:
             handoffs,
             context_wrapper,
             run_config,
+            continuation=(
+                response_chain.continuation(original_input, generated_items)
+                if response_chain and input is full_input
+                else None
+            ),
         )
+        if response_chain:
+            response_chain.record(original_input, generated_items, new_response)
 
         return await cls._get_single_step_result_from_response(
             agent=agent,
@@ -856,25 +1052,99 @@ class Runner:
         handoffs: list[Handoff],
         context_wrapper: RunContextWrapper[TContext],
         run_config: RunConfig,
+        continuation: tuple[str, list[TResponseInputItem]] | None = None,
     ) -> ModelResponse:
         model = cls._get_model(agent, run_config)
         model_settings = agent.model_settings.resolve(run_config.model_settings)
-        new_response = await model.get_response(
-            system_instructions=system_prompt,
-            input=input,
-            model_settings=model_settings,
-            tools=agent.tools,
-            output_schema=output_schema,
-            handoffs=handoffs,
-            tracing=get_model_tracing_impl(
-                run_config.tracing_disabled, run_config.trace_include_sensitive_data
-            ),
+        tracing = get_model_tracing_impl(
+            run_config.tracing_disabled, run_config.trace_include_sensitive_data
         )
 
-        context_wrapper.usage.add(new_response.usage)
+        new_response: ModelResponse | None = None
+        sent_input = input
+        if continuation is not None and model.supports_previous_response_id:
+            previous_response_id, sent_input = continuation
+            try:
+                new_response = await model.get_response(
+                    system_instructions=system_prompt,
+                    input=sent_input,
+                    model_settings=model_settings,
+                    tools=agent.tools,
+                    output_schema=output_schema,
+                    handoffs=handoffs,
+                    tracing=tracing,
+                    previous_response_id=previous_response_id,
+                )
+            except (BadRequestError, NotFoundError) as e:
+                if not _previous_response_missing(e):
+                    raise
+                logger.warning(
+                    f"Couldn't continue from response {previous_response_id}, "
+                    f"sending the full history instead: {e}"
+                )
+                sent_input = input
+
+        if new_response is None:
+            new_response = await model.get_response(
+                system_instructions=system_prompt,
+                input=input,
+                model_settings=model_settings,
+                tools=agent.tools,
+                output_schema=output_schema,
+                handoffs=handoffs,
+                tracing=tracing,
+            )
+
+        if run_config.use_previous_response_id:
+            new_response.usage.input_bytes = _input_bytes(sent_input)
+        _add_usage(context_wrapper, agent, new_response.usage)
 
         return new_response
 
+    @classmethod
+    async def _manage_history(
+        cls,
+        agent: Agent[TContext],
+        system_prompt: str | None,
+        input: list[TResponseInputItem],
+        handoffs: list[Handoff],
+        context_wrapper: RunContextWrapper[TContext],
+        run_config: RunConfig,
+    ) -> list[TResponseInputItem]:
+        if run_config.history_manager is None:
+            return input
+        return await run_config.history_manager.manage(
+            input,
+            HistoryContext(
+                agent=agent,
+                system_instructions=system_prompt,
+                tools=agent.tools,
+                handoffs=handoffs,
+                context_wrapper=context_wrapper,
+                run_config=run_config,
+            ),
+        )
+
+    @classmethod
+    def _agent_span(cls, agent: Agent[Any]) -> Span[AgentSpanData]:
+        if GLOBAL_TRACE_PROVIDER.spans_disabled():
+            # Don't bother listing handoffs and tools for a span that won't be recorded.
+            return agent_span(name=agent.name)
+
+        handoff_names = [h.agent_name for h in cls._get_handoffs(agent)]
+        tool_names = [t.name for t in agent.tools]
+        if output_schema := cls._get_output_schema(agent):
+            output_type_name = output_schema.output_type_name()
+        else:
+            output_type_name = "str"
+
+        return agent_span(
+            name=agent.name,
+            handoffs=handoff_names,
+            tools=tool_names,
+            output_type=output_type_name,
+        )
+
     @classmethod
     def _get_output_schema(cls, agent: Agent[Any]) -> AgentOutputSchema | None:
         if agent.output_type is None or agent.output_type is str:
@@ -894,11 +1164,15 @@ class Runner:
 
     @classmethod
     def _get_model(cls, agent: Agent[Any], run_config: RunConfig) -> Model:
+        model: Model
         if isinstance(run_config.model, Model):
-            return run_config.model
+            model = run_config.model
         elif isinstance(run_config.model, str):
-            return run_config.model_provider.get_model(run_config.model)
+            model = run_config.model_provider.get_model(run_config.model)
         elif isinstance(agent.model, Model):
-            return agent.model
+            model = agent.model
+        else:
+            model = run_config.model_provider.get_model(agent.model)
 
-        return run_config.model_provider.get_model(agent.model)
+        batch_collector = get_current_batch_collector()
+        return batch_collector.wrap(model) if batch_collector is not None else model
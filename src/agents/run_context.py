@@ -24,3 +24,8 @@ class RunContextWrapper(Generic[TContext]):
     """The usage of the agent run so far. For streamed responses, the usage will be stale until the
     last chunk of the stream is processed.
     """
+
+    usage_by_agent: dict[str, Usage] = field(default_factory=dict)
+    """The usage of the agent run so far, broken down by agent name. For example,
+    `usage_by_agent[name].cache_hit_ratio` shows how well prompt caching works for each agent.
+    """
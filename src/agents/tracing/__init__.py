@@ -1,3 +1,5 @@
+from __future__ import annotations
+
 import atexit
 
 from .create import (
@@ -14,6 +16,7 @@ from .create import (
 )
 from .processor_interface import TracingProcessor
 from .processors import default_exporter, default_processor
+from .sampling import RatioSampler, Sampler, TailSamplingProcessor
 from .setup import GLOBAL_TRACE_PROVIDER
 from .span_data import (
     AgentSpanData,
@@ -41,6 +44,7 @@ __all__ = [
     "handoff_span",
     "response_span",
     "set_trace_processors",
+    "set_trace_sampler",
     "set_tracing_disabled",
     "trace",
     "Trace",
@@ -55,6 +59,9 @@ __all__ = [
     "HandoffSpanData",
     "ResponseSpanData",
     "TracingProcessor",
+    "Sampler",
+    "RatioSampler",
+    "TailSamplingProcessor",
     "gen_trace_id",
     "gen_span_id",
 ]
@@ -74,6 +81,13 @@ def set_trace_processors(processors: list[TracingProcessor]) -> None:
     GLOBAL_TRACE_PROVIDER.set_processors(processors)
 
 
+def set_trace_sampler(sampler: Sampler | None) -> None:
+    """
+    Set the sampler that decides which traces are recorded. None to record every trace.
+    """
+    GLOBAL_TRACE_PROVIDER.set_sampler(sampler)
+
+
 def set_tracing_disabled(disabled: bool) -> None:
     """
     Set whether tracing is globally disabled.
@@ -0,0 +1,451 @@
+"""Offline analysis of recorded traces: where did the time go?
+
+The functions here take exported traces and spans, either the `Trace` and `Span` objects a
+processor or exporter receives, or the records `TraceFileReader` reads back, and rebuild the span
+tree of each trace. `analyze_trace` then computes the critical path through the trace, i.e. the
+chain of spans that determined its wall time, and attributes that time to model calls, tools,
+guardrails, handoffs and the framework itself. The trees can also be written out for flame graph
+viewers, with `to_speedscope` and `to_chrome_trace`.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any
+
+from .spans import Span
+from .traces import Trace
+
+CATEGORIES = ("model", "tool", "guardrail", "handoff", "framework", "other")
+"""The categories time is attributed to."""
+
+_CATEGORY_BY_TYPE = {
+    "generation": "model",
+    "response": "model",
+    "function": "tool",
+    "guardrail": "guardrail",
+    "handoff": "handoff",
+    "agent": "framework",
+    "trace": "framework",
+}
+
+
+@dataclass(eq=False)
+class SpanNode:
+    """A span in a rebuilt trace tree. Times are in seconds since the epoch, clamped to the
+    parent span, so that children never stick out of their parent."""
+
+    span_id: str
+    parent_id: str | None
+    type: str
+    name: str
+    start: float
+    end: float
+    data: dict[str, Any] = field(default_factory=dict)
+    error: dict[str, Any] | None = None
+    children: list[SpanNode] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+    @property
+    def category(self) -> str:
+        return _CATEGORY_BY_TYPE.get(self.type, "other")
+
+    def walk(self) -> Iterable[SpanNode]:
+        """Yields this span and all of its descendants, depth first."""
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+
+@dataclass
+class TraceTree:
+    """The span tree of one trace. `root` stands for the trace itself: it spans from the start of
+    the first span to the end of the last one, and its children are the top level spans."""
+
+    trace_id: str
+    workflow_name: str | None
+    root: SpanNode
+
+    @property
+    def start(self) -> float:
+        return self.root.start
+
+    @property
+    def wall_time(self) -> float:
+        return self.root.duration
+
+    @property
+    def span_count(self) -> int:
+        return sum(1 for _ in self.root.walk()) - 1
+
+
+@dataclass
+class CriticalPathSegment:
+    """A stretch of the critical path, during which `span` was running and none of its children
+    on the critical path were."""
+
+    span: SpanNode
+    start: float
+    end: float
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@dataclass
+class TraceAnalysis:
+    trace_id: str
+    workflow_name: str | None
+    wall_time: float
+    """The time from the start of the first span to the end of the last one, in seconds."""
+
+    span_count: int
+
+    critical_path: list[CriticalPathSegment]
+    """The segments of the critical path, in order. Their durations add up to the wall time."""
+
+    critical_path_time: dict[str, float]
+    """The wall time, broken down by category along the critical path."""
+
+    total_time: dict[str, float]
+    """The self time of all spans, by category. Spans that ran in parallel are all counted, so
+    this can add up to more than the wall time."""
+
+    def summary(self, top: int = 5) -> str:
+        """Formats the analysis as a short text report.
+
+        Args:
+            top: The number of slowest spans on the critical path to list.
+        """
+        title = f" ({self.workflow_name})" if self.workflow_name else ""
+        lines = [
+            f"Trace {self.trace_id}{title}: {self.wall_time:.3f}s, {self.span_count} spans",
+            "Critical path by category:",
+        ]
+        for category, seconds in sorted(self.critical_path_time.items(), key=lambda kv: -kv[1]):
+            if seconds <= 0:
+                continue
+            share = seconds / self.wall_time * 100 if self.wall_time else 0.0
+            total = self.total_time.get(category, 0.0)
+            lines.append(
+                f"  {category:<10} {seconds:9.3f}s {share:5.1f}%   (all spans: {total:.3f}s)"
+            )
+
+        by_span: dict[SpanNode, float] = {}
+        for segment in self.critical_path:
+            if segment.span.type != "trace":
+                by_span[segment.span] = by_span.get(segment.span, 0.0) + segment.duration
+        slowest = sorted(by_span.items(), key=lambda kv: -kv[1])[:top]
+        if slowest:
+            lines.append("Slowest spans on the critical path:")
+            for node, seconds in slowest:
+                lines.append(f"  {node.name:<40} {seconds:9.3f}s")
+        return "\n".join(lines)
+
+
+def _timestamp(value: str | None) -> float | None:
+    if not value:
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+
+def _span_name(span_type: str, data: dict[str, Any]) -> str:
+    if span_type == "generation":
+        label = data.get("model")
+    elif span_type == "handoff":
+        label = f"{data.get('from_agent')} -> {data.get('to_agent')}"
+    elif span_type == "response":
+        label = data.get("response_id")
+    else:
+        label = data.get("name")
+    return f"{span_type}: {label}" if label else span_type
+
+
+def _as_record(item: Trace | Span[Any] | dict[str, Any]) -> dict[str, Any] | None:
+    if isinstance(item, dict):
+        return item
+    return item.export()
+
+
+def build_trace_trees(items: Iterable[Trace | Span[Any] | dict[str, Any]]) -> list[TraceTree]:
+    """Rebuilds the span trees of the traces the items belong to.
+
+    Args:
+        items: Traces and spans, as objects or as exported records, in any order and for any
+            number of traces. Spans that haven't started are skipped, and spans that haven't
+            finished are treated as instantaneous. Spans whose parent is missing are attached to
+            the trace.
+
+    Returns:
+        One tree per trace that has at least one span, in the order the traces first appear.
+    """
+    workflow_names: dict[str, str | None] = {}
+    nodes_by_trace: dict[str, list[SpanNode]] = {}
+    for item in items:
+        record = _as_record(item)
+        if record is None:
+            continue
+        if record.get("object") == "trace":
+            workflow_names[record["id"]] = record.get("workflow_name")
+            nodes_by_trace.setdefault(record["id"], [])
+            continue
+
+        start = _timestamp(record.get("started_at"))
+        if start is None:
+            continue
+        end = _timestamp(record.get("ended_at"))
+        data = record.get("span_data") or {}
+        span_type = data.get("type", "unknown")
+        nodes_by_trace.setdefault(record["trace_id"], []).append(
+            SpanNode(
+                span_id=record["id"],
+                parent_id=record.get("parent_id"),
+                type=span_type,
+                name=_span_name(span_type, data),
+                start=start,
+                end=max(start, end) if end is not None else start,
+                data=data,
+                error=record.get("error"),
+            )
+        )
+
+    trees = []
+    for trace_id, nodes in nodes_by_trace.items():
+        if not nodes:
+            continue
+        workflow_name = workflow_names.get(trace_id)
+        root = SpanNode(
+            span_id=trace_id,
+            parent_id=None,
+            type="trace",
+            name=f"trace: {workflow_name}" if workflow_name else "trace",
+            start=min(node.start for node in nodes),
+            end=max(node.end for node in nodes),
+        )
+        by_id = {node.span_id: node for node in nodes}
+        for node in nodes:
+            parent = by_id.get(node.parent_id) if node.parent_id else None
+            (parent or root).children.append(node)
+        _clamp(root)
+        trees.append(TraceTree(trace_id=trace_id, workflow_name=workflow_name, root=root))
+    return trees
+
+
+def _clamp(root: SpanNode) -> None:
+    # Timestamps are only precise to the microsecond, so a child can look like it ends just after
+    # its parent.
+    for node in root.walk():
+        node.children.sort(key=lambda child: (child.start, child.end))
+        for child in node.children:
+            child.start = min(max(child.start, node.start), node.end)
+            child.end = max(min(child.end, node.end), child.start)
+
+
+def critical_path(tree: TraceTree) -> list[CriticalPathSegment]:
+    """Computes the critical path of a trace: the chain of spans that determined its wall time.
+
+    Starting from the end of a span, the path goes to the child that finished last, then, from
+    the start of that child, to the child that finished last before it, and so on. Time when none
+    of a span's children on the path were running is attributed to the span itself. For children
+    that ran in parallel, such as tool calls or guardrails, only the one that finished last is on
+    the path.
+
+    Returns:
+        The segments of the path, in order. Consecutive segments of the same span are merged.
+    """
+    backwards: list[CriticalPathSegment] = []
+    _walk_critical_path(tree.root, tree.root.start, tree.root.end, backwards)
+
+    segments: list[CriticalPathSegment] = []
+    for segment in reversed(backwards):
+        if segment.end <= segment.start:
+            continue
+        if segments and segments[-1].span is segment.span and segments[-1].end == segment.start:
+            segments[-1].end = segment.end
+        else:
+            segments.append(segment)
+    return segments
+
+
+def _walk_critical_path(
+    node: SpanNode, start: float, end: float, out: list[CriticalPathSegment]
+) -> None:
+    # Appends the segments of the path between `start` and `end`, from last to first.
+    cursor = end
+    while True:
+        candidates = [c for c in node.children if c.start < cursor and c.end > start]
+        if not candidates:
+            break
+        child = max(candidates, key=lambda c: (min(c.end, cursor), -c.start))
+        child_end = min(child.end, cursor)
+        if child_end < cursor:
+            out.append(CriticalPathSegment(node, child_end, cursor))
+        child_start = max(child.start, start)
+        _walk_critical_path(child, child_start, child_end, out)
+        cursor = child_start
+    if cursor > start:
+        out.append(CriticalPathSegment(node, start, cursor))
+
+
+def _self_time(node: SpanNode) -> float:
+    busy = 0.0
+    covered_until = node.start
+    for child in node.children:
+        if child.end <= covered_until:
+            continue
+        busy += child.end - max(child.start, covered_until)
+        covered_until = child.end
+    return node.duration - busy
+
+
+def analyze_trace(tree: TraceTree) -> TraceAnalysis:
+    """Computes the critical path of a trace, and attributes its wall time to categories.
+
+    Model calls (generation and response spans) count as `model`, function spans as `tool`, and
+    guardrail and handoff spans as `guardrail` and `handoff`. Time spent in agent spans, or
+    between spans, outside of any of those, is `framework` overhead. Custom spans count as
+    `other`.
+    """
+    path = critical_path(tree)
+    critical_path_time = dict.fromkeys(CATEGORIES, 0.0)
+    for segment in path:
+        critical_path_time[segment.span.category] += segment.duration
+
+    total_time = dict.fromkeys(CATEGORIES, 0.0)
+    for node in tree.root.walk():
+        total_time[node.category] += _self_time(node)
+
+    return TraceAnalysis(
+        trace_id=tree.trace_id,
+        workflow_name=tree.workflow_name,
+        wall_time=tree.wall_time,
+        span_count=tree.span_count,
+        critical_path=path,
+        critical_path_time=critical_path_time,
+        total_time=total_time,
+    )
+
+
+def analyze_traces(items: Iterable[Trace | Span[Any] | dict[str, Any]]) -> list[TraceAnalysis]:
+    """Rebuilds the trees of the traces the items belong to, and analyzes each of them. See
+    `build_trace_trees` and `analyze_trace`."""
+    return [analyze_trace(tree) for tree in build_trace_trees(items)]
+
+
+def _lanes(tree: TraceTree) -> list[list[tuple[SpanNode, bool]]]:
+    """Splits the spans of a tree into lanes where spans are properly nested, as flame graph
+    viewers expect. Children that overlap an earlier sibling, i.e. that ran in parallel with it,
+    go to a new lane along with their descendants.
+
+    Returns:
+        For each lane, the open (True) and close (False) events of its spans, in order.
+    """
+    lanes: list[list[tuple[SpanNode, bool]]] = []
+
+    def place(node: SpanNode, lane: int) -> None:
+        lanes[lane].append((node, True))
+        cursor = node.start
+        for child in node.children:
+            if child.start >= cursor:
+                place(child, lane)
+                cursor = child.end
+            else:
+                lanes.append([])
+                place(child, len(lanes) - 1)
+        lanes[lane].append((node, False))
+
+    lanes.append([])
+    place(tree.root, 0)
+    return lanes
+
+
+def _milliseconds(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def to_speedscope(trees: Iterable[TraceTree], name: str = "Agent traces") -> dict[str, Any]:
+    """Converts trace trees to the speedscope file format (https://www.speedscope.app).
+
+    Each lane of each trace becomes an evented profile, with times in milliseconds since the
+    start of the trace. Spans that ran in parallel with a sibling are in lanes of their own.
+    """
+    frames: list[dict[str, Any]] = []
+    frame_index: dict[str, int] = {}
+    profiles = []
+    for tree in trees:
+        for lane_number, lane in enumerate(_lanes(tree)):
+            events = []
+            for node, opened in lane:
+                index = frame_index.get(node.name)
+                if index is None:
+                    index = frame_index[node.name] = len(frames)
+                    frames.append({"name": node.name})
+                at = _milliseconds((node.start if opened else node.end) - tree.start)
+                events.append({"type": "O" if opened else "C", "frame": index, "at": at})
+            profile_name = tree.workflow_name or tree.trace_id
+            if lane_number:
+                profile_name = f"{profile_name} (parallel {lane_number})"
+            profiles.append(
+                {
+                    "type": "evented",
+                    "name": profile_name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": _milliseconds(tree.wall_time),
+                    "events": events,
+                }
+            )
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "openai-agents",
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+
+def to_chrome_trace(trees: Iterable[TraceTree]) -> dict[str, Any]:
+    """Converts trace trees to the Chrome trace event format, as read by Perfetto
+    (https://ui.perfetto.dev) and `chrome://tracing`.
+
+    Each trace is a process, and each of its lanes a thread, with spans as complete events.
+    Timestamps are in microseconds since the epoch.
+    """
+    events: list[dict[str, Any]] = []
+    for pid, tree in enumerate(trees, start=1):
+        events.append(
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": f"{tree.workflow_name or 'trace'} ({tree.trace_id})"},
+            }
+        )
+        for tid, lane in enumerate(_lanes(tree), start=1):
+            for node, opened in lane:
+                if not opened:
+                    continue
+                args: dict[str, Any] = {"span_id": node.span_id, "parent_id": node.parent_id}
+                if node.error:
+                    args["error"] = node.error
+                events.append(
+                    {
+                        "name": node.name,
+                        "cat": node.category,
+                        "ph": "X",
+                        "ts": round(node.start * 1_000_000),
+                        "dur": round(node.duration * 1_000_000),
+                        "pid": pid,
+                        "tid": tid,
+                        "args": args,
+                    }
+                )
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
@@ -14,7 +14,7 @@ from .span_data import (
     HandoffSpanData,
     ResponseSpanData,
 )
-from .spans import Span
+from .spans import DISABLED_SPAN, Span
 from .traces import Trace
 
 if TYPE_CHECKING:
@@ -104,6 +104,8 @@ def agent_span(
     Returns:
         The newly created agent span.
     """
+    if GLOBAL_TRACE_PROVIDER.spans_disabled(parent):
+        return DISABLED_SPAN
     return GLOBAL_TRACE_PROVIDER.create_span(
         span_data=AgentSpanData(name=name, handoffs=handoffs, tools=tools, output_type=output_type),
         span_id=span_id,
@@ -137,6 +139,8 @@ def function_span(
     Returns:
         The newly created function span.
     """
+    if GLOBAL_TRACE_PROVIDER.spans_disabled(parent):
+        return DISABLED_SPAN
     return GLOBAL_TRACE_PROVIDER.create_span(
         span_data=FunctionSpanData(name=name, input=input, output=output),
         span_id=span_id,
@@ -179,6 +183,8 @@ def generation_span(
     Returns:
         The newly created generation span.
     """
+    if GLOBAL_TRACE_PROVIDER.spans_disabled(parent):
+        return DISABLED_SPAN
     return GLOBAL_TRACE_PROVIDER.create_span(
         span_data=GenerationSpanData(
             input=input, output=output, model=model, model_config=model_config, usage=usage
@@ -207,6 +213,8 @@ def response_span(
             trace/span as the parent.
         disabled: If True, we will return a Span but the Span will not be recorded.
     """
+    if GLOBAL_TRACE_PROVIDER.spans_disabled(parent):
+        return DISABLED_SPAN
     return GLOBAL_TRACE_PROVIDER.create_span(
         span_data=ResponseSpanData(response=response),
         span_id=span_id,
@@ -238,6 +246,8 @@ def handoff_span(
     Returns:
         The newly created handoff span.
     """
+    if GLOBAL_TRACE_PROVIDER.spans_disabled(parent):
+        return DISABLED_SPAN
     return GLOBAL_TRACE_PROVIDER.create_span(
         span_data=HandoffSpanData(from_agent=from_agent, to_agent=to_agent),
         span_id=span_id,
@@ -270,6 +280,8 @@ def custom_span(
     Returns:
         The newly created custom span.
     """
+    if GLOBAL_TRACE_PROVIDER.spans_disabled(parent):
+        return DISABLED_SPAN
     return GLOBAL_TRACE_PROVIDER.create_span(
         span_data=CustomSpanData(name=name, data=data or {}),
         span_id=span_id,
@@ -298,6 +310,8 @@ def guardrail_span(
             trace/span as the parent.
         disabled: If True, we will return a Span but the Span will not be recorded.
     """
+    if GLOBAL_TRACE_PROVIDER.spans_disabled(parent):
+        return DISABLED_SPAN
     return GLOBAL_TRACE_PROVIDER.create_span(
         span_data=GuardrailSpanData(name=name, triggered=triggered),
         span_id=span_id,
@@ -0,0 +1,243 @@
+from __future__ import annotations
+
+import gzip
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from typing import Any
+
+from ..logger import logger
+from .payload import SerializedSpan
+from .processor_interface import TracingExporter
+from .spans import Span
+from .traces import Trace
+
+_INDEX_SUFFIX = ".idx"
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+class FileSpanExporter(TracingExporter):
+    """Appends traces and spans to local JSONL files, one compact JSON record per line.
+
+    Records go to `<prefix>-<timestamp>-<n>.jsonl` in `directory`. The file is rotated once it
+    reaches `max_file_bytes`, or once it has been open for `rotate_after` seconds. Rotated files
+    can be gzip-compressed.
+
+    Each data file gets an index file next to it, listing the trace ID, offset and length of every
+    record, so that `TraceFileReader` can find a trace without scanning the data files.
+    """
+
+    def __init__(
+        self,
+        directory: str | os.PathLike[str],
+        prefix: str = "traces",
+        max_file_bytes: int = 64 * 1024 * 1024,
+        rotate_after: float | None = 3600.0,
+        compress_rotated: bool = False,
+        json_dumps: Callable[[Any], bytes] | None = None,
+    ):
+        """
+        Args:
+            directory: The directory to write the files to. Created if it doesn't exist.
+            prefix: The prefix of the file names.
+            max_file_bytes: Rotate the current file once it reaches this size.
+            rotate_after: Rotate the current file once it has been open for this many seconds.
+                None to only rotate by size.
+            compress_rotated: Whether to gzip files once they are rotated. Compressed files take
+                less space, but reading a trace from one means decompressing the whole file.
+            json_dumps: Serializes a trace or span to JSON bytes. Defaults to the standard
+                library's `json`.
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix
+        self.max_file_bytes = max_file_bytes
+        self.rotate_after = rotate_after
+        self.compress_rotated = compress_rotated
+        self._json_dumps = json_dumps or _json_dumps
+        self._lock = threading.Lock()
+        self._file_count = 0
+        self._path: Path | None = None
+        self._data_file: Any = None
+        self._index_file: Any = None
+        self._opened_at = 0.0
+
+    @property
+    def current_path(self) -> Path | None:
+        """The file records are currently written to, if any."""
+        return self._path
+
+    def export(self, items: list[Trace | Span[Any]]) -> None:
+        lines: list[tuple[str, bytes]] = []
+        for item in items:
+            if isinstance(item, SerializedSpan):
+                lines.append((item.trace_id, item.payload + b"\n"))
+                continue
+            exported = item.export()
+            if exported:
+                lines.append((item.trace_id, self._json_dumps(exported) + b"\n"))
+        if not lines:
+            return
+
+        with self._lock:
+            if self._data_file is not None and self._should_rotate():
+                self._close_current()
+            if self._data_file is None:
+                self._open_next()
+
+            offset = self._data_file.tell()
+            index = []
+            for trace_id, line in lines:
+                index.append(f"{trace_id}\t{offset}\t{len(line)}\n")
+                offset += len(line)
+            self._data_file.write(b"".join(line for _, line in lines))
+            self._data_file.flush()
+            # The index is written after the data, so it never points past the end of the file.
+            self._index_file.write("".join(index))
+            self._index_file.flush()
+
+    def rotate(self) -> None:
+        """Closes the current file. The next export starts a new one."""
+        with self._lock:
+            self._close_current()
+
+    def close(self) -> None:
+        """Closes the current file."""
+        self.rotate()
+
+    def _should_rotate(self) -> bool:
+        if self._data_file.tell() >= self.max_file_bytes:
+            return True
+        return self.rotate_after is not None and (
+            time.monotonic() - self._opened_at >= self.rotate_after
+        )
+
+    def _open_next(self) -> None:
+        self._file_count += 1
+        timestamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime())
+        self._path = self.directory / f"{self.prefix}-{timestamp}-{self._file_count:04d}.jsonl"
+        self._data_file = open(self._path, "ab")
+        self._index_file = open(str(self._path) + _INDEX_SUFFIX, "a", encoding="utf-8")
+        self._opened_at = time.monotonic()
+
+    def _close_current(self) -> None:
+        if self._data_file is None or self._path is None:
+            return
+        self._data_file.close()
+        self._index_file.close()
+        path, self._path = self._path, None
+        self._data_file = self._index_file = None
+
+        if self.compress_rotated:
+            compressed = path.with_name(path.name + ".gz")
+            with open(path, "rb") as source, gzip.open(compressed, "wb") as target:
+                shutil.copyfileobj(source, target)
+            # The index keeps pointing at the uncompressed offsets.
+            os.replace(str(path) + _INDEX_SUFFIX, str(compressed) + _INDEX_SUFFIX)
+            path.unlink()
+            logger.debug(f"Rotated trace file {path} to {compressed}")
+
+
+class TraceFileReader:
+    """Finds traces in the files written by `FileSpanExporter`.
+
+    Uncompressed files are memory-mapped, so only the records of the traces that are read are
+    paged in. Which records belong to which trace comes from the index files written next to the
+    data files; for a data file without one, the index is built by scanning the file once.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str], prefix: str = "traces"):
+        """
+        Args:
+            directory: The directory the files were written to.
+            prefix: The prefix of the file names.
+        """
+        self.directory = Path(directory)
+        self.prefix = prefix
+        # trace ID -> [(file, offset, length)]
+        self._index: dict[str, list[tuple[Path, int, int]]] = {}
+        self._mmaps: dict[Path, mmap.mmap] = {}
+        self._decompressed: dict[Path, bytes] = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Rebuilds the index, to pick up files and records written since it was built."""
+        self._index.clear()
+        self.close()
+        for path in sorted(self.directory.glob(f"{self.prefix}-*.jsonl*")):
+            if path.name.endswith(_INDEX_SUFFIX):
+                continue
+            for trace_id, offset, length in self._file_index(path):
+                self._index.setdefault(trace_id, []).append((path, offset, length))
+
+    def trace_ids(self) -> list[str]:
+        """The IDs of the traces found in the files, in the order they were first written."""
+        return list(self._index)
+
+    def read_trace(self, trace_id: str) -> list[dict[str, Any]]:
+        """Returns the records of a trace, in the order they were written: the trace record
+        itself, and the spans. Empty if the trace isn't found."""
+        return [
+            json.loads(self._data(path)[offset : offset + length])
+            for path, offset, length in self._index.get(trace_id, [])
+        ]
+
+    def close(self) -> None:
+        """Unmaps the files."""
+        for mapped in self._mmaps.values():
+            mapped.close()
+        self._mmaps.clear()
+        self._decompressed.clear()
+
+    def __enter__(self) -> TraceFileReader:
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _file_index(self, path: Path) -> Iterator[tuple[str, int, int]]:
+        index_path = Path(str(path) + _INDEX_SUFFIX)
+        if index_path.exists():
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.rstrip("\n").split("\t")
+                    # Skip a line cut short by a crash.
+                    if len(parts) == 3:
+                        yield parts[0], int(parts[1]), int(parts[2])
+            return
+
+        data = self._data(path)
+        offset = 0
+        while offset < len(data):
+            end = data.find(b"\n", offset)
+            if end < 0:
+                # A record cut short by a crash.
+                break
+            try:
+                record = json.loads(data[offset:end])
+                yield record.get("trace_id") or record["id"], offset, end + 1 - offset
+            except (ValueError, KeyError):
+                logger.warning(f"Skipping malformed trace record at {path}:{offset}")
+            offset = end + 1
+
+    def _data(self, path: Path) -> bytes | mmap.mmap:
+        if path.suffix == ".gz":
+            if path not in self._decompressed:
+                with gzip.open(path, "rb") as f:
+                    self._decompressed[path] = f.read()
+            return self._decompressed[path]
+
+        if path not in self._mmaps:
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return b""
+                self._mmaps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmaps[path]
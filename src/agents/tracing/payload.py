@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import json
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from ..logger import logger
+from .span_data import SpanData
+from .spans import Span, SpanError
+
+TRUNCATION_MARKER = "...[truncated {removed} bytes]"
+"""Appended to string fields that were truncated."""
+
+
+@dataclass
+class SpanPayloadLimits:
+    """Caps on the size of the large fields of span data, in bytes of JSON. A field over its cap
+    is truncated: strings keep their beginning, followed by `TRUNCATION_MARKER`, and other values
+    are replaced by `{"truncated": true, "original_bytes": ..., "preview": ...}`, where `preview`
+    is the beginning of their JSON. None means no cap."""
+
+    generation_input: int | None = 64 * 1024
+    """The messages sent to the model, in `GenerationSpanData.input`."""
+
+    generation_output: int | None = 64 * 1024
+    """The model's output, in `GenerationSpanData.output`."""
+
+    function_input: int | None = 64 * 1024
+    """The arguments of a tool call, in `FunctionSpanData.input`."""
+
+    function_output: int | None = 64 * 1024
+    """The result of a tool call, in `FunctionSpanData.output`."""
+
+    custom_data: int | None = 64 * 1024
+    """The data of a custom span, in `CustomSpanData.data`."""
+
+
+_CAPPED_FIELDS = {
+    "generation": ("input", "output"),
+    "function": ("input", "output"),
+    "custom": ("data",),
+}
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def _truncate(value: Any, limit: int, json_dumps: Callable[[Any], bytes]) -> tuple[Any, int]:
+    """Returns the value capped to `limit` bytes, and the number of bytes removed."""
+    if isinstance(value, str):
+        encoded = value.encode()
+        if len(encoded) <= limit:
+            return value, 0
+        kept = encoded[:limit].decode(errors="ignore")
+        removed = len(encoded) - len(kept.encode())
+        return kept + TRUNCATION_MARKER.format(removed=removed), removed
+
+    encoded = json_dumps(value)
+    if len(encoded) <= limit:
+        return value, 0
+    preview = encoded[:limit].decode(errors="ignore")
+    truncated = {"truncated": True, "original_bytes": len(encoded), "preview": preview}
+    return truncated, len(encoded) - len(preview.encode())
+
+
+def truncate_span_data(
+    exported: dict[str, Any],
+    limits: SpanPayloadLimits,
+    json_dumps: Callable[[Any], bytes] | None = None,
+) -> int:
+    """Caps the large fields of exported span data in place.
+
+    Args:
+        exported: The span data, as returned by `SpanData.export()`.
+        limits: The caps to apply.
+        json_dumps: Serializes values to JSON bytes, to measure them.
+
+    Returns:
+        The number of bytes removed.
+    """
+    span_type = exported.get("type")
+    fields = _CAPPED_FIELDS.get(span_type) if isinstance(span_type, str) else None
+    if not fields:
+        return 0
+
+    removed = 0
+    for field in fields:
+        limit = getattr(limits, f"{span_type}_{field}")
+        value = exported.get(field)
+        if limit is None or value is None:
+            continue
+        exported[field], field_removed = _truncate(value, limit, json_dumps or _json_dumps)
+        removed += field_removed
+    return removed
+
+
+class _SerializedSpanData(SpanData):
+    __slots__ = ("_span",)
+
+    def __init__(self, span: SerializedSpan):
+        self._span = span
+
+    @property
+    def type(self) -> str:
+        return self._span.span_type
+
+    def export(self) -> dict[str, Any]:
+        record = self._span.export()
+        return record["span_data"] if record else {}
+
+
+class SerializedSpan(Span[SpanData]):
+    """A finished span, serialized to compact JSON bytes.
+
+    Span data can hold large objects: the messages sent to the model, its response, tool
+    outputs. Serializing a span when it ends, with `serialize_span`, releases them right away,
+    instead of holding on to them until the span is exported. Exporters that only use
+    `export()` work unchanged; those that know about this class can send `payload` as it is.
+    The span can't be started, finished or changed again.
+    """
+
+    __slots__ = (
+        "_trace_id",
+        "_span_id",
+        "_parent_id",
+        "_error",
+        "span_type",
+        "payload",
+        "truncated_bytes",
+    )
+
+    def __init__(
+        self,
+        trace_id: str,
+        span_id: str,
+        parent_id: str | None,
+        error: SpanError | None,
+        span_type: str,
+        payload: bytes,
+        truncated_bytes: int = 0,
+    ):
+        self._trace_id = trace_id
+        self._span_id = span_id
+        self._parent_id = parent_id
+        self._error = error
+        self.span_type = span_type
+        # The exported span, as JSON bytes.
+        self.payload = payload
+        # The number of bytes removed from span data fields over their cap.
+        self.truncated_bytes = truncated_bytes
+
+    @property
+    def trace_id(self) -> str:
+        return self._trace_id
+
+    @property
+    def span_id(self) -> str:
+        return self._span_id
+
+    @property
+    def parent_id(self) -> str | None:
+        return self._parent_id
+
+    @property
+    def span_data(self) -> SpanData:
+        return _SerializedSpanData(self)
+
+    @property
+    def error(self) -> SpanError | None:
+        return self._error
+
+    @property
+    def started_at(self) -> str | None:
+        record = self.export()
+        return record["started_at"] if record else None
+
+    @property
+    def ended_at(self) -> str | None:
+        record = self.export()
+        return record["ended_at"] if record else None
+
+    def start(self, mark_as_current: bool = False):
+        logger.warning("Span already finished")
+
+    def finish(self, reset_current: bool = False) -> None:
+        logger.warning("Span already finished")
+
+    def __enter__(self) -> Span[SpanData]:
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def set_error(self, error: SpanError) -> None:
+        logger.warning("Can't set the error of a span that was already serialized")
+
+    def export(self) -> dict[str, Any] | None:
+        exported: dict[str, Any] = json.loads(self.payload)
+        return exported
+
+
+def serialize_span(
+    span: Span[Any],
+    limits: SpanPayloadLimits | None = None,
+    json_dumps: Callable[[Any], bytes] | None = None,
+) -> SerializedSpan | None:
+    """Serializes a finished span, capping its large fields.
+
+    Args:
+        span: The span to serialize.
+        limits: The caps on span data fields. Defaults to `SpanPayloadLimits()`.
+        json_dumps: Serializes the span to JSON bytes. Defaults to the standard library's `json`.
+
+    Returns:
+        The serialized span, or None if the span isn't recorded.
+    """
+    record = span.export()
+    if not record:
+        return None
+    dumps = json_dumps or _json_dumps
+    span_data = record.get("span_data") or {}
+    truncated_bytes = truncate_span_data(span_data, limits or SpanPayloadLimits(), dumps)
+    return SerializedSpan(
+        trace_id=span.trace_id,
+        span_id=span.span_id,
+        parent_id=span.parent_id,
+        error=span.error,
+        span_type=span_data.get("type", "unknown"),
+        payload=dumps(record),
+        truncated_bytes=truncated_bytes,
+    )
@@ -51,8 +51,13 @@ class TracingProcessor(abc.ABC):
         pass
 
     @abc.abstractmethod
-    def force_flush(self) -> None:
-        """Forces an immediate flush of all queued spans/traces."""
+    def force_flush(self, timeout: float | None = None) -> None:
+        """Forces an immediate flush of all queued spans/traces.
+
+        Args:
+            timeout: The maximum time to wait, in seconds. Waits indefinitely if None. Processors
+                that don't wait for anything can ignore it.
+        """
         pass
 
 
@@ -67,3 +72,12 @@ class TracingExporter(abc.ABC):
             items: The items to export.
         """
         pass
+
+    def flush(self, timeout: float | None = None) -> None:  # noqa: B027
+        """Waits until the items passed to `export` have been exported. Exporters that are done
+        with the items by the time `export` returns don't need to implement this.
+
+        Args:
+            timeout: The maximum time to wait, in seconds. Waits indefinitely if None.
+        """
+        pass
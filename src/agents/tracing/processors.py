@@ -1,15 +1,22 @@
 from __future__ import annotations
 
+import asyncio
+import collections
+import gzip
+import json
 import os
-import queue
 import random
 import threading
 import time
-from typing import Any
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from typing import Any, Literal, cast
 
 import httpx
 
+from ..exceptions import UserError
 from ..logger import logger
+from .payload import SerializedSpan, SpanPayloadLimits, serialize_span
 from .processor_interface import TracingExporter, TracingProcessor
 from .spans import Span
 from .traces import Trace
@@ -26,6 +33,47 @@ class ConsoleSpanExporter(TracingExporter):
                 print(f"[Exporter] Export span: {item.export()}")
 
 
+@dataclass
+class ExportStats:
+    """Statistics for a `BackendSpanExporter`."""
+
+    items: int = 0
+    """The number of traces and spans exported."""
+
+    requests: int = 0
+    """The number of payloads sent, not counting retries."""
+
+    payload_bytes: int = 0
+    """The size of the payloads sent, before compression."""
+
+    sent_bytes: int = 0
+    """The size of the payloads sent, after compression, not counting retries."""
+
+    serialization_time: float = 0.0
+    """Time spent serializing traces and spans, in seconds."""
+
+    compression_time: float = 0.0
+    """Time spent compressing payloads, in seconds."""
+
+    retries: int = 0
+    """The number of times a payload was sent again after a failure."""
+
+    failed_items: int = 0
+    """Traces and spans in payloads that were rejected, or still failed after every retry."""
+
+    dropped_items: int = 0
+    """Traces and spans dropped without being sent, because too many payloads were waiting to
+    be sent."""
+
+
+_PAYLOAD_START = b'{"data":['
+_PAYLOAD_END = b"]}"
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
 class BackendSpanExporter(TracingExporter):
     def __init__(
         self,
@@ -36,6 +84,9 @@ class BackendSpanExporter(TracingExporter):
         max_retries: int = 3,
         base_delay: float = 1.0,
         max_delay: float = 30.0,
+        compression: Literal["gzip", "zstd"] | None = None,
+        max_payload_bytes: int = 4 * 1024 * 1024,
+        json_dumps: Callable[[Any], bytes] | None = None,
     ):
         """
         Args:
@@ -49,6 +100,13 @@ class BackendSpanExporter(TracingExporter):
             max_retries: Maximum number of retries upon failures.
             base_delay: Base delay (in seconds) for the first backoff.
             max_delay: Maximum delay (in seconds) for backoff growth.
+            compression: How to compress payloads, if at all. "zstd" requires the `zstandard`
+                package. Only use this with endpoints that accept compressed request bodies.
+            max_payload_bytes: Batches are split so that each payload stays under this size,
+                before compression. A single trace or span bigger than this is sent on its own.
+            json_dumps: Serializes a trace or span to JSON bytes. Defaults to the standard
+                library's `json`; pass a faster encoder such as `orjson.dumps` to reduce the CPU
+                spent on serialization.
         """
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
         self.organization = organization or os.environ.get("OPENAI_ORG_ID")
@@ -57,10 +115,38 @@ class BackendSpanExporter(TracingExporter):
         self.max_retries = max_retries
         self.base_delay = base_delay
         self.max_delay = max_delay
+        self.compression = compression
+        self.max_payload_bytes = max_payload_bytes
+        self.stats = ExportStats()
+        # Stats are updated from the threads that call `export`, and from the event loop's thread
+        # in `AsyncBackendSpanExporter`.
+        self._stats_lock = threading.Lock()
+        self._json_dumps = json_dumps or _json_dumps
+        self._compress = self._get_compressor(compression)
 
         # Keep a client open for connection pooling across multiple export calls
         self._client = httpx.Client(timeout=httpx.Timeout(timeout=60, connect=5.0))
 
+    @staticmethod
+    def _get_compressor(
+        compression: Literal["gzip", "zstd"] | None,
+    ) -> Callable[[bytes], bytes] | None:
+        if compression is None:
+            return None
+        if compression == "gzip":
+            return lambda data: gzip.compress(data, compresslevel=6)
+        if compression == "zstd":
+            try:
+                import zstandard  # type: ignore[import-not-found]
+            except ImportError as e:
+                raise UserError(
+                    "zstd compression requires the `zstandard` package. Install it with "
+                    "`pip install zstandard`."
+                ) from e
+            compressor = zstandard.ZstdCompressor()
+            return cast(Callable[[bytes], bytes], compressor.compress)
+        raise UserError(f"Unknown trace compression: {compression}")
+
     def set_api_key(self, api_key: str):
         """Set the OpenAI API key for the exporter.
 
@@ -78,59 +164,377 @@ class BackendSpanExporter(TracingExporter):
             logger.warning("OPENAI_API_KEY is not set, skipping trace export")
             return
 
-        data = [item.export() for item in items if item.export()]
-        payload = {"data": data}
+        headers = self._headers()
+        for records in self._serialize(items):
+            self._send(self._encode(records), headers, len(records))
 
+    def _headers(self) -> dict[str, str]:
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
             "OpenAI-Beta": "traces=v1",
         }
-
+        if self.compression:
+            headers["Content-Encoding"] = self.compression
+        return headers
+
+    def _serialize(self, items: list[Trace | Span[Any]]) -> Iterator[list[bytes]]:
+        """Serializes each item once, and groups the results into payloads that stay under
+        `max_payload_bytes`."""
+        # The size of an empty payload, not counting the comma after the last record.
+        empty_size = len(_PAYLOAD_START) + len(_PAYLOAD_END) - 1
+        records: list[bytes] = []
+        size = empty_size
+        for item in items:
+            if isinstance(item, SerializedSpan):
+                record: bytes | None = item.payload
+            else:
+                start = time.perf_counter()
+                exported = item.export()
+                record = self._json_dumps(exported) if exported else None
+                elapsed = time.perf_counter() - start
+                with self._stats_lock:
+                    self.stats.serialization_time += elapsed
+            if record is None:
+                continue
+
+            if records and size + len(record) + 1 > self.max_payload_bytes:
+                yield records
+                records, size = [], empty_size
+            records.append(record)
+            size += len(record) + 1
+
+        if records:
+            yield records
+
+    def _encode(self, records: list[bytes]) -> bytes:
+        body = _PAYLOAD_START + b",".join(records) + _PAYLOAD_END
+        payload_bytes = len(body)
+        compression_time = 0.0
+        if self._compress is not None:
+            start = time.perf_counter()
+            body = self._compress(body)
+            compression_time = time.perf_counter() - start
+        with self._stats_lock:
+            self.stats.payload_bytes += payload_bytes
+            self.stats.compression_time += compression_time
+            self.stats.sent_bytes += len(body)
+            self.stats.requests += 1
+            self.stats.items += len(records)
+        return body
+
+    def _send(self, body: bytes, headers: dict[str, str], item_count: int) -> None:
         # Exponential backoff loop
         attempt = 0
-        delay = self.base_delay
         while True:
             attempt += 1
             try:
-                response = self._client.post(url=self.endpoint, headers=headers, json=payload)
-
-                # If the response is successful, break out of the loop
-                if response.status_code < 300:
-                    logger.debug(f"Exported {len(items)} items")
+                response = self._client.post(url=self.endpoint, headers=headers, content=body)
+                if self._handle_response(response, item_count):
                     return
-
-                # If the response is a client error (4xx), we wont retry
-                if 400 <= response.status_code < 500:
-                    logger.error(f"Tracing client error {response.status_code}: {response.text}")
-                    return
-
-                # For 5xx or other unexpected codes, treat it as transient and retry
-                logger.warning(f"Server error {response.status_code}, retrying.")
             except httpx.RequestError as exc:
                 # Network or other I/O error, we'll retry
                 logger.warning(f"Request failed: {exc}")
 
             # If we reach here, we need to retry or give up
-            if attempt >= self.max_retries:
-                logger.error("Max retries reached, giving up on this batch.")
+            if self._give_up(attempt, item_count):
                 return
-
-            # Exponential backoff + jitter
-            sleep_time = delay + random.uniform(0, 0.1 * delay)  # 10% jitter
-            time.sleep(sleep_time)
-            delay = min(delay * 2, self.max_delay)
+            time.sleep(self._retry_delay(attempt))
+
+    def _handle_response(self, response: httpx.Response, item_count: int) -> bool:
+        """Returns whether the payload is done with: either exported, or rejected."""
+        # If the response is successful, break out of the loop
+        if response.status_code < 300:
+            logger.debug(f"Exported {item_count} items")
+            return True
+
+        # If the response is a client error (4xx), we wont retry
+        if 400 <= response.status_code < 500:
+            logger.error(f"Tracing client error {response.status_code}: {response.text}")
+            with self._stats_lock:
+                self.stats.failed_items += item_count
+            return True
+
+        # For 5xx or other unexpected codes, treat it as transient and retry
+        logger.warning(f"Server error {response.status_code}, retrying.")
+        return False
+
+    def _give_up(self, attempt: int, item_count: int) -> bool:
+        if attempt >= self.max_retries:
+            logger.error("Max retries reached, giving up on this batch.")
+            with self._stats_lock:
+                self.stats.failed_items += item_count
+            return True
+        with self._stats_lock:
+            self.stats.retries += 1
+        return False
+
+    def _retry_delay(self, attempt: int) -> float:
+        # Exponential backoff + jitter
+        delay = min(self.base_delay * 2.0 ** (attempt - 1), self.max_delay)
+        return delay + random.uniform(0, 0.1 * delay)  # 10% jitter
 
     def close(self):
         """Close the underlying HTTP client."""
         self._client.close()
 
 
+class AsyncBackendSpanExporter(BackendSpanExporter):
+    """Exports traces and spans to the backend from an asyncio event loop running on a thread of
+    its own.
+
+    `export` serializes the items, hands the payloads to the loop and returns, so a slow or
+    failing endpoint doesn't hold up the processor that calls it. Up to `max_concurrent_requests`
+    payloads are sent at once, and a payload that is backing off before a retry doesn't hold one
+    of those slots, so retries don't delay new batches.
+
+    When `max_pending_payloads` payloads are already waiting to be sent, `export` blocks for up to
+    `backpressure_timeout` seconds for one of them to be done with, then drops the payload and
+    counts its items in `stats.dropped_items`.
+    """
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        organization: str | None = None,
+        project: str | None = None,
+        endpoint: str = "https://api.openai.com/v1/traces/ingest",
+        max_retries: int = 3,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        compression: Literal["gzip", "zstd"] | None = None,
+        max_payload_bytes: int = 4 * 1024 * 1024,
+        json_dumps: Callable[[Any], bytes] | None = None,
+        max_concurrent_requests: int = 4,
+        max_pending_payloads: int = 64,
+        backpressure_timeout: float = 1.0,
+    ):
+        """
+        Args:
+            api_key: The API key for the "Authorization" header. Defaults to
+                `os.environ["OPENAI_API_KEY"]` if not provided.
+            organization: The OpenAI organization to use. Defaults to
+                `os.environ["OPENAI_ORG_ID"]` if not provided.
+            project: The OpenAI project to use. Defaults to
+                `os.environ["OPENAI_PROJECT_ID"]` if not provided.
+            endpoint: The HTTP endpoint to which traces/spans are posted.
+            max_retries: Maximum number of retries upon failures.
+            base_delay: Base delay (in seconds) for the first backoff.
+            max_delay: Maximum delay (in seconds) for backoff growth.
+            compression: How to compress payloads, if at all. See `BackendSpanExporter`.
+            max_payload_bytes: The maximum size of a payload, before compression.
+            json_dumps: Serializes a trace or span to JSON bytes.
+            max_concurrent_requests: The maximum number of requests in flight at once.
+            max_pending_payloads: The maximum number of payloads waiting to be sent, including
+                the ones in flight and the ones backing off before a retry.
+            backpressure_timeout: How long `export` waits, in seconds, when too many payloads are
+                pending, before dropping a payload.
+        """
+        super().__init__(
+            api_key=api_key,
+            organization=organization,
+            project=project,
+            endpoint=endpoint,
+            max_retries=max_retries,
+            base_delay=base_delay,
+            max_delay=max_delay,
+            compression=compression,
+            max_payload_bytes=max_payload_bytes,
+            json_dumps=json_dumps,
+        )
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_pending_payloads = max_pending_payloads
+        self.backpressure_timeout = backpressure_timeout
+
+        self._pending = 0
+        self._pending_changed = threading.Condition()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread: threading.Thread | None = None
+        # Created on the loop's thread.
+        self._async_client: httpx.AsyncClient | None = None
+        self._request_slots: asyncio.Semaphore | None = None
+
+    def export(self, items: list[Trace | Span[Any]]) -> None:
+        if not items:
+            return
+
+        if not self.api_key:
+            logger.warning("OPENAI_API_KEY is not set, skipping trace export")
+            return
+
+        headers = self._headers()
+        for records in self._serialize(items):
+            if not self._reserve():
+                logger.warning(f"Too many trace payloads pending, dropping {len(records)} items.")
+                with self._stats_lock:
+                    self.stats.dropped_items += len(records)
+                continue
+            body = self._encode(records)
+            asyncio.run_coroutine_threadsafe(
+                self._send_async(body, headers, len(records)), self._get_loop()
+            )
+
+    def flush(self, timeout: float | None = None) -> None:
+        """Waits until every payload handed to the loop has been sent, or given up on."""
+        with self._pending_changed:
+            if not self._pending_changed.wait_for(lambda: self._pending == 0, timeout=timeout):
+                logger.warning(f"Timed out with {self._pending} trace payloads still pending.")
+
+    def close(self, timeout: float | None = 10.0):
+        """Waits for pending payloads for up to `timeout` seconds, then closes the HTTP clients
+        and stops the loop."""
+        self.flush(timeout)
+        loop, thread = self._loop, self._loop_thread
+        if loop is not None and thread is not None:
+            asyncio.run_coroutine_threadsafe(self._close_async_client(), loop).result(timeout=5)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout=5)
+            loop.close()
+            self._loop = self._loop_thread = None
+        super().close()
+
+    def _reserve(self) -> bool:
+        with self._pending_changed:
+            if not self._pending_changed.wait_for(
+                lambda: self._pending < self.max_pending_payloads,
+                timeout=self.backpressure_timeout,
+            ):
+                return False
+            self._pending += 1
+            return True
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._pending_changed:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(
+                    target=self._loop.run_forever, name="trace-exporter", daemon=True
+                )
+                self._loop_thread.start()
+            return self._loop
+
+    async def _send_async(self, body: bytes, headers: dict[str, str], item_count: int) -> None:
+        try:
+            if self._async_client is None:
+                self._async_client = httpx.AsyncClient(
+                    timeout=httpx.Timeout(timeout=60, connect=5.0)
+                )
+                self._request_slots = asyncio.Semaphore(self.max_concurrent_requests)
+            assert self._request_slots is not None
+
+            # Exponential backoff loop
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    async with self._request_slots:
+                        response = await self._async_client.post(
+                            url=self.endpoint, headers=headers, content=body
+                        )
+                    if self._handle_response(response, item_count):
+                        return
+                except httpx.RequestError as exc:
+                    # Network or other I/O error, we'll retry
+                    logger.warning(f"Request failed: {exc}")
+
+                if self._give_up(attempt, item_count):
+                    return
+                await asyncio.sleep(self._retry_delay(attempt))
+        except Exception as e:
+            logger.error(f"Error exporting {item_count} traces and spans: {e}")
+            with self._stats_lock:
+                self.stats.failed_items += item_count
+        finally:
+            with self._pending_changed:
+                self._pending -= 1
+                self._pending_changed.notify_all()
+
+    async def _close_async_client(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+def _remaining(deadline: float | None) -> float | None:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+
+class _ExportQueue:
+    """A bounded FIFO of traces and spans that the export worker drains in bulk. It isn't
+    thread-safe by itself: the processor guards it with its lock."""
+
+    def __init__(self, maxsize: int):
+        self._items: collections.deque[Trace | Span[Any]] = collections.deque()
+        self._maxsize = maxsize
+        # The size of the serialized spans in the queue.
+        self.nbytes = 0
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+    def full(self) -> bool:
+        return len(self._items) >= self._maxsize
+
+    def put(self, item: Trace | Span[Any]) -> int:
+        """Adds an item and returns the new size of the queue, or -1 if the queue is full."""
+        if len(self._items) >= self._maxsize:
+            return -1
+        self._items.append(item)
+        if isinstance(item, SerializedSpan):
+            self.nbytes += len(item.payload)
+        return len(self._items)
+
+    def take(self, max_items: int) -> list[Trace | Span[Any]]:
+        """Removes and returns up to `max_items` items, oldest first."""
+        if len(self._items) <= max_items:
+            items = list(self._items)
+            self._items.clear()
+        else:
+            items = [self._items.popleft() for _ in range(max_items)]
+        if self.nbytes:
+            self.nbytes -= sum(len(i.payload) for i in items if isinstance(i, SerializedSpan))
+        return items
+
+
+@dataclass
+class BatchProcessorStats:
+    """Statistics for a `BatchTraceProcessor`."""
+
+    queued: int
+    """The number of traces and spans waiting to be exported."""
+
+    queued_bytes: int
+    """The size of the serialized spans waiting to be exported. Only spans serialized when they
+    end, i.e. when `payload_limits` is set, are counted."""
+
+    max_queue_size: int
+    """The maximum number of traces and spans that can wait to be exported."""
+
+    dropped: int
+    """The number of traces and spans dropped because the queue was full."""
+
+    serialized_spans: int
+    """The number of spans serialized when they ended."""
+
+    serialized_bytes: int
+    """The total size of the spans serialized when they ended."""
+
+    truncated_bytes: int
+    """The number of bytes removed from span data fields over their cap."""
+
+
 class BatchTraceProcessor(TracingProcessor):
     """Some implementation notes:
-    1. Using Queue, which is thread-safe.
-    2. Using a background thread to export spans, to minimize any performance issues.
-    3. Spans are stored in memory until they are exported.
+    1. Traces and spans are put in a bounded queue guarded by a lock, so adding one is cheap.
+    2. A background thread exports them in batches, to minimize any performance issues. It sleeps
+       on a condition variable until the queue reaches the export trigger size, the scheduled
+       export time comes, or a flush or shutdown is requested. It doesn't poll.
+    3. Spans are stored in memory until they are exported. With `payload_limits` set, they are
+       serialized to compact JSON as they end instead, so the objects in their span data, like
+       model inputs and responses, can be released right away.
     """
 
     def __init__(
@@ -140,6 +544,7 @@ class BatchTraceProcessor(TracingProcessor):
         max_batch_size: int = 128,
         schedule_delay: float = 5.0,
         export_trigger_ratio: float = 0.7,
+        payload_limits: SpanPayloadLimits | None = None,
     ):
         """
         Args:
@@ -147,30 +552,48 @@ class BatchTraceProcessor(TracingProcessor):
             max_queue_size: The maximum number of spans to store in the queue. After this, we will
                 start dropping spans.
             max_batch_size: The maximum number of spans to export in a single batch.
-            schedule_delay: The delay between checks for new spans to export.
+            schedule_delay: The maximum time, in seconds, a span waits in the queue before it is
+                exported.
             export_trigger_ratio: The ratio of the queue size at which we will trigger an export.
+            payload_limits: If set, spans are serialized when they end, with their large span data
+                fields capped to these limits, and the exporter gets `SerializedSpan`s. Only use
+                this with exporters that just call `export()` on the spans they get.
         """
         self._exporter = exporter
-        self._queue: queue.Queue[Trace | Span[Any]] = queue.Queue(maxsize=max_queue_size)
+        self._payload_limits = payload_limits
+        self._queue = _ExportQueue(max_queue_size)
         self._max_queue_size = max_queue_size
         self._max_batch_size = max_batch_size
         self._schedule_delay = schedule_delay
-        self._shutdown_event = threading.Event()
 
         # The queue size threshold at which we export immediately.
-        self._export_trigger_size = int(max_queue_size * export_trigger_ratio)
+        self._export_trigger_size = max(1, int(max_queue_size * export_trigger_ratio))
 
         # Track when we next *must* perform a scheduled export
-        self._next_export_time = time.time() + self._schedule_delay
+        self._next_export_time = time.monotonic() + self._schedule_delay
+
+        self._lock = threading.Lock()
+        # Wakes the worker thread.
+        self._work_ready = threading.Condition(self._lock)
+        # Wakes the threads waiting in `force_flush`.
+        self._export_done = threading.Condition(self._lock)
+        # Items are exported in the order they were queued, so comparing how many were queued with
+        # how many were exported tells whether a given item has been exported.
+        self._queued_count = 0
+        self._exported_count = 0
+        self._flush_requested = False
+        self._shutdown_requested = False
+        self._worker_stopped = False
+        self._dropped = 0
+        self._serialized_spans = 0
+        self._serialized_bytes = 0
+        self._truncated_bytes = 0
 
-        self._shutdown_event = threading.Event()
         self._worker_thread = threading.Thread(target=self._run, daemon=True)
         self._worker_thread.start()
 
     def on_trace_start(self, trace: Trace) -> None:
-        try:
-            self._queue.put_nowait(trace)
-        except queue.Full:
+        if not self._enqueue(trace):
             logger.warning("Queue is full, dropping trace.")
 
     def on_trace_end(self, trace: Trace) -> None:
@@ -182,65 +605,298 @@ class BatchTraceProcessor(TracingProcessor):
         pass
 
     def on_span_end(self, span: Span[Any]) -> None:
-        try:
-            self._queue.put_nowait(span)
-        except queue.Full:
+        if self._payload_limits is not None:
+            try:
+                serialized = serialize_span(span, self._payload_limits)
+            except Exception as e:
+                # Span data that can't be serialized mustn't fail the code that ended the span.
+                # Queue the span itself; the exporter will deal with it.
+                logger.error(f"Error serializing span {span.span_id}: {e}")
+            else:
+                if serialized is None:
+                    return
+                span = serialized
+        if not self._enqueue(span):
             logger.warning("Queue is full, dropping span.")
 
+    def _enqueue(self, item: Trace | Span[Any]) -> bool:
+        with self._lock:
+            size = self._queue.put(item)
+            if size < 0:
+                self._dropped += 1
+                return False
+            self._queued_count += 1
+            if isinstance(item, SerializedSpan):
+                self._serialized_spans += 1
+                self._serialized_bytes += len(item.payload)
+                self._truncated_bytes += item.truncated_bytes
+            # Only the item that crosses the threshold wakes the worker.
+            if size == self._export_trigger_size:
+                self._work_ready.notify()
+            return True
+
+    def stats(self) -> BatchProcessorStats:
+        """Returns a snapshot of the processor's queue and memory use."""
+        with self._lock:
+            return BatchProcessorStats(
+                queued=self._queue.qsize(),
+                queued_bytes=self._queue.nbytes,
+                max_queue_size=self._max_queue_size,
+                dropped=self._dropped,
+                serialized_spans=self._serialized_spans,
+                serialized_bytes=self._serialized_bytes,
+                truncated_bytes=self._truncated_bytes,
+            )
+
     def shutdown(self, timeout: float | None = None):
         """
-        Called when the application stops. We signal our thread to stop, then join it.
+        Called when the application stops. We signal our thread to stop, then join it. The thread
+        exports everything still queued before it exits.
         """
-        self._shutdown_event.set()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._shutdown_requested = True
+            self._work_ready.notify()
         self._worker_thread.join(timeout=timeout)
+        self._exporter.flush(_remaining(deadline))
 
-    def force_flush(self):
-        """
-        Forces an immediate flush of all queued spans.
+    def force_flush(self, timeout: float | None = None) -> None:
         """
-        self._export_batches(force=True)
+        Exports everything queued so far and waits until it has been exported, including batches
+        the worker thread was already exporting.
 
-    def _run(self):
-        while not self._shutdown_event.is_set():
-            current_time = time.time()
-            queue_size = self._queue.qsize()
-
-            # If it's time for a scheduled flush or queue is above the trigger threshold
-            if current_time >= self._next_export_time or queue_size >= self._export_trigger_size:
-                self._export_batches(force=False)
-                # Reset the next scheduled flush time
-                self._next_export_time = time.time() + self._schedule_delay
-            else:
-                # Sleep a short interval so we don't busy-wait.
-                time.sleep(0.2)
+        Args:
+            timeout: The maximum time to wait, in seconds. Waits indefinitely if None.
+        """
+        if self._worker_stopped or threading.current_thread() is self._worker_thread:
+            # Nobody else is going to export, so do it here.
+            self._export_batches()
+            self._exporter.flush(timeout)
+            return
 
-        # Final drain after shutdown
-        self._export_batches(force=True)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            target = self._queued_count
+            self._flush_requested = True
+            self._work_ready.notify()
+            flushed = self._export_done.wait_for(
+                lambda: self._exported_count >= target or self._worker_stopped,
+                timeout=timeout,
+            )
+        if not flushed:
+            logger.warning(f"Timed out after {timeout}s waiting for traces to be exported.")
+            return
+        self._exporter.flush(_remaining(deadline))
 
-    def _export_batches(self, force: bool = False):
-        """Drains the queue and exports in batches. If force=True, export everything.
-        Otherwise, export up to `max_batch_size` repeatedly until the queue is empty or below a
-        certain threshold.
-        """
+    def _run(self):
         while True:
-            items_to_export: list[Span[Any] | Trace] = []
+            with self._lock:
+                while not (
+                    self._shutdown_requested
+                    or self._flush_requested
+                    or self._queue.qsize() >= self._export_trigger_size
+                ):
+                    remaining = self._next_export_time - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._work_ready.wait(remaining)
+                self._flush_requested = False
+                shutting_down = self._shutdown_requested
+
+            self._export_batches()
+            # Reset the next scheduled flush time
+            self._next_export_time = time.monotonic() + self._schedule_delay
+
+            if shutting_down:
+                break
 
-            # Gather a batch of spans up to max_batch_size
-            while not self._queue.empty() and (
-                force or len(items_to_export) < self._max_batch_size
-            ):
-                try:
-                    items_to_export.append(self._queue.get_nowait())
-                except queue.Empty:
-                    # Another thread might have emptied the queue between checks
-                    break
+        # Release any `force_flush` callers whose items were queued after the final drain.
+        with self._lock:
+            self._worker_stopped = True
+            self._export_done.notify_all()
 
+    def _export_batches(self) -> None:
+        """Drains the queue and exports it in batches of up to `max_batch_size` items. The lock is
+        only held while taking a batch from the queue, not while exporting it."""
+        while True:
+            with self._lock:
+                items_to_export = self._queue.take(self._max_batch_size)
             # If we collected nothing, we're done
             if not items_to_export:
                 break
 
-            # Export the batch
-            self._exporter.export(items_to_export)
+            try:
+                self._exporter.export(items_to_export)
+            except Exception as e:
+                logger.error(f"Error exporting {len(items_to_export)} traces and spans: {e}")
+            finally:
+                with self._lock:
+                    self._exported_count += len(items_to_export)
+                    self._export_done.notify_all()
+
+
+@dataclass
+class ProcessorQueueStats:
+    """Statistics for a `QueuedTracingProcessor`."""
+
+    queued: int
+    """The number of events currently waiting to be handled."""
+
+    max_queue_size: int
+    """The maximum number of events that can wait to be handled."""
+
+    processed: int
+    """The number of events the processor has handled so far."""
+
+    dropped: int
+    """The number of events dropped because the queue was full."""
+
+    lag: float
+    """How long, in seconds, the oldest waiting event has been waiting. 0 if nothing is waiting."""
+
+    max_lag: float
+    """The longest time, in seconds, an event has waited before being handled."""
+
+
+class QueuedTracingProcessor(TracingProcessor):
+    """Runs a processor on a thread of its own, so that a slow processor doesn't slow down the
+    agent runs it traces or the other processors.
+
+    Trace and span events are put in a bounded queue, which is an O(1) operation, and a worker
+    thread hands them to the wrapped processor in order. When the queue is full, events are
+    dropped according to `drop_policy`. Note that the processor handles events after the fact,
+    so by the time it handles a span start event, the span may already have ended.
+    """
+
+    def __init__(
+        self,
+        processor: TracingProcessor,
+        max_queue_size: int = 2048,
+        drop_policy: Literal["drop_newest", "drop_oldest"] = "drop_newest",
+    ):
+        """
+        Args:
+            processor: The processor to run on the worker thread.
+            max_queue_size: The maximum number of events waiting to be handled.
+            drop_policy: What to drop when the queue is full: the incoming event
+                ("drop_newest"), or the event that has been waiting the longest ("drop_oldest").
+        """
+        self.processor = processor
+        self._max_queue_size = max_queue_size
+        self._drop_oldest = drop_policy == "drop_oldest"
+        self._events: collections.deque[tuple[Callable[[Any], None], Any, float]] = (
+            collections.deque()
+        )
+        self._lock = threading.Lock()
+        self._work_ready = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._queued_count = 0
+        # Events leave the queue in order, so comparing how many were queued with how many left
+        # the queue tells whether a given event has been handled.
+        self._handled_count = 0
+        self._processed_count = 0
+        self._dropped_count = 0
+        self._max_lag = 0.0
+        self._dropping = False
+        self._shutdown_requested = False
+        self._worker_stopped = False
+
+        self._worker_thread = threading.Thread(target=self._run, daemon=True)
+        self._worker_thread.start()
+
+    def on_trace_start(self, trace: Trace) -> None:
+        self._enqueue(self.processor.on_trace_start, trace)
+
+    def on_trace_end(self, trace: Trace) -> None:
+        self._enqueue(self.processor.on_trace_end, trace)
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        self._enqueue(self.processor.on_span_start, span)
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        self._enqueue(self.processor.on_span_end, span)
+
+    def _enqueue(self, handler: Callable[[Any], None], item: Trace | Span[Any]) -> None:
+        with self._lock:
+            full = len(self._events) >= self._max_queue_size
+            if full:
+                self._dropped_count += 1
+                warn = not self._dropping
+                self._dropping = True
+                if self._drop_oldest:
+                    self._events.popleft()
+                    self._handled_count += 1
+            if not full or self._drop_oldest:
+                self._events.append((handler, item, time.monotonic()))
+                self._queued_count += 1
+                if len(self._events) == 1:
+                    self._work_ready.notify()
+
+        if full and warn:
+            logger.warning(f"Queue for {self.processor} is full, dropping events.")
+
+    def stats(self) -> ProcessorQueueStats:
+        with self._lock:
+            oldest = self._events[0][2] if self._events else None
+            return ProcessorQueueStats(
+                queued=len(self._events),
+                max_queue_size=self._max_queue_size,
+                processed=self._processed_count,
+                dropped=self._dropped_count,
+                lag=time.monotonic() - oldest if oldest is not None else 0.0,
+                max_lag=self._max_lag,
+            )
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """Handles the events still queued, then shuts down the wrapped processor."""
+        with self._lock:
+            self._shutdown_requested = True
+            self._work_ready.notify()
+        self._worker_thread.join(timeout=timeout)
+        self.processor.shutdown()
+
+    def force_flush(self, timeout: float | None = None) -> None:
+        """Waits until the events queued so far have been handled, then flushes the wrapped
+        processor.
+
+        Args:
+            timeout: The maximum time to wait, in seconds. Waits indefinitely if None.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            target = self._queued_count
+            handled = self._idle.wait_for(
+                lambda: self._handled_count >= target or self._worker_stopped, timeout=timeout
+            )
+        if not handled:
+            logger.warning(f"Timed out after {timeout}s waiting for trace events to be handled.")
+            return
+        self.processor.force_flush(timeout=_remaining(deadline))
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._events and not self._shutdown_requested:
+                    self._work_ready.wait()
+                if not self._events:
+                    # Shutting down, and everything has been handled.
+                    self._worker_stopped = True
+                    self._idle.notify_all()
+                    return
+                handler, item, enqueued_at = self._events.popleft()
+                if not self._events:
+                    self._dropping = False
+                self._max_lag = max(self._max_lag, time.monotonic() - enqueued_at)
+
+            try:
+                handler(item)
+            except Exception as e:
+                logger.error(f"Error in trace processor {self.processor}: {e}")
+
+            with self._lock:
+                self._handled_count += 1
+                self._processed_count += 1
+                self._idle.notify_all()
 
 
 # Create a shared global instance:
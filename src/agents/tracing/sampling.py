@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+import abc
+import collections
+import hashlib
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any
+
+from ..exceptions import UserError
+from ..logger import logger
+from .processor_interface import TracingProcessor
+from .span_data import GuardrailSpanData
+from .spans import Span
+from .traces import Trace
+
+
+class Sampler(abc.ABC):
+    """Decides, when a trace is created, whether it is recorded. Traces that aren't sampled are
+    no-ops, as are all their spans, so they cost next to nothing."""
+
+    @abc.abstractmethod
+    def should_sample(
+        self, name: str, trace_id: str, group_id: str | None, metadata: dict[str, Any] | None
+    ) -> bool:
+        """Returns whether to record the trace.
+
+        Args:
+            name: The name of the workflow being traced.
+            trace_id: The ID of the trace.
+            group_id: The group ID of the trace, if any.
+            metadata: The metadata of the trace, if any.
+        """
+        pass
+
+
+class RatioSampler(Sampler):
+    """Records a fixed share of traces. The decision is derived from the trace ID, so it is the
+    same wherever it is made for a given trace."""
+
+    def __init__(self, ratio: float, salt: str | None = None):
+        """
+        Args:
+            ratio: The share of traces to record, between 0 and 1.
+            salt: Mixed into the hash of the trace ID. Samplers with different salts make
+                independent decisions for the same trace, e.g. a share of traces kept after they
+                were already sampled by another sampler. None to use the unsalted hash.
+        """
+        if not 0 <= ratio <= 1:
+            raise UserError(f"The sampling ratio must be between 0 and 1, got {ratio}")
+        self.ratio = ratio
+        self.salt = salt
+        self._threshold = int(ratio * 2**32)
+
+    def should_sample(
+        self, name: str, trace_id: str, group_id: str | None, metadata: dict[str, Any] | None
+    ) -> bool:
+        return _trace_id_hash(trace_id, self.salt) < self._threshold
+
+
+def _trace_id_hash(trace_id: str, salt: str | None = None) -> int:
+    if salt is None:
+        return zlib.crc32(trace_id.encode())
+    # Not crc32: the CRCs of the salted and unsalted IDs only differ by a constant, so their
+    # decisions would be correlated.
+    digest = hashlib.blake2b(trace_id.encode(), digest_size=4, key=salt.encode()).digest()
+    return int.from_bytes(digest, "big")
+
+
+_TAIL_SAMPLING_SALT = "tail"
+
+
+@dataclass
+class TailSamplingStats:
+    """Statistics for a `TailSamplingProcessor`."""
+
+    kept: int = 0
+    """The number of traces forwarded to the wrapped processor."""
+
+    discarded: int = 0
+    """The number of traces that finished without being interesting, and weren't sampled."""
+
+    evicted: int = 0
+    """The number of traces discarded before they finished, to stay under the buffer cap."""
+
+    buffered_spans: int = 0
+    """The number of spans currently buffered."""
+
+
+@dataclass
+class _BufferedTrace:
+    trace: Trace
+    started_at: float = field(default_factory=time.monotonic)
+    # The processor methods to call, in order, if the trace is kept.
+    events: list[tuple[str, Any]] = field(default_factory=list)
+    # The spans buffered so far. A span has a start and an end event, but counts once.
+    span_ids: set[str] = field(default_factory=set)
+    interesting: bool = False
+
+
+class TailSamplingProcessor(TracingProcessor):
+    """Holds on to each trace's spans until the trace ends, and only then decides whether to pass
+    the trace on to the wrapped processor.
+
+    Traces are kept when a span recorded an error, a guardrail was triggered, or the trace took
+    longer than `slow_threshold` seconds. A `sample_ratio` share of the other traces is kept too,
+    as a baseline.
+
+    Buffered spans are capped at `max_buffered_spans` in total. Past that, the traces that have
+    been buffered the longest are discarded, and counted in `stats.evicted`.
+    """
+
+    def __init__(
+        self,
+        processor: TracingProcessor,
+        slow_threshold: float | None = 30.0,
+        sample_ratio: float = 0.0,
+        max_buffered_spans: int = 10_000,
+    ):
+        """
+        Args:
+            processor: The processor to pass kept traces on to.
+            slow_threshold: Traces taking longer than this, in seconds, are kept. None to not keep
+                traces for being slow.
+            sample_ratio: The share of the other traces to keep anyway. This is independent of
+                head sampling: with a head `RatioSampler` of 0.1 and a `sample_ratio` of 0.1, 1% of
+                the uninteresting traces are kept.
+            max_buffered_spans: The maximum number of spans held in memory across all traces.
+        """
+        self.processor = processor
+        self.slow_threshold = slow_threshold
+        self.max_buffered_spans = max_buffered_spans
+        self.stats = TailSamplingStats()
+        # Salted, so that the baseline is independent of a head `RatioSampler` that already
+        # decided which traces are recorded at all.
+        self._baseline = RatioSampler(sample_ratio, salt=_TAIL_SAMPLING_SALT)
+        self._traces: collections.OrderedDict[str, _BufferedTrace] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def on_trace_start(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.trace_id] = _BufferedTrace(trace)
+
+    def on_span_start(self, span: Span[Any]) -> None:
+        self._buffer(span.trace_id, "on_span_start", span)
+
+    def on_span_end(self, span: Span[Any]) -> None:
+        interesting = span.error is not None or (
+            isinstance(span.span_data, GuardrailSpanData) and span.span_data.triggered
+        )
+        self._buffer(span.trace_id, "on_span_end", span, interesting)
+
+    def on_trace_end(self, trace: Trace) -> None:
+        with self._lock:
+            buffered = self._traces.pop(trace.trace_id, None)
+            if buffered is None:
+                return
+            self.stats.buffered_spans -= len(buffered.span_ids)
+            duration = time.monotonic() - buffered.started_at
+            keep = (
+                buffered.interesting
+                or (self.slow_threshold is not None and duration > self.slow_threshold)
+                or self._baseline.should_sample(trace.name, trace.trace_id, None, None)
+            )
+            if keep:
+                self.stats.kept += 1
+            else:
+                self.stats.discarded += 1
+
+        if keep:
+            self.processor.on_trace_start(trace)
+            for method, item in buffered.events:
+                getattr(self.processor, method)(item)
+            self.processor.on_trace_end(trace)
+
+    def _buffer(self, trace_id: str, method: str, span: Span[Any], interesting: bool = False):
+        with self._lock:
+            buffered = self._traces.get(trace_id)
+            if buffered is None:
+                # The trace was evicted, or started before this processor was registered.
+                return
+            buffered.events.append((method, span))
+            buffered.interesting = buffered.interesting or interesting
+            if span.span_id not in buffered.span_ids:
+                buffered.span_ids.add(span.span_id)
+                self.stats.buffered_spans += 1
+
+            evicted = 0
+            while self.stats.buffered_spans > self.max_buffered_spans and self._traces:
+                _, oldest = self._traces.popitem(last=False)
+                self.stats.buffered_spans -= len(oldest.span_ids)
+                self.stats.evicted += 1
+                evicted += 1
+
+        if evicted:
+            logger.warning(f"Tail sampling buffer is full, discarded {evicted} traces.")
+
+    def shutdown(self) -> None:
+        self.processor.shutdown()
+
+    def force_flush(self, timeout: float | None = None) -> None:
+        # Traces still in progress can't be decided on yet, so they stay buffered.
+        self.processor.force_flush(timeout=timeout)
@@ -2,11 +2,13 @@ from __future__ import annotations
 
 import os
 import threading
+import time
 from typing import Any
 
 from ..logger import logger
 from . import util
 from .processor_interface import TracingProcessor
+from .sampling import Sampler
 from .scope import Scope
 from .spans import NoOpSpan, Span, SpanImpl, TSpanData
 from .traces import NoOpTrace, Trace, TraceImpl
@@ -72,12 +74,18 @@ class SynchronousMultiTracingProcessor(TracingProcessor):
             logger.debug(f"Shutting down trace processor {processor}")
             processor.shutdown()
 
-    def force_flush(self):
+    def force_flush(self, timeout: float | None = None):
         """
         Force the processors to flush their buffers.
+
+        Args:
+            timeout: The maximum time to wait for all the processors, in seconds. Waits
+                indefinitely if None.
         """
+        deadline = None if timeout is None else time.monotonic() + timeout
         for processor in self._processors:
-            processor.force_flush()
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            processor.force_flush(timeout=remaining)
 
 
 class TraceProvider:
@@ -87,6 +95,7 @@ class TraceProvider:
             "true",
             "1",
         )
+        self._sampler: Sampler | None = None
 
     def register_processor(self, processor: TracingProcessor):
         """
@@ -118,6 +127,25 @@ class TraceProvider:
         """
         self._disabled = disabled
 
+    def set_sampler(self, sampler: Sampler | None) -> None:
+        """
+        Set the sampler that decides which traces are recorded. None to record every trace.
+        """
+        self._sampler = sampler
+
+    def spans_disabled(self, parent: Trace | Span[Any] | None = None) -> bool:
+        """
+        Returns whether spans created now, under `parent` or else under the current span, are
+        known to be no-ops. Callers can use this to skip building span data.
+        """
+        if self._disabled:
+            return True
+        if parent is None:
+            return isinstance(Scope.get_current_trace(), NoOpTrace) or isinstance(
+                Scope.get_current_span(), NoOpSpan
+            )
+        return isinstance(parent, (NoOpTrace, NoOpSpan))
+
     def create_trace(
         self,
         name: str,
@@ -135,6 +163,12 @@ class TraceProvider:
 
         trace_id = trace_id or util.gen_trace_id()
 
+        if self._sampler is not None and not self._sampler.should_sample(
+            name, trace_id, group_id, metadata
+        ):
+            logger.debug(f"Trace {name} with id {trace_id} is not sampled")
+            return NoOpTrace()
+
         logger.debug(f"Creating trace {name} with id {trace_id}")
 
         return TraceImpl(
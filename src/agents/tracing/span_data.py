@@ -19,6 +19,35 @@ class SpanData(abc.ABC):
         pass
 
 
+class NoOpSpanData(SpanData):
+    """Stands in for the data of spans that aren't recorded, so that no span data is built for
+    them. Writes are ignored. Reads return None, except for the fields that callers add to, which
+    return a new empty container every time."""
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+    def __getattr__(self, name: str) -> Any:
+        return None
+
+    @property
+    def retries(self) -> list[dict[str, Any]]:
+        return []
+
+    @property
+    def data(self) -> dict[str, Any]:
+        return {}
+
+    @property
+    def type(self) -> str:
+        return "no-op"
+
+    def export(self) -> dict[str, Any]:
+        return {}
+
+
 class AgentSpanData(SpanData):
     __slots__ = ("name", "handoffs", "tools", "output_type")
 
@@ -76,6 +105,8 @@ class GenerationSpanData(SpanData):
         "model",
         "model_config",
         "usage",
+        "retries",
+        "time_to_first_token_ns",
     )
 
     def __init__(
@@ -91,13 +122,16 @@ class GenerationSpanData(SpanData):
         self.model = model
         self.model_config = model_config
         self.usage = usage
+        self.retries: list[dict[str, Any]] = []
+        # For streamed generations: how long after the span started the first token arrived.
+        self.time_to_first_token_ns: int | None = None
 
     @property
     def type(self) -> str:
         return "generation"
 
     def export(self) -> dict[str, Any]:
-        return {
+        exported: dict[str, Any] = {
             "type": self.type,
             "input": self.input,
             "output": self.output,
@@ -105,10 +139,15 @@ class GenerationSpanData(SpanData):
             "model_config": self.model_config,
             "usage": self.usage,
         }
+        if self.retries:
+            exported["retries"] = self.retries
+        if self.time_to_first_token_ns is not None:
+            exported["time_to_first_token_ns"] = self.time_to_first_token_ns
+        return exported
 
 
 class ResponseSpanData(SpanData):
-    __slots__ = ("response", "input")
+    __slots__ = ("response", "input", "retries", "time_to_first_token_ns")
 
     def __init__(
         self,
@@ -119,16 +158,24 @@ class ResponseSpanData(SpanData):
         # This is not used by the OpenAI trace processors, but is useful for other tracing
         # processor implementations
         self.input = input
+        self.retries: list[dict[str, Any]] = []
+        # For streamed responses: how long after the span started the first token arrived.
+        self.time_to_first_token_ns: int | None = None
 
     @property
     def type(self) -> str:
         return "response"
 
     def export(self) -> dict[str, Any]:
-        return {
+        exported: dict[str, Any] = {
             "type": self.type,
             "response_id": self.response.id if self.response else None,
         }
+        if self.retries:
+            exported["retries"] = self.retries
+        if self.time_to_first_token_ns is not None:
+            exported["time_to_first_token_ns"] = self.time_to_first_token_ns
+        return exported
 
 
 class HandoffSpanData(SpanData):
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import abc
 import contextvars
+import time
 from typing import Any, Generic, TypeVar
 
 from typing_extensions import TypedDict
@@ -10,7 +11,7 @@ from ..logger import logger
 from . import util
 from .processor_interface import TracingProcessor
 from .scope import Scope
-from .span_data import SpanData
+from .span_data import NoOpSpanData, SpanData
 
 TSpanData = TypeVar("TSpanData", bound=SpanData)
 
@@ -92,6 +93,12 @@ class Span(abc.ABC, Generic[TSpanData]):
     def ended_at(self) -> str | None:
         pass
 
+    @property
+    def duration_ns(self) -> int | None:
+        """How long the span lasted, in nanoseconds, measured with a monotonic clock. None if the
+        span hasn't finished, or isn't recorded."""
+        return None
+
 
 class NoOpSpan(Span[TSpanData]):
     __slots__ = ("_span_data", "_prev_span_token")
@@ -156,13 +163,34 @@ class NoOpSpan(Span[TSpanData]):
         return None
 
 
+class DisabledSpan(NoOpSpan[Any]):
+    """The span handed out when tracing is known to be off in the current context. A single
+    instance is shared: it holds no data, and it doesn't become the current span, since the spans
+    nested in it are no-ops anyway."""
+
+    __slots__ = ()
+
+    def __init__(self) -> None:
+        super().__init__(NoOpSpanData())
+
+    def start(self, mark_as_current: bool = False):
+        pass
+
+    def finish(self, reset_current: bool = False) -> None:
+        pass
+
+
+DISABLED_SPAN = DisabledSpan()
+
+
 class SpanImpl(Span[TSpanData]):
     __slots__ = (
         "_trace_id",
         "_span_id",
         "_parent_id",
-        "_started_at",
-        "_ended_at",
+        "_started_at_ns",
+        "_start_ns",
+        "_end_ns",
         "_error",
         "_prev_span_token",
         "_processor",
@@ -180,8 +208,11 @@ class SpanImpl(Span[TSpanData]):
         self._trace_id = trace_id
         self._span_id = span_id or util.gen_span_id()
         self._parent_id = parent_id
-        self._started_at: str | None = None
-        self._ended_at: str | None = None
+        # The wall clock time the span started at, and monotonic clock readings for its start and
+        # end. They are only formatted when the span is exported.
+        self._started_at_ns: int | None = None
+        self._start_ns: int | None = None
+        self._end_ns: int | None = None
         self._processor = processor
         self._error: SpanError | None = None
         self._prev_span_token: contextvars.Token[Span[TSpanData] | None] | None = None
@@ -204,21 +235,22 @@ class SpanImpl(Span[TSpanData]):
         return self._parent_id
 
     def start(self, mark_as_current: bool = False):
-        if self.started_at is not None:
+        if self._start_ns is not None:
             logger.warning("Span already started")
             return
 
-        self._started_at = util.time_iso()
+        self._started_at_ns = time.time_ns()
+        self._start_ns = time.perf_counter_ns()
         self._processor.on_span_start(self)
         if mark_as_current:
             self._prev_span_token = Scope.set_current_span(self)
 
     def finish(self, reset_current: bool = False) -> None:
-        if self.ended_at is not None:
+        if self._end_ns is not None:
             logger.warning("Span already finished")
             return
 
-        self._ended_at = util.time_iso()
+        self._end_ns = time.perf_counter_ns()
         self._processor.on_span_end(self)
         if reset_current and self._prev_span_token is not None:
             Scope.reset_current_span(self._prev_span_token)
@@ -245,11 +277,24 @@ class SpanImpl(Span[TSpanData]):
 
     @property
     def started_at(self) -> str | None:
-        return self._started_at
+        if self._started_at_ns is None:
+            return None
+        return util.ns_to_iso(self._started_at_ns)
 
     @property
     def ended_at(self) -> str | None:
-        return self._ended_at
+        duration_ns = self.duration_ns
+        if self._started_at_ns is None or duration_ns is None:
+            return None
+        # Derived from the monotonic duration, so that it is consistent with it even if the wall
+        # clock was adjusted while the span was running.
+        return util.ns_to_iso(self._started_at_ns + duration_ns)
+
+    @property
+    def duration_ns(self) -> int | None:
+        if self._start_ns is None or self._end_ns is None:
+            return None
+        return self._end_ns - self._start_ns
 
     def export(self) -> dict[str, Any] | None:
         return {
@@ -257,8 +302,8 @@ class SpanImpl(Span[TSpanData]):
             "id": self.span_id,
             "trace_id": self.trace_id,
             "parent_id": self._parent_id,
-            "started_at": self._started_at,
-            "ended_at": self._ended_at,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
             "span_data": self.span_data.export(),
             "error": self._error,
         }
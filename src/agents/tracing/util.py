@@ -7,6 +7,12 @@ def time_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def ns_to_iso(timestamp_ns: int) -> str:
+    """Converts a `time.time_ns()` timestamp to ISO 8601 format."""
+    seconds, ns = divmod(timestamp_ns, 1_000_000_000)
+    return datetime.fromtimestamp(seconds, timezone.utc).replace(microsecond=ns // 1000).isoformat()
+
+
 def gen_trace_id() -> str:
     """Generates a new trace ID."""
     return f"trace_{uuid.uuid4().hex}"
@@ -1,4 +1,19 @@
+from __future__ import annotations
+
 from dataclasses import dataclass
+from typing import Any
+
+from openai.types import CompletionUsage
+from openai.types.responses import ResponseUsage
+
+
+def _details_field(details: Any, name: str) -> int:
+    # Token details may be typed models, or plain dicts for fields that the installed `openai`
+    # package doesn't know about yet.
+    if details is None:
+        return 0
+    value = details.get(name) if isinstance(details, dict) else getattr(details, name, None)
+    return value if isinstance(value, int) else 0
 
 
 @dataclass
@@ -15,8 +30,61 @@ class Usage:
     total_tokens: int = 0
     """Total tokens sent and received, across all requests."""
 
-    def add(self, other: "Usage") -> None:
+    input_bytes: int = 0
+    """Total bytes of input items sent, across all requests. Only tracked for runs that set
+    `RunConfig.use_previous_response_id`, where it shows how much chaining saves."""
+
+    cached_input_tokens: int = 0
+    """Total input tokens that were served from the provider's prompt cache, across all
+    requests. These are included in `input_tokens`."""
+
+    reasoning_tokens: int = 0
+    """Total reasoning tokens generated, across all requests. These are included in
+    `output_tokens`."""
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        """The fraction of input tokens that were served from the prompt cache."""
+        return self.cached_input_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def add(self, other: Usage) -> None:
         self.requests += other.requests if other.requests else 0
         self.input_tokens += other.input_tokens if other.input_tokens else 0
         self.output_tokens += other.output_tokens if other.output_tokens else 0
         self.total_tokens += other.total_tokens if other.total_tokens else 0
+        self.input_bytes += other.input_bytes if other.input_bytes else 0
+        self.cached_input_tokens += other.cached_input_tokens if other.cached_input_tokens else 0
+        self.reasoning_tokens += other.reasoning_tokens if other.reasoning_tokens else 0
+
+    @classmethod
+    def from_response_usage(cls, usage: ResponseUsage | None) -> Usage:
+        """Creates the usage of a single request from the usage reported by the Responses API."""
+        if usage is None:
+            return cls()
+        return cls(
+            requests=1,
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            total_tokens=usage.total_tokens,
+            cached_input_tokens=_details_field(
+                getattr(usage, "input_tokens_details", None), "cached_tokens"
+            ),
+            reasoning_tokens=_details_field(
+                getattr(usage, "output_tokens_details", None), "reasoning_tokens"
+            ),
+        )
+
+    @classmethod
+    def from_completion_usage(cls, usage: CompletionUsage | None) -> Usage:
+        """Creates the usage of a single request from the usage reported by the Chat Completions
+        API."""
+        if usage is None:
+            return cls()
+        return cls(
+            requests=1,
+            input_tokens=usage.prompt_tokens,
+            output_tokens=usage.completion_tokens,
+            total_tokens=usage.total_tokens,
+            cached_input_tokens=_details_field(usage.prompt_tokens_details, "cached_tokens"),
+            reasoning_tokens=_details_field(usage.completion_tokens_details, "reasoning_tokens"),
+        )
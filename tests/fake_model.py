@@ -52,6 +52,7 @@ class FakeModel(Model):
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
         tracing: ModelTracing,
+        previous_response_id: str | None = None,
     ) -> ModelResponse:
         with generation_span(disabled=not self.tracing_enabled) as span:
             output = self.get_next_output()
@@ -83,6 +84,7 @@ class FakeModel(Model):
         output_schema: AgentOutputSchema | None,
         handoffs: list[Handoff],
         tracing: ModelTracing,
+        previous_response_id: str | None = None,
     ) -> AsyncIterator[TResponseStreamEvent]:
         with generation_span(disabled=not self.tracing_enabled) as span:
             output = self.get_next_output()
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from openai import RateLimitError
+
+from agents import Agent, ModelSettings, ModelTracing, RunConfig, Runner
+from agents._run_scope import run_scope
+from agents.items import TResponseStreamEvent
+from agents.models.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    AdaptiveConcurrencyPolicy,
+    AdaptiveConcurrencyProvider,
+)
+from agents.models.interface import Model, ModelProvider
+from agents.models.scheduler import ScheduledModel
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+
+
+def _rate_limit_error() -> RateLimitError:
+    request = httpx.Request("POST", "http://api.test/v1/responses")
+    return RateLimitError("Slow down", response=httpx.Response(429, request=request), body=None)
+
+
+class _SlowModel(FakeModel):
+    """A fake model that takes `delay` seconds to respond and tracks its calls in flight."""
+
+    def __init__(self, delay: float = 0.0):
+        super().__init__()
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def get_response(self, *args, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            return await super().get_response(*args, **kwargs)
+        finally:
+            self.in_flight -= 1
+
+
+async def _get(model: Model):
+    return await model.get_response(
+        None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_additively_and_halves_on_rate_limits():
+    policy = AdaptiveConcurrencyPolicy(initial_limit=2, decrease_cooldown=0)
+    wrapped = FakeModel()
+    wrapped.add_multiple_turn_outputs([[get_text_message("ok")]] * 4 + [_rate_limit_error()])
+    model = ScheduledModel(wrapped, AdaptiveConcurrencyLimiter(policy))
+
+    for _ in range(4):
+        await _get(model)
+    # Each success adds 1 / limit, so the limit grows by about one per limit's worth of calls.
+    assert model.scheduler.limit == 3
+
+    with pytest.raises(RateLimitError):
+        await _get(model)
+    stats = model.scheduler.stats()
+    assert stats.limit == 1
+    assert stats.decreases == 1
+    assert stats.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_latency_spikes_decrease_the_limit():
+    limiter = AdaptiveConcurrencyLimiter(
+        AdaptiveConcurrencyPolicy(initial_limit=8, latency_spike_ratio=3.0, decrease_cooldown=0)
+    )
+    for _ in range(10):
+        await limiter.acquire()
+        limiter.release(latency=0.01)
+    assert limiter.stats().latency_baseline == pytest.approx(0.01)
+    limit = limiter.limit
+
+    await limiter.acquire()
+    limiter.release(latency=0.5)
+    assert limiter.limit == limit // 2
+    # The spike is kept out of the baseline.
+    assert limiter.stats().latency_baseline == pytest.approx(0.01)
+
+
+@pytest.mark.asyncio
+async def test_waiting_room_serves_higher_priorities_first_and_runs_in_turn():
+    limiter = AdaptiveConcurrencyLimiter(AdaptiveConcurrencyPolicy(initial_limit=1, max_limit=1))
+    order: list[str] = []
+
+    async def call(name: str) -> None:
+        await limiter.acquire()
+        order.append(name)
+        limiter.release(latency=0.0)
+
+    await limiter.acquire()
+    tasks = []
+    # A busy run queues three calls before a second run and a high-priority run queue theirs.
+    with run_scope():
+        tasks += [asyncio.create_task(call(f"busy-{i}")) for i in range(3)]
+    with run_scope():
+        tasks.append(asyncio.create_task(call("other")))
+    with run_scope(priority=1):
+        tasks.append(asyncio.create_task(call("urgent")))
+    await asyncio.sleep(0)
+    assert limiter.queue_length == 5
+
+    limiter.release(latency=0.0)
+    await asyncio.gather(*tasks)
+
+    assert order == ["urgent", "busy-0", "other", "busy-1", "busy-2"]
+    stats = limiter.stats()
+    assert stats.queued_calls == 5
+    assert stats.max_wait > 0
+    assert stats.average_wait > 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_give_up_their_place():
+    limiter = AdaptiveConcurrencyLimiter(AdaptiveConcurrencyPolicy(initial_limit=1))
+    await limiter.acquire()
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+
+    assert limiter.queue_length == 0
+    limiter.release(latency=0.0)
+    await asyncio.wait_for(limiter.acquire(), timeout=1)
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.asyncio
+async def test_streams_hold_their_slot_until_they_end():
+    limiter = AdaptiveConcurrencyLimiter(AdaptiveConcurrencyPolicy(initial_limit=1))
+    wrapped = FakeModel()
+    wrapped.set_next_output([get_text_message("hello")])
+    model = ScheduledModel(wrapped, limiter)
+
+    stream: AsyncIterator[TResponseStreamEvent] = model.stream_response(
+        None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+    first = await stream.__anext__()
+    assert first.type == "response.completed"
+    assert limiter.in_flight == 1
+    async for _ in stream:
+        pass
+    assert limiter.in_flight == 0
+
+
+class _Provider(ModelProvider):
+    def __init__(self, model: Model):
+        self.model = model
+
+    def get_model(self, model_name: str | None) -> Model:
+        return self.model
+
+
+@pytest.mark.asyncio
+async def test_provider_limits_concurrent_runs():
+    wrapped = _SlowModel(delay=0.01)
+    wrapped.add_multiple_turn_outputs([[get_text_message("ok")]] * 6)
+    provider = AdaptiveConcurrencyProvider(
+        _Provider(wrapped), AdaptiveConcurrencyPolicy(initial_limit=2, max_limit=2)
+    )
+    run_config = RunConfig(model_provider=provider)
+
+    results = await asyncio.gather(
+        *(Runner.run(Agent(name="test"), "hi", run_config=run_config) for _ in range(6))
+    )
+
+    assert [result.final_output for result in results] == ["ok"] * 6
+    assert wrapped.max_in_flight == 2
+    stats = provider.stats()
+    assert stats.calls == 6
+    assert stats.queued_calls == 4
+    assert stats.in_flight == 0 and stats.queue_length == 0
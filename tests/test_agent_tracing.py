@@ -1,14 +1,21 @@
 from __future__ import annotations
 
 import asyncio
+from typing import Any, Callable
 
 import pytest
 
-from agents import Agent, RunConfig, Runner, trace
+from agents import Agent, RunConfig, Runner, _run_impl, run as run_module, trace
+from agents.items import TResponseOutputItem
+from agents.tracing import agent_span, function_span, generation_span
+from agents.tracing.setup import GLOBAL_TRACE_PROVIDER
+from agents.tracing.span_data import AgentSpanData, FunctionSpanData, GenerationSpanData
+from agents.tracing.spans import DISABLED_SPAN, Span
 
+from . import fake_model
 from .fake_model import FakeModel
-from .test_responses import get_text_message
-from .testing_processor import fetch_ordered_spans, fetch_traces
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+from .testing_processor import SPAN_PROCESSOR_TESTING, fetch_ordered_spans, fetch_traces
 
 
 @pytest.mark.asyncio
@@ -320,3 +327,51 @@ async def test_manual_streaming_disabling_works():
 
     traces = fetch_traces()
     assert len(traces) == 0, f"Expected 0 traces, got {len(traces)}"
+
+
+@pytest.mark.asyncio
+async def test_tracing_disabled_runs_skip_span_creation(monkeypatch):
+    """Checks that a run with tracing off doesn't build any span or span data, and doesn't reach
+    the processors."""
+    turns = 5
+    outputs: list[list[TResponseOutputItem] | Exception] = [
+        [get_function_tool_call("noop", "{}")] for _ in range(turns - 1)
+    ]
+    outputs.append([get_text_message("done")])
+    model = FakeModel(tracing_enabled=True)
+    model.add_multiple_turn_outputs(outputs)
+    agent = Agent(name="test_agent", model=model, tools=[get_function_tool("noop", "ok")])
+
+    def fail(*args, **kwargs):
+        pytest.fail("No span should be created with tracing disabled")
+
+    monkeypatch.setattr(GLOBAL_TRACE_PROVIDER, "create_span", fail)
+    for span_data in [AgentSpanData, FunctionSpanData, GenerationSpanData]:
+        monkeypatch.setattr(span_data, "__init__", fail)
+    for method in ["on_trace_start", "on_trace_end", "on_span_start", "on_span_end"]:
+        monkeypatch.setattr(SPAN_PROCESSOR_TESTING, method, fail)
+
+    spans: list[Span[Any]] = []
+
+    def recording(create_span: Callable[..., Span[Any]]) -> Callable[..., Span[Any]]:
+        def create(*args: Any, **kwargs: Any) -> Span[Any]:
+            span = create_span(*args, **kwargs)
+            spans.append(span)
+            return span
+
+        return create
+
+    monkeypatch.setattr(run_module, "agent_span", recording(agent_span))
+    monkeypatch.setattr(_run_impl, "function_span", recording(function_span))
+    monkeypatch.setattr(fake_model, "generation_span", recording(generation_span))
+
+    result = await Runner.run(
+        agent, input="hi", max_turns=turns, run_config=RunConfig(tracing_disabled=True)
+    )
+
+    assert result.final_output == "done"
+    # One agent span, plus a generation span per turn and a function span per tool call.
+    assert len(spans) == 1 + turns + (turns - 1)
+    assert all(span is DISABLED_SPAN for span in spans)
+    assert fetch_traces() == []
+    assert fetch_ordered_spans() == []
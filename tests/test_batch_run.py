@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
+from openai.types.chat.chat_completion import Choice
+
+from agents import Agent, ModelSettings, ModelTracing, Runner, Tool, UserError, generation_span
+from agents.exceptions import BatchRequestError
+from agents.models.batch import (
+    BatchCollector,
+    BatchTransport,
+    LocalBatchTransport,
+    reset_current_batch_collector,
+    set_current_batch_collector,
+)
+from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
+from agents.models.openai_responses import OpenAIResponsesModel
+
+from .fake_model import FakeModel, get_response_obj
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+
+
+class RecordingTransport(BatchTransport):
+    def __init__(self, transport: BatchTransport):
+        self.transport = transport
+        self.batches: list[tuple[str, list[dict[str, Any]]]] = []
+
+    async def submit(self, endpoint: str, requests: bytes) -> bytes:
+        self.batches.append((endpoint, [json.loads(line) for line in requests.splitlines()]))
+        return await self.transport.submit(endpoint, requests)
+
+
+def _client(handler) -> AsyncOpenAI:
+    return AsyncOpenAI(
+        api_key="fake",
+        base_url="http://api.test/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+
+
+def _responses_handler(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    user_text = body["input"][0]["content"]
+    if user_text == "fail":
+        return httpx.Response(400, json={"error": {"message": "Invalid input"}})
+    if any(item.get("type") == "function_call_output" for item in body["input"]):
+        output = [get_text_message(f"done: {user_text}")]
+    else:
+        output = [get_function_tool_call("foo", "{}")]
+    return httpx.Response(200, json=get_response_obj(output).model_dump(mode="json"))
+
+
+def _responses_agent(client: AsyncOpenAI) -> Agent:
+    return Agent(
+        name="test",
+        model=OpenAIResponsesModel("gpt-4o", client),
+        tools=[get_function_tool("foo", "result")],
+    )
+
+
+@pytest.mark.asyncio
+async def test_runs_are_suspended_until_their_batch_completes():
+    client = _client(_responses_handler)
+    transport = RecordingTransport(LocalBatchTransport(client))
+
+    results = await Runner.run_batch(_responses_agent(client), ["a", "b", "c"], transport=transport)
+
+    assert [r.final_output for r in results if not isinstance(r, BaseException)] == [
+        "done: a",
+        "done: b",
+        "done: c",
+    ]
+    # One batch per turn, each holding the requests of all three runs.
+    assert [len(requests) for _, requests in transport.batches] == [3, 3]
+    endpoint, requests = transport.batches[0]
+    assert endpoint == "/v1/responses"
+    assert requests[0]["method"] == "POST"
+    assert requests[0]["url"] == "/v1/responses"
+    assert requests[0]["body"]["model"] == "gpt-4o"
+    assert "stream" not in requests[0]["body"]
+    assert len({request["custom_id"] for _, batch in transport.batches for request in batch}) == 6
+
+
+@pytest.mark.asyncio
+async def test_failed_requests_only_fail_their_run():
+    client = _client(_responses_handler)
+
+    results = await Runner.run_batch(
+        _responses_agent(client), ["a", "fail"], transport=LocalBatchTransport(client)
+    )
+
+    assert not isinstance(results[0], BaseException)
+    assert results[0].final_output == "done: a"
+    assert isinstance(results[1], BatchRequestError)
+    assert "Invalid input" in results[1].message
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_splits_batches():
+    client = _client(_responses_handler)
+    transport = RecordingTransport(LocalBatchTransport(client))
+
+    await Runner.run_batch(
+        _responses_agent(client), ["a", "b", "c"], transport=transport, max_batch_size=2
+    )
+
+    assert all(len(requests) <= 2 for _, requests in transport.batches)
+    assert sum(len(requests) for _, requests in transport.batches) == 6
+
+
+@pytest.mark.asyncio
+async def test_chat_completions_models_are_batched():
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        return httpx.Response(
+            200,
+            json={
+                "id": "chatcmpl-1",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "finish_reason": "stop",
+                        "message": {
+                            "role": "assistant",
+                            "content": body["messages"][-1]["content"],
+                        },
+                    }
+                ],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+            },
+        )
+
+    client = _client(handler)
+    transport = RecordingTransport(LocalBatchTransport(client))
+    agent = Agent(name="test", model=OpenAIChatCompletionsModel("gpt-4o", client))
+
+    results = await Runner.run_batch(agent, ["x", "y"], transport=transport)
+
+    assert [r.final_output for r in results if not isinstance(r, BaseException)] == ["x", "y"]
+    assert [endpoint for endpoint, _ in transport.batches] == ["/v1/chat/completions"]
+    assert all(
+        not isinstance(r, BaseException) and r.raw_responses[0].usage.input_tokens == 5
+        for r in results
+    )
+
+
+@pytest.mark.asyncio
+async def test_models_that_cannot_be_batched_make_real_time_requests():
+    model = FakeModel()
+    model.add_multiple_turn_outputs([[get_text_message("one")], [get_text_message("two")]])
+    transport = RecordingTransport(LocalBatchTransport(_client(_responses_handler)))
+
+    results = await Runner.run_batch(
+        Agent(name="test", model=model), ["a", "b"], transport=transport
+    )
+
+    assert sorted(r.final_output for r in results if not isinstance(r, BaseException)) == [
+        "one",
+        "two",
+    ]
+    assert transport.batches == []
+
+
+@pytest.mark.asyncio
+async def test_streaming_is_not_supported_in_batch_runs():
+    client = _client(_responses_handler)
+    agent = Agent(name="test", model=OpenAIResponsesModel("gpt-4o", client))
+
+    token = set_current_batch_collector(BatchCollector(LocalBatchTransport(client)))
+    try:
+        result = Runner.run_streamed(agent, "hi")
+        with pytest.raises(UserError):
+            async for _ in result.stream_events():
+                pass
+    finally:
+        reset_current_batch_collector(token)
+
+
+class _HangingTransport(BatchTransport):
+    async def submit(self, endpoint: str, requests: bytes) -> bytes:
+        await asyncio.Event().wait()
+        raise AssertionError("unreachable")
+
+
+@pytest.mark.asyncio
+async def test_cancelled_batches_fail_their_requests():
+    collector = BatchCollector(_HangingTransport())
+    collector.runs_started(1)
+    submitted = asyncio.create_task(collector.submit("/v1/responses", {"model": "gpt-4o"}))
+    await asyncio.sleep(0)
+
+    [batch_task] = collector._tasks
+    batch_task.cancel()
+
+    with pytest.raises(BatchRequestError, match="cancelled"):
+        await asyncio.wait_for(submitted, timeout=1)
+
+
+class _CapturingCreate:
+    def __init__(self, response: Any):
+        self.response = response
+        self.kwargs: dict[str, Any] = {}
+
+    async def create(self, **kwargs: Any) -> Any:
+        self.kwargs = kwargs
+        return self.response
+
+
+def _real_time_only(kwargs: dict[str, Any]) -> dict[str, Any]:
+    return {
+        k: v for k, v in kwargs.items() if k not in ("stream", "stream_options", "extra_headers")
+    }
+
+
+@pytest.mark.asyncio
+async def test_batch_bodies_match_real_time_requests():
+    settings = ModelSettings(temperature=0.5, max_tokens=10, tool_choice="auto")
+    tools: list[Tool] = [get_function_tool("foo", "result")]
+
+    responses = _CapturingCreate(get_response_obj([]))
+    responses_client: Any = type("_Client", (), {"responses": responses})()
+    responses_model = OpenAIResponsesModel("gpt-4o", responses_client)
+    await responses_model._fetch_response(
+        "be nice", "hi", settings, tools, None, [], "resp_1", stream=False
+    )
+    assert _real_time_only(responses.kwargs) == responses_model._build_request(
+        "be nice", "hi", settings, tools, None, [], previous_response_id="resp_1"
+    )
+
+    completion = ChatCompletion(
+        id="1",
+        created=0,
+        model="gpt-4o",
+        object="chat.completion",
+        choices=[
+            Choice(
+                index=0,
+                finish_reason="stop",
+                message=ChatCompletionMessage(role="assistant", content="hi"),
+            )
+        ],
+    )
+    completions = _CapturingCreate(completion)
+    chat: Any = type("_Chat", (), {"completions": completions})()
+    chat_client: Any = type("_Client", (), {"chat": chat})()
+    chat_model = OpenAIChatCompletionsModel("gpt-4o", chat_client)
+    with generation_span(disabled=True) as span:
+        await chat_model._fetch_response(
+            "be nice", "hi", settings, tools, None, [], span, ModelTracing.DISABLED, stream=False
+        )
+    assert _real_time_only(completions.kwargs) == chat_model._build_request(
+        "be nice", "hi", settings, tools, None, []
+    )
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import asyncio
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, BadRequestError, InternalServerError
+
+from agents import Agent, ModelSettings, ModelTracing, RunConfig, Runner, trace
+from agents.exceptions import CircuitOpenError
+from agents.items import TResponseOutputItem
+from agents.models.circuit_breaker import (
+    CircuitBreaker,
+    CircuitBreakerModel,
+    CircuitBreakerPolicy,
+    CircuitBreakerProvider,
+    CircuitKey,
+    CircuitStateChange,
+    circuit_key,
+)
+from agents.models.interface import Model, ModelProvider
+from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+from .testing_processor import fetch_ordered_spans
+
+_REQUEST = httpx.Request("POST", "http://api.test/v1/responses")
+
+
+def _server_error() -> InternalServerError:
+    return InternalServerError(
+        "Service unavailable", response=httpx.Response(503, request=_REQUEST), body=None
+    )
+
+
+def _model(outputs: list[list[TResponseOutputItem] | Exception]) -> FakeModel:
+    model = FakeModel()
+    model.add_multiple_turn_outputs(outputs)
+    return model
+
+
+async def _get(model: Model):
+    return await model.get_response(
+        None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+
+
+def _breaker(**policy) -> tuple[CircuitBreaker, list[CircuitStateChange]]:
+    changes: list[CircuitStateChange] = []
+    breaker = CircuitBreaker(
+        CircuitKey(provider="test", base_url=None, model="test"),
+        CircuitBreakerPolicy(**policy),
+        on_state_change=changes.append,
+    )
+    return breaker, changes
+
+
+@pytest.mark.asyncio
+async def test_circuit_opens_after_consecutive_failures_and_fails_fast():
+    breaker, changes = _breaker(failure_threshold=2, recovery_time=60)
+    wrapped = _model([_server_error(), _server_error(), [get_text_message("unused")]])
+    model = CircuitBreakerModel(wrapped, breaker)
+
+    for _ in range(2):
+        with pytest.raises(InternalServerError):
+            await _get(model)
+    assert breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        await _get(model)
+    # The wrapped model wasn't called while the circuit was open.
+    assert len(wrapped.turn_outputs) == 1
+    assert [(c.previous_state, c.state) for c in changes] == [("closed", "open")]
+
+
+@pytest.mark.asyncio
+async def test_half_open_probes_close_or_reopen_the_circuit():
+    breaker, changes = _breaker(failure_threshold=1, recovery_time=0.05)
+    model = CircuitBreakerModel(
+        _model([_server_error(), _server_error(), [get_text_message("ok")]]), breaker
+    )
+
+    with pytest.raises(InternalServerError):
+        await _get(model)
+    await asyncio.sleep(0.05)
+    assert breaker.state == "half_open"
+    # Reading the state doesn't change it: that happens when the next call is let through.
+    assert [c.state for c in changes] == ["open"]
+
+    # A failed probe opens the circuit again.
+    with pytest.raises(InternalServerError):
+        await _get(model)
+    assert [c.state for c in changes] == ["open", "half_open", "open"]
+
+    await asyncio.sleep(0.05)
+    await _get(model)
+    assert [c.state for c in changes] == ["open", "half_open", "open", "half_open", "closed"]
+
+
+@pytest.mark.asyncio
+async def test_client_errors_do_not_trip_the_circuit():
+    client_error = BadRequestError(
+        "Invalid request", response=httpx.Response(400, request=_REQUEST), body=None
+    )
+    breaker, _ = _breaker(failure_threshold=1)
+    model = CircuitBreakerModel(_model([client_error, [get_text_message("ok")]]), breaker)
+
+    with pytest.raises(BadRequestError):
+        await _get(model)
+    assert breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_open_circuits_reroute_to_the_fallback_model():
+    breaker, _ = _breaker(failure_threshold=1, recovery_time=60)
+    model = CircuitBreakerModel(
+        _model([_server_error()]),
+        breaker,
+        fallback=_model([[get_text_message("fallback")], [get_text_message("streamed")]]),
+    )
+
+    with pytest.raises(InternalServerError):
+        await _get(model)
+    response = await _get(model)
+    assert response.output[0].content[0].text == "fallback"
+
+    events = [
+        event
+        async for event in model.stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        )
+    ]
+    assert events[-1].type == "response.completed"
+
+
+@pytest.mark.asyncio
+async def test_streaming_failures_trip_the_circuit():
+    breaker, _ = _breaker(failure_threshold=1)
+    model = CircuitBreakerModel(_model([_server_error()]), breaker)
+
+    with pytest.raises(InternalServerError):
+        async for _ in model.stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        ):
+            pass
+    assert breaker.state == "open"
+
+
+@pytest.mark.asyncio
+async def test_state_changes_are_traced():
+    breaker, _ = _breaker(failure_threshold=1)
+    model = CircuitBreakerModel(_model([_server_error()]), breaker)
+
+    with trace("test"):
+        with pytest.raises(InternalServerError):
+            await _get(model)
+
+    [span] = fetch_ordered_spans()
+    assert span.export()["span_data"] == {  # type: ignore[index]
+        "type": "custom",
+        "name": "circuit_breaker_state_change",
+        "data": {
+            "provider": "test",
+            "base_url": None,
+            "model": "test",
+            "previous_state": "closed",
+            "state": "open",
+            "consecutive_failures": 1,
+        },
+    }
+
+
+class _Provider(ModelProvider):
+    def __init__(self, models: dict[str, Model]):
+        self.models = models
+
+    def get_model(self, model_name: str | None) -> Model:
+        return self.models[model_name or "default"]
+
+
+@pytest.mark.asyncio
+async def test_provider_shares_breakers_across_runs():
+    provider = CircuitBreakerProvider(
+        _Provider({"default": _model([_server_error(), _server_error()])}),
+        policy=CircuitBreakerPolicy(failure_threshold=2, recovery_time=60),
+        fallback=_Provider({"backup": _model([[get_text_message("from backup")]])}),
+        fallback_model_name="backup",
+    )
+    run_config = RunConfig(model_provider=provider)
+
+    for _ in range(2):
+        with pytest.raises(InternalServerError):
+            await Runner.run(Agent(name="test"), "hi", run_config=run_config)
+    result = await Runner.run(Agent(name="test"), "hi", run_config=run_config)
+
+    assert result.final_output == "from backup"
+    [breaker] = provider.breakers.values()
+    assert breaker.state == "open"
+    assert breaker.key.provider == "_Provider"
+
+
+def test_circuit_keys_include_the_base_url_and_model():
+    client = AsyncOpenAI(api_key="fake", base_url="http://replica-1/v1")
+    key = circuit_key(OpenAIChatCompletionsModel("llama", client), provider="OpenAIProvider")
+    assert key == CircuitKey(
+        provider="OpenAIProvider", base_url="http://replica-1/v1/", model="llama"
+    )
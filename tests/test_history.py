@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+from typing import Any
+
+import pytest
+
+from agents import Agent, RunConfig, Runner, TokenBudgetHistoryManager
+from agents.history import (
+    ClearToolOutputs,
+    DropOldestItems,
+    DropReasoningItems,
+    HistoryContext,
+    SummarizeOlderItems,
+    estimate_tokens,
+)
+from agents.items import TResponseInputItem, TResponseOutputItem
+from agents.run_context import RunContextWrapper
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+
+
+def _message(role: str, text: str) -> TResponseInputItem:
+    return {"role": role, "content": text}  # type: ignore[return-value, misc]
+
+
+def _call(call_id: str) -> TResponseInputItem:
+    return {
+        "type": "function_call",
+        "id": f"fc_{call_id}",
+        "call_id": call_id,
+        "name": "lookup",
+        "arguments": "{}",
+    }
+
+
+def _output(call_id: str, size: int = 400) -> TResponseInputItem:
+    return {"type": "function_call_output", "call_id": call_id, "output": "x" * size}
+
+
+def _reasoning(n: int) -> TResponseInputItem:
+    summary = [{"type": "summary_text", "text": "y" * 200}]
+    return {"type": "reasoning", "id": f"rs_{n}", "summary": summary}  # type: ignore[typeddict-item]
+
+
+def _history(turns: int) -> list[TResponseInputItem]:
+    items = [_message("user", "Find the answer")]
+    for n in range(turns):
+        items += [_reasoning(n), _call(f"call_{n}"), _output(f"call_{n}")]
+    items.append(_message("assistant", "Here is the answer"))
+    return items
+
+
+def _context(agent: Agent | None = None) -> HistoryContext:
+    return HistoryContext(
+        agent=agent or Agent(name="test"),
+        system_instructions=None,
+        tools=[],
+        handoffs=[],
+        context_wrapper=RunContextWrapper(context=None),
+        run_config=RunConfig(),
+    )
+
+
+def _assert_pairs_are_kept(items: list[Any]) -> None:
+    calls = {item["call_id"] for item in items if item.get("type") == "function_call"}
+    outputs = {item["call_id"] for item in items if item.get("type") == "function_call_output"}
+    assert calls == outputs
+
+
+def test_token_estimates_grow_with_content():
+    short = estimate_tokens([_message("user", "hi")])
+    long = estimate_tokens([_message("user", "hi " * 400)])
+    assert 0 < short < 20
+    assert 250 < long < 400
+
+
+@pytest.mark.asyncio
+async def test_history_within_budget_is_sent_as_is():
+    history = _history(3)
+    manager = TokenBudgetHistoryManager(max_tokens=100_000)
+    assert await manager.manage(history, _context()) is history
+
+
+@pytest.mark.asyncio
+async def test_default_strategies_drop_reasoning_then_outputs_then_oldest_items():
+    history = _history(10)
+    total = estimate_tokens(history)
+
+    # A little over budget: dropping old reasoning items is enough.
+    managed = await TokenBudgetHistoryManager(max_tokens=total - 100).manage(history, _context())
+    assert [item.get("type") for item in managed].count("reasoning") < 10
+    assert [item.get("type") for item in managed].count("function_call_output") == 10
+    assert estimate_tokens(managed) <= total - 100
+
+    # Far over budget: old tool outputs are cleared, then the oldest items are dropped.
+    managed = await TokenBudgetHistoryManager(max_tokens=900).manage(history, _context())
+    assert estimate_tokens(managed) <= 900
+    assert managed[0] == history[0]
+    assert managed[-1] == history[-1]
+    _assert_pairs_are_kept(managed)
+    assert history == _history(10)
+
+
+@pytest.mark.asyncio
+async def test_cleared_tool_outputs_keep_their_calls():
+    history = _history(4)
+    manager = TokenBudgetHistoryManager(
+        max_tokens=estimate_tokens(history) - 150, strategies=[ClearToolOutputs(keep_last=3)]
+    )
+    managed = await manager.manage(history, _context())
+
+    outputs = [item for item in managed if item.get("type") == "function_call_output"]
+    assert outputs[0]["output"] == "[Tool output removed to save space]"  # type: ignore[typeddict-item]
+    assert outputs[-1]["output"] == "x" * 400  # type: ignore[typeddict-item]
+    assert len(managed) == len(history)
+
+
+@pytest.mark.asyncio
+async def test_dropping_items_keeps_calls_with_their_outputs():
+    # Parallel calls: both calls come before both outputs.
+    history = [
+        _message("user", "Compare"),
+        _reasoning(0),
+        _call("a"),
+        _call("b"),
+        _output("a"),
+        _output("b"),
+        _message("user", "And now?"),
+        _call("c"),
+        _output("c"),
+    ]
+    manager = TokenBudgetHistoryManager(
+        max_tokens=estimate_tokens(history) - 100,
+        strategies=[DropReasoningItems(keep_last=100), DropOldestItems(keep_last=2)],
+    )
+    managed = await manager.manage(history, _context())
+
+    assert managed[0] == history[0]
+    _assert_pairs_are_kept(managed)
+    assert _call("c") in managed and _output("c") in managed
+    assert len(managed) < len(history)
+
+
+@pytest.mark.asyncio
+async def test_older_items_are_summarized_and_summaries_are_reused():
+    summarizer_model = FakeModel()
+    summarizer_model.add_multiple_turn_outputs(
+        [[get_text_message("the user wants the answer")], [get_text_message("updated summary")]]
+    )
+    strategy = SummarizeOlderItems(Agent(name="summarizer", model=summarizer_model), keep_last=3)
+    manager = TokenBudgetHistoryManager(max_tokens=1000, strategies=[strategy])
+
+    history = _history(6)
+    managed = await manager.manage(history, _context())
+    assert managed[0] == {
+        "role": "user",
+        "content": "Summary of the earlier conversation:\nthe user wants the answer",
+    }
+    # The last three items are kept, along with the reasoning item that goes with the tool call.
+    assert managed[1:] == history[-4:]
+    _assert_pairs_are_kept(managed)
+
+    # A later request of the run reuses the summary, as long as what's left fits.
+    extended = history + [_message("user", "Thanks")]
+    assert (await manager.manage(extended, _context()))[0] == managed[0]
+    assert len(summarizer_model.turn_outputs) == 1
+
+
+class _RecordingModel(FakeModel):
+    def __init__(self) -> None:
+        super().__init__()
+        self.inputs: list[Any] = []
+
+    async def get_response(self, system_instructions, input, *args, **kwargs):
+        self.inputs.append(input)
+        return await super().get_response(system_instructions, input, *args, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_runner_sends_managed_history_but_keeps_the_full_history():
+    turns: list[list[TResponseOutputItem] | Exception] = [
+        [get_function_tool_call("lookup", "{}")] for _ in range(4)
+    ]
+    turns.append([get_text_message("done")])
+    model = _RecordingModel()
+    model.add_multiple_turn_outputs(turns)
+    agent = Agent(name="test", model=model, tools=[get_function_tool("lookup", "z" * 2000)])
+    manager = TokenBudgetHistoryManager(
+        max_tokens=1500, strategies=[ClearToolOutputs(keep_last=2), DropOldestItems(keep_last=2)]
+    )
+
+    result = await Runner.run(agent, "hi", run_config=RunConfig(history_manager=manager))
+
+    assert result.final_output == "done"
+    assert all(estimate_tokens(sent) <= 1500 for sent in model.inputs)
+    last_input = model.inputs[-1]
+    _assert_pairs_are_kept(last_input)
+    assert last_input[-1]["output"] == "z" * 2000
+    # The run itself still has every item.
+    full = result.to_input_list()
+    assert [item.get("output") for item in full if item.get("type") == "function_call_output"] == [
+        "z" * 2000
+    ] * 4
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import threading
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, InternalServerError
+
+from agents import Agent, ModelSettings, ModelTracing, RunConfig, Runner
+from agents.models.load_balancing import Endpoint, LoadBalancingProvider
+
+from .test_responses import get_function_tool
+
+
+def _completion(content: str | None, tool_call: bool = False) -> dict[str, Any]:
+    message: dict[str, Any] = {"role": "assistant", "content": content}
+    if tool_call:
+        message["tool_calls"] = [
+            {"id": "call_1", "type": "function", "function": {"name": "foo", "arguments": "{}"}}
+        ]
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "llama",
+        "choices": [{"index": 0, "finish_reason": "stop", "message": message}],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+    }
+
+
+def _reply(body: dict[str, Any], name: str) -> dict[str, Any]:
+    # Call a tool first, then answer with the endpoint's name.
+    if any(message["role"] == "tool" for message in body["messages"]):
+        return _completion(name)
+    return _completion(None, tool_call=True)
+
+
+def _endpoint(name: str, handler) -> Endpoint:
+    return Endpoint(
+        base_url=f"http://{name}/v1",
+        openai_client=AsyncOpenAI(
+            api_key="fake",
+            base_url=f"http://{name}/v1",
+            max_retries=0,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        ),
+    )
+
+
+def _replica(name: str, requests: list[str]) -> Endpoint:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(name)
+        return httpx.Response(200, json=_reply(json.loads(request.content), name))
+
+    return _endpoint(name, handler)
+
+
+async def _get(provider: LoadBalancingProvider):
+    return await provider.get_model("llama").get_response(
+        None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+
+
+def _agent() -> Agent:
+    return Agent(name="test", model="llama", tools=[get_function_tool("foo", "result")])
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_requests_go_to_the_endpoint_with_fewest_outstanding_requests():
+    release = asyncio.Event()
+    requests: list[str] = []
+
+    def replica(name: str) -> Endpoint:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(name)
+            await release.wait()
+            return httpx.Response(200, json=_completion(name))
+
+        return _endpoint(name, handler)
+
+    provider = LoadBalancingProvider([replica("a"), replica("b")], sticky_runs=False)
+    calls = [asyncio.create_task(_get(provider)) for _ in range(4)]
+    await asyncio.sleep(0.05)
+
+    assert sorted(requests) == ["a", "a", "b", "b"]
+    assert [stats.outstanding_requests for stats in provider.endpoint_stats()] == [2, 2]
+    release.set()
+    await asyncio.gather(*calls)
+    assert [stats.outstanding_requests for stats in provider.endpoint_stats()] == [0, 0]
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_requests_of_a_run_stick_to_one_endpoint():
+    requests: list[str] = []
+    provider = LoadBalancingProvider([_replica("a", requests), _replica("b", requests)])
+    run_config = RunConfig(model_provider=provider)
+
+    first = await Runner.run(_agent(), "hi", run_config=run_config)
+    second = await Runner.run(_agent(), "hi", run_config=run_config)
+
+    assert requests == [first.final_output] * 2 + [second.final_output] * 2
+    assert {first.final_output, second.final_output} == {"a", "b"}
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_failing_endpoints_are_ejected_until_their_ejection_time_is_over():
+    requests: list[str] = []
+
+    def failing(request: httpx.Request) -> httpx.Response:
+        requests.append("down")
+        return httpx.Response(500, json={"error": {"message": "Overloaded"}})
+
+    provider = LoadBalancingProvider(
+        [_endpoint("down", failing), _replica("up", requests)],
+        sticky_runs=False,
+        max_failures=2,
+        ejection_time=0.1,
+    )
+
+    outcomes = []
+    for _ in range(6):
+        try:
+            await _get(provider)
+            outcomes.append("ok")
+        except InternalServerError:
+            outcomes.append("error")
+
+    down, up = provider.endpoint_stats()
+    assert outcomes.count("error") == 2
+    assert requests.count("down") == 2
+    assert not down.healthy
+    assert down.failures == 2
+    assert up.healthy and up.failures == 0
+
+    # Once the ejection time is over, the endpoint gets traffic again, and is ejected again
+    # right away if it still fails.
+    await asyncio.sleep(0.1)
+    for _ in range(2):
+        try:
+            await _get(provider)
+        except InternalServerError:
+            pass
+    assert requests.count("down") == 3
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_ewma_latency_routing_prefers_fast_endpoints():
+    requests: list[str] = []
+
+    def replica(name: str, delay: float) -> Endpoint:
+        async def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(name)
+            await asyncio.sleep(delay)
+            return httpx.Response(200, json=_completion(name))
+
+        return _endpoint(name, handler)
+
+    provider = LoadBalancingProvider(
+        [replica("slow", 0.05), replica("fast", 0.0)], strategy="ewma_latency", sticky_runs=False
+    )
+    for _ in range(6):
+        await _get(provider)
+
+    # Each endpoint is measured once, then the fast one gets the traffic.
+    assert requests.count("slow") == 1
+    slow, fast = provider.endpoint_stats()
+    assert slow.ewma_latency is not None and fast.ewma_latency is not None
+    assert slow.ewma_latency > fast.ewma_latency
+
+
+@pytest.mark.asyncio
+async def test_health_checks_eject_and_restore_endpoints():
+    up = True
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if not up:
+            raise httpx.ConnectError("Connection refused", request=request)
+        return httpx.Response(200, json={"object": "list", "data": []})
+
+    provider = LoadBalancingProvider([_endpoint("a", handler), _endpoint("b", handler)])
+
+    up = False
+    assert [stats.healthy for stats in await provider.check_health()] == [False, False]
+    up = True
+    assert [stats.healthy for stats in await provider.check_health()] == [True, True]
+
+    provider.start_health_checks(interval=0.01)
+    up = False
+    await asyncio.sleep(0.05)
+    await provider.stop_health_checks()
+    assert not any(stats.healthy for stats in provider.endpoint_stats())
+
+
+class _StubReplica(BaseHTTPRequestHandler):
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        payload = json.dumps(_reply(body, self.server.name)).encode()  # type: ignore[attr-defined]
+        self.server.requests += 1  # type: ignore[attr-defined]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_servers() -> Iterator[list[ThreadingHTTPServer]]:
+    servers = []
+    for name in ("replica-1", "replica-2"):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _StubReplica)
+        server.name = name  # type: ignore[attr-defined]
+        server.requests = 0  # type: ignore[attr-defined]
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_runs_are_spread_across_stub_http_servers(stub_servers):
+    provider = LoadBalancingProvider(
+        [f"http://127.0.0.1:{server.server_address[1]}/v1" for server in stub_servers],
+        max_connections=4,
+    )
+    run_config = RunConfig(model_provider=provider)
+
+    results = await asyncio.gather(
+        *(Runner.run(_agent(), "hi", run_config=run_config) for _ in range(4))
+    )
+
+    assert sorted(result.final_output for result in results) == [
+        "replica-1",
+        "replica-1",
+        "replica-2",
+        "replica-2",
+    ]
+    assert [server.requests for server in stub_servers] == [4, 4]
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import json
+import time
+from typing import Any
+
+import pytest
+from openai.types.responses import (
+    ResponseCompletedEvent,
+    ResponseCreatedEvent,
+    ResponseTextDeltaEvent,
+)
+
+from agents import Agent, ModelSettings, ModelTracing, Runner
+from agents.items import ModelResponse
+from agents.models.cache import (
+    CachingModel,
+    DiskModelResponseCache,
+    InMemoryModelResponseCache,
+    stream_events_from_response,
+)
+from agents.usage import Usage
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+
+
+async def _get(model: CachingModel, input: str = "hi", settings: ModelSettings | None = None):
+    return await model.get_response(
+        system_instructions="be nice",
+        input=input,
+        model_settings=settings or ModelSettings(temperature=0),
+        tools=[get_function_tool("foo", "bar")],
+        output_schema=None,
+        handoffs=[],
+        tracing=ModelTracing.DISABLED,
+    )
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_are_served_from_cache():
+    fake = FakeModel()
+    fake.add_multiple_turn_outputs([[get_text_message("first")], [get_text_message("second")]])
+    model = CachingModel(fake)
+
+    first = await _get(model)
+    second = await _get(model)
+
+    assert first.output == second.output == [get_text_message("first")]
+    assert second.usage == Usage()
+    assert model.stats.hits == 1
+    assert model.stats.misses == 1
+    assert model.stats.hit_rate == 0.5
+
+
+@pytest.mark.asyncio
+async def test_different_requests_miss_the_cache():
+    fake = FakeModel()
+    fake.add_multiple_turn_outputs(
+        [[get_text_message("a")], [get_text_message("b")], [get_text_message("c")]]
+    )
+    model = CachingModel(fake)
+
+    assert (await _get(model, input="one")).output == [get_text_message("a")]
+    assert (await _get(model, input="two")).output == [get_text_message("b")]
+    assert (await _get(model, settings=ModelSettings(temperature=0.5))).output == [
+        get_text_message("c")
+    ]
+    assert model.stats.hits == 0
+
+
+@pytest.mark.asyncio
+async def test_saved_tokens_are_reported():
+    cache = InMemoryModelResponseCache()
+    model = CachingModel(FakeModel(), cache=cache, namespace="test")
+    key = model._key("be nice", "hi", ModelSettings(temperature=0), [], None, [])
+    cache.set(
+        key,
+        ModelResponse(
+            output=[get_text_message("cached")],
+            usage=Usage(requests=1, input_tokens=10, output_tokens=5, total_tokens=15),
+            referenceable_id=None,
+        ),
+    )
+
+    response = await model.get_response(
+        "be nice", "hi", ModelSettings(temperature=0), [], None, [], ModelTracing.DISABLED
+    )
+
+    assert response.output == [get_text_message("cached")]
+    assert model.stats.saved_input_tokens == 10
+    assert model.stats.saved_output_tokens == 5
+    assert model.stats.saved_tokens == 15
+
+
+def test_in_memory_cache_evicts_least_recently_used():
+    cache = InMemoryModelResponseCache(max_entries=2)
+    response = ModelResponse(output=[], usage=Usage(), referenceable_id=None)
+    cache.set("a", response)
+    cache.set("b", response)
+    assert cache.get("a") is not None
+    cache.set("c", response)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert len(cache) == 2
+
+
+def test_in_memory_cache_expires_entries():
+    cache = InMemoryModelResponseCache(ttl=0.01)
+    cache.set("a", ModelResponse(output=[], usage=Usage(), referenceable_id=None))
+    time.sleep(0.02)
+    assert cache.get("a") is None
+
+
+def test_disk_cache_round_trips_responses(tmp_path):
+    cache = DiskModelResponseCache(tmp_path)
+    response = ModelResponse(
+        output=[get_text_message("hello"), get_function_tool_call("foo", '{"a": 1}')],
+        usage=Usage(requests=1, input_tokens=3, output_tokens=4, total_tokens=7),
+        referenceable_id="resp_123",
+    )
+    cache.set("key", response)
+
+    loaded = DiskModelResponseCache(tmp_path).get("key")
+    assert loaded == response
+    assert cache.get("missing") is None
+
+    cache.clear()
+    assert cache.get("key") is None
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        [],
+        {"response": {"output": []}},
+        {"stored_at": "yesterday", "response": {"output": []}},
+        {"stored_at": time.time(), "response": {"output": [{"type": "unknown"}]}},
+    ],
+)
+def test_disk_cache_treats_malformed_entries_as_misses(tmp_path, entry):
+    cache = DiskModelResponseCache(tmp_path, ttl=3600)
+    (tmp_path / "key.json").write_text(json.dumps(entry))
+
+    assert cache.get("key") is None
+
+
+def test_disk_cache_removes_partial_entries_on_failure(tmp_path, monkeypatch):
+    def failing_dump(*args: Any, **kwargs: Any) -> None:
+        raise OSError("disk full")
+
+    cache = DiskModelResponseCache(tmp_path)
+    monkeypatch.setattr("agents.models.cache.json.dump", failing_dump)
+    with pytest.raises(OSError):
+        cache.set("key", ModelResponse(output=[], usage=Usage(), referenceable_id=None))
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_disk_cache_expires_entries(tmp_path):
+    cache = DiskModelResponseCache(tmp_path, ttl=0.01)
+    cache.set("key", ModelResponse(output=[], usage=Usage(), referenceable_id=None))
+    time.sleep(0.02)
+    assert cache.get("key") is None
+
+
+def test_stream_events_from_response():
+    response = ModelResponse(
+        output=[get_text_message("hello")], usage=Usage(), referenceable_id="resp_1"
+    )
+    events = stream_events_from_response(response)
+
+    assert isinstance(events[0], ResponseCreatedEvent)
+    deltas = [e.delta for e in events if isinstance(e, ResponseTextDeltaEvent)]
+    assert deltas == ["hello"]
+    assert isinstance(events[-1], ResponseCompletedEvent)
+    assert events[-1].response.id == "resp_1"
+    assert events[-1].response.output == [get_text_message("hello")]
+
+
+@pytest.mark.asyncio
+async def test_streamed_runs_use_and_populate_the_cache():
+    fake = FakeModel()
+    fake.add_multiple_turn_outputs([[get_text_message("first")], [get_text_message("second")]])
+    model = CachingModel(fake)
+    agent = Agent(name="test", model=model, model_settings=ModelSettings(temperature=0))
+
+    result = Runner.run_streamed(agent, input="test")
+    async for _ in result.stream_events():
+        pass
+    assert result.final_output == "first"
+
+    result = Runner.run_streamed(agent, input="test")
+    deltas = [
+        event.data.delta
+        async for event in result.stream_events()
+        if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent)
+    ]
+    assert result.final_output == "first"
+    assert deltas == ["first"]
+    assert model.stats.hits == 1
+
+    # The non-streamed path shares the same cache entries.
+    assert (await Runner.run(agent, input="test")).final_output == "first"
+    assert model.stats.hits == 2
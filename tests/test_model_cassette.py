@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import time
+
+import pytest
+
+from agents import Agent, ModelSettings, ModelTracing, Runner
+from agents.exceptions import CassetteMismatchError
+from agents.models.cassette import RecordingModel, ReplayModel
+
+from .fake_model import FakeModel
+from .test_responses import get_function_tool, get_function_tool_call, get_text_message
+
+
+def _tool_agent(model) -> Agent:
+    return Agent(name="test", model=model, tools=[get_function_tool("foo", "tool_result")])
+
+
+async def _record(path) -> None:
+    fake = FakeModel()
+    fake.add_multiple_turn_outputs(
+        [[get_function_tool_call("foo", "{}")], [get_text_message("done")]]
+    )
+    result = await Runner.run(_tool_agent(RecordingModel(fake, path)), input="hi")
+    assert result.final_output == "done"
+
+
+@pytest.mark.parametrize("filename", ["session.jsonl", "session.jsonl.gz"])
+@pytest.mark.asyncio
+async def test_replay_serves_a_recorded_run(tmp_path, filename):
+    path = tmp_path / filename
+    await _record(path)
+
+    replay = ReplayModel(path)
+    assert replay.remaining == 2
+
+    result = await Runner.run(_tool_agent(replay), input="hi")
+    assert result.final_output == "done"
+    assert result.raw_responses[0].output == [get_function_tool_call("foo", "{}")]
+    assert replay.remaining == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_serves_a_recorded_stream(tmp_path):
+    path = tmp_path / "stream.jsonl"
+    fake = FakeModel()
+    fake.add_multiple_turn_outputs(
+        [[get_function_tool_call("foo", "{}")], [get_text_message("done")]]
+    )
+    result = Runner.run_streamed(_tool_agent(RecordingModel(fake, path)), input="hi")
+    async for _ in result.stream_events():
+        pass
+    assert result.final_output == "done"
+
+    result = Runner.run_streamed(_tool_agent(ReplayModel(path)), input="hi")
+    async for _ in result.stream_events():
+        pass
+    assert result.final_output == "done"
+
+
+@pytest.mark.asyncio
+async def test_replay_fails_loudly_on_unrecorded_requests(tmp_path):
+    path = tmp_path / "session.jsonl"
+    await _record(path)
+
+    with pytest.raises(CassetteMismatchError):
+        await Runner.run(_tool_agent(ReplayModel(path)), input="a different input")
+
+
+@pytest.mark.asyncio
+async def test_replay_does_not_reuse_exchanges(tmp_path):
+    path = tmp_path / "session.jsonl"
+    await _record(path)
+    replay = ReplayModel(path)
+
+    await Runner.run(_tool_agent(replay), input="hi")
+    with pytest.raises(CassetteMismatchError):
+        await Runner.run(_tool_agent(replay), input="hi")
+
+
+@pytest.mark.asyncio
+async def test_replay_simulates_scaled_latency(tmp_path):
+    path = tmp_path / "session.jsonl"
+    recording = RecordingModel(FakeModel(initial_output=[get_text_message("x")]), path)
+    await recording.get_response(None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED)
+
+    # Pretend the recorded request took 0.2s
+    header, interaction = (json.loads(line) for line in path.read_text().splitlines())
+    interaction["latency"] = 0.2
+    path.write_text(f"{json.dumps(header)}\n{json.dumps(interaction)}\n")
+
+    replay = ReplayModel(path, latency_scale=0.5)
+    start = time.perf_counter()
+    response = await replay.get_response(
+        None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+    assert time.perf_counter() - start >= 0.09
+    assert response.output == [get_text_message("x")]
+
+
+def test_replay_rejects_non_cassette_files(tmp_path):
+    path = tmp_path / "not_a_cassette.jsonl"
+    path.write_text('{"hello": "world"}\n')
+    with pytest.raises(CassetteMismatchError):
+        ReplayModel(path)
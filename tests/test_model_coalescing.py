@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+from openai.types.responses import ResponseCompletedEvent
+from openai.types.responses.response_usage import ResponseUsage
+
+from agents import Agent, ModelSettings, ModelTracing, Runner
+from agents.items import TResponseStreamEvent
+from agents.models.cache import stream_events_from_response
+from agents.models.coalescing import CoalescingModel
+from agents.usage import Usage
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+
+
+class _GatedModel(FakeModel):
+    """A fake model that holds every request until `release` is set, and counts requests."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.release = asyncio.Event()
+        self.requests = 0
+
+    async def get_response(self, *args, **kwargs):
+        self.requests += 1
+        await self.release.wait()
+        response = await super().get_response(*args, **kwargs)
+        response.usage = Usage(requests=1, input_tokens=10, output_tokens=5, total_tokens=15)
+        return response
+
+    async def stream_response(self, *args, **kwargs) -> AsyncIterator[TResponseStreamEvent]:
+        self.requests += 1
+        response = await super().get_response(*args, **kwargs)
+        events = stream_events_from_response(response)
+        yield events[0]
+        await self.release.wait()
+        for event in events[1:]:
+            if isinstance(event, ResponseCompletedEvent):
+                event.response.usage = ResponseUsage(
+                    input_tokens=10,
+                    output_tokens=5,
+                    total_tokens=15,
+                    output_tokens_details={"reasoning_tokens": 0},  # type: ignore[arg-type]
+                )
+            yield event
+
+
+def _model(*outputs: str) -> tuple[CoalescingModel, _GatedModel]:
+    wrapped = _GatedModel()
+    wrapped.add_multiple_turn_outputs([[get_text_message(output)] for output in outputs])
+    return CoalescingModel(wrapped), wrapped
+
+
+async def _get(model: CoalescingModel, input: str = "hi"):
+    return await model.get_response(
+        None, input, ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+
+
+async def _stream(model: CoalescingModel) -> list[TResponseStreamEvent]:
+    return [
+        event
+        async for event in model.stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        )
+    ]
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_requests_are_sent_once():
+    model, wrapped = _model("hello", "unused")
+    calls = [asyncio.create_task(_get(model)) for _ in range(3)]
+    await asyncio.sleep(0)
+    wrapped.release.set()
+    first, *attached = await asyncio.gather(*calls)
+
+    assert wrapped.requests == 1
+    assert [r.output[0].content[0].text for r in [first, *attached]] == ["hello"] * 3
+    # Usage is only reported once, by the call that sent the request.
+    assert first.usage.total_tokens == 15
+    assert all(r.usage.total_tokens == 0 for r in attached)
+    assert attached[0].output is not first.output
+    assert model.stats.requests == 1
+    assert model.stats.coalesced == 2
+    assert model.stats.saved_input_tokens == 20
+
+
+@pytest.mark.asyncio
+async def test_only_identical_overlapping_requests_are_coalesced():
+    model, wrapped = _model("a", "b", "c")
+    wrapped.release.set()
+
+    await asyncio.gather(_get(model, "one"), _get(model, "two"))
+    await _get(model, "one")
+
+    assert wrapped.requests == 3
+    assert model.stats.coalesced == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_are_raised_to_every_attached_call():
+    model, wrapped = _model()
+    wrapped.set_next_output(ValueError("Model failed"))
+    calls = [asyncio.create_task(_get(model)) for _ in range(2)]
+    await asyncio.sleep(0)
+    wrapped.release.set()
+
+    results = await asyncio.gather(*calls, return_exceptions=True)
+    assert [type(r) for r in results] == [ValueError, ValueError]
+    assert wrapped.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_cancelling_the_first_caller_does_not_cancel_attached_calls():
+    model, wrapped = _model("hello")
+    first = asyncio.create_task(_get(model))
+    await asyncio.sleep(0)
+    attached = asyncio.create_task(_get(model))
+    await asyncio.sleep(0)
+
+    first.cancel()
+    await asyncio.sleep(0)
+    wrapped.release.set()
+
+    response = await attached
+    assert response.output[0].content[0].text == "hello"
+    assert first.cancelled()
+    assert wrapped.requests == 1
+
+
+@pytest.mark.asyncio
+async def test_streams_are_fanned_out_from_the_beginning():
+    model, wrapped = _model("hello")
+    first = asyncio.create_task(_stream(model))
+    await asyncio.sleep(0.01)
+    # Attached after the stream started, but still gets every event.
+    attached = asyncio.create_task(_stream(model))
+    await asyncio.sleep(0)
+    wrapped.release.set()
+    first_events, attached_events = await asyncio.gather(first, attached)
+
+    assert wrapped.requests == 1
+    assert [e.type for e in attached_events] == [e.type for e in first_events]
+    first_completed, attached_completed = first_events[-1], attached_events[-1]
+    assert isinstance(first_completed, ResponseCompletedEvent)
+    assert isinstance(attached_completed, ResponseCompletedEvent)
+    assert first_completed.response.usage is not None
+    assert first_completed.response.usage.total_tokens == 15
+    assert attached_completed.response.usage is None
+    assert model.stats.saved_output_tokens == 5
+
+
+@pytest.mark.asyncio
+async def test_parallel_runs_share_one_request():
+    model, wrapped = _model("translated", "unused")
+    agent = Agent(name="translator", model=model)
+
+    runs = [asyncio.create_task(Runner.run(agent, "Translate: hello")) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    wrapped.release.set()
+    results = await asyncio.gather(*runs)
+
+    assert [result.final_output for result in results] == ["translated"] * 3
+    assert wrapped.requests == 1
@@ -0,0 +1,242 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+import pytest
+from openai.types.responses import ResponseCompletedEvent, ResponseCreatedEvent
+
+from agents import Agent, ModelSettings, ModelTracing, Runner, trace
+from agents.items import ModelResponse, TResponseStreamEvent
+from agents.models.hedging import HedgedModel, HedgedModelProvider
+from agents.models.interface import Model, ModelProvider
+from agents.usage import Usage
+
+from .fake_model import get_response_obj
+from .test_responses import get_text_message
+from .testing_processor import fetch_ordered_spans
+
+
+class DelayedModel(Model):
+    def __init__(self, text: str, delay: float = 0.0, error: Exception | None = None):
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = 0
+
+    async def get_response(self, *args, **kwargs) -> ModelResponse:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return ModelResponse(
+            output=[get_text_message(self.text)],
+            usage=Usage(requests=1, input_tokens=1, output_tokens=1, total_tokens=2),
+            referenceable_id=None,
+        )
+
+    async def stream_response(self, *args, **kwargs) -> AsyncIterator[TResponseStreamEvent]:
+        self.calls += 1
+        # Streams start right away, before the model produced any output.
+        yield ResponseCreatedEvent(type="response.created", response=get_response_obj([]))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        yield ResponseCompletedEvent(
+            type="response.completed", response=get_response_obj([get_text_message(self.text)])
+        )
+
+
+async def _get(model: Model) -> ModelResponse:
+    return await model.get_response(
+        None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    primary, secondary = DelayedModel("primary"), DelayedModel("secondary")
+    model = HedgedModel(primary, secondary, hedge_delay=0.5)
+
+    response = await _get(model)
+
+    assert response.output == [get_text_message("primary")]
+    assert secondary.calls == 0
+    assert model.stats.hedged_requests == 0
+
+
+@pytest.mark.asyncio
+async def test_slow_primary_is_hedged_and_cancelled():
+    primary, secondary = DelayedModel("primary", delay=5), DelayedModel("secondary")
+    model = HedgedModel(primary, secondary, hedge_delay=0.01)
+
+    response = await _get(model)
+    await asyncio.sleep(0)
+
+    assert response.output == [get_text_message("secondary")]
+    assert primary.cancelled == 1
+    assert model.stats.hedged_requests == 1
+    assert model.stats.secondary_wins == 1
+    assert model.stats.cancelled_requests == 1
+    # The cancelled request is accounted for in the returned usage.
+    assert response.usage.requests == 2
+    assert response.usage.input_tokens == 1
+
+
+@pytest.mark.asyncio
+async def test_failing_primary_falls_back_immediately():
+    primary = DelayedModel("primary", error=ValueError("boom"))
+    secondary = DelayedModel("secondary")
+    model = HedgedModel(primary, secondary, hedge_delay=5)
+
+    response = await asyncio.wait_for(_get(model), timeout=1)
+    assert response.output == [get_text_message("secondary")]
+    # The failed primary request is a failure, not hedging cost.
+    assert model.stats.failed_requests == 1
+    assert model.stats.cancelled_requests == 0
+    assert model.stats.wasted_usage == Usage()
+    assert response.usage.requests == 1
+
+    events = [
+        event
+        async for event in model.stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        )
+    ]
+    assert isinstance(events[-1], ResponseCompletedEvent)
+    assert model.stats.failed_requests == 2
+    assert model.stats.cancelled_requests == 0
+    assert model.stats.wasted_usage == Usage()
+
+
+@pytest.mark.asyncio
+async def test_both_failing_raises_primary_error():
+    primary = DelayedModel("primary", error=ValueError("primary"))
+    secondary = DelayedModel("secondary", error=ValueError("secondary"))
+    model = HedgedModel(primary, secondary, hedge_delay=0.01)
+
+    with pytest.raises(ValueError, match="primary"):
+        await _get(model)
+
+
+@pytest.mark.asyncio
+async def test_delay_adapts_to_observed_latency_percentile():
+    model = HedgedModel(
+        DelayedModel("p"), DelayedModel("s"), hedge_delay=3, percentile=0.5, min_samples=3
+    )
+    assert model.current_delay() == 3
+
+    model._response_latencies.extend([0.1, 0.2, 0.3, 0.4])
+    assert model.current_delay() == 0.2
+    # Streams have their own latency window.
+    assert model.current_delay(streaming=True) == 3
+
+
+@pytest.mark.asyncio
+async def test_hedged_requests_record_a_lower_bound_of_the_primary_latency():
+    model = HedgedModel(DelayedModel("p", delay=5), DelayedModel("s"), hedge_delay=0.05)
+
+    await _get(model)
+    events = [
+        event
+        async for event in model.stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        )
+    ]
+
+    assert events[-1].type == "response.completed"
+    # The primary requests were cancelled, but the time they took so far is still recorded, so
+    # that slow responses aren't left out of the window.
+    [response_latency] = model._response_latencies
+    [first_delta_latency] = model._first_delta_latencies
+    assert 0.05 <= response_latency < 1
+    assert 0.05 <= first_delta_latency < 1
+
+
+@pytest.mark.asyncio
+async def test_streams_are_hedged_on_their_first_delta_of_output():
+    primary, secondary = DelayedModel("primary", delay=5), DelayedModel("secondary")
+    model = HedgedModel(primary, secondary, hedge_delay=0.01)
+
+    events = [
+        event
+        async for event in model.stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        )
+    ]
+    await asyncio.sleep(0)
+
+    # The primary stream had started, but hadn't produced any output yet.
+    assert model.stats.secondary_wins == 1
+    assert primary.cancelled == 1
+    assert [event.type for event in events] == ["response.created", "response.completed"]
+
+
+@pytest.mark.asyncio
+async def test_streamed_run_uses_the_first_stream_to_respond():
+    primary, secondary = DelayedModel("primary", delay=5), DelayedModel("secondary")
+    agent = Agent(name="test", model=HedgedModel(primary, secondary, hedge_delay=0.01))
+
+    result = Runner.run_streamed(agent, input="hi")
+    async for _ in result.stream_events():
+        pass
+
+    assert result.final_output == "secondary"
+    assert primary.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_stream_is_not_hedged():
+    primary, secondary = DelayedModel("primary"), DelayedModel("secondary")
+    agent = Agent(name="test", model=HedgedModel(primary, secondary, hedge_delay=0.5))
+
+    result = Runner.run_streamed(agent, input="hi")
+    async for _ in result.stream_events():
+        pass
+
+    assert result.final_output == "primary"
+    assert secondary.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_winner_is_recorded_in_span():
+    model = HedgedModel(DelayedModel("p", delay=5), DelayedModel("s"), hedge_delay=0.01)
+    with trace("test"):
+        await model.get_response(None, "hi", ModelSettings(), [], None, [], ModelTracing.ENABLED)
+
+    hedge_span = fetch_ordered_spans()[0].export()
+    assert hedge_span is not None
+    assert hedge_span["span_data"]["name"] == "hedged_request"
+    assert hedge_span["span_data"]["data"]["winner"] == "secondary"
+    assert hedge_span["span_data"]["data"]["hedged"] is True
+
+
+class _Provider(ModelProvider):
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    def get_model(self, model_name: str | None) -> Model:
+        return DelayedModel(f"{self.prefix}:{model_name}")
+
+
+@pytest.mark.asyncio
+async def test_provider_caches_hedged_models():
+    provider = HedgedModelProvider(
+        _Provider("a"), _Provider("b"), secondary_model_name="backup", hedge_delay=0.5
+    )
+    model = provider.get_model("main")
+
+    assert provider.get_model("main") is model
+    assert isinstance(model, HedgedModel)
+    assert (await _get(model)).output == [get_text_message("a:main")]
+    assert isinstance(model.secondary, DelayedModel)
+    assert model.secondary.text == "b:backup"
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import json
+import time
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, BadRequestError, InternalServerError, RateLimitError
+
+from agents import Agent, ModelSettings, ModelTracing, OpenAIProvider, RunConfig, Runner, trace
+from agents.models.retry import Retrier, RetryConfig, RetryPolicy, classify_error
+
+from .fake_model import get_response_obj
+from .test_responses import get_text_message
+from .testing_processor import fetch_ordered_spans
+
+FAST = RetryPolicy(initial_delay=0.001, jitter=0.0)
+
+
+def _provider(handler, config: RetryConfig, use_responses: bool = True) -> OpenAIProvider:
+    client = AsyncOpenAI(
+        api_key="fake",
+        base_url="http://api.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return OpenAIProvider(openai_client=client, use_responses=use_responses, retry_config=config)
+
+
+def _flaky(failures: list[httpx.Response]):
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if failures:
+            return failures.pop(0)
+        output = [get_text_message("hello")]
+        return httpx.Response(200, json=get_response_obj(output).model_dump(mode="json"))
+
+    return handler, requests
+
+
+def _error(status: int, headers: dict[str, str] | None = None) -> httpx.Response:
+    return httpx.Response(status, json={"error": {"message": "Failed"}}, headers=headers)
+
+
+async def _get(provider: OpenAIProvider, tracing: ModelTracing = ModelTracing.DISABLED):
+    return await provider.get_model("gpt-4o").get_response(
+        None, "hi", ModelSettings(), [], None, [], tracing
+    )
+
+
+def test_errors_are_classified_by_policy():
+    request = httpx.Request("POST", "http://api.test/v1/responses")
+
+    def status_error(status: int) -> Exception:
+        response = httpx.Response(status, request=request)
+        if status == 429:
+            return RateLimitError("Slow down", response=response, body=None)
+        return InternalServerError("Failed", response=response, body=None)
+
+    assert classify_error(status_error(429)) == "rate_limit"
+    assert classify_error(status_error(503)) == "server_error"
+    assert classify_error(status_error(408)) == "timeout"
+    assert classify_error(httpx.ReadError("Connection reset")) is None
+    assert classify_error(ValueError()) is None
+
+
+def test_backoff_grows_exponentially_up_to_the_max_delay():
+    policy = RetryPolicy(initial_delay=1.0, multiplier=2.0, max_delay=5.0, jitter=0.0)
+    assert [policy.backoff(retries) for retries in range(4)] == [1.0, 2.0, 4.0, 5.0]
+
+    jittered = RetryPolicy(initial_delay=1.0, jitter=0.5)
+    assert all(0.5 <= jittered.backoff(0) <= 1.0 for _ in range(20))
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_server_errors_are_retried_and_recorded_on_the_span():
+    handler, requests = _flaky([_error(500), _error(503)])
+    provider = _provider(handler, RetryConfig(server_error=FAST))
+
+    with trace("test"):
+        response = await _get(provider, ModelTracing.ENABLED)
+
+    assert response.referenceable_id == "123"
+    assert len(requests) == 3
+    [span] = [s for s in fetch_ordered_spans() if s.span_data.type == "response"]
+    retries = span.export()["span_data"]["retries"]  # type: ignore[index]
+    assert [(r["retry"], r["error_class"], r["status_code"]) for r in retries] == [
+        (1, "server_error", 500),
+        (2, "server_error", 503),
+    ]
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_rate_limits_wait_for_retry_after():
+    handler, requests = _flaky([_error(429, {"retry-after-ms": "100"})])
+    provider = _provider(handler, RetryConfig(rate_limit=FAST))
+
+    start = time.perf_counter()
+    await _get(provider)
+    assert time.perf_counter() - start >= 0.09
+    assert len(requests) == 2
+
+    # Waiting longer than the policy allows isn't worth it, so the error is raised.
+    handler, requests = _flaky([_error(429, {"retry-after": "120"})])
+    with pytest.raises(RateLimitError):
+        await _get(_provider(handler, RetryConfig(rate_limit=FAST)))
+    assert len(requests) == 1
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_client_errors_and_disabled_policies_are_not_retried():
+    handler, requests = _flaky([_error(400)])
+    with pytest.raises(BadRequestError):
+        await _get(_provider(handler, RetryConfig(server_error=FAST)))
+    assert len(requests) == 1
+
+    handler, requests = _flaky([_error(500)])
+    with pytest.raises(InternalServerError):
+        await _get(_provider(handler, RetryConfig(server_error=None)))
+    assert len(requests) == 1
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_retries_are_limited_by_the_run_budget():
+    handler, requests = _flaky([_error(500)] * 10)
+    provider = _provider(
+        handler,
+        RetryConfig(
+            server_error=RetryPolicy(max_retries=5, initial_delay=0.001), max_retries_per_run=2
+        ),
+    )
+
+    with pytest.raises(InternalServerError):
+        await Runner.run(Agent(name="test"), "hi", run_config=RunConfig(model_provider=provider))
+    assert len(requests) == 3
+
+    # Calls outside of a run are only limited by their policy.
+    with pytest.raises(InternalServerError):
+        await _get(provider)
+    assert len(requests) == 3 + 6
+
+
+def _chunk(content: str | None, finish: bool = False) -> str:
+    chunk = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [
+            {
+                "index": 0,
+                "delta": {"content": content} if content else {},
+                "finish_reason": "stop" if finish else None,
+            }
+        ],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_streams_are_retried_before_their_first_event():
+    attempts = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise httpx.ReadError("Connection reset", request=request)
+        body = _chunk("hel") + _chunk("lo") + _chunk(None, finish=True) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    provider = _provider(handler, RetryConfig(timeout=FAST), use_responses=False)
+    events = [
+        event
+        async for event in provider.get_model("gpt-4o").stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        )
+    ]
+
+    assert attempts == 2
+    assert events[0].type == "response.created"
+    assert events[-1].type == "response.completed"
+
+
+@pytest.mark.asyncio
+async def test_streams_are_not_retried_after_their_first_event():
+    opened = 0
+
+    async def open_stream() -> AsyncIterator[str]:
+        nonlocal opened
+        opened += 1
+
+        async def events() -> AsyncIterator[str]:
+            yield "first"
+            request = httpx.Request("POST", "http://api.test/v1/responses")
+            raise httpx.ReadError("Connection reset", request=request)
+
+        return events()
+
+    retrier = Retrier(RetryConfig(timeout=FAST))
+    stream = await retrier.open_stream(open_stream)
+    received = []
+    with pytest.raises(httpx.ReadError):
+        async for event in stream:
+            received.append(event)
+
+    assert received == ["first"]
+    assert opened == 1
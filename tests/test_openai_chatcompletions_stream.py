@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import AsyncIterator
 
 import pytest
@@ -21,6 +22,10 @@ from agents.model_settings import ModelSettings
 from agents.models.interface import ModelTracing
 from agents.models.openai_chatcompletions import OpenAIChatCompletionsModel
 from agents.models.openai_provider import OpenAIProvider
+from agents.tracing import trace
+from agents.tracing.span_data import GenerationSpanData
+
+from .testing_processor import fetch_ordered_spans
 
 
 @pytest.mark.allow_call_model_methods
@@ -281,3 +286,59 @@ async def test_stream_response_yields_events_for_tool_call(monkeypatch) -> None:
     assert output_events[2].delta == "arg1arg2"
     assert output_events[3].type == "response.output_item.done"
     assert output_events[4].type == "response.completed"
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_stream_response_records_time_to_first_token(monkeypatch) -> None:
+    def chunk(delta: ChoiceDelta) -> ChatCompletionChunk:
+        return ChatCompletionChunk(
+            id="chunk-id",
+            created=1,
+            model="fake",
+            object="chat.completion.chunk",
+            choices=[Choice(index=0, delta=delta)],
+        )
+
+    async def fake_stream() -> AsyncIterator[ChatCompletionChunk]:
+        # The role comes first, and the first token only after a while.
+        yield chunk(ChoiceDelta(role="assistant"))
+        await asyncio.sleep(0.02)
+        yield chunk(ChoiceDelta(content="Hi"))
+        await asyncio.sleep(0.02)
+        yield chunk(ChoiceDelta(content="!"))
+
+    async def patched_fetch_response(self, *args, **kwargs):
+        resp = Response(
+            id="resp-id",
+            created_at=0,
+            model="fake-model",
+            object="response",
+            output=[],
+            tool_choice="none",
+            tools=[],
+            parallel_tool_calls=False,
+        )
+        return resp, fake_stream()
+
+    monkeypatch.setattr(OpenAIChatCompletionsModel, "_fetch_response", patched_fetch_response)
+    model = OpenAIProvider(use_responses=False).get_model("gpt-4")
+    with trace(workflow_name="test"):
+        async for _ in model.stream_response(
+            system_instructions=None,
+            input="",
+            model_settings=ModelSettings(),
+            tools=[],
+            output_schema=None,
+            handoffs=[],
+            tracing=ModelTracing.ENABLED,
+        ):
+            pass
+
+    [span] = fetch_ordered_spans()
+    assert isinstance(span.span_data, GenerationSpanData)
+    ttft = span.span_data.time_to_first_token_ns
+    assert ttft is not None
+    assert 20_000_000 <= ttft < 40_000_000
+    assert span.duration_ns is not None and span.duration_ns >= 40_000_000
+    assert span.span_data.export()["time_to_first_token_ns"] == ttft
@@ -0,0 +1,319 @@
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Callable
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, BadRequestError, NotFoundError
+from openai.types.responses import ResponseCompletedEvent
+
+from agents import Agent, ModelSettings, ModelTracing, RunConfig, Runner, handoff
+from agents.agent_output import AgentOutputSchema
+from agents.extensions.handoff_filters import remove_all_tools
+from agents.handoffs import Handoff
+from agents.items import (
+    ModelResponse,
+    TResponseInputItem,
+    TResponseOutputItem,
+    TResponseStreamEvent,
+)
+from agents.models.cache import CachingModel
+from agents.models.cassette import RecordingModel
+from agents.models.circuit_breaker import CircuitBreakerModel
+from agents.models.coalescing import CoalescingModel
+from agents.models.hedging import HedgedModel
+from agents.models.interface import Model
+from agents.models.openai_responses import OpenAIResponsesModel
+from agents.models.scheduler import RequestScheduler, ScheduledModel
+from agents.tool import Tool
+from agents.usage import Usage
+
+from .fake_model import FakeModel, get_response_obj
+from .test_responses import (
+    get_function_tool,
+    get_function_tool_call,
+    get_handoff_tool_call,
+    get_text_message,
+)
+
+_REQUEST = httpx.Request("POST", "https://api.test/v1/responses")
+
+
+def _previous_response_not_found() -> NotFoundError:
+    return NotFoundError(
+        "Previous response not found",
+        response=httpx.Response(404, request=_REQUEST),
+        body={"code": "previous_response_not_found", "param": "previous_response_id"},
+    )
+
+
+def _invalid_tools() -> BadRequestError:
+    return BadRequestError(
+        "Invalid tools",
+        response=httpx.Response(400, request=_REQUEST),
+        body={"code": "invalid_value", "param": "tools"},
+    )
+
+
+class ChainingModel(OpenAIResponsesModel):
+    """Stands in for the Responses API, recording what each request sends."""
+
+    def __init__(
+        self,
+        turns: list[list[TResponseOutputItem]],
+        chaining_error: Exception | None = None,
+    ):
+        super().__init__(model="test", openai_client=AsyncOpenAI(api_key="fake"))
+        self.turns = turns
+        self.chaining_error = chaining_error
+        self.requests: list[tuple[str | None, list[TResponseInputItem]]] = []
+
+    def _respond(self, input, previous_response_id) -> tuple[str, list[TResponseOutputItem]]:
+        self.requests.append((previous_response_id, list(input)))
+        if previous_response_id and self.chaining_error:
+            raise self.chaining_error
+        return f"resp_{len(self.requests)}", self.turns.pop(0)
+
+    async def get_response(
+        self, system_instructions, input, *args, previous_response_id=None, **kwargs
+    ) -> ModelResponse:
+        response_id, output = self._respond(input, previous_response_id)
+        return ModelResponse(output=output, usage=Usage(), referenceable_id=response_id)
+
+    async def stream_response(
+        self, system_instructions, input, *args, previous_response_id=None, **kwargs
+    ) -> AsyncIterator[ResponseCompletedEvent]:
+        response_id, output = self._respond(input, previous_response_id)
+        yield ResponseCompletedEvent(
+            type="response.completed", response=get_response_obj(output, response_id)
+        )
+
+
+def _tool_turns() -> list[list[TResponseOutputItem]]:
+    return [
+        [get_function_tool_call("foo", "{}")],
+        [get_function_tool_call("foo", "{}")],
+        [get_text_message("done")],
+    ]
+
+
+def _tool_agent(model) -> Agent:
+    return Agent(name="test", model=model, tools=[get_function_tool("foo", "result")])
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+@pytest.mark.asyncio
+async def test_turns_only_send_new_items(streamed):
+    model = ChainingModel(_tool_turns())
+    run_config = RunConfig(use_previous_response_id=True)
+
+    if streamed:
+        streamed_result = Runner.run_streamed(_tool_agent(model), "hi", run_config=run_config)
+        async for _ in streamed_result.stream_events():
+            pass
+        raw_responses = streamed_result.raw_responses
+        assert streamed_result.final_output == "done"
+    else:
+        result = await Runner.run(_tool_agent(model), "hi", run_config=run_config)
+        raw_responses = result.raw_responses
+        assert result.final_output == "done"
+
+    assert [previous for previous, _ in model.requests] == [None, "resp_1", "resp_2"]
+    for _, sent in model.requests[1:]:
+        assert len(sent) == 1
+        assert sent[0].get("type") == "function_call_output"
+
+    sent_bytes = [response.usage.input_bytes for response in raw_responses]
+    assert sent_bytes == [len(json.dumps(sent)) for _, sent in model.requests]
+
+
+@pytest.mark.asyncio
+async def test_full_history_is_sent_by_default():
+    model = ChainingModel(_tool_turns())
+    result = await Runner.run(_tool_agent(model), "hi")
+
+    assert [previous for previous, _ in model.requests] == [None, None, None]
+    assert [len(sent) for _, sent in model.requests] == [1, 3, 5]
+    assert result.raw_responses[0].usage.input_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_full_history_when_chaining_fails():
+    model = ChainingModel(_tool_turns()[1:], chaining_error=_previous_response_not_found())
+    result = await Runner.run(
+        _tool_agent(model), "hi", run_config=RunConfig(use_previous_response_id=True)
+    )
+
+    assert result.final_output == "done"
+    assert [(previous, len(sent)) for previous, sent in model.requests] == [
+        (None, 1),
+        ("resp_1", 1),
+        (None, 3),
+    ]
+
+
+@pytest.mark.parametrize("streamed", [False, True])
+@pytest.mark.asyncio
+async def test_other_errors_arent_retried_with_the_full_history(streamed):
+    model = ChainingModel(_tool_turns(), chaining_error=_invalid_tools())
+    run_config = RunConfig(use_previous_response_id=True)
+
+    with pytest.raises(BadRequestError):
+        if streamed:
+            streamed_result = Runner.run_streamed(_tool_agent(model), "hi", run_config=run_config)
+            async for _ in streamed_result.stream_events():
+                pass
+        else:
+            await Runner.run(_tool_agent(model), "hi", run_config=run_config)
+
+    assert [previous for previous, _ in model.requests] == [None, "resp_1"]
+
+
+@pytest.mark.asyncio
+async def test_wrapped_models_keep_the_chain():
+    model = ChainingModel(_tool_turns())
+    result = await Runner.run(
+        _tool_agent(CachingModel(model)), "hi", run_config=RunConfig(use_previous_response_id=True)
+    )
+
+    assert result.final_output == "done"
+    assert [previous for previous, _ in model.requests] == [None, "resp_1", "resp_2"]
+
+
+@pytest.mark.asyncio
+async def test_handoff_input_filters_reset_the_chain():
+    def build(input_filter):
+        model = ChainingModel(
+            [[get_function_tool_call("foo", "{}")], [], [get_text_message("done")]]
+        )
+        target = Agent(name="target", model=model)
+        source = Agent(
+            name="source",
+            model=model,
+            tools=[get_function_tool("foo", "result")],
+            handoffs=[handoff(target, input_filter=input_filter)],
+        )
+        model.turns[1] = [get_handoff_tool_call(target)]
+        return model, source
+
+    model, agent = build(None)
+    await Runner.run(agent, "hi", run_config=RunConfig(use_previous_response_id=True))
+    assert model.requests[2][0] == "resp_2"
+    assert [item.get("type") for item in model.requests[2][1]] == ["function_call_output"]
+
+    model, agent = build(remove_all_tools)
+    await Runner.run(agent, "hi", run_config=RunConfig(use_previous_response_id=True))
+    assert model.requests[2][0] is None
+    # The filtered history: the input message only, without the tool calls and outputs.
+    assert len(model.requests[2][1]) == 1
+
+
+@pytest.mark.asyncio
+async def test_models_without_chaining_support_get_the_full_history():
+    turns: list[list[TResponseOutputItem] | Exception] = [*_tool_turns()]
+    model = FakeModel()
+    model.add_multiple_turn_outputs(turns)
+    result = await Runner.run(
+        _tool_agent(model), "hi", run_config=RunConfig(use_previous_response_id=True)
+    )
+
+    assert result.final_output == "done"
+    assert result.raw_responses[2].usage.input_bytes > result.raw_responses[1].usage.input_bytes
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_responses_model_sends_previous_response_id():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(json.loads(request.content))
+        response = get_response_obj([get_text_message("hello")], "resp_2")
+        return httpx.Response(200, json=response.model_dump(mode="json"))
+
+    client = AsyncOpenAI(
+        api_key="fake",
+        base_url="http://api.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    response = await OpenAIResponsesModel("gpt-4o", client).get_response(
+        None,
+        [],
+        ModelSettings(),
+        [],
+        None,
+        [],
+        ModelTracing.DISABLED,
+        previous_response_id="resp_1",
+    )
+
+    assert bodies[0]["previous_response_id"] == "resp_1"
+    assert response.referenceable_id == "resp_2"
+
+
+class OldSignatureModel(Model):
+    """A custom model written before `previous_response_id` was added to the interface."""
+
+    async def get_response(  # type: ignore[override]
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> ModelResponse:
+        return ModelResponse(
+            output=[get_text_message("hello")], usage=Usage(), referenceable_id=None
+        )
+
+    async def stream_response(  # type: ignore[override]
+        self,
+        system_instructions: str | None,
+        input: str | list[TResponseInputItem],
+        model_settings: ModelSettings,
+        tools: list[Tool],
+        output_schema: AgentOutputSchema | None,
+        handoffs: list[Handoff],
+        tracing: ModelTracing,
+    ) -> AsyncIterator[TResponseStreamEvent]:
+        yield ResponseCompletedEvent(
+            type="response.completed", response=get_response_obj([get_text_message("hello")])
+        )
+
+
+_WRAPPERS: dict[str, Callable[[Model, Path], Model]] = {
+    "caching": lambda model, _: CachingModel(model),
+    "recording": lambda model, tmp_path: RecordingModel(model, tmp_path / "cassette.jsonl"),
+    "coalescing": lambda model, _: CoalescingModel(model),
+    "circuit_breaker": lambda model, _: CircuitBreakerModel(model),
+    "scheduled": lambda model, _: ScheduledModel(model, RequestScheduler()),
+    "hedged": lambda model, _: HedgedModel(model, OldSignatureModel()),
+}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("wrapper", list(_WRAPPERS))
+async def test_wrappers_accept_models_without_previous_response_id(wrapper, tmp_path):
+    model = _WRAPPERS[wrapper](OldSignatureModel(), tmp_path)
+    assert not model.supports_previous_response_id
+
+    response = await model.get_response(
+        None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+    assert response.output == [get_text_message("hello")]
+
+    events = [
+        event
+        async for event in model.stream_response(
+            None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+        )
+    ]
+    assert isinstance(events[-1], ResponseCompletedEvent)
+
+    result = await Runner.run(Agent(name="test", model=model), "hi")
+    assert result.final_output == "hello"
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import httpx
+import pytest
+from openai import AsyncOpenAI
+
+from agents import Agent, Model, ModelProvider, OpenAIProvider, RunConfig, Runner
+from agents.models.openai_provider import DEFAULT_MODEL
+
+from .fake_model import FakeModel
+
+
+def _provider(handler) -> OpenAIProvider:
+    client = AsyncOpenAI(
+        api_key="fake",
+        base_url="http://api.test/v1",
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return OpenAIProvider(openai_client=client)
+
+
+def test_provider_caches_models_by_name():
+    provider = OpenAIProvider(openai_client=AsyncOpenAI(api_key="fake"))
+
+    assert provider.get_model("gpt-4o-mini") is provider.get_model("gpt-4o-mini")
+    assert provider.get_model(None) is provider.get_model(DEFAULT_MODEL)
+    assert provider.get_model("gpt-4o-mini") is not provider.get_model("o1")
+
+
+@pytest.mark.asyncio
+async def test_warmup_opens_connections_and_resolves_models():
+    paths = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        paths.append(request.url.path)
+        # Even a rejected request leaves an open connection behind.
+        return httpx.Response(401, json={"error": {"message": "Unauthorized"}})
+
+    provider = _provider(handler)
+    report = await provider.warmup(["gpt-4o-mini", None, "gpt-4o-mini"], connections=3)
+
+    assert paths == ["/v1/models"] * 3
+    assert report.connections_opened == 3
+    assert report.connection_errors == 0
+    assert report.models == ["gpt-4o-mini", DEFAULT_MODEL]
+    assert report.total_time >= report.connection_time > 0
+
+
+@pytest.mark.asyncio
+async def test_warmup_reports_connection_errors():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    report = await _provider(handler).warmup(connections=2)
+
+    assert report.connections_opened == 0
+    assert report.connection_errors == 2
+
+
+class RecordingProvider(ModelProvider):
+    def __init__(self):
+        self.requested: list[str | None] = []
+
+    def get_model(self, model_name: str | None) -> Model:
+        self.requested.append(model_name)
+        return FakeModel()
+
+
+@pytest.mark.asyncio
+async def test_runner_warmup_resolves_models_of_reachable_agents():
+    leaf = Agent(name="leaf", model="o1")
+    middle = Agent(name="middle", model="gpt-4o-mini", handoffs=[leaf])
+    fixed = Agent(name="fixed", model=FakeModel(), handoffs=[leaf])
+    root = Agent(name="root", handoffs=[middle, fixed])
+    leaf.handoffs.append(root)
+
+    provider = RecordingProvider()
+    report = await Runner.warmup([root], run_config=RunConfig(model_provider=provider))
+
+    assert sorted(provider.requested, key=str) == sorted([None, "gpt-4o-mini", "o1"], key=str)
+    assert sorted(report.models) == ["default", "gpt-4o-mini", "o1"]
+    assert report.connections_opened == 0
+
+
+@pytest.mark.asyncio
+async def test_runner_warmup_uses_run_config_model():
+    provider = RecordingProvider()
+    await Runner.warmup(
+        [Agent(name="a", model="o1")],
+        run_config=RunConfig(model="gpt-4o", model_provider=provider),
+    )
+    assert provider.requested == ["gpt-4o"]
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+import httpx
+import pytest
+from openai import AsyncOpenAI, RateLimitError
+
+from agents import ModelSettings, ModelTracing, OpenAIProvider
+from agents.models.rate_limit import RateLimit, RateLimiter, RateLimitPolicy, estimate_tokens
+
+
+@pytest.mark.asyncio
+async def test_requests_queue_once_the_bucket_is_empty():
+    # 6000 tokens per minute refills at 100 tokens per second.
+    limiter = RateLimiter(RateLimitPolicy(tokens_per_minute=6000))
+
+    assert await limiter.acquire("gpt-4o", 6000) == 0
+    start = time.perf_counter()
+    waited = await limiter.acquire("gpt-4o", 10)
+
+    assert waited == pytest.approx(0.1, abs=0.02)
+    assert time.perf_counter() - start >= 0.08
+    assert limiter.stats.requests == 2
+    assert limiter.stats.queued_requests == 1
+    assert limiter.stats.max_wait == waited
+
+
+@pytest.mark.asyncio
+async def test_waiting_requests_are_served_in_order():
+    limiter = RateLimiter(RateLimitPolicy(requests_per_minute=600))
+    await asyncio.gather(*(limiter.acquire("gpt-4o", 0) for _ in range(600)))
+
+    waits = await asyncio.gather(*(limiter.acquire("gpt-4o", 0) for _ in range(3)))
+    assert waits == sorted(waits)
+    assert waits[-1] == pytest.approx(0.3, abs=0.02)
+
+
+@pytest.mark.asyncio
+async def test_limits_apply_per_model():
+    limiter = RateLimiter(
+        RateLimitPolicy(
+            tokens_per_minute=6000, per_model={"gpt-4o-mini": RateLimit(tokens_per_minute=60000)}
+        )
+    )
+    await limiter.acquire("gpt-4o", 6000)
+
+    assert await limiter.acquire("gpt-4o-mini", 6000) == 0
+    assert await limiter.acquire("o1", 6000) == 0
+
+
+@pytest.mark.asyncio
+async def test_headers_correct_the_buckets():
+    limiter = RateLimiter(RateLimitPolicy(requests_per_minute=600, tokens_per_minute=60000))
+    limiter.update_from_headers(
+        "gpt-4o",
+        httpx.Headers(
+            {"x-ratelimit-remaining-requests": "100", "x-ratelimit-remaining-tokens": "0"}
+        ),
+    )
+    # Out of tokens: the next request waits for a refill of 1000 tokens per second.
+    assert await limiter.acquire("gpt-4o", 100) == pytest.approx(0.1, abs=0.02)
+
+    limiter.update_from_headers("gpt-4o", httpx.Headers({"retry-after-ms": "50"}))
+    assert await limiter.acquire("gpt-4o", 0) >= 0.05
+
+
+def test_estimate_tokens_counts_text_and_max_output():
+    input: list[dict[str, Any]] = [{"role": "user", "content": "x" * 400}]
+    assert 100 <= estimate_tokens(input) <= 110
+    assert 200 <= estimate_tokens(input, instructions="y" * 400, max_output_tokens=50) - 50 <= 210
+
+    tools = [{"type": "function", "name": "lookup", "parameters": {"description": "z" * 400}}]
+    assert estimate_tokens(input, tools=tools) - estimate_tokens(input) >= 100
+
+
+def _chat_completion_json() -> dict[str, Any]:
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o",
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "hello"},
+            }
+        ],
+        "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+    }
+
+
+def _provider(handler) -> OpenAIProvider:
+    client = AsyncOpenAI(
+        api_key="fake",
+        base_url="http://api.test/v1",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+    )
+    return OpenAIProvider(
+        openai_client=client,
+        use_responses=False,
+        rate_limit_policy=RateLimitPolicy(requests_per_minute=6000),
+    )
+
+
+async def _get(provider: OpenAIProvider):
+    return await provider.get_model("gpt-4o").get_response(
+        None, "hi", ModelSettings(), [], None, [], ModelTracing.DISABLED
+    )
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_provider_models_share_a_limiter_fed_by_response_headers():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            200,
+            json=_chat_completion_json(),
+            headers={"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "100ms"},
+        )
+
+    provider = _provider(handler)
+    response = await _get(provider)
+    assert response.usage.output_tokens == 1
+
+    # The server reported no requests left until its window resets, so the next request waits.
+    start = time.perf_counter()
+    await _get(provider)
+    assert time.perf_counter() - start >= 0.08
+    assert provider.rate_limiter is not None
+    assert provider.rate_limiter.stats.queued_requests == 1
+
+
+@pytest.mark.allow_call_model_methods
+@pytest.mark.asyncio
+async def test_rate_limit_errors_pause_requests():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(
+            429,
+            json={"error": {"message": "Rate limit reached", "type": "requests"}},
+            headers={"retry-after-ms": "100"},
+        )
+
+    provider = _provider(handler)
+    with pytest.raises(RateLimitError):
+        await _get(provider)
+
+    assert provider.rate_limiter is not None
+    assert await provider.rate_limiter.acquire("gpt-4o", 0) == pytest.approx(0.1, abs=0.02)
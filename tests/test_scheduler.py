@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from agents import Agent, RunConfig, Runner
+from agents._run_scope import RunScope, get_current_run_scope, run_scope
+from agents.models.interface import Model, ModelProvider
+from agents.models.scheduler import RequestScheduler, SchedulingProvider
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+
+
+async def _queue_calls(
+    scheduler: RequestScheduler, calls: list[tuple[str, int, float | None]]
+) -> list[str]:
+    """Queues named calls with the given priority and deadline behind a held slot, then releases
+    the slot and returns the order the calls were served in."""
+    order: list[str] = []
+
+    async def call(name: str) -> None:
+        await scheduler.acquire()
+        order.append(name)
+        scheduler.release(latency=0.0)
+
+    await scheduler.acquire()
+    tasks = []
+    for name, priority, deadline in calls:
+        with run_scope(priority=priority, deadline=deadline):
+            tasks.append(asyncio.create_task(call(name)))
+        await asyncio.sleep(0)
+    scheduler.release(latency=0.0)
+    await asyncio.gather(*tasks)
+    return order
+
+
+@pytest.mark.asyncio
+async def test_earliest_deadline_goes_first_within_a_priority():
+    order = await _queue_calls(
+        RequestScheduler(max_concurrency=1),
+        [("none", 0, None), ("late", 0, 30.0), ("soon", 0, 10.0), ("urgent", 1, None)],
+    )
+    assert order == ["urgent", "soon", "late", "none"]
+
+
+@pytest.mark.asyncio
+async def test_waiting_calls_age_into_higher_priorities():
+    scheduler = RequestScheduler(max_concurrency=1, aging_interval=0.05)
+    await scheduler.acquire()
+    order: list[str] = []
+
+    async def call(name: str) -> None:
+        await scheduler.acquire()
+        order.append(name)
+        scheduler.release(latency=0.0)
+
+    with run_scope(priority=0):
+        starved = asyncio.create_task(call("batch"))
+    await asyncio.sleep(0.06)
+    with run_scope(priority=1):
+        fresh = asyncio.create_task(call("interactive"))
+    await asyncio.sleep(0)
+    scheduler.release(latency=0.0)
+    await asyncio.gather(starved, fresh)
+
+    # The batch call has waited long enough to catch up with the interactive call's priority,
+    # and it arrived first.
+    assert order == ["batch", "interactive"]
+
+    order = await _queue_calls(
+        RequestScheduler(max_concurrency=1, aging_interval=None),
+        [("batch", 0, None), ("interactive", 1, None)],
+    )
+    assert order == ["interactive", "batch"]
+
+
+class _SlowModel(FakeModel):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+        self.scopes: list[RunScope | None] = []
+
+    async def get_response(self, *args, **kwargs):
+        self.scopes.append(get_current_run_scope())
+        await asyncio.sleep(self.delay)
+        return await super().get_response(*args, **kwargs)
+
+
+class _Provider(ModelProvider):
+    def __init__(self, model: Model):
+        self.model = model
+
+    def get_model(self, model_name: str | None) -> Model:
+        return self.model
+
+
+@pytest.mark.asyncio
+async def test_interactive_runs_skip_ahead_of_batch_runs():
+    model = _SlowModel(delay=0.01)
+    model.add_multiple_turn_outputs([[get_text_message("ok")]] * 16)
+    provider = SchedulingProvider(_Provider(model), RequestScheduler(max_concurrency=2))
+    agent = Agent(name="test")
+
+    batch = [
+        asyncio.create_task(Runner.run(agent, "hi", run_config=RunConfig(model_provider=provider)))
+        for _ in range(12)
+    ]
+    await asyncio.sleep(0)
+    interactive_config = RunConfig(model_provider=provider, priority=10, deadline=5.0)
+    interactive = [
+        asyncio.create_task(Runner.run(agent, "hi", run_config=interactive_config))
+        for _ in range(4)
+    ]
+    await asyncio.gather(*batch, *interactive)
+
+    stats = provider.stats()
+    assert stats.calls == 16
+    # Interactive calls wait for at most a couple of calls in flight, however long the batch
+    # queue is.
+    assert stats.p95_wait_by_priority[10] < 0.05
+    assert stats.p95_wait_by_priority[0] > stats.p95_wait_by_priority[10]
+    interactive_scopes = [scope for scope in model.scopes if scope and scope.priority == 10]
+    assert len(interactive_scopes) == 4
+    assert all(scope.deadline is not None for scope in interactive_scopes)
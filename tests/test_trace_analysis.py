@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from openai.types.responses import ResponseFunctionToolCall
+
+from agents import Agent, Runner, function_tool
+from agents.tracing.analysis import (
+    analyze_trace,
+    analyze_traces,
+    build_trace_trees,
+    to_chrome_trace,
+    to_speedscope,
+)
+from agents.tracing.file_exporter import FileSpanExporter, TraceFileReader
+from agents.tracing.spans import Span
+from agents.tracing.traces import Trace
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+from .testing_processor import fetch_ordered_spans, fetch_traces
+
+_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def _span(
+    span_id: str, parent_id: str | None, start: float, end: float, **data: Any
+) -> dict[str, Any]:
+    return {
+        "object": "trace.span",
+        "id": span_id,
+        "trace_id": "trace_1",
+        "parent_id": parent_id,
+        "started_at": (_EPOCH + timedelta(seconds=start)).isoformat(),
+        "ended_at": (_EPOCH + timedelta(seconds=end)).isoformat(),
+        "span_data": data,
+        "error": None,
+    }
+
+
+def _records() -> list[dict[str, Any]]:
+    # An agent whose guardrail runs alongside the first model call, which then calls two tools in
+    # parallel, and gets its final answer from a second model call.
+    return [
+        {"object": "trace", "id": "trace_1", "workflow_name": "workflow"},
+        _span("agent", None, 0, 10, type="agent", name="assistant"),
+        _span("guardrail", "agent", 0, 1, type="guardrail", name="check"),
+        _span("gen_1", "agent", 0, 3, type="generation", model="gpt-4o"),
+        _span("tool_a", "agent", 3, 5, type="function", name="fast"),
+        _span("tool_b", "agent", 3, 8, type="function", name="slow"),
+        _span("gen_2", "agent", 8.5, 10, type="generation", model="gpt-4o"),
+    ]
+
+
+def test_critical_path_goes_through_the_slowest_parallel_spans():
+    [tree] = build_trace_trees(_records())
+    analysis = analyze_trace(tree)
+
+    assert analysis.wall_time == 10
+    assert analysis.span_count == 6
+    path = [
+        (s.span.span_id, s.start - tree.start, s.end - tree.start) for s in analysis.critical_path
+    ]
+    assert path == [
+        ("gen_1", 0, 3),
+        ("tool_b", 3, 8),
+        ("agent", 8, 8.5),
+        ("gen_2", 8.5, 10),
+    ]
+    assert analysis.critical_path_time["model"] == 4.5
+    assert analysis.critical_path_time["tool"] == 5
+    assert analysis.critical_path_time["framework"] == 0.5
+    assert analysis.critical_path_time["guardrail"] == 0
+    assert sum(analysis.critical_path_time.values()) == analysis.wall_time
+    # Parallel work counts in full outside of the critical path.
+    assert analysis.total_time["tool"] == 7
+    assert analysis.total_time["guardrail"] == 1
+
+    summary = analysis.summary()
+    assert "Trace trace_1 (workflow): 10.000s, 6 spans" in summary
+    assert "function: slow" in summary
+    assert "function: fast" not in summary
+
+
+def _assert_properly_nested(profile: dict[str, Any]) -> None:
+    stack: list[int] = []
+    last_at = 0.0
+    for event in profile["events"]:
+        assert event["at"] >= last_at
+        last_at = event["at"]
+        if event["type"] == "O":
+            stack.append(event["frame"])
+        else:
+            assert stack.pop() == event["frame"]
+    assert not stack
+
+
+def test_flame_graph_exports_put_parallel_spans_in_their_own_lanes():
+    trees = build_trace_trees(_records())
+
+    speedscope = to_speedscope(trees)
+    frames = [frame["name"] for frame in speedscope["shared"]["frames"]]
+    assert "function: slow" in frames and "generation: gpt-4o" in frames
+    # The guardrail and the slow tool overlap a sibling, so they get lanes of their own.
+    assert [profile["name"] for profile in speedscope["profiles"]] == [
+        "workflow",
+        "workflow (parallel 1)",
+        "workflow (parallel 2)",
+    ]
+    for profile in speedscope["profiles"]:
+        _assert_properly_nested(profile)
+    assert speedscope["profiles"][0]["endValue"] == 10_000
+
+    chrome = to_chrome_trace(trees)
+    spans = {event["name"]: event for event in chrome["traceEvents"] if event["ph"] == "X"}
+    assert spans["function: slow"]["dur"] == 5_000_000
+    assert spans["function: slow"]["tid"] != spans["function: fast"]["tid"]
+    assert spans["function: fast"]["tid"] == spans["agent: assistant"]["tid"]
+    assert spans["function: slow"]["cat"] == "tool"
+
+
+@pytest.mark.asyncio
+async def test_analyzes_a_recorded_run(tmp_path):
+    @function_tool
+    async def fast() -> str:
+        await asyncio.sleep(0.01)
+        return "fast"
+
+    @function_tool
+    async def slow() -> str:
+        await asyncio.sleep(0.1)
+        return "slow"
+
+    model = FakeModel(tracing_enabled=True)
+    model.add_multiple_turn_outputs(
+        [
+            [
+                ResponseFunctionToolCall(
+                    id="1", call_id="1", type="function_call", name="fast", arguments="{}"
+                ),
+                ResponseFunctionToolCall(
+                    id="2", call_id="2", type="function_call", name="slow", arguments="{}"
+                ),
+            ],
+            [get_text_message("done")],
+        ]
+    )
+    agent = Agent(name="test", model=model, tools=[fast, slow])
+    await Runner.run(agent, "hi")
+
+    items: list[Trace | Span[Any]] = [*fetch_traces(), *fetch_ordered_spans()]
+    [analysis] = analyze_traces(items)
+    assert analysis.workflow_name == "Agent workflow"
+    on_path: dict[str, float] = {}
+    for segment in analysis.critical_path:
+        on_path[segment.span.name] = on_path.get(segment.span.name, 0.0) + segment.duration
+    # The fast tool is only on the path until the slow one starts.
+    assert on_path["function: slow"] >= 0.1
+    assert on_path.get("function: fast", 0.0) < 0.01
+    assert 0.1 <= analysis.critical_path_time["tool"] < analysis.wall_time
+    assert sum(analysis.critical_path_time.values()) == pytest.approx(analysis.wall_time)
+
+    # The same analysis can be done from the records on disk.
+    exporter = FileSpanExporter(tmp_path)
+    exporter.export(items)
+    exporter.close()
+    with TraceFileReader(tmp_path) as reader:
+        [trace_id] = reader.trace_ids()
+        [from_file] = analyze_traces(reader.read_trace(trace_id))
+    assert from_file.critical_path_time == pytest.approx(analysis.critical_path_time)
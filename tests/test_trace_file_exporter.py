@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Any
+
+from agents.tracing.file_exporter import FileSpanExporter, TraceFileReader
+from agents.tracing.span_data import CustomSpanData
+from agents.tracing.spans import Span, SpanImpl
+from agents.tracing.traces import Trace, TraceImpl
+
+from .test_trace_processor import mock_processor
+
+
+def _trace_items(trace_id: str, spans: int) -> list[Trace | Span[Any]]:
+    processor = mock_processor()
+    trace = TraceImpl(
+        name="workflow", trace_id=trace_id, group_id=None, metadata=None, processor=processor
+    )
+    items: list[Trace | Span[Any]] = [trace]
+    for n in range(spans):
+        items.append(
+            SpanImpl(
+                trace_id=trace_id,
+                span_id=f"span_{trace_id}_{n}",
+                parent_id=None,
+                processor=processor,
+                span_data=CustomSpanData(name="step", data={"payload": "x" * 200}),
+            )
+        )
+    return items
+
+
+def test_records_are_appended_as_jsonl(tmp_path):
+    exporter = FileSpanExporter(tmp_path)
+    exporter.export(_trace_items("trace_a", 2))
+    exporter.export(_trace_items("trace_b", 1))
+    path = exporter.current_path
+    exporter.close()
+
+    assert path is not None
+    lines = path.read_bytes().splitlines()
+    records = [json.loads(line) for line in lines]
+    objects = [record["object"] for record in records]
+    assert objects == ["trace", "trace.span", "trace.span", "trace", "trace.span"]
+    assert b" " not in lines[0]
+
+
+def test_files_are_rotated_by_size_and_time(tmp_path):
+    exporter = FileSpanExporter(tmp_path, max_file_bytes=1000, rotate_after=None)
+    for n in range(6):
+        exporter.export(_trace_items(f"trace_{n}", 2))
+    exporter.close()
+    assert len(list(tmp_path.glob("traces-*.jsonl"))) == 3
+
+    exporter = FileSpanExporter(tmp_path / "timed", rotate_after=0.05)
+    exporter.export(_trace_items("trace_a", 1))
+    exporter.export(_trace_items("trace_b", 1))
+    time.sleep(0.06)
+    exporter.export(_trace_items("trace_c", 1))
+    exporter.close()
+    assert len(list((tmp_path / "timed").glob("traces-*.jsonl"))) == 2
+
+
+def test_reader_finds_traces_across_rotated_files(tmp_path):
+    exporter = FileSpanExporter(tmp_path, max_file_bytes=1500, compress_rotated=True)
+    for n in range(10):
+        exporter.export(_trace_items(f"trace_{n}", 3))
+    # Spans of a trace can land in a later batch, and a later file.
+    exporter.export(_trace_items("trace_3", 1)[1:])
+    exporter.close()
+    assert list(tmp_path.glob("traces-*.jsonl")) == []
+    assert len(list(tmp_path.glob("traces-*.jsonl.gz"))) > 2
+
+    with TraceFileReader(tmp_path) as reader:
+        assert reader.trace_ids() == [f"trace_{n}" for n in range(10)]
+        records = reader.read_trace("trace_3")
+        assert records[0] == {
+            "object": "trace",
+            "id": "trace_3",
+            "workflow_name": "workflow",
+            "group_id": None,
+            "metadata": None,
+        }
+        assert [r["id"] for r in records[1:]] == [f"span_trace_3_{n}" for n in range(3)] + [
+            "span_trace_3_0"
+        ]
+        assert reader.read_trace("trace_missing") == []
+
+
+def test_reader_memory_maps_files_and_rebuilds_missing_indexes(tmp_path):
+    exporter = FileSpanExporter(tmp_path, max_file_bytes=1500)
+    for n in range(5):
+        exporter.export(_trace_items(f"trace_{n}", 2))
+    # Leave the current file open, cut short by a crash.
+    current = exporter.current_path
+    assert current is not None
+    with open(current, "ab") as f:
+        f.write(b'{"object":"trace.span","trace_id":"trace_4"')
+
+    indexed = TraceFileReader(tmp_path)
+    expected = {trace_id: indexed.read_trace(trace_id) for trace_id in indexed.trace_ids()}
+    assert len(expected["trace_4"]) == 3
+    indexed.close()
+
+    for index in tmp_path.glob("*.idx"):
+        os.remove(index)
+    with TraceFileReader(tmp_path) as scanned:
+        assert {t: scanned.read_trace(t) for t in scanned.trace_ids()} == expected
+        assert scanned._mmaps
+    exporter.close()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import gc
+import json
+import tracemalloc
+from typing import Any
+
+from agents.tracing import custom_span, trace
+from agents.tracing.file_exporter import FileSpanExporter, TraceFileReader
+from agents.tracing.payload import (
+    SerializedSpan,
+    SpanPayloadLimits,
+    serialize_span,
+    truncate_span_data,
+)
+from agents.tracing.processors import BackendSpanExporter, BatchTraceProcessor, default_processor
+from agents.tracing.setup import GLOBAL_TRACE_PROVIDER
+from agents.tracing.span_data import FunctionSpanData, GenerationSpanData
+from agents.tracing.spans import SpanImpl
+
+from .test_trace_processor import _RecordingExporter, mock_processor
+from .testing_processor import SPAN_PROCESSOR_TESTING
+
+
+def _generation_span(index: int, size: int) -> SpanImpl[GenerationSpanData]:
+    span = SpanImpl(
+        trace_id="trace_1",
+        span_id=f"span_{index}",
+        parent_id=None,
+        processor=mock_processor(),
+        span_data=GenerationSpanData(
+            input=[{"role": "user", "content": f"{index} " + "x" * size}],
+            output=[{"role": "assistant", "content": "ok"}],
+            model="gpt-4o",
+        ),
+    )
+    span.start()
+    span.finish()
+    return span
+
+
+def test_fields_over_their_cap_are_truncated_with_a_marker():
+    exported: dict[str, Any] = {
+        "type": "function",
+        "name": "lookup",
+        "input": '{"q": "hi"}',
+        "output": "é" * 1000,
+    }
+    removed = truncate_span_data(exported, SpanPayloadLimits(function_output=101))
+    # Multi-byte characters aren't split.
+    assert exported["output"] == "é" * 50 + "...[truncated 1900 bytes]"
+    assert exported["input"] == '{"q": "hi"}'
+    assert removed == 1900
+
+    exported = _generation_span(0, 1000).span_data.export()
+    truncate_span_data(exported, SpanPayloadLimits(generation_input=100))
+    assert exported["input"]["truncated"] is True
+    assert exported["input"]["original_bytes"] > 1000
+    assert exported["input"]["preview"].startswith('[{"role":"user","content":"0 xxx')
+    assert len(exported["input"]["preview"]) == 100
+    assert exported["output"] == [{"role": "assistant", "content": "ok"}]
+
+    exported = FunctionSpanData(name="lookup", input=None, output="y" * 100_000).export()
+    assert truncate_span_data(exported, SpanPayloadLimits(function_output=None)) == 0
+    assert exported["output"] == "y" * 100_000
+
+
+def test_serialized_spans_export_like_the_original():
+    span = _generation_span(0, 10)
+    serialized = serialize_span(span)
+    assert serialized is not None
+    assert serialized.export() == span.export()
+    assert json.loads(serialized.payload) == span.export()
+    assert serialized.span_data.type == "generation"
+    assert serialized.started_at == span.started_at
+    assert serialized.truncated_bytes == 0
+
+    # The exporters write the payload as it is.
+    exporter = BackendSpanExporter(api_key="test_key")
+    assert list(exporter._serialize([serialized])) == [[serialized.payload]]
+    exporter.close()
+
+
+def test_batch_processor_holds_bounded_payloads_instead_of_span_objects():
+    def queued_memory(payload_limits: SpanPayloadLimits | None) -> tuple[int, BatchTraceProcessor]:
+        processor = BatchTraceProcessor(
+            _RecordingExporter(),
+            schedule_delay=60.0,
+            export_trigger_ratio=2.0,
+            payload_limits=payload_limits,
+        )
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for index in range(100):
+                processor.on_span_end(_generation_span(index, 100_000))
+            gc.collect()
+            return tracemalloc.get_traced_memory()[0], processor
+        finally:
+            tracemalloc.stop()
+
+    unbounded, processor = queued_memory(None)
+    processor.shutdown()
+    bounded, processor = queued_memory(SpanPayloadLimits(generation_input=1024))
+
+    # Each span held on to 100KB of input. Now only the capped payloads are kept.
+    assert unbounded > 100 * 100_000
+    assert bounded < unbounded / 20
+    stats = processor.stats()
+    assert stats.queued == 100
+    assert stats.serialized_spans == 100
+    assert 100 * 1024 < stats.queued_bytes < 100 * 2048
+    assert stats.queued_bytes == stats.serialized_bytes
+    assert stats.truncated_bytes > 100 * 99_000
+
+    processor.force_flush()
+    assert processor.stats().queued_bytes == 0
+    processor.shutdown()
+
+
+def test_serialized_spans_are_written_to_files(tmp_path):
+    exporter = FileSpanExporter(tmp_path)
+    processor = BatchTraceProcessor(exporter, payload_limits=SpanPayloadLimits(generation_input=64))
+    processor.on_span_end(_generation_span(0, 1000))
+    processor.force_flush()
+    exporter.close()
+
+    with TraceFileReader(tmp_path) as reader:
+        [record] = reader.read_trace("trace_1")
+    assert record["id"] == "span_0"
+    assert record["span_data"]["input"]["truncated"] is True
+    processor.shutdown()
+
+
+def test_serialized_spans_cant_be_changed():
+    serialized = serialize_span(_generation_span(0, 10))
+    assert isinstance(serialized, SerializedSpan)
+    serialized.set_error({"message": "late", "data": None})
+    assert serialized.error is None
+    assert serialized.export()["error"] is None  # type: ignore[index]
+
+
+def test_spans_that_cant_be_serialized_are_queued_as_they_are():
+    exporter = _RecordingExporter()
+    processor = BatchTraceProcessor(exporter, payload_limits=SpanPayloadLimits())
+    GLOBAL_TRACE_PROVIDER.set_processors([processor])
+    try:
+        # Doesn't raise in the code that ends the span.
+        with trace("test"):
+            with custom_span("c", data={"x": object()}) as span:
+                pass
+        processor.force_flush()
+    finally:
+        GLOBAL_TRACE_PROVIDER.set_processors([SPAN_PROCESSOR_TESTING])
+        processor.shutdown()
+
+    [exported_span] = [item for batch in exporter.batches for item in batch if item is span]
+    assert not isinstance(exported_span, SerializedSpan)
+    assert processor.stats().serialized_spans == 0
+
+
+def test_default_processor_doesnt_serialize_spans():
+    assert default_processor()._payload_limits is None
@@ -1,15 +1,27 @@
+import gzip
+import json
 import os
+import threading
 import time
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, cast
 from unittest.mock import MagicMock, patch
 
 import httpx
 import pytest
 
-from agents.tracing.processor_interface import TracingProcessor
-from agents.tracing.processors import BackendSpanExporter, BatchTraceProcessor
-from agents.tracing.span_data import AgentSpanData
-from agents.tracing.spans import SpanImpl
-from agents.tracing.traces import TraceImpl
+from agents.tracing.processor_interface import TracingExporter, TracingProcessor
+from agents.tracing.processors import (
+    AsyncBackendSpanExporter,
+    BackendSpanExporter,
+    BatchTraceProcessor,
+    QueuedTracingProcessor,
+)
+from agents.tracing.setup import SynchronousMultiTracingProcessor
+from agents.tracing.span_data import AgentSpanData, GenerationSpanData
+from agents.tracing.spans import Span, SpanImpl
+from agents.tracing.traces import Trace, TraceImpl
 
 
 def get_span(processor: TracingProcessor) -> SpanImpl[AgentSpanData]:
@@ -64,7 +76,11 @@ def test_batch_trace_processor_on_span_end(mocked_exporter):
 
 
 def test_batch_trace_processor_queue_full(mocked_exporter):
-    processor = BatchTraceProcessor(exporter=mocked_exporter, max_queue_size=2, schedule_delay=0.1)
+    # Neither the trigger size nor the schedule delay is reached, so the worker leaves the queue
+    # alone.
+    processor = BatchTraceProcessor(
+        exporter=mocked_exporter, max_queue_size=2, schedule_delay=60.0, export_trigger_ratio=2.0
+    )
     # Fill the queue
     processor.on_trace_start(get_trace(processor))
     processor.on_trace_start(get_trace(processor))
@@ -168,6 +184,212 @@ def test_batch_trace_processor_scheduled_export(mocked_exporter):
     assert total_exported == 1, "Item should be exported after scheduled delay"
 
 
+class _RecordingExporter(TracingExporter):
+    """Records exported batches. If `blocking`, each export waits until `release` is set."""
+
+    def __init__(self, blocking: bool = False):
+        self.batches: list[list[Trace | Span[Any]]] = []
+        self.exported = threading.Event()
+        self.release = threading.Event()
+        if not blocking:
+            self.release.set()
+
+    def export(self, items: list[Trace | Span[Any]]) -> None:
+        self.exported.set()
+        self.release.wait(timeout=5)
+        self.batches.append(items)
+
+    @property
+    def total(self) -> int:
+        return sum(len(batch) for batch in self.batches)
+
+
+def test_batch_trace_processor_wakes_when_trigger_size_is_reached():
+    exporter = _RecordingExporter()
+    processor = BatchTraceProcessor(
+        exporter, max_queue_size=10, export_trigger_ratio=0.5, schedule_delay=60.0
+    )
+    for _ in range(4):
+        processor.on_span_end(get_span(processor))
+    assert not exporter.exported.wait(timeout=0.05)
+
+    start = time.monotonic()
+    processor.on_span_end(get_span(processor))
+    assert exporter.exported.wait(timeout=1.0)
+    assert time.monotonic() - start < 0.5
+    processor.shutdown()
+    assert exporter.total == 5
+
+
+def test_batch_trace_processor_exports_within_schedule_delay():
+    exporter = _RecordingExporter()
+    processor = BatchTraceProcessor(exporter, schedule_delay=0.05)
+    time.sleep(0.1)
+
+    start = time.monotonic()
+    processor.on_span_end(get_span(processor))
+    assert exporter.exported.wait(timeout=1.0)
+    # The worker sleeps until the scheduled time, rather than polling on an interval.
+    assert time.monotonic() - start < 0.2
+    processor.shutdown()
+
+
+def test_batch_trace_processor_force_flush_waits_for_exports_in_flight():
+    exporter = _RecordingExporter(blocking=True)
+    processor = BatchTraceProcessor(exporter, max_batch_size=2, schedule_delay=60.0)
+    for _ in range(3):
+        processor.on_span_end(get_span(processor))
+
+    # The worker picks up the first batch and is stuck exporting it.
+    flusher = threading.Thread(target=processor.force_flush)
+    flusher.start()
+    assert exporter.exported.wait(timeout=1.0)
+    processor.force_flush(timeout=0.05)
+    assert exporter.total == 0
+    assert flusher.is_alive()
+
+    exporter.release.set()
+    processor.force_flush()
+    assert exporter.total == 3
+    assert [len(batch) for batch in exporter.batches] == [2, 1]
+    flusher.join(timeout=1.0)
+    assert not flusher.is_alive()
+
+    processor.shutdown()
+    # After shutdown, flushing exports on the calling thread.
+    processor.on_span_end(get_span(processor))
+    processor.force_flush()
+    assert exporter.total == 4
+
+
+def test_batch_trace_processor_enqueue_overhead():
+    """Benchmarks the hot path: ending a span only adds it to the queue."""
+    exporter = _RecordingExporter()
+    processor = BatchTraceProcessor(exporter, max_queue_size=20_000, schedule_delay=60.0)
+    span = get_span(processor)
+    n = 10_000
+
+    start = time.perf_counter()
+    for _ in range(n):
+        processor.on_span_end(span)
+    per_span = (time.perf_counter() - start) / n
+
+    processor.shutdown()
+    assert exporter.total == n
+    # Typically around a microsecond; the bound leaves room for slow CI machines.
+    assert per_span < 50e-6
+
+
+class _BlockingProcessor(TracingProcessor):
+    """Records the span ids it handles, waiting until `release` is set before handling each one."""
+
+    def __init__(self):
+        self.handled: list[str] = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.flushed = False
+        self.flush_timeout: float | None = None
+
+    def on_trace_start(self, trace):
+        pass
+
+    def on_trace_end(self, trace):
+        pass
+
+    def on_span_start(self, span):
+        pass
+
+    def on_span_end(self, span):
+        self.started.set()
+        self.release.wait(timeout=5)
+        if span.span_id == "bad":
+            raise ValueError("Processor failed")
+        self.handled.append(span.span_id)
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout: float | None = None) -> None:
+        self.flushed = True
+        self.flush_timeout = timeout
+
+
+def _named_span(processor: TracingProcessor, span_id: str) -> SpanImpl[AgentSpanData]:
+    return SpanImpl(
+        trace_id="test_trace_id",
+        span_id=span_id,
+        parent_id=None,
+        processor=processor,
+        span_data=AgentSpanData(name="test_agent"),
+    )
+
+
+def test_queued_processor_does_not_block_the_caller():
+    slow = _BlockingProcessor()
+    processor = QueuedTracingProcessor(slow)
+
+    start = time.monotonic()
+    for n in range(20):
+        processor.on_span_end(_named_span(processor, str(n)))
+    assert time.monotonic() - start < 0.1
+    assert slow.started.wait(timeout=1.0)
+    assert processor.stats().queued == 19
+
+    time.sleep(0.02)
+    assert processor.stats().lag >= 0.02
+    # Gives up while the wrapped processor is still blocked.
+    processor.force_flush(timeout=0.01)
+    assert not slow.flushed
+    slow.release.set()
+    processor.force_flush(timeout=5)
+    assert slow.handled == [str(n) for n in range(20)]
+    assert slow.flushed
+    # What is left of the timeout is passed on to the wrapped processor.
+    assert slow.flush_timeout is not None and 0 < slow.flush_timeout <= 5
+
+    stats = processor.stats()
+    assert (stats.queued, stats.processed, stats.dropped, stats.lag) == (0, 20, 0, 0.0)
+    assert stats.max_lag >= 0.02
+    processor.shutdown()
+
+
+@pytest.mark.parametrize(
+    "drop_policy, expected",
+    [("drop_newest", ["0", "1", "2"]), ("drop_oldest", ["0", "3", "4"])],
+)
+def test_queued_processor_drop_policies(drop_policy, expected):
+    slow = _BlockingProcessor()
+    processor = QueuedTracingProcessor(slow, max_queue_size=2, drop_policy=drop_policy)
+    processor.on_span_end(_named_span(processor, "0"))
+    # The worker is now stuck handling the first span, and the next two fill the queue.
+    assert slow.started.wait(timeout=1.0)
+    for n in range(1, 5):
+        processor.on_span_end(_named_span(processor, str(n)))
+
+    stats = processor.stats()
+    assert (stats.queued, stats.dropped) == (2, 2)
+    slow.release.set()
+    processor.shutdown()
+    assert slow.handled == expected
+    assert processor.stats().processed == 3
+
+
+def test_queued_processor_errors_do_not_stop_the_worker():
+    failing = _BlockingProcessor()
+    failing.release.set()
+    fast = MagicMock()
+    multi = SynchronousMultiTracingProcessor()
+    multi.set_processors([QueuedTracingProcessor(failing), fast])
+
+    for span_id in ["a", "bad", "b"]:
+        multi.on_span_end(_named_span(multi, span_id))
+    multi.force_flush()
+
+    assert failing.handled == ["a", "b"]
+    assert fast.on_span_end.call_count == 3
+    multi.shutdown()
+
+
 @pytest.fixture
 def patched_time_sleep():
     """
@@ -274,3 +496,212 @@ def test_backend_span_exporter_close(mock_client):
 
     # Ensure underlying http client is closed
     mock_client.return_value.close.assert_called_once()
+
+
+class _SinkHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = cast(_HttpSink, self.server)
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        time.sleep(server.delay)
+        with server.lock:
+            fail = server.failures > 0
+            server.failures -= 1
+        if fail:
+            self.send_response(500)
+        else:
+            server.requests.append((dict(self.headers), body))
+            self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _HttpSink(ThreadingHTTPServer):
+    """A local HTTP server that records the requests it receives."""
+
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), _SinkHandler)
+        self.requests: list[tuple[dict[str, str], bytes]] = []
+        # Set by tests: how long to take to respond, and how many requests to fail first.
+        self.delay = 0.0
+        self.failures = 0
+        self.lock = threading.Lock()
+
+
+@pytest.fixture
+def http_sink() -> Iterator[_HttpSink]:
+    server = _HttpSink()
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _generation_spans(count: int) -> list[SpanImpl[GenerationSpanData]]:
+    messages = [{"role": "user", "content": "Tell me about the weather in Tokyo. " * 50}]
+    return [
+        SpanImpl(
+            trace_id="test_trace_id",
+            span_id=f"span_{n}",
+            parent_id=None,
+            processor=mock_processor(),
+            span_data=GenerationSpanData(input=messages, output=messages, model="gpt-4o"),
+        )
+        for n in range(count)
+    ]
+
+
+def _received_items(server: _HttpSink) -> list[dict[str, Any]]:
+    items: list[dict[str, Any]] = []
+    for headers, body in server.requests:
+        if headers.get("Content-Encoding") == "gzip":
+            body = gzip.decompress(body)
+        items += json.loads(body)["data"]
+    return items
+
+
+def test_backend_span_exporter_serializes_each_item_once():
+    span = get_span(mock_processor())
+    with patch.object(SpanImpl, "export", autospec=True, side_effect=SpanImpl.export) as export:
+        with patch("httpx.Client") as mock_client:
+            mock_client.return_value.post.return_value = MagicMock(status_code=200)
+            exporter = BackendSpanExporter(api_key="test_key")
+            exporter.export([span])
+    assert export.call_count == 1
+    body = mock_client.return_value.post.call_args.kwargs["content"]
+    assert json.loads(body) == {"data": [span.export()]}
+
+
+def test_backend_span_exporter_splits_batches_by_size(http_sink: _HttpSink):
+    spans = _generation_spans(20)
+    record_size = len(json.dumps(spans[0].export(), separators=(",", ":")))
+    exporter = BackendSpanExporter(
+        api_key="test_key",
+        endpoint=f"http://127.0.0.1:{http_sink.server_port}",
+        max_payload_bytes=record_size * 5 + 100,
+    )
+    exporter.export(spans)  # type: ignore[arg-type]
+    exporter.close()
+
+    assert len(http_sink.requests) == 4
+    assert all(len(body) <= record_size * 5 + 100 for _, body in http_sink.requests)
+    assert [item["id"] for item in _received_items(http_sink)] == [span.span_id for span in spans]
+    assert exporter.stats.items == 20
+    assert exporter.stats.requests == 4
+
+
+def test_backend_span_exporter_compression_benchmark(http_sink: _HttpSink):
+    """Compares bytes on the wire and CPU time with and without gzip, against a local sink."""
+    spans = _generation_spans(200)
+    stats = {}
+    for compression in [None, "gzip"]:
+        exporter = BackendSpanExporter(
+            api_key="test_key",
+            endpoint=f"http://127.0.0.1:{http_sink.server_port}",
+            compression=compression,  # type: ignore[arg-type]
+        )
+        exporter.export(spans)  # type: ignore[arg-type]
+        exporter.close()
+        stats[compression] = exporter.stats
+
+    plain, compressed = stats[None], stats["gzip"]
+    assert plain.payload_bytes == compressed.payload_bytes == plain.sent_bytes
+    assert compressed.sent_bytes < plain.sent_bytes / 10
+    assert compressed.compression_time > 0
+    assert plain.serialization_time > 0
+    assert http_sink.requests[-1][0]["Content-Encoding"] == "gzip"
+    assert _received_items(http_sink) == [span.export() for span in spans] * 2
+
+
+def _async_exporter(server: _HttpSink, **kwargs: Any) -> AsyncBackendSpanExporter:
+    return AsyncBackendSpanExporter(
+        api_key="test_key", endpoint=f"http://127.0.0.1:{server.server_port}", **kwargs
+    )
+
+
+def test_async_exporter_sends_batches_concurrently(http_sink: _HttpSink):
+    http_sink.delay = 0.2
+    exporter = _async_exporter(http_sink, max_concurrent_requests=4)
+    spans = _generation_spans(4)
+
+    start = time.monotonic()
+    for span in spans:
+        exporter.export([span])
+    assert time.monotonic() - start < 0.1
+    exporter.flush()
+    # Four requests of 0.2s each, sent at once.
+    assert time.monotonic() - start < 0.6
+    assert sorted(item["id"] for item in _received_items(http_sink)) == [s.span_id for s in spans]
+    exporter.close()
+
+
+def test_async_exporter_retries_do_not_block_new_batches(http_sink: _HttpSink):
+    http_sink.failures = 1
+    exporter = _async_exporter(http_sink, base_delay=0.3)
+    first, second = _generation_spans(2)
+
+    exporter.export([first])
+    time.sleep(0.1)
+    # The first batch failed and is backing off; the second one goes through in the meantime.
+    exporter.export([second])
+    time.sleep(0.1)
+    assert [item["id"] for item in _received_items(http_sink)] == [second.span_id]
+
+    exporter.flush()
+    assert [item["id"] for item in _received_items(http_sink)] == [second.span_id, first.span_id]
+    assert exporter.stats.retries == 1
+    assert exporter.stats.failed_items == 0
+    exporter.close()
+
+
+def test_async_exporter_drops_payloads_under_backpressure(http_sink: _HttpSink):
+    http_sink.delay = 0.3
+    exporter = _async_exporter(http_sink, max_pending_payloads=1, backpressure_timeout=0.05)
+    first, second = _generation_spans(2)
+
+    exporter.export([first])
+    start = time.monotonic()
+    exporter.export([second])
+    assert 0.05 <= time.monotonic() - start < 0.25
+    exporter.flush()
+
+    assert [item["id"] for item in _received_items(http_sink)] == [first.span_id]
+    assert exporter.stats.dropped_items == 1
+    assert exporter.stats.items == 1
+    exporter.close()
+
+
+def test_batch_processor_force_flush_waits_for_async_exporter(http_sink: _HttpSink):
+    http_sink.delay = 0.1
+    exporter = _async_exporter(http_sink)
+    processor = BatchTraceProcessor(exporter, schedule_delay=60.0)
+    spans = _generation_spans(3)
+    for span in spans:
+        processor.on_span_end(span)
+
+    processor.force_flush()
+    assert len(_received_items(http_sink)) == 3
+    processor.shutdown()
+    exporter.close()
+
+
+def test_async_exporter_stats_add_up_across_threads(http_sink: _HttpSink):
+    exporter = _async_exporter(http_sink, max_concurrent_requests=8)
+    spans = _generation_spans(200)
+
+    def export_every_fourth(offset: int) -> None:
+        for span in spans[offset::4]:
+            exporter.export([span])
+
+    threads = [threading.Thread(target=export_every_fourth, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    exporter.flush()
+
+    assert exporter.stats.items == exporter.stats.requests == 200
+    assert len(_received_items(http_sink)) == 200
+    exporter.close()
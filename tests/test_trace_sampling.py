@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import pytest
+
+from agents import (
+    Agent,
+    GuardrailFunctionOutput,
+    InputGuardrail,
+    InputGuardrailTripwireTriggered,
+    Runner,
+    set_trace_processors,
+    set_trace_sampler,
+)
+from agents.exceptions import UserError
+from agents.tracing import RatioSampler, TailSamplingProcessor, custom_span, trace
+from agents.tracing.traces import NoOpTrace, TraceImpl
+
+from .fake_model import FakeModel
+from .test_responses import get_text_message
+from .testing_processor import SPAN_PROCESSOR_TESTING, SpanProcessorForTests
+
+
+@pytest.fixture
+def sampler_reset():
+    yield
+    set_trace_sampler(None)
+    set_trace_processors([SPAN_PROCESSOR_TESTING])
+
+
+def test_ratio_sampler_is_deterministic_per_trace_id():
+    sampler = RatioSampler(0.25)
+    trace_ids = [f"trace_{n:032x}" for n in range(2000)]
+    decisions = [sampler.should_sample("w", trace_id, None, None) for trace_id in trace_ids]
+
+    assert 0.2 < sum(decisions) / len(decisions) < 0.3
+    assert decisions == [sampler.should_sample("w", t, None, None) for t in trace_ids]
+    assert not any(RatioSampler(0).should_sample("w", t, None, None) for t in trace_ids)
+    assert all(RatioSampler(1).should_sample("w", t, None, None) for t in trace_ids)
+    with pytest.raises(UserError):
+        RatioSampler(1.5)
+
+
+def test_unsampled_traces_and_their_spans_are_no_ops(sampler_reset):
+    set_trace_sampler(RatioSampler(0))
+    with trace("unsampled") as t:
+        with custom_span("work"):
+            pass
+    assert isinstance(t, NoOpTrace)
+    assert SPAN_PROCESSOR_TESTING.get_ordered_spans(including_empty=True) == []
+
+    set_trace_sampler(None)
+    with trace("sampled"):
+        with custom_span("work"):
+            pass
+    assert len(SPAN_PROCESSOR_TESTING.get_ordered_spans()) == 1
+
+
+def _guardrail(tripwire: bool) -> InputGuardrail:
+    def check(context, agent, input) -> GuardrailFunctionOutput:
+        return GuardrailFunctionOutput(output_info=None, tripwire_triggered=tripwire)
+
+    return InputGuardrail(guardrail_function=check)
+
+
+@pytest.mark.asyncio
+async def test_tail_sampling_keeps_traces_with_errors_and_tripped_guardrails(sampler_reset):
+    downstream = SpanProcessorForTests()
+    tail = TailSamplingProcessor(downstream, slow_threshold=None)
+    set_trace_processors([tail])
+
+    model = FakeModel()
+    model.add_multiple_turn_outputs([[get_text_message("ok")], [get_text_message("ok")]])
+    await Runner.run(Agent(name="fine", model=model, input_guardrails=[_guardrail(False)]), "hi")
+    with pytest.raises(InputGuardrailTripwireTriggered):
+        await Runner.run(
+            Agent(name="tripped", model=model, input_guardrails=[_guardrail(True)]), "hi"
+        )
+    failing_model = FakeModel(tracing_enabled=True)
+    failing_model.set_next_output(ValueError("Model failed"))
+    with pytest.raises(ValueError):
+        await Runner.run(Agent(name="failed", model=failing_model), "hi")
+
+    assert (tail.stats.kept, tail.stats.discarded) == (2, 1)
+    assert tail.stats.buffered_spans == 0
+    kept_agents = {
+        span.span_data.name
+        for span in downstream.get_ordered_spans()
+        if span.span_data.type == "agent"
+    }
+    assert kept_agents == {"tripped", "failed"}
+    assert len(downstream.get_traces()) == 2
+
+
+def test_tail_sampling_keeps_slow_traces_and_a_baseline_share():
+    downstream = SpanProcessorForTests()
+    slow = TailSamplingProcessor(downstream, slow_threshold=0.0)
+    baseline = TailSamplingProcessor(downstream, slow_threshold=None, sample_ratio=1.0)
+    neither = TailSamplingProcessor(downstream, slow_threshold=60.0)
+    for tail in [slow, baseline, neither]:
+        t = TraceImpl(name="test", trace_id=None, group_id=None, metadata=None, processor=tail)
+        t.start()
+        t.finish()
+
+    assert [tail.stats.kept for tail in [slow, baseline, neither]] == [1, 1, 0]
+    assert len(downstream.get_traces()) == 2
+
+
+def test_tail_sampling_baseline_is_independent_of_head_sampling(sampler_reset):
+    downstream = SpanProcessorForTests()
+    tail = TailSamplingProcessor(downstream, slow_threshold=None, sample_ratio=0.5)
+    set_trace_sampler(RatioSampler(0.5))
+    set_trace_processors([tail])
+    for _ in range(2000):
+        with trace("test"):
+            pass
+
+    recorded = tail.stats.kept + tail.stats.discarded
+    assert 800 < recorded < 1200
+    # Half of the recorded traces are kept, rather than all of them, as they would be if both
+    # decisions came from the same hash of the trace ID.
+    assert 0.4 < tail.stats.kept / recorded < 0.6
+
+
+def test_salted_ratio_samplers_decide_independently():
+    trace_ids = [f"trace_{n:032x}" for n in range(2000)]
+    head = RatioSampler(0.5)
+    salted = RatioSampler(0.5, salt="tail")
+    both = sum(
+        head.should_sample("w", t, None, None) and salted.should_sample("w", t, None, None)
+        for t in trace_ids
+    )
+    assert 0.2 < both / len(trace_ids) < 0.3
+    assert [salted.should_sample("w", t, None, None) for t in trace_ids] == [
+        RatioSampler(0.5, salt="tail").should_sample("w", t, None, None) for t in trace_ids
+    ]
+
+
+def test_tail_sampling_buffer_is_capped():
+    downstream = SpanProcessorForTests()
+    tail = TailSamplingProcessor(downstream, max_buffered_spans=3)
+    set_trace_processors([tail])
+    try:
+        with trace("first"):
+            for _ in range(2):
+                with custom_span("work"):
+                    pass
+            with trace("second"):
+                # Exactly at the cap: each span counts once, though it's buffered on start and end.
+                with custom_span("work"):
+                    pass
+                assert tail.stats.evicted == 0
+                assert tail.stats.buffered_spans == 3
+
+                # Over the cap, which pushes out the first trace.
+                with custom_span("work"):
+                    pass
+                assert tail.stats.evicted == 1
+                assert tail.stats.buffered_spans == 2
+    finally:
+        set_trace_processors([SPAN_PROCESSOR_TESTING])
+    assert tail.stats.buffered_spans == 0
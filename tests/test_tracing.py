@@ -1,6 +1,8 @@
 from __future__ import annotations
 
 import asyncio
+import time
+from datetime import datetime, timezone
 from typing import Any
 
 import pytest
@@ -12,10 +14,12 @@ from agents.tracing import (
     custom_span,
     function_span,
     generation_span,
+    get_current_span,
     handoff_span,
     trace,
 )
-from agents.tracing.spans import SpanError
+from agents.tracing.spans import DISABLED_SPAN, SpanError
+from agents.tracing.util import ns_to_iso
 
 from .testing_processor import fetch_events, fetch_ordered_spans, fetch_traces
 
@@ -400,3 +404,51 @@ async def test_noop_parent_is_noop_child():
     span_2.finish()
 
     assert span_2.export() is None
+
+
+def test_disabled_tracing_hands_out_a_shared_span_without_data():
+    with trace(workflow_name="test", disabled=True):
+        span = agent_span(name="agent", tools=["a", "b"])
+        assert span is DISABLED_SPAN
+        with span:
+            # The span doesn't become the current span, since nested spans are no-ops anyway.
+            assert get_current_span() is None
+            with function_span(name="tool") as nested:
+                nested.span_data.input = "ignored"
+                assert nested.span_data.input is None
+                nested.span_data.retries.append({"attempt": 1})
+                assert nested.span_data.retries == []
+    assert fetch_ordered_spans() == []
+
+
+def test_disabled_span_in_enabled_trace_disables_nested_spans():
+    with trace(workflow_name="test"):
+        with custom_span(name="disabled", disabled=True) as span:
+            assert span is not DISABLED_SPAN
+            assert get_current_span() is span
+            assert custom_span(name="nested") is DISABLED_SPAN
+        with custom_span(name="enabled") as span:
+            assert span.export() is not None
+    assert len(fetch_ordered_spans()) == 1
+
+
+def test_span_timing_uses_a_monotonic_clock():
+    with trace(workflow_name="test"):
+        with custom_span(name="span_1") as span:
+            assert span.duration_ns is None
+            time.sleep(0.01)
+
+    assert span.duration_ns is not None and span.duration_ns >= 10_000_000
+    assert span.started_at is not None and span.ended_at is not None
+    started_at = datetime.fromisoformat(span.started_at)
+    ended_at = datetime.fromisoformat(span.ended_at)
+    # The ISO timestamps are only formatted on export, and agree with the duration.
+    assert abs((ended_at - started_at).total_seconds() * 1e9 - span.duration_ns) < 2_000
+    assert started_at.tzinfo is not None
+    assert span.export()["started_at"] == span.started_at
+
+
+def test_ns_to_iso_matches_datetime_isoformat():
+    now = datetime.now(timezone.utc)
+    timestamp_ns = int(now.timestamp()) * 1_000_000_000 + now.microsecond * 1000 + 999
+    assert ns_to_iso(timestamp_ns) == now.isoformat()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import json
+from typing import Any
+
+import pytest
+from openai.types import CompletionUsage
+from openai.types.completion_usage import CompletionTokensDetails, PromptTokensDetails
+from openai.types.responses import ResponseUsage
+
+from agents import (
+    Agent,
+    FileSearchTool,
+    ModelSettings,
+    RunContextWrapper,
+    RunHooks,
+    Runner,
+    function_tool,
+)
+from agents.items import ModelResponse
+from agents.models.openai_chatcompletions import _Converter
+from agents.models.openai_responses import Converter
+from agents.usage import Usage
+
+from .fake_model import FakeModel
+from .test_responses import get_handoff_tool_call, get_text_message
+
+
+def test_usage_from_response_usage_reads_token_details():
+    usage = Usage.from_response_usage(
+        ResponseUsage.model_validate(
+            {
+                "input_tokens": 100,
+                "output_tokens": 20,
+                "total_tokens": 120,
+                "input_tokens_details": {"cached_tokens": 80},
+                "output_tokens_details": {"reasoning_tokens": 12},
+            }
+        )
+    )
+
+    assert usage == Usage(
+        requests=1,
+        input_tokens=100,
+        output_tokens=20,
+        total_tokens=120,
+        cached_input_tokens=80,
+        reasoning_tokens=12,
+    )
+    assert usage.cache_hit_ratio == 0.8
+    assert Usage.from_response_usage(None) == Usage()
+
+
+def test_usage_from_completion_usage_reads_token_details():
+    usage = Usage.from_completion_usage(
+        CompletionUsage(
+            prompt_tokens=50,
+            completion_tokens=10,
+            total_tokens=60,
+            prompt_tokens_details=PromptTokensDetails(cached_tokens=25),
+            completion_tokens_details=CompletionTokensDetails(reasoning_tokens=4),
+        )
+    )
+
+    assert usage.cached_input_tokens == 25
+    assert usage.reasoning_tokens == 4
+    assert Usage.from_completion_usage(
+        CompletionUsage(prompt_tokens=1, completion_tokens=1, total_tokens=2)
+    ) == Usage(requests=1, input_tokens=1, output_tokens=1, total_tokens=2)
+
+
+def test_usage_add_sums_cached_and_reasoning_tokens():
+    usage = Usage()
+    usage.add(Usage(requests=1, input_tokens=10, cached_input_tokens=5, reasoning_tokens=2))
+    usage.add(Usage(requests=1, input_tokens=30, cached_input_tokens=15, reasoning_tokens=3))
+
+    assert usage.cached_input_tokens == 20
+    assert usage.reasoning_tokens == 5
+    assert usage.cache_hit_ratio == 0.5
+    assert Usage().cache_hit_ratio == 0.0
+
+
+class UsageModel(FakeModel):
+    def __init__(self, usage: Usage):
+        super().__init__()
+        self.usage = usage
+
+    async def get_response(self, *args, **kwargs) -> ModelResponse:
+        response = await super().get_response(*args, **kwargs)
+        return ModelResponse(
+            output=response.output, usage=Usage(**vars(self.usage)), referenceable_id=None
+        )
+
+
+@pytest.mark.asyncio
+async def test_usage_is_reported_per_agent():
+    contexts: list[RunContextWrapper[Any]] = []
+
+    class Hooks(RunHooks[Any]):
+        async def on_agent_end(self, context, agent, output):
+            contexts.append(context)
+
+    target_model = UsageModel(Usage(requests=1, input_tokens=100, cached_input_tokens=0))
+    target_model.set_next_output([get_text_message("done")])
+    target = Agent(name="target", model=target_model)
+
+    source_model = UsageModel(Usage(requests=1, input_tokens=100, cached_input_tokens=75))
+    source_model.set_next_output([get_handoff_tool_call(target)])
+    source = Agent(name="source", model=source_model, handoffs=[target])
+
+    await Runner.run(source, "hi", hooks=Hooks())
+
+    usage_by_agent = contexts[0].usage_by_agent
+    assert usage_by_agent["source"].cache_hit_ratio == 0.75
+    assert usage_by_agent["target"].cache_hit_ratio == 0.0
+    assert contexts[0].usage.cached_input_tokens == 75
+
+
+def test_converted_request_prefix_is_byte_stable():
+    def build() -> Agent:
+        @function_tool
+        def lookup(city: str, days: int = 1) -> str:
+            """Looks up the weather."""
+            return city
+
+        return Agent(
+            name="agent",
+            tools=[
+                lookup,
+                FileSearchTool(vector_store_ids=["vs_1"], include_search_results=True),
+                FileSearchTool(vector_store_ids=["vs_2"], include_search_results=True),
+            ],
+            handoffs=[Agent(name="other")],
+        )
+
+    def serialize(agent: Agent) -> str:
+        converted = Converter.convert_tools(agent.tools, Runner._get_handoffs(agent))
+        return json.dumps({"tools": converted.tools, "includes": converted.includes})
+
+    assert serialize(build()) == serialize(build())
+    assert Converter.convert_tools(build().tools, []).includes == ["file_search_call.results"]
+
+
+def test_cache_breakpoints_mark_instructions_and_history():
+    messages = _Converter.items_to_messages(
+        [
+            {"role": "user", "content": "hi"},
+            {"role": "user", "content": [{"type": "input_text", "text": "more"}]},
+        ]
+    )
+    messages.insert(0, {"role": "system", "content": "You are helpful."})
+
+    _Converter.add_cache_breakpoints(messages)
+
+    ephemeral = {"type": "ephemeral"}
+    assert messages[0]["content"] == [
+        {"type": "text", "text": "You are helpful.", "cache_control": ephemeral}
+    ]
+    assert messages[1]["content"] == "hi"
+    content = messages[2]["content"]
+    assert content is not None and not isinstance(content, str)
+    assert list(content)[-1] == {
+        "type": "text",
+        "text": "more",
+        "cache_control": ephemeral,
+    }
+
+
+def test_cache_breakpoints_setting_resolves():
+    assert ModelSettings().resolve(ModelSettings(cache_breakpoints=True)).cache_breakpoints
+    assert ModelSettings(cache_breakpoints=True).resolve(ModelSettings()).cache_breakpoints
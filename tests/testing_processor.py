@@ -60,7 +60,7 @@ class SpanProcessorForTests(TracingProcessor):
     def shutdown(self) -> None:
         pass
 
-    def force_flush(self) -> None:
+    def force_flush(self, timeout: float | None = None) -> None:
         pass
 
 